@@ -0,0 +1,41 @@
+"""Ajout des agrégats mensuels des transactions
+
+Revision ID: 008
+Revises: standardisation_noms_modeles
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = 'standardisation_noms_modeles'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'finance_agregats_mensuels',
+        sa.Column('periode', sa.String(7), nullable=False),
+        sa.Column('type_transaction', sa.String(20), nullable=False),
+        sa.Column('categorie', sa.String(20), nullable=False),
+        sa.Column('statut', sa.String(20), nullable=False),
+        sa.Column('montant_total', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('nombre_transactions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('periode', 'type_transaction', 'categorie', 'statut')
+    )
+
+    # Reprise de l'historique des transactions
+    op.execute("""
+        INSERT INTO finance_agregats_mensuels
+            (periode, type_transaction, categorie, statut, montant_total, nombre_transactions)
+        SELECT to_char(date_transaction, 'YYYY-MM'), type_transaction, categorie,
+               COALESCE(statut, 'EN_ATTENTE'), SUM(montant), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4
+    """)
+
+def downgrade():
+    op.drop_table('finance_agregats_mensuels')
@@ -0,0 +1,45 @@
+"""Ajout des jobs de clôture mensuelle et du gel des écritures
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'cloture_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('periode', sa.String(7), nullable=False),
+        sa.Column('statut', sa.String(20), nullable=False, server_default='EN_ATTENTE'),
+        sa.Column('etapes', sa.JSON()),
+        sa.Column('progression', sa.Integer(), server_default='0'),
+        sa.Column('erreur', sa.Text()),
+        sa.Column('utilisateur_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('employes.id')),
+        sa.Column('heartbeat', sa.DateTime()),
+        sa.Column('date_debut', sa.DateTime()),
+        sa.Column('date_fin', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_cloture_jobs_periode', 'cloture_jobs', ['periode'], unique=True)
+
+    op.add_column(
+        'ecritures_comptables',
+        sa.Column('modifiable', sa.Boolean(), nullable=False, server_default=sa.true())
+    )
+
+def downgrade():
+    op.drop_column('ecritures_comptables', 'modifiable')
+    op.drop_index('ix_cloture_jobs_periode', table_name='cloture_jobs')
+    op.drop_table('cloture_jobs')
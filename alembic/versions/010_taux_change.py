@@ -0,0 +1,29 @@
+"""Ajout des taux de change journaliers
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'taux_change',
+        sa.Column('date_taux', sa.Date(), nullable=False),
+        sa.Column('devise', sa.String(3), nullable=False),
+        sa.Column('taux', sa.Numeric(18, 8), nullable=False),
+        sa.Column('source', sa.String(50)),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('date_taux', 'devise')
+    )
+
+def downgrade():
+    op.drop_table('taux_change')
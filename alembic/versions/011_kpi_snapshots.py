@@ -0,0 +1,35 @@
+"""Ajout des instantanés mensuels d'indicateurs financiers
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'kpi_snapshots',
+        sa.Column('periode', sa.String(7), nullable=False),
+        sa.Column('chiffre_affaires', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('charges', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('resultat_net', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('total_actif', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('total_passif', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('tresorerie', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('ratio_liquidite', sa.Float()),
+        sa.Column('marge_nette', sa.Float()),
+        sa.Column('nombre_ecritures', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('calcule_le', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('periode')
+    )
+
+def downgrade():
+    op.drop_table('kpi_snapshots')
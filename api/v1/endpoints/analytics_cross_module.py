@@ -5,8 +5,10 @@ API endpoints pour les analytics cross-module
 from typing import Dict, Any, Optional
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
+from core.responses import EncodedJSONResponse
 from core.security import get_current_user, Permission, require_permissions
 from db.database import get_db
 from services.analytics_cross_module_service import CrossModuleAnalytics
@@ -19,14 +21,16 @@ async def get_unified_analytics(
     date_fin: Optional[date] = Query(None, description="Date de fin de l'analyse"),
     db: Session = Depends(get_db),
     current_user: Dict = Depends(get_current_user)
-) -> Dict[str, Any]:
+) -> Response:
     """
     Récupère les analytics unifiés de tous les modules.
     Inclut les corrélations et prédictions cross-module.
     """
     try:
         service = CrossModuleAnalytics(db)
-        return await service.get_unified_analytics(date_debut, date_fin)
+        return EncodedJSONResponse(
+            await service.get_unified_analytics_json(date_debut, date_fin)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
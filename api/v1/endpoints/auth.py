@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List
 from models.tache import Tache
@@ -10,8 +10,11 @@ from core.security import (
     verify_password,
     get_password_hash,
     create_access_token,
-    verify_token
+    get_current_user,
+    revoke_token,
+    oauth2_scheme
 )
+from core.principal_cache import Principal
 from models.auth import Utilisateur, Role, Permission, TypeRole
 from schemas.auth import (
     UserCreate,
@@ -32,35 +35,8 @@ from sqlalchemy import text
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
 
-# Dépendance pour obtenir l'utilisateur courant
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> Utilisateur:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Identifiants invalides",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    try:
-        payload = verify_token(token)
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except Exception:
-        raise credentials_exception
-        
-    user = db.query(Utilisateur).filter(
-        Utilisateur.username == username,
-        Utilisateur.is_active == True
-    ).first()
-    
-    if user is None:
-        raise credentials_exception
-    return user
+# get_current_user (core.security) reste importable depuis ce module
 
 @router.get("/")
 async def read_auth():
@@ -95,6 +71,12 @@ async def login(
     logger.info("Token d'accès créé avec succès")
     return {"access_token": access_token, "token_type": "bearer"}
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(oauth2_scheme)):
+    """Révoque le token courant"""
+    revoke_token(token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 @router.post("/first-admin", response_model=UserResponse)
 async def create_first_admin(
     user: FirstAdminCreate,
@@ -236,9 +218,12 @@ async def create_user(
     return db_user
 
 @router.get("/users/me", response_model=UserResponse)
-async def read_users_me(current_user: Utilisateur = Depends(get_current_user)):
+async def read_users_me(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
     """Récupère les informations de l'utilisateur connecté"""
-    return current_user
+    return db.get(Utilisateur, current_user.id)
 
 # Endpoints pour la gestion des rôles
 @router.post("/roles", response_model=RoleResponse)
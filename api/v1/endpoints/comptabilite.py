@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import date
+from decimal import Decimal
 from uuid import UUID
 
-from db.database import get_db
+from core.etag import CACHE_CONTROL, conditional_response, data_watermark, make_etag
+from db.database import SessionLocal, get_db
+from models.comptabilite import StatutClotureJob
 from services.comptabilite_service import ComptabiliteService
+from services.container import ServiceContainer, get_container
+from services.finance_comptabilite.kpi import SnapshotsKpi
+from services.finance_comptabilite.rapprochement import RapprochementBancaire
+from services.ml.finance_comptabilite.cloture import GestionCloture
 from schemas.comptabilite import (
     CompteComptableCreate, CompteComptableUpdate, CompteComptableResponse,
     EcritureComptableCreate, EcritureComptableUpdate, EcritureComptableResponse,
     JournalComptableCreate, JournalComptableResponse,
     ExerciceComptableCreate, ExerciceComptableResponse,
-    LigneGrandLivre, CompteBalance, BilanResponse, CompteResultatResponse
+    LigneGrandLivre, CompteBalance, BilanResponse, CompteResultatResponse,
+    ClotureJobResponse, ValidationEcrituresRequest, ValidationEcrituresResponse,
+    KpiSnapshotResponse
 )
 
 router = APIRouter(prefix="/comptabilite", tags=["comptabilite"])
@@ -21,10 +30,10 @@ router = APIRouter(prefix="/comptabilite", tags=["comptabilite"])
 # Nouveaux endpoints pour les statistiques et analyses
 @router.get("/stats")
 async def get_stats(
-    db: Session = Depends(get_db)
+    container: ServiceContainer = Depends(get_container)
 ) -> Dict[str, Any]:
     """Récupère les statistiques financières"""
-    service = ComptabiliteService(db)
+    service = container.get(ComptabiliteService)
     try:
         return await service.get_stats()
     except Exception as e:
@@ -33,10 +42,10 @@ async def get_stats(
 @router.get("/budget/analysis")
 async def get_budget_analysis(
     periode: str = Query(..., description="Période d'analyse (format: YYYY-MM)"),
-    db: Session = Depends(get_db)
+    container: ServiceContainer = Depends(get_container)
 ) -> Dict[str, Any]:
     """Analyse détaillée du budget pour une période"""
-    service = ComptabiliteService(db)
+    service = container.get(ComptabiliteService)
     try:
         return await service.get_budget_analysis(periode)
     except Exception as e:
@@ -45,10 +54,10 @@ async def get_budget_analysis(
 @router.get("/cashflow")
 async def get_cashflow(
     days: int = Query(30, description="Nombre de jours d'historique", ge=1, le=365),
-    db: Session = Depends(get_db)
+    container: ServiceContainer = Depends(get_container)
 ) -> List[Dict[str, Any]]:
     """Récupère les données de trésorerie sur une période"""
-    service = ComptabiliteService(db)
+    service = container.get(ComptabiliteService)
     try:
         return await service.get_cashflow(days)
     except Exception as e:
@@ -131,6 +140,18 @@ async def list_ecritures(
         statut=statut
     )
 
+@router.post("/ecritures/valider", response_model=ValidationEcrituresResponse)
+async def valider_ecritures(
+    validation: ValidationEcrituresRequest,
+    db: Session = Depends(get_db)
+):
+    """Valide en masse les écritures en brouillon (période, journal, identifiants)"""
+    service = ComptabiliteService(db)
+    try:
+        return await service.valider_ecritures(**validation.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/ecritures/{ecriture_id}/valider")
 async def valider_ecriture(
     ecriture_id: UUID,
@@ -190,41 +211,155 @@ async def cloturer_exercice(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Clôture mensuelle: job persistant exécuté en arrière-plan
+async def _executer_cloture(job_id: UUID):
+    """Exécute un job de clôture dans sa propre session"""
+    db = SessionLocal()
+    try:
+        await GestionCloture(db).executer_job(job_id)
+    finally:
+        db.close()
+
+@router.post("/clotures/{periode}", response_model=ClotureJobResponse, status_code=202)
+async def lancer_cloture_mensuelle(
+    periode: str,
+    utilisateur_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Lance ou reprend la clôture mensuelle d'une période (YYYY-MM)"""
+    try:
+        job = GestionCloture(db).creer_job(periode, utilisateur_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Période invalide, format attendu YYYY-MM")
+    if job.statut != StatutClotureJob.TERMINE:
+        background_tasks.add_task(_executer_cloture, job.id)
+    return job
+
+@router.get("/clotures/{periode}", response_model=ClotureJobResponse)
+async def get_cloture_mensuelle(
+    periode: str,
+    db: Session = Depends(get_db)
+):
+    """Avancement de la clôture mensuelle d'une période"""
+    job = GestionCloture(db).get_job(periode)
+    if not job:
+        raise HTTPException(status_code=404, detail="Aucune clôture pour cette période")
+    return job
+
+@router.post("/rapprochement-bancaire")
+async def rapprocher_banque(
+    date_debut: date,
+    date_fin: date,
+    tolerance_montant: Decimal = Query(Decimal("0"), ge=0),
+    fenetre_jours: int = Query(3, ge=0, le=31),
+    appliquer: bool = True,
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Rapproche les transactions avec les lignes du journal de banque de la période"""
+    if date_fin < date_debut:
+        raise HTTPException(status_code=400, detail="La date de fin précède la date de début")
+    resultat = await RapprochementBancaire(db).rapprocher(
+        date_debut, date_fin, tolerance_montant, fenetre_jours, appliquer
+    )
+    return resultat.to_dict()
+
+PERIODE_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+@router.post("/kpi/snapshots", response_model=List[KpiSnapshotResponse])
+async def enregistrer_snapshots_kpi(
+    debut: str = Query(..., pattern=PERIODE_PATTERN),
+    fin: Optional[str] = Query(None, pattern=PERIODE_PATTERN),
+    db: Session = Depends(get_db)
+):
+    """Recalcule et enregistre les indicateurs des mois [debut, fin]"""
+    if fin and fin < debut:
+        raise HTTPException(status_code=400, detail="La période de fin précède la période de début")
+    return await SnapshotsKpi(db).enregistrer(debut, fin)
+
+@router.get("/kpi", response_model=List[KpiSnapshotResponse])
+async def get_snapshots_kpi(
+    debut: str = Query(..., pattern=PERIODE_PATTERN),
+    fin: str = Query(..., pattern=PERIODE_PATTERN),
+    db: Session = Depends(get_db)
+):
+    """Indicateurs enregistrés des mois [debut, fin] (courbes de tendance)"""
+    return SnapshotsKpi(db).get_snapshots(debut, fin)
+
+@router.get("/kpi/comparaison/{annee}")
+async def comparer_kpi_annees(
+    annee: int,
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Indicateurs mensuels de l'année comparés à ceux de l'année précédente"""
+    return SnapshotsKpi(db).comparer_annees(annee)
+
 # Endpoints pour les rapports comptables
 @router.get("/grand-livre", response_model=List[LigneGrandLivre])
 async def get_grand_livre(
     compte_id: Optional[UUID] = None,
     date_debut: Optional[date] = None,
     date_fin: Optional[date] = None,
+    devise: Optional[str] = Query(None, min_length=3, max_length=3, description="Devise de restitution (ex: EUR)"),
     db: Session = Depends(get_db)
 ):
     """Génère le grand livre"""
     service = ComptabiliteService(db)
-    return await service.get_grand_livre(
-        compte_id=compte_id,
-        date_debut=date_debut,
-        date_fin=date_fin
-    )
+    try:
+        return await service.get_grand_livre(
+            compte_id=compte_id,
+            date_debut=date_debut,
+            date_fin=date_fin,
+            devise=devise
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/balance", response_model=List[CompteBalance])
 async def get_balance(
+    request: Request,
+    response: Response,
     date_debut: Optional[date] = None,
     date_fin: Optional[date] = None,
+    devise: Optional[str] = Query(None, min_length=3, max_length=3, description="Devise de restitution (ex: EUR)"),
     db: Session = Depends(get_db)
 ):
-    """Génère la balance générale"""
+    """Génère la balance générale (GET conditionnel via ETag)"""
+    if devise:
+        # Montants convertis au taux du jour de clôture (à défaut aujourd'hui)
+        etag = make_etag(
+            "balance", date_debut, date_fin, devise.upper(), date_fin or date.today(),
+            data_watermark(db, "comptabilite", "change")
+        )
+    else:
+        etag = make_etag("balance", date_debut, date_fin, data_watermark(db, "comptabilite"))
+    not_modified = conditional_response(request, response, etag, CACHE_CONTROL["comptabilite"])
+    if not_modified:
+        return not_modified
+
     service = ComptabiliteService(db)
-    return await service.get_balance_generale(
-        date_debut=date_debut,
-        date_fin=date_fin
-    )
+    try:
+        return await service.get_balance_generale(
+            date_debut=date_debut,
+            date_fin=date_fin,
+            devise=devise
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/bilan", response_model=BilanResponse)
 async def get_bilan(
+    request: Request,
+    response: Response,
     date_fin: date = Query(..., description="Date de fin pour le bilan"),
     db: Session = Depends(get_db)
 ):
-    """Génère le bilan comptable"""
+    """Génère le bilan comptable (GET conditionnel via ETag)"""
+    etag = make_etag("bilan", date_fin, data_watermark(db, "comptabilite"))
+    not_modified = conditional_response(request, response, etag, CACHE_CONTROL["comptabilite"])
+    if not_modified:
+        return not_modified
+
     service = ComptabiliteService(db)
     return await service.get_bilan(date_fin=date_fin)
 
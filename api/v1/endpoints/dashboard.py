@@ -1,24 +1,22 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Dict, Any
-from db.database import get_db
+from db.database import get_db, get_async_db
 from models.auth import Utilisateur
 from api.v1.endpoints.auth import get_current_user
+from core.etag import CACHE_CONTROL, content_etag, etag_matches
+from core.responses import EncodedJSONResponse
 from services.dashboard_service import DashboardService
 from services.ml.tableau_bord.unification import TableauBordUnifieService
-from services.hr_analytics_service import HRAnalyticsService
-from services.production_service import ProductionService
-from services.finance_service import FinanceService
-from services.inventory_service import InventoryService
-from services.weather_service import WeatherService
-from services.ml.projets.service import ProjetsMLService
-from services.cache_service import CacheService
+from services.container import ServiceContainer, get_container
 
 router = APIRouter()
 
 @router.get("/stats")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Utilisateur = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """Récupère les statistiques pour le tableau de bord"""
@@ -28,7 +26,7 @@ async def get_dashboard_stats(
 @router.get("/activities")
 async def get_recent_activities(
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     """Récupère les activités récentes"""
@@ -46,17 +44,19 @@ async def get_weather_data(
 
 @router.get("/unified")
 async def get_unified_dashboard(
-    db: Session = Depends(get_db),
+    request: Request,
+    container: ServiceContainer = Depends(get_container),
     current_user: Utilisateur = Depends(get_current_user)
-) -> Dict[str, Any]:
-    """Récupère les données du tableau de bord unifié"""
-    service = TableauBordUnifieService(
-        hr_service=HRAnalyticsService(db),
-        production_service=ProductionService(db),
-        finance_service=FinanceService(db),
-        inventory_service=InventoryService(db),
-        weather_service=WeatherService(db),
-        projets_ml=ProjetsMLService(db),
-        cache_service=CacheService()
-    )
-    return await service.get_unified_dashboard_data()
\ No newline at end of file
+) -> Response:
+    """
+    Récupère les données du tableau de bord unifié (JSON mis en cache)
+
+    L'ETag identifie la version en cache: un client à jour reçoit une
+    réponse 304, sans transfert du contenu.
+    """
+    service = container.get(TableauBordUnifieService)
+    payload = await service.get_unified_dashboard_json()
+    headers = {"ETag": content_etag(payload), "Cache-Control": CACHE_CONTROL["dashboard"]}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return EncodedJSONResponse(payload, headers=headers)
\ No newline at end of file
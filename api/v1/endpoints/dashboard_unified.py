@@ -1,43 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any
-from sqlalchemy.orm import Session
 
+from fastapi.responses import Response
+
+from core.responses import EncodedJSONResponse
 from services.ml.tableau_bord.unification import TableauBordUnifieService
-from services.hr_analytics_service import HRAnalyticsService
-from services.production_service import ProductionService
-from services.finance_service import FinanceService
-from services.inventory_service import InventoryService
-from services.weather_service import WeatherService
-from services.ml.projets.service import ProjetsMLService
-from services.cache_service import CacheService
-from db.database import get_db
+from services.container import ServiceContainer, get_container
 
 router = APIRouter()
 
-async def get_dashboard_service(db: Session = Depends(get_db)):
+async def get_dashboard_service(container: ServiceContainer = Depends(get_container)):
     """Injection des dépendances pour le service dashboard unifié."""
-    return TableauBordUnifieService(
-        hr_service=HRAnalyticsService(),
-        production_service=ProductionService(),
-        finance_service=FinanceService(),
-        inventory_service=InventoryService(),
-        weather_service=WeatherService(),
-        projets_ml=ProjetsMLService(db),
-        cache_service=CacheService()
-    )
+    return container.get(TableauBordUnifieService)
 
-@router.get("/unified", response_model=Dict[str, Any])
+@router.get("/unified")
 async def get_unified_dashboard(
     service: TableauBordUnifieService = Depends(get_dashboard_service)
-) -> Dict[str, Any]:
+) -> Response:
     """
     Récupère les données du dashboard unifié.
     
     Returns:
-        Dict[str, Any]: Données agrégées de tous les modules
+        Response: Données agrégées de tous les modules (JSON mis en cache)
     """
     try:
-        return await service.get_unified_dashboard_data()
+        return EncodedJSONResponse(await service.get_unified_dashboard_json())
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-from db.database import get_db
+from db.database import SessionLocal, get_db
 from models.auth import Utilisateur
 from models.finance import Transaction, Compte, Budget
 from schemas.finance import (
     TransactionCreate, TransactionUpdate, TransactionResponse,
     CompteCreate, CompteUpdate, CompteResponse,
-    BudgetCreate, BudgetUpdate, BudgetResponse
+    BudgetCreate, BudgetUpdate, BudgetResponse,
+    ScenarioRequest
 )
 from api.v1.endpoints.auth import get_current_user
 from services.finance_service import FinanceService
@@ -134,15 +135,35 @@ async def update_budget(
 
 # Nouvelles routes pour l'analyse budgétaire et les projections
 
+async def _enrichir_budget_analysis(periode: str) -> None:
+    """Enrichissement ML de l'analyse budgétaire, hors requête (session dédiée)"""
+    db = SessionLocal()
+    try:
+        await FinanceService(db).enrichir_budget_analysis(periode)
+    finally:
+        db.close()
+
 @router.get("/budgets/analysis/{periode}")
 async def get_budget_analysis(
     periode: str,
+    background_tasks: BackgroundTasks,
+    devise: Optional[str] = Query(None, min_length=3, max_length=3, description="Devise de restitution (ex: EUR)"),
     db: Session = Depends(get_db),
     current_user: Utilisateur = Depends(get_current_user)
 ):
-    """Récupère l'analyse budgétaire détaillée pour une période"""
+    """
+    Analyse budgétaire d'une période: écarts immédiats, enrichissement ML
+    joint dès qu'il est calculé (ml_statut)
+    """
     finance_service = FinanceService(db)
-    return await finance_service.get_budget_analysis(periode)
+    try:
+        analysis = await finance_service.get_budget_analysis(periode, devise=devise)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Une seule tâche d'enrichissement par période, quel que soit le nombre de lectures
+    if analysis["ml_statut"] == "EN_ATTENTE" and await finance_service.reserver_enrichissement(periode):
+        background_tasks.add_task(_enrichir_budget_analysis, periode)
+    return analysis
 
 @router.get("/projections")
 async def get_financial_projections(
@@ -154,6 +175,19 @@ async def get_financial_projections(
     finance_service = FinanceService(db)
     return await finance_service.get_financial_projections(months_ahead)
 
+@router.post("/projections/scenarios")
+async def simulate_scenarios(
+    request: ScenarioRequest,
+    db: Session = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_user)
+):
+    """Bandes P10/P50/P90 de produits, charges et trésorerie (simulation Monte-Carlo)"""
+    finance_service = FinanceService(db)
+    try:
+        return await finance_service.simulate_scenarios(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Documentation Swagger
 
 @router.get("/docs/models")
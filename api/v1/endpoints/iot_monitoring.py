@@ -5,9 +5,10 @@ from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from db.database import get_db
+from db.database import get_db, get_async_db
 from schemas.iot_monitoring import (
     MonitoringRequestSchema,
     MonitoringDataSchema,
@@ -25,20 +26,23 @@ from services.ml.production.service import ProductionMLService
 
 router = APIRouter(prefix="/api/v1/iot-monitoring", tags=["IoT Monitoring"])
 
-def get_iot_service(db: Session = Depends(get_db)) -> IoTService:
-    """Injection de dépendance pour le service IoT."""
-    return IoTService(db)
-
 def get_weather_service(db: Session = Depends(get_db)) -> WeatherService:
     """Injection de dépendance pour le service météo."""
     return WeatherService(db)
 
+def get_iot_service(
+    db: Session = Depends(get_db),
+    weather_service: WeatherService = Depends(get_weather_service)
+) -> IoTService:
+    """Injection de dépendance pour le service IoT."""
+    return IoTService(db, weather_service)
+
 def get_ml_service(db: Session = Depends(get_db)) -> ProductionMLService:
     """Injection de dépendance pour le service ML."""
     return ProductionMLService(db)
 
 def get_monitoring_service(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     iot_service: IoTService = Depends(get_iot_service),
     weather_service: WeatherService = Depends(get_weather_service),
     ml_service: ProductionMLService = Depends(get_ml_service)
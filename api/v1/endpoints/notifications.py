@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, status
 from sqlalchemy.orm import Session
 from typing import List
-import json
 from db.database import get_db
 from models.notification import Notification
 from schemas.notification import NotificationCreate, NotificationResponse
 from api.v1.endpoints.auth import get_current_user
 from models.auth import Utilisateur
+from services.notification_hub import get_notification_hub
 
 router = APIRouter()
 
@@ -43,27 +43,19 @@ async def mark_as_read(
     db.commit()
     return {"status": "success"}
 
-# Gestionnaire de connexions WebSocket
-connected_clients = {}
-
 @router.websocket("/ws/{client_id}")
-async def notifications_websocket(websocket: WebSocket, client_id: str):
-    """Endpoint WebSocket pour les notifications en temps réel"""
+async def notifications_websocket(websocket: WebSocket, client_id: str, heartbeat: bool = False):
+    """
+    Endpoint WebSocket pour les notifications en temps réel
+
+    Les notifications publiées par n'importe quel worker sont relayées
+    par Redis jusqu'à cette connexion. Avec ?heartbeat=true, le serveur
+    envoie {"type":"ping"} pendant les silences et ferme la connexion si le
+    client ne répond pas (par {"type":"pong"}) avant WS_IDLE_TIMEOUT.
+    """
     await websocket.accept()
-    connected_clients[client_id] = websocket
-    
-    try:
-        while True:
-            data = await websocket.receive_text()
-            # Traitement des messages du client si nécessaire
-    except Exception:
-        connected_clients.pop(client_id, None)
+    await get_notification_hub().serve(websocket, client_id, heartbeat=heartbeat)
 
 async def send_notification(user_id: str, notification: dict):
-    """Envoie une notification via WebSocket"""
-    if user_id in connected_clients:
-        websocket = connected_clients[user_id]
-        try:
-            await websocket.send_json(notification)
-        except Exception:
-            connected_clients.pop(user_id, None)
\ No newline at end of file
+    """Publie une notification vers les connexions WebSocket de l'utilisateur"""
+    await get_notification_hub().publish(user_id, notification)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 from datetime import datetime, timezone, timedelta
+from core.etag import CACHE_CONTROL, conditional_response, data_watermark, make_etag
 from services.production_report_service import ProductionReportService
 from db.database import get_db
 from pydantic import BaseModel
@@ -31,6 +32,8 @@ class ProductionEventCreate(BaseModel):
 
 @router.get("/weekly", response_model=Dict[str, Any])
 async def get_weekly_report(
+    request: Request,
+    response: Response,
     date: Optional[str] = Query(
         None,
         description="Date de début au format YYYY-MM-DD (défaut: date actuelle)"
@@ -52,6 +55,8 @@ async def get_weekly_report(
     
     Les données sont mises en cache pendant 1 heure pour optimiser les performances.
     Utilisez force_refresh=true pour forcer une mise à jour des données.
+    Sans nouvelle récolte ni nouvel événement, un client présentant l'ETag
+    reçu (If-None-Match) obtient une réponse 304.
     """
     try:
         # Utilisation de la date fournie ou date actuelle
@@ -63,8 +68,20 @@ async def get_weekly_report(
             hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc
         )
 
-        # Génération du rapport
+        # GET conditionnel: filigrane de production et heure du cache météo
         report_service = ProductionReportService(db)
+        if not force_refresh:
+            etag = make_etag(
+                "weekly",
+                start_date,
+                data_watermark(db, "production"),
+                int(datetime.now(timezone.utc).timestamp()) // report_service.cache_ttl
+            )
+            not_modified = conditional_response(request, response, etag, CACHE_CONTROL["production"])
+            if not_modified:
+                return not_modified
+
+        # Génération du rapport
         report = await report_service.generate_weekly_report(
             start_date,
             force_refresh=force_refresh
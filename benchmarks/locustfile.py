@@ -0,0 +1,161 @@
+"""
+Scénarios de charge (locust) pour les endpoints les plus sollicités
+
+Usage (API lancée sur une base remplie par benchmarks.seed):
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 \\
+        --headless -u 50 -r 10 -t 5m --csv benchmarks/results/run
+    python -m benchmarks.report benchmarks/results/run_stats.csv
+
+Les identifiants (parcelles, produits, période) et le compte de test sont
+lus dans benchmarks/seed_state.json. Les URL paramétrées sont regroupées
+sous un nom stable (name=...) pour la comparaison avec la référence.
+"""
+
+from datetime import date, timedelta
+import json
+import os
+import random
+
+from locust import HttpUser, between, task
+
+from benchmarks.seed import STATE_FILE
+
+API = "/api/v1"
+# Le routeur de monitoring déclare aussi son préfixe complet
+IOT_MONITORING = f"{API}/iot-monitoring{API}/iot-monitoring"
+
+def _load_state() -> dict:
+    if STATE_FILE.exists():
+        return json.loads(STATE_FILE.read_text())
+    return {"parcelles": [], "produits": [], "period": {}}
+
+STATE = _load_state()
+
+class AuthenticatedUser(HttpUser):
+    """Utilisateur connecté (token OAuth2 obtenu au démarrage)"""
+    abstract = True
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        response = self.client.post(
+            f"{API}/auth/token",
+            data={
+                "username": os.getenv("BENCH_USERNAME", STATE.get("username", "bench")),
+                "password": os.getenv("BENCH_PASSWORD", STATE.get("password", "")),
+            },
+            name="auth/token",
+        )
+        response.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+class DashboardUser(AuthenticatedUser):
+    """Bureau de la ferme: tableau de bord rafraîchi en continu"""
+    weight = 4
+
+    def on_start(self):
+        super().on_start()
+        self.unified_etag = None
+
+    @task(3)
+    def stats(self):
+        self.client.get(f"{API}/dashboard/stats", name="dashboard/stats")
+
+    @task(2)
+    def activities(self):
+        self.client.get(f"{API}/dashboard/activities?limit=10", name="dashboard/activities")
+
+    @task(2)
+    def unified(self):
+        # Client qui revalide sa copie (If-None-Match): 304 sans changement
+        headers = {"If-None-Match": self.unified_etag} if self.unified_etag else {}
+        with self.client.get(
+            f"{API}/dashboard/unified", headers=headers, name="dashboard/unified", catch_response=True
+        ) as response:
+            if response.status_code in (200, 304):
+                self.unified_etag = response.headers.get("ETag", self.unified_etag)
+                response.success()
+
+class ComptabiliteUser(AuthenticatedUser):
+    """Comptable: balance, bilan et grand livre sur la période générée"""
+    weight = 2
+
+    def _period(self):
+        end = date.fromisoformat(STATE["period"].get("end", date.today().isoformat()))
+        start = end.replace(month=1, day=1)
+        return start, end
+
+    @task(3)
+    def balance(self):
+        start, end = self._period()
+        self.client.get(
+            f"{API}/comptabilite/balance?date_debut={start}&date_fin={end}",
+            name="comptabilite/balance"
+        )
+
+    @task(2)
+    def bilan(self):
+        _, end = self._period()
+        self.client.get(f"{API}/comptabilite/bilan?date_fin={end}", name="comptabilite/bilan")
+
+    @task(1)
+    def grand_livre(self):
+        _, end = self._period()
+        start = end - timedelta(days=30)
+        self.client.get(
+            f"{API}/comptabilite/grand-livre?date_debut={start}&date_fin={end}",
+            name="comptabilite/grand-livre"
+        )
+
+    @task(1)
+    def compte_resultat(self):
+        start, end = self._period()
+        self.client.get(
+            f"{API}/comptabilite/compte-resultat?date_debut={start}&date_fin={end}",
+            name="comptabilite/compte-resultat"
+        )
+
+class IoTMonitoringUser(AuthenticatedUser):
+    """Suivi des capteurs d'une parcelle (relevés toutes les 5 minutes)"""
+    weight = 3
+
+    def _parcelle(self):
+        return random.choice(STATE["parcelles"]) if STATE["parcelles"] else None
+
+    @task(3)
+    def parcelle_dashboard(self):
+        parcelle_id = self._parcelle()
+        if parcelle_id:
+            self.client.get(
+                f"{IOT_MONITORING}/parcelles/{parcelle_id}/dashboard",
+                name="iot-monitoring/parcelles/[id]/dashboard"
+            )
+
+    @task(2)
+    def parcelle_monitoring(self):
+        parcelle_id = self._parcelle()
+        if parcelle_id:
+            self.client.get(
+                f"{IOT_MONITORING}/parcelles/{parcelle_id}",
+                name="iot-monitoring/parcelles/[id]"
+            )
+
+    @task(1)
+    def health(self):
+        self.client.get(f"{IOT_MONITORING}/health", name="iot-monitoring/health")
+
+class InventaireUser(AuthenticatedUser):
+    """Magasinier: catalogue paginé et stocks par produit"""
+    weight = 2
+
+    @task(2)
+    def produits(self):
+        skip = random.randrange(0, 1000, 100)
+        self.client.get(f"{API}/inventaire/produits?skip={skip}&limit=100", name="inventaire/produits")
+
+    @task(3)
+    def stocks_produit(self):
+        if STATE["produits"]:
+            self.client.get(
+                f"{API}/inventaire/stocks?produit_id={random.choice(STATE['produits'])}",
+                name="inventaire/stocks?produit_id"
+            )
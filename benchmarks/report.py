@@ -0,0 +1,134 @@
+"""
+Comparaison d'un tir locust avec la référence enregistrée
+
+Lit le fichier <prefix>_stats.csv produit par locust --csv et compare, par
+endpoint, la latence p50/p95 et le débit à benchmarks/baseline.json.
+Un endpoint régresse si son p95 dépasse la référence de plus de
+--latency-tolerance, ou si son débit baisse de plus de
+--throughput-tolerance. Le code de sortie vaut 1 en cas de régression.
+
+Usage:
+    python -m benchmarks.report benchmarks/results/run_stats.csv
+    python -m benchmarks.report benchmarks/results/run_stats.csv --update-baseline
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import csv
+import json
+import sys
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+LATENCY_TOLERANCE = 0.20
+THROUGHPUT_TOLERANCE = 0.15
+
+@dataclass
+class EndpointStats:
+    """Statistiques locust d'un endpoint"""
+    requests: int
+    failures: int
+    p50_ms: float
+    p95_ms: float
+    rps: float
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"p50_ms": self.p50_ms, "p95_ms": self.p95_ms, "rps": self.rps}
+
+@dataclass
+class Comparison:
+    """Écart d'un endpoint par rapport à la référence"""
+    name: str
+    current: EndpointStats
+    baseline: Optional[Dict[str, float]]
+    regressions: List[str]
+
+    def ratio(self, metric: str) -> Optional[float]:
+        if not self.baseline or not self.baseline.get(metric):
+            return None
+        return getattr(self.current, metric) / self.baseline[metric] - 1
+
+def _number(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def load_stats(path: Path) -> Dict[str, EndpointStats]:
+    """Statistiques par endpoint ("GET dashboard/stats"), hors ligne Aggregated"""
+    stats = {}
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            if row["Name"] == "Aggregated":
+                continue
+            stats[f"{row['Type']} {row['Name']}"] = EndpointStats(
+                requests=int(_number(row["Request Count"])),
+                failures=int(_number(row["Failure Count"])),
+                p50_ms=_number(row["50%"]),
+                p95_ms=_number(row["95%"]),
+                rps=_number(row["Requests/s"]),
+            )
+    return stats
+
+def compare(current: Dict[str, EndpointStats],
+            baseline: Dict[str, Dict[str, float]],
+            latency_tolerance: float = LATENCY_TOLERANCE,
+            throughput_tolerance: float = THROUGHPUT_TOLERANCE) -> List[Comparison]:
+    """Compare chaque endpoint du tir à sa référence"""
+    comparisons = []
+    for name, stats in sorted(current.items()):
+        reference = baseline.get(name)
+        regressions = []
+        if stats.failures:
+            regressions.append(f"{stats.failures} échecs")
+        if reference:
+            if reference.get("p95_ms") and stats.p95_ms > reference["p95_ms"] * (1 + latency_tolerance):
+                regressions.append("p95")
+            if reference.get("rps") and stats.rps < reference["rps"] * (1 - throughput_tolerance):
+                regressions.append("débit")
+        comparisons.append(Comparison(name, stats, reference, regressions))
+    return comparisons
+
+def format_report(comparisons: List[Comparison]) -> str:
+    def delta(comparison: Comparison, metric: str) -> str:
+        ratio = comparison.ratio(metric)
+        return "   n/a" if ratio is None else f"{ratio:+6.0%}"
+
+    lines = [
+        f"{'Endpoint':<50} {'p50 ms':>8} {'p95 ms':>8} {'Δp95':>6} {'req/s':>7} {'Δreq/s':>6}  Statut",
+    ]
+    for c in comparisons:
+        status = "RÉGRESSION (" + ", ".join(c.regressions) + ")" if c.regressions else (
+            "ok" if c.baseline else "pas de référence"
+        )
+        lines.append(
+            f"{c.name:<50} {c.current.p50_ms:>8.0f} {c.current.p95_ms:>8.0f} {delta(c, 'p95_ms')} "
+            f"{c.current.rps:>7.1f} {delta(c, 'rps')}  {status}"
+        )
+    return "\n".join(lines)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare un tir locust à la référence")
+    parser.add_argument("stats", type=Path, help="Fichier <prefix>_stats.csv de locust")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--latency-tolerance", type=float, default=LATENCY_TOLERANCE)
+    parser.add_argument("--throughput-tolerance", type=float, default=THROUGHPUT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistre ce tir comme référence")
+    args = parser.parse_args()
+
+    current = load_stats(args.stats)
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(
+            {name: stats.to_dict() for name, stats in sorted(current.items())}, indent=2
+        ) + "\n")
+        print(f"Référence mise à jour: {args.baseline} ({len(current)} endpoints)")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    comparisons = compare(current, baseline, args.latency_tolerance, args.throughput_tolerance)
+    print(format_report(comparisons))
+    return 1 if any(c.regressions for c in comparisons) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
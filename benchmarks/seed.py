@@ -0,0 +1,344 @@
+"""
+Générateur de données synthétiques pour les tests de charge
+
+Remplit une base de benchmark avec des volumes réalistes: plusieurs années
+d'écritures comptables équilibrées, des mois de relevés de capteurs toutes
+les 5 minutes, des milliers de stocks. Les données sont générées par lots
+(numpy) et insérées en executemany.
+
+Usage:
+    python -m benchmarks.seed --database-url postgresql://... --profile medium --create-schema
+
+Le schéma de benchmark est créé depuis les modèles SQLAlchemy, sans
+contraintes de clés étrangères (certaines tables référencées, comme
+entrepots, n'existent que dans les migrations). L'API doit alors être
+lancée avec DB_SCHEMA_MODE=off sur cette base.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+import argparse
+import json
+import logging
+import uuid
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from core.security import get_password_hash
+from db.schema import create_tables
+from models.auth import Role, TypeRole, Utilisateur
+from models.comptabilite import (
+    CompteComptable,
+    EcritureComptable,
+    JournalComptable,
+    StatutEcriture,
+    TypeCompte,
+    TypeJournal
+)
+from models.inventory import CategoryProduit, Produit, Stock, UniteMesure
+from models.iot_sensor import IoTSensor, SensorReading, SensorStatus, SensorType
+from models.production import CultureType, Parcelle, ParcelleStatus, QualiteRecolte, Recolte
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = Path(__file__).parent / "seed_state.json"
+BATCH_SIZE = 10000
+READING_INTERVAL = timedelta(minutes=5)
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+
+@dataclass(frozen=True)
+class Volumes:
+    """Volumes générés par profil"""
+    years: int               # Années d'écritures
+    ecritures_per_day: int   # Écritures équilibrées par jour ouvré (moyenne)
+    parcelles: int
+    sensors_per_parcelle: int
+    sensor_months: int       # Mois de relevés toutes les 5 minutes
+    produits: int
+    stocks_per_produit: int
+
+PROFILES = {
+    "small": Volumes(1, 20, 5, 2, 1, 200, 2),
+    "medium": Volumes(3, 60, 20, 4, 3, 1500, 3),
+    "large": Volumes(5, 150, 40, 6, 6, 5000, 4),
+}
+
+# Plan comptable OHADA réduit: (numéro, libellé, type)
+PLAN_COMPTABLE = [
+    ("101000", "Capital social", TypeCompte.PASSIF),
+    ("401000", "Fournisseurs", TypeCompte.PASSIF),
+    ("411000", "Clients", TypeCompte.ACTIF),
+    ("421000", "Personnel, rémunérations dues", TypeCompte.PASSIF),
+    ("521000", "Banque", TypeCompte.ACTIF),
+    ("571000", "Caisse", TypeCompte.ACTIF),
+    ("601000", "Achats d'engrais", TypeCompte.CHARGE),
+    ("602000", "Achats de semences", TypeCompte.CHARGE),
+    ("605000", "Carburant", TypeCompte.CHARGE),
+    ("624000", "Entretien et réparations", TypeCompte.CHARGE),
+    ("661000", "Salaires", TypeCompte.CHARGE),
+    ("701000", "Ventes d'huile de palme", TypeCompte.PRODUIT),
+    ("702000", "Ventes de papayes", TypeCompte.PRODUIT),
+    ("706000", "Prestations de services", TypeCompte.PRODUIT),
+]
+CONTREPARTIES = ["401000", "411000", "421000", "521000", "571000"]
+
+JOURNAUX = [
+    ("AC", "Achats", TypeJournal.ACHAT),
+    ("VE", "Ventes", TypeJournal.VENTE),
+    ("BQ", "Banque", TypeJournal.BANQUE),
+    ("CA", "Caisse", TypeJournal.CAISSE),
+    ("OD", "Opérations diverses", TypeJournal.OPERATIONS_DIVERSES),
+]
+
+# Profil journalier des capteurs: (type, unité, moyenne, amplitude, bruit)
+CAPTEURS = [
+    (SensorType.TEMPERATURE_AIR, "°C", 27.0, 5.0, 0.6),
+    (SensorType.HUMIDITE_AIR, "%", 75.0, -12.0, 2.0),
+    (SensorType.HUMIDITE_SOL, "%", 35.0, -3.0, 1.0),
+    (SensorType.LUMINOSITE, "lux", 40000.0, 40000.0, 2500.0),
+    (SensorType.PH_SOL, "pH", 5.5, 0.05, 0.05),
+    (SensorType.PLUVIOMETRIE, "mm", 0.2, 0.2, 0.3),
+]
+
+def create_schema(engine: Engine) -> List[str]:
+    """Crée les tables absentes, sans clés étrangères"""
+    return create_tables(engine)
+
+def _batches(rows: List[Dict[str, Any]], size: int = BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def generate_ecritures(rng: np.random.Generator,
+                       volumes: Volumes,
+                       comptes: Dict[str, uuid.UUID],
+                       journaux: Dict[str, uuid.UUID],
+                       end: date) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Écritures équilibrées (charge ou produit et sa contrepartie), jour par jour
+
+    Produit des lots d'environ BATCH_SIZE lignes.
+    """
+    start = end - timedelta(days=365 * volumes.years)
+    days = np.arange(np.datetime64(start), np.datetime64(end), dtype="datetime64[D]")
+    days = days[np.is_busday(days)]
+    counts = rng.poisson(volumes.ecritures_per_day, len(days))
+
+    charges = [numero for numero, _, type_compte in PLAN_COMPTABLE if type_compte == TypeCompte.CHARGE]
+    produits = [numero for numero, _, type_compte in PLAN_COMPTABLE if type_compte == TypeCompte.PRODUIT]
+
+    batch: List[Dict[str, Any]] = []
+    piece = 0
+    for day, count in zip(days.tolist(), counts):
+        is_vente = rng.random(count) < 0.45
+        montants = np.round(rng.lognormal(11, 1.2, count), -1)
+        for vente, montant in zip(is_vente, montants):
+            piece += 1
+            compte = str(rng.choice(produits if vente else charges))
+            contrepartie = str(rng.choice(CONTREPARTIES))
+            common = {
+                "date_ecriture": day,
+                "numero_piece": f"P{piece:08d}",
+                "journal_id": journaux["VE" if vente else "AC"],
+                "periode": day.strftime("%Y-%m"),
+                "statut": StatutEcriture.VALIDEE,
+                "libelle": "Vente" if vente else "Achat",
+                "date_validation": datetime.combine(day, datetime.min.time()),
+            }
+            montant = float(montant)
+            # Produit: crédit du compte de produit, débit de la contrepartie
+            batch.append({
+                **common, "id": uuid.uuid4(), "compte_id": comptes[compte],
+                "debit": 0 if vente else montant, "credit": montant if vente else 0,
+            })
+            batch.append({
+                **common, "id": uuid.uuid4(), "compte_id": comptes[contrepartie],
+                "debit": montant if vente else 0, "credit": 0 if vente else montant,
+            })
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate_readings(rng: np.random.Generator,
+                      sensor_id: uuid.UUID,
+                      profile: tuple,
+                      start: datetime,
+                      end: datetime) -> Iterator[List[Dict[str, Any]]]:
+    """Relevés toutes les 5 minutes: cycle journalier, bruit, batterie décroissante"""
+    _, unite, moyenne, amplitude, bruit = profile
+    step = int(READING_INTERVAL.total_seconds())
+    seconds = np.arange(0, int((end - start).total_seconds()), step)
+    heures = (seconds % 86400) / 3600
+    valeurs = (
+        moyenne
+        + amplitude * np.sin((heures - 8) / 24 * 2 * np.pi)
+        + rng.normal(0, bruit, len(seconds))
+    )
+    batterie = np.clip(100 - seconds / seconds.max(initial=1) * rng.uniform(20, 60), 0, 100)
+    signal = np.clip(rng.normal(85, 8, len(seconds)), 0, 100)
+
+    for lot in range(0, len(seconds), BATCH_SIZE):
+        yield [
+            {
+                "id": uuid.uuid4(),
+                "capteur_id": sensor_id,
+                "timestamp": start + timedelta(seconds=int(s)),
+                "valeur": round(float(v), 2),
+                "unite": unite,
+                "qualite_signal": round(float(q), 1),
+                "niveau_batterie": round(float(b), 1),
+            }
+            for s, v, q, b in zip(
+                seconds[lot:lot + BATCH_SIZE], valeurs[lot:lot + BATCH_SIZE],
+                signal[lot:lot + BATCH_SIZE], batterie[lot:lot + BATCH_SIZE]
+            )
+        ]
+
+def generate_inventory(rng: np.random.Generator, volumes: Volumes) -> Dict[str, List[Dict[str, Any]]]:
+    """Produits et stocks répartis sur cinq entrepôts"""
+    entrepots = [str(uuid.uuid4()) for _ in range(5)]
+    categories = list(CategoryProduit)
+    unites = list(UniteMesure)
+    produits, stocks = [], []
+    for i in range(volumes.produits):
+        produit_id = str(uuid.uuid4())
+        produits.append({
+            "id": produit_id,
+            "code": f"PRD{i:06d}",
+            "nom": f"Produit {i}",
+            "categorie": categories[i % len(categories)],
+            "unite_mesure": unites[i % len(unites)],
+            "prix_unitaire": round(float(rng.lognormal(7, 1)), 0),
+            "seuil_alerte": float(rng.integers(10, 200)),
+        })
+        for j in range(volumes.stocks_per_produit):
+            stocks.append({
+                "id": str(uuid.uuid4()),
+                "produit_id": produit_id,
+                "entrepot_id": entrepots[j % len(entrepots)],
+                "quantite": round(float(rng.gamma(2, 150)), 1),
+                "valeur_unitaire": produits[-1]["prix_unitaire"],
+                "lot": f"L{i:06d}-{j}",
+            })
+    return {"produits": produits, "stocks": stocks}
+
+def seed(engine: Engine, volumes: Volumes, seed_value: int = 42, end: date = None) -> Dict[str, Any]:
+    """
+    Insère le jeu de données et retourne son état (identifiants utiles aux scénarios)
+    """
+    rng = np.random.default_rng(seed_value)
+    end = end or date.today()
+    counts: Dict[str, int] = {}
+
+    def insert(connection, table, rows):
+        if rows:
+            connection.execute(table.insert(), rows)
+            counts[table.name] = counts.get(table.name, 0) + len(rows)
+
+    with engine.begin() as connection:
+        role_id = str(uuid.uuid4())
+        insert(connection, Role.__table__, [{"id": role_id, "nom": "Benchmark", "type": TypeRole.ADMIN}])
+        insert(connection, Utilisateur.__table__, [{
+            "id": str(uuid.uuid4()), "email": "bench@fofal.cm", "username": BENCH_USERNAME,
+            "hashed_password": get_password_hash(BENCH_PASSWORD), "role_id": role_id,
+            "is_active": True, "is_superuser": True,
+        }])
+
+        comptes = {numero: uuid.uuid4() for numero, _, _ in PLAN_COMPTABLE}
+        insert(connection, CompteComptable.__table__, [
+            {"id": comptes[numero], "numero": numero, "libelle": libelle, "type_compte": type_compte}
+            for numero, libelle, type_compte in PLAN_COMPTABLE
+        ])
+        journaux = {code: uuid.uuid4() for code, _, _ in JOURNAUX}
+        insert(connection, JournalComptable.__table__, [
+            {"id": journaux[code], "code": code, "libelle": libelle, "type_journal": type_journal}
+            for code, libelle, type_journal in JOURNAUX
+        ])
+        for batch in generate_ecritures(rng, volumes, comptes, journaux, end):
+            insert(connection, EcritureComptable.__table__, batch)
+
+    with engine.begin() as connection:
+        parcelles = [uuid.uuid4() for _ in range(volumes.parcelles)]
+        insert(connection, Parcelle.__table__, [
+            {
+                "id": parcelle_id, "code": f"PAR{i:03d}",
+                "culture_type": CultureType.PALMIER if i % 3 else CultureType.PAPAYE,
+                "surface_hectares": round(float(rng.uniform(1, 12)), 2),
+                "date_plantation": end - timedelta(days=int(rng.integers(400, 4000))),
+                "statut": ParcelleStatus.ACTIVE,
+            }
+            for i, parcelle_id in enumerate(parcelles)
+        ])
+        semaines = 52 * volumes.years
+        qualites = list(QualiteRecolte)
+        insert(connection, Recolte.__table__, [
+            {
+                "id": uuid.uuid4(), "parcelle_id": parcelle_id,
+                "date_recolte": datetime.combine(end - timedelta(weeks=int(w)), datetime.min.time()),
+                "quantite_kg": round(float(rng.gamma(4, 120)), 2),
+                "qualite": qualites[int(q)],
+            }
+            for parcelle_id in parcelles
+            for w, q in zip(range(semaines), rng.integers(0, len(qualites), semaines))
+        ])
+
+    reading_end = datetime.combine(end, datetime.min.time())
+    reading_start = reading_end - timedelta(days=30 * volumes.sensor_months)
+    for p, parcelle_id in enumerate(parcelles):
+        with engine.begin() as connection:
+            for s in range(volumes.sensors_per_parcelle):
+                profile = CAPTEURS[s % len(CAPTEURS)]
+                sensor_id = uuid.uuid4()
+                insert(connection, IoTSensor.__table__, [{
+                    "id": sensor_id, "code": f"CAP{p:03d}{s:02d}", "type": profile[0],
+                    "status": SensorStatus.ACTIF, "parcelle_id": parcelle_id,
+                    "intervalle_lecture": READING_INTERVAL.total_seconds(),
+                }])
+                for batch in generate_readings(rng, sensor_id, profile, reading_start, reading_end):
+                    insert(connection, SensorReading.__table__, batch)
+
+    inventory = generate_inventory(rng, volumes)
+    with engine.begin() as connection:
+        for batch in _batches(inventory["produits"]):
+            insert(connection, Produit.__table__, batch)
+        for batch in _batches(inventory["stocks"]):
+            insert(connection, Stock.__table__, batch)
+
+    return {
+        "username": BENCH_USERNAME,
+        "password": BENCH_PASSWORD,
+        "period": {"start": (end - timedelta(days=365 * volumes.years)).isoformat(), "end": end.isoformat()},
+        "parcelles": [str(p) for p in parcelles],
+        "produits": [p["id"] for p in inventory["produits"][:200]],
+        "counts": counts,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Remplit une base de benchmark")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="medium")
+    parser.add_argument("--create-schema", action="store_true", help="Crée les tables absentes")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    engine = create_engine(args.database_url)
+    if args.create_schema:
+        created = create_schema(engine)
+        logger.info(f"{len(created)} tables créées")
+
+    state = seed(engine, PROFILES[args.profile], args.seed)
+    STATE_FILE.write_text(json.dumps(state, indent=2))
+    for table, count in state["counts"].items():
+        logger.info(f"{table}: {count} lignes")
+    logger.info(f"État écrit dans {STATE_FILE}")
+
+if __name__ == "__main__":
+    main()
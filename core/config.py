@@ -17,6 +17,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 jours
     ALGORITHM: str = "HS256"
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
     
     # Database
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
@@ -24,13 +25,28 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "Jejuivfadama90")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "fofal_erp_2024")
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    ASYNC_DATABASE_URI: Optional[str] = None
     DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 30 minutes
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    # Démarrage: check (refuse un schéma en retard sur Alembic), warn, create (dev), off
+    DB_SCHEMA_MODE: str = os.getenv("DB_SCHEMA_MODE", "check")
+    DB_POOL_PREWARM: int = int(os.getenv("DB_POOL_PREWARM", "5"))  # Connexions ouvertes au démarrage
     
     # Redis
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_URL: Optional[str] = None
     
+    # Notifications temps réel (WebSocket)
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))  # Messages en attente par connexion
+    WS_HEARTBEAT_INTERVAL: float = float(os.getenv("WS_HEARTBEAT_INTERVAL", "25"))  # Ping protocole et ping applicatif
+    WS_IDLE_TIMEOUT: float = float(os.getenv("WS_IDLE_TIMEOUT", "90"))  # Clients ?heartbeat=true uniquement
+    
     # Weather API
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "L6JNFAY48CA9P9G5NCGBYCNDA")
     WEATHER_CACHE_TTL: int = int(os.getenv("WEATHER_CACHE_TTL", "1800"))  # 30 minutes
@@ -48,8 +64,10 @@ class Settings(BaseSettings):
     STORAGE_LOCAL_PATH: str = os.getenv("STORAGE_LOCAL_PATH", "./storage")
     
     # Currency
-    DEFAULT_CURRENCY: Optional[str] = None
-    EXCHANGE_RATE_API_KEY: Optional[str] = None
+    DEFAULT_CURRENCY: str = os.getenv("DEFAULT_CURRENCY", "XAF")
+    EXCHANGE_RATE_API_KEY: Optional[str] = os.getenv("EXCHANGE_RATE_API_KEY")
+    EXCHANGE_RATE_API_URL: str = os.getenv("EXCHANGE_RATE_API_URL", "https://v6.exchangerate-api.com/v6")
+    EXCHANGE_RATE_CACHE_TTL: int = int(os.getenv("EXCHANGE_RATE_CACHE_TTL", "3600"))  # Tables de taux en mémoire
     
     # Email
     SMTP_TLS: bool = True
@@ -60,6 +78,19 @@ class Settings(BaseSettings):
     EMAILS_FROM_EMAIL: Optional[str] = None
     EMAILS_FROM_NAME: Optional[str] = None
 
+    # Compression des réponses (octets), en dessous la réponse est envoyée telle quelle
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+    # Observabilité: traces OpenTelemetry, Sentry, profilage SQL (debug)
+    OTEL_ENABLED: bool = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+    OTEL_SERVICE_NAME: str = os.getenv("OTEL_SERVICE_NAME", "fofal-erp")
+    OTEL_EXPORTER_OTLP_ENDPOINT: Optional[str] = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    SENTRY_DSN: Optional[str] = os.getenv("SENTRY_DSN")
+    SENTRY_TRACES_SAMPLE_RATE: float = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0.1"))
+    QUERY_PROFILING: bool = os.getenv("QUERY_PROFILING", "false").lower() == "true"
+    QUERY_PROFILING_SLOWEST: int = int(os.getenv("QUERY_PROFILING_SLOWEST", "5"))
+    QUERY_PROFILING_WARN_COUNT: int = int(os.getenv("QUERY_PROFILING_WARN_COUNT", "50"))
+
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -77,9 +108,23 @@ class Settings(BaseSettings):
             )
         else:
             self.SQLALCHEMY_DATABASE_URI = self.DATABASE_URL
+        self.ASYNC_DATABASE_URI = to_async_url(self.SQLALCHEMY_DATABASE_URI)
         self.REDIS_URL = f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}"
         self.WEATHER_API_URL = "https://api.weather.com"
 
+# Pilotes asynchrones par dialecte synchrone
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Convertit une URL SQLAlchemy synchrone vers son pilote asynchrone"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
 @lru_cache()
 def get_settings() -> Settings:
     """Retourne une instance singleton des paramètres"""
@@ -91,17 +136,28 @@ settings = get_settings()
 APP_CONFIG = {
     "title": settings.PROJECT_NAME,
     "description": "API pour la gestion de l'exploitation agricole FOFAL",
-    "version": "1.0.0"
+    "version": "1.0.0",
+    "compression_min_size": settings.COMPRESSION_MIN_SIZE
 }
 
 SECURITY_CONFIG = {
     "secret_key": settings.SECRET_KEY,
     "access_token_expire_minutes": settings.ACCESS_TOKEN_EXPIRE_MINUTES,
-    "algorithm": settings.ALGORITHM
+    "algorithm": settings.ALGORITHM,
+    "principal_cache_ttl": settings.AUTH_CACHE_TTL_SECONDS
 }
 
 DATABASE_CONFIG = {
     "SQLALCHEMY_DATABASE_URI": settings.SQLALCHEMY_DATABASE_URI,
+    "ASYNC_DATABASE_URI": settings.ASYNC_DATABASE_URI,
+    "POOL_SIZE": settings.DB_POOL_SIZE,
+    "MAX_OVERFLOW": settings.DB_MAX_OVERFLOW,
+    "POOL_TIMEOUT": settings.DB_POOL_TIMEOUT,
+    "POOL_RECYCLE": settings.DB_POOL_RECYCLE,
+    "POOL_PRE_PING": settings.DB_POOL_PRE_PING,
+    "STATEMENT_TIMEOUT_MS": settings.DB_STATEMENT_TIMEOUT_MS,
+    "SCHEMA_MODE": settings.DB_SCHEMA_MODE,
+    "POOL_PREWARM": settings.DB_POOL_PREWARM,
     "POSTGRES_SERVER": settings.POSTGRES_SERVER,
     "POSTGRES_USER": settings.POSTGRES_USER,
     "POSTGRES_PASSWORD": settings.POSTGRES_PASSWORD,
@@ -114,6 +170,23 @@ REDIS_CONFIG = {
     "URL": settings.REDIS_URL
 }
 
+NOTIFICATIONS_CONFIG = {
+    "send_queue_size": settings.WS_SEND_QUEUE_SIZE,
+    "heartbeat_interval": settings.WS_HEARTBEAT_INTERVAL,
+    "idle_timeout": settings.WS_IDLE_TIMEOUT
+}
+
+TELEMETRY_CONFIG = {
+    "otel_enabled": settings.OTEL_ENABLED,
+    "service_name": settings.OTEL_SERVICE_NAME,
+    "otlp_endpoint": settings.OTEL_EXPORTER_OTLP_ENDPOINT,
+    "sentry_dsn": settings.SENTRY_DSN,
+    "sentry_traces_sample_rate": settings.SENTRY_TRACES_SAMPLE_RATE,
+    "query_profiling": settings.QUERY_PROFILING,
+    "query_profiling_slowest": settings.QUERY_PROFILING_SLOWEST,
+    "query_profiling_warn_count": settings.QUERY_PROFILING_WARN_COUNT
+}
+
 STORAGE_CONFIG = {
     "PROVIDER": settings.STORAGE_PROVIDER,
     "ACCESS_KEY": settings.STORAGE_ACCESS_KEY,
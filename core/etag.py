@@ -0,0 +1,100 @@
+"""
+ETags et GET conditionnels pour les rapports interrogés en boucle
+
+L'ETag d'un rapport est dérivé d'un filigrane des données sources (nombre de
+lignes, dernière modification) obtenu en une seule requête d'agrégats, ou de
+la version en cache du contenu. Si le client présente le même ETag
+(If-None-Match), la réponse 304 est renvoyée sans construire le rapport.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.comptabilite import CompteComptable, EcritureComptable
+from models.finance import TauxChange
+from models.production import ProductionEvent, Recolte
+from services.cache_service import fingerprint
+
+# Fraîcheur annoncée aux clients, par rapport
+CACHE_CONTROL = {
+    # Revalidation à chaque appel: le filigrane est une requête d'agrégats
+    "comptabilite": "private, no-cache",
+    # Données météo rafraîchies au plus toutes les heures côté serveur
+    "production": "private, max-age=300",
+    # Tableau de bord en cache 15 minutes côté serveur
+    "dashboard": "private, max-age=60",
+}
+
+# Agrégats formant le filigrane de chaque étiquette (sans jointure)
+WATERMARKS: Dict[str, Callable[[], List]] = {
+    "comptabilite": lambda: [
+        func.count(EcritureComptable.id),
+        func.max(EcritureComptable.updated_at),
+        func.count(CompteComptable.id),
+        func.max(CompteComptable.updated_at),
+    ],
+    # Taux publiés: un nouveau taux change les montants convertis
+    "change": lambda: [
+        func.count(TauxChange.date_taux),
+        func.max(TauxChange.date_taux),
+        func.max(TauxChange.created_at),
+    ],
+    # Pas de colonne updated_at: la somme des quantités détecte les corrections
+    "production": lambda: [
+        func.count(Recolte.id),
+        func.max(Recolte.date_recolte),
+        func.sum(Recolte.quantite_kg),
+        func.count(ProductionEvent.id),
+        func.max(ProductionEvent.date_debut),
+        func.max(ProductionEvent.date_fin),
+    ],
+}
+
+def data_watermark(db: Session, *tags: str) -> Tuple:
+    """Filigrane des données des étiquettes, en une seule requête"""
+    columns = [
+        select(aggregate).scalar_subquery()
+        for tag in tags
+        for aggregate in WATERMARKS[tag]()
+    ]
+    return tuple(db.execute(select(*columns)).one())
+
+def make_etag(*parts) -> str:
+    """ETag faible construit à partir de valeurs (paramètres, filigrane)"""
+    return f'W/"{fingerprint(*parts)[:24]}"'
+
+def content_etag(payload: bytes) -> str:
+    """ETag faible d'un contenu déjà encodé"""
+    return f'W/"{hashlib.blake2b(payload, digest_size=12).hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparaison faible (RFC 9110) avec l'en-tête If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+def conditional_response(request: Request,
+                         response: Response,
+                         etag: str,
+                         cache_control: str) -> Optional[Response]:
+    """
+    Réponse 304 si le client possède déjà cette version
+
+    Sinon, les en-têtes ETag et Cache-Control sont ajoutés à la réponse
+    de l'endpoint et None est renvoyé.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
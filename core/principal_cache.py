@@ -0,0 +1,208 @@
+"""
+Cache des identités authentifiées
+
+Un token déjà validé est résolu sans décodage JWT ni requête SQL: l'entrée
+conserve l'identité de l'utilisateur et ses permissions précalculées pendant
+une courte durée (AUTH_CACHE_TTL_SECONDS), sans dépasser l'expiration du
+token. Les entrées sont invalidées à la modification d'un utilisateur ou
+d'un rôle, et les tokens révoqués (déconnexion) sont inscrits dans Redis
+pour être refusés par tous les workers.
+
+Les modifications faites par un autre worker sont publiées dans Redis sous
+forme de compteurs de version (par utilisateur, et un pour l'ensemble des
+rôles). Chaque entrée retient les versions lues à sa mise en cache; un
+succès du cache relit ces versions et la liste de révocation en une seule
+requête Redis (MGET) et abandonne l'entrée si l'une a changé.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+import logging
+import threading
+import time
+
+from core.config import SECURITY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+REVOKED_KEY = "auth:revoked:{jti}"
+USER_VERSION_KEY = "auth:version:user:{user_id}"
+ROLES_VERSION_KEY = "auth:version:roles"
+
+# Versions (utilisateur, rôles) publiées dans Redis
+Versions = Tuple[Optional[str], Optional[str]]
+
+@dataclass(frozen=True)
+class Principal:
+    """Identité de l'utilisateur authentifié"""
+    id: str
+    username: str
+    role_id: Optional[str]
+    is_active: bool
+    is_superuser: bool
+    is_staff: bool
+    permissions: FrozenSet[str]
+
+class PrincipalCache:
+    """Cache mémoire des tokens validés, par worker"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: int = 10000):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None
+            else SECURITY_CONFIG["principal_cache_ttl"]
+        )
+        self.max_entries = max_entries
+        # token -> (expiration, jti, identité, versions à la mise en cache)
+        self._entries: Dict[str, Tuple[float, Optional[str], Principal, Optional[Versions]]] = {}
+        self._by_user: Dict[str, Set[str]] = {}
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        """
+        Identité d'un token déjà validé, si encore valable: ni révoqué, ni
+        utilisateur ou rôles modifiés depuis la mise en cache (y compris par
+        un autre worker)
+        """
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        expires_at, jti, principal, versions = entry
+        if expires_at <= time.time() or (jti and self._revoked_locally(jti)):
+            self._discard(token)
+            return None
+        try:
+            revoked, current = self._shared_state(principal.id, jti)
+        except Exception as e:
+            # Redis indisponible: seules les invalidations de ce worker s'appliquent
+            logger.warning(f"Invalidations partagées indisponibles: {str(e)}")
+            return principal
+        if revoked or current != versions:
+            self._discard(token)
+            return None
+        return principal
+
+    def put(self,
+            token: str,
+            principal: Principal,
+            jti: Optional[str] = None,
+            token_expires_at: Optional[float] = None) -> None:
+        """Mémorise l'identité d'un token validé"""
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        try:
+            versions = self._shared_state(principal.id)[1]
+        except Exception:
+            versions = None  # Relu au premier succès du cache
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[token] = (expires_at, jti, principal, versions)
+            self._by_user.setdefault(principal.id, set()).add(token)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Oublie les tokens d'un utilisateur (modification, désactivation)"""
+        with self._lock:
+            for token in self._by_user.pop(str(user_id), set()):
+                self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        """Oublie tous les tokens (modification d'un rôle ou de ses permissions)"""
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def publish_invalidation(self, user_ids: Iterable[str] = (), roles: bool = False) -> None:
+        """
+        Publie aux autres workers la modification d'utilisateurs ou des rôles
+        (incrément des versions), après le commit qui l'a rendue visible
+        """
+        try:
+            pipeline = self._redis().pipeline()
+            for user_id in user_ids:
+                pipeline.incr(USER_VERSION_KEY.format(user_id=user_id))
+            if roles:
+                pipeline.incr(ROLES_VERSION_KEY)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Invalidation non partagée entre workers: {str(e)}")
+
+    def revoke(self, jti: str, token_expires_at: float) -> None:
+        """Révoque un token jusqu'à son expiration naturelle"""
+        with self._lock:
+            self._revoked[jti] = token_expires_at
+            for token, (_, entry_jti, principal, _) in list(self._entries.items()):
+                if entry_jti == jti:
+                    self._entries.pop(token, None)
+                    self._by_user.get(principal.id, set()).discard(token)
+
+        remaining = int(token_expires_at - time.time())
+        if remaining > 0:
+            try:
+                self._redis().setex(REVOKED_KEY.format(jti=jti), remaining, 1)
+            except Exception as e:
+                logger.warning(f"Révocation non partagée entre workers: {str(e)}")
+
+    def is_revoked(self, jti: str) -> bool:
+        """Token révoqué par ce worker ou par un autre (via Redis)"""
+        if self._revoked_locally(jti):
+            return True
+        try:
+            return bool(self._redis().exists(REVOKED_KEY.format(jti=jti)))
+        except Exception as e:
+            logger.warning(f"Liste de révocation indisponible: {str(e)}")
+            return False
+
+    def _revoked_locally(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        if expires_at is not None:
+            if expires_at > time.time():
+                return True
+            self._revoked.pop(jti, None)
+        return False
+
+    def _shared_state(self, user_id: str, jti: Optional[str] = None) -> Tuple[bool, Versions]:
+        """Révocation du token et versions publiées, en une requête Redis"""
+        keys = [USER_VERSION_KEY.format(user_id=user_id), ROLES_VERSION_KEY]
+        if jti:
+            keys.append(REVOKED_KEY.format(jti=jti))
+        values = self._redis().mget(keys)
+        return bool(jti and values[2]), (values[0], values[1])
+
+    def _redis(self):
+        from services.cache_service import get_redis_client
+        return get_redis_client()
+
+    def _discard(self, token: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if entry is not None:
+                self._by_user.get(entry[2].id, set()).discard(token)
+
+    def _evict(self) -> None:
+        """Retire les entrées expirées, puis les plus anciennes (appelé sous verrou)"""
+        now = time.time()
+        for token, (expires_at, _, principal, _) in list(self._entries.items()):
+            if expires_at <= now:
+                self._entries.pop(token, None)
+                self._by_user.get(principal.id, set()).discard(token)
+        while len(self._entries) >= self.max_entries:
+            token, (_, _, principal, _) = next(iter(self._entries.items()))
+            self._entries.pop(token, None)
+            self._by_user.get(principal.id, set()).discard(token)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Instance singleton du cache d'identités
+_principal_cache = None
+
+def get_principal_cache() -> PrincipalCache:
+    """Retourne l'instance singleton du cache d'identités"""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache()
+    return _principal_cache
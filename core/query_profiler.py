@@ -0,0 +1,128 @@
+"""
+Profilage des requêtes SQL par requête HTTP
+
+Des hooks SQLAlchemy (before/after_cursor_execute) comptent et chronomètrent
+chaque instruction exécutée pendant les profils actifs. Les profils sont
+portés par une ContextVar: ils suivent la requête dans le pool de threads
+comme dans les greenlets du moteur asynchrone, et s'imbriquent (un budget
+de requêtes dans un test profilé). Hors profil, le coût d'un hook se limite
+à la lecture de la ContextVar.
+
+QueryProfilerMiddleware (QUERY_PROFILING=true, à réserver au debug) ajoute
+à chaque réponse le nombre de requêtes et le temps passé en base
+(Server-Timing), et journalise les instructions les plus lentes. Au-delà de
+QUERY_PROFILING_WARN_COUNT instructions, un avertissement signale un
+probable N+1.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+import heapq
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import TELEMETRY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_active_profiles: ContextVar[Tuple["QueryProfile", ...]] = ContextVar("query_profiles", default=())
+
+@dataclass
+class QueryProfile:
+    """Instructions SQL exécutées pendant un profil"""
+    slowest_count: int = 5
+    keep_statements: bool = False
+    count: int = 0
+    total_ms: float = 0.0
+    # Toutes les instructions, dans l'ordre (keep_statements)
+    statements: List[str] = field(default_factory=list)
+    # Tas min (durée, rang, instruction) des instructions les plus lentes
+    _slowest: List[Tuple[float, int, str]] = field(default_factory=list)
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        if self.keep_statements:
+            self.statements.append(statement)
+        entry = (duration_ms, self.count, statement)
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, entry)
+        elif duration_ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self) -> List[Tuple[float, str]]:
+        """Instructions les plus lentes, de la plus lente à la plus rapide"""
+        return [(duration, statement) for duration, _, statement in sorted(self._slowest, reverse=True)]
+
+@contextmanager
+def profile_queries(slowest_count: int = 5, keep_statements: bool = False) -> Iterator[QueryProfile]:
+    """Profile les requêtes SQL exécutées dans le bloc"""
+    profile = QueryProfile(slowest_count=slowest_count, keep_statements=keep_statements)
+    token = _active_profiles.set(_active_profiles.get() + (profile,))
+    try:
+        yield profile
+    finally:
+        _active_profiles.reset(token)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profiles.get() and context is not None:
+        context._query_profiler_start = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiles = _active_profiles.get()
+    start = getattr(context, "_query_profiler_start", None)
+    if not profiles or start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    for profile in profiles:
+        profile.record(statement[:500], duration_ms)
+
+class QueryProfilerMiddleware:
+    """Middleware ASGI: statistiques SQL de chaque requête HTTP"""
+
+    def __init__(self, app,
+                 slowest_count: Optional[int] = None,
+                 warn_count: Optional[int] = None):
+        self.app = app
+        self.slowest_count = slowest_count or TELEMETRY_CONFIG["query_profiling_slowest"]
+        self.warn_count = warn_count or TELEMETRY_CONFIG["query_profiling_warn_count"]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries(self.slowest_count) as profile:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-query-count", str(profile.count).encode()))
+                    headers.append((
+                        b"server-timing",
+                        f'db;dur={profile.total_ms:.1f};desc="{profile.count} queries"'.encode()
+                    ))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+        self._report(scope, profile)
+
+    def _report(self, scope, profile: QueryProfile) -> None:
+        from core.telemetry import set_span_attributes
+
+        set_span_attributes({"db.query_count": profile.count, "db.time_ms": round(profile.total_ms, 1)})
+        route = f"{scope.get('method')} {scope.get('path')}"
+        summary = f"{route}: {profile.count} requêtes SQL, {profile.total_ms:.1f} ms"
+        if profile.count > self.warn_count:
+            slowest = "\n".join(f"  {duration:.1f} ms  {statement}" for duration, statement in profile.slowest)
+            logger.warning(f"{summary} (N+1 probable)\n{slowest}")
+        else:
+            logger.info(summary)
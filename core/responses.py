@@ -0,0 +1,65 @@
+"""
+Sérialisation JSON des réponses de l'API (orjson)
+
+APIJSONResponse est la classe de réponse par défaut de l'application.
+Pour les gros tableaux de bord, cached_json conserve en cache les octets
+JSON déjà encodés: un succès du cache est renvoyé tel quel
+(EncodedJSONResponse), sans jsonable_encoder ni ré-encodage.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(value: Any) -> Any:
+    """Types non gérés nativement par orjson"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+def dumps(content: Any) -> bytes:
+    """Encode un contenu en JSON (UTF-8)"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+class APIJSONResponse(JSONResponse):
+    """Réponse JSON encodée par orjson (datetime, UUID, numpy, Decimal)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class EncodedJSONResponse(Response):
+    """Réponse dont le corps est déjà du JSON encodé"""
+
+    media_type = "application/json"
+
+async def cached_json(
+    cache,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    expire_in: Optional[timedelta] = None
+) -> bytes:
+    """
+    Octets JSON depuis le cache, ou calculés, encodés une fois et stockés
+
+    Args:
+        cache: CacheService
+        key: Clé du cache (distincte des clés pickle)
+        compute: Coroutine produisant le contenu en cas d'absence
+        expire_in: Durée de validité
+    """
+    payload = await cache.get_json(key)
+    if payload is None:
+        payload = dumps(await compute())
+        await cache.set_json(key, payload, expire_in)
+    return payload
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta
 from typing import Optional, Union, Any, List, Callable
 from enum import Enum
+from uuid import uuid4
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from core.config import SECURITY_CONFIG
-from sqlalchemy.orm import Session
+from core.principal_cache import Principal, get_principal_cache
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, object_session
 from db.database import get_db
-from models.auth import Utilisateur
+from models.auth import Utilisateur, Role, TypeRole
 import logging
 from functools import wraps
 
@@ -34,6 +37,11 @@ class Permission(str, Enum):
 
 def require_permissions(permissions: List[Permission]) -> Callable:
     """Décorateur pour vérifier les permissions requises"""
+    # Calculé une fois à la décoration, comparé à Principal.permissions
+    required_permissions = frozenset(
+        p.value if isinstance(p, Enum) else p for p in permissions
+    )
+
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -46,15 +54,14 @@ def require_permissions(permissions: List[Permission]) -> Callable:
                 )
 
             # Vérification des permissions
-            user_permissions = set(user.permissions or [])
-            required_permissions = set(permissions)
+            user_permissions = getattr(user, 'permissions', None) or frozenset()
 
             # Les admins ont toutes les permissions
-            if Permission.ADMIN in user_permissions:
+            if Permission.ADMIN.value in user_permissions:
                 return await func(*args, **kwargs)
 
             # Vérification des permissions spécifiques
-            if not required_permissions.issubset(user_permissions):
+            if not required_permissions <= user_permissions:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Permissions insuffisantes"
@@ -114,7 +121,8 @@ def create_access_token(
             minutes=SECURITY_CONFIG["access_token_expire_minutes"]
         )
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # jti: identifiant du token pour la révocation (déconnexion)
+    to_encode = {"exp": expire, "sub": str(subject), "jti": uuid4().hex}
     encoded_jwt = jwt.encode(
         to_encode,
         SECURITY_CONFIG["secret_key"],
@@ -122,31 +130,133 @@ def create_access_token(
     )
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> Utilisateur:
-    """Récupère l'utilisateur courant à partir du token JWT"""
+def _principal_permissions(user: Utilisateur) -> frozenset:
+    """Permissions effectives: codes du rôle et drapeaux de l'utilisateur"""
+    permissions = {Permission.USER.value}
+    role = user.role
+    if role is not None and role.is_active is not False:
+        permissions.update(p.code.lower() for p in role.permissions)
+        if role.type == TypeRole.ADMIN:
+            permissions.add(Permission.ADMIN.value)
+    if user.is_superuser:
+        permissions.add(Permission.ADMIN.value)
+    if user.is_staff:
+        permissions.add(Permission.STAFF.value)
+    return frozenset(permissions)
+
+def load_principal(db: Session, username: str) -> Optional[Principal]:
+    """Charge l'utilisateur, son rôle et ses permissions en une requête"""
+    user = (
+        db.query(Utilisateur)
+        .options(joinedload(Utilisateur.role).joinedload(Role.permissions))
+        .filter(Utilisateur.username == username)
+        .first()
+    )
+    if user is None:
+        return None
+    return Principal(
+        id=str(user.id),
+        username=user.username,
+        role_id=user.role_id,
+        is_active=bool(user.is_active),
+        is_superuser=bool(user.is_superuser),
+        is_staff=bool(user.is_staff),
+        permissions=_principal_permissions(user)
+    )
+
+def authenticate_token(token: str, db: Session) -> Principal:
+    """
+    Résout l'identité portée par un token
+
+    Un token déjà validé est servi par le cache d'identités (ni décodage
+    JWT ni requête SQL; révocation et versions relues dans Redis). Sinon:
+    décodage, contrôle de révocation, chargement de l'utilisateur puis mise
+    en cache.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
+        detail="Identifiants invalides",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+    cache = get_principal_cache()
+    principal = cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(
             token,
             SECURITY_CONFIG["secret_key"],
             algorithms=[SECURITY_CONFIG["algorithm"]]
         )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-            
-        user = db.query(Utilisateur).filter(Utilisateur.id == user_id).first()
-        if user is None:
-            raise credentials_exception
-            
-        return user
     except JWTError:
         raise credentials_exception
+
+    username = payload.get("sub")
+    jti = payload.get("jti")
+    if username is None or (jti and cache.is_revoked(jti)):
+        raise credentials_exception
+
+    principal = load_principal(db, username)
+    if principal is None or not principal.is_active:
+        raise credentials_exception
+
+    cache.put(token, principal, jti=jti, token_expires_at=payload.get("exp"))
+    return principal
+
+def revoke_token(token: str) -> None:
+    """Révoque un token (déconnexion) jusqu'à son expiration"""
+    payload = verify_token(token)
+    cache = get_principal_cache()
+    if payload.get("jti"):
+        cache.revoke(payload["jti"], payload["exp"])
+    else:
+        # Token émis avant l'ajout du jti: seule l'entrée locale est retirée
+        principal = cache.get(token)
+        if principal is not None:
+            cache.invalidate_user(principal.id)
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Récupère l'identité de l'utilisateur courant à partir du token JWT"""
+    return authenticate_token(token, db)
+
+# Invalidation du cache d'identités à la modification des utilisateurs et rôles:
+# immédiate pour ce worker, publiée aux autres après le commit
+PENDING_INVALIDATIONS = "principal_invalidations"
+
+def _record_invalidation(target, user_id: Optional[str]) -> None:
+    """Invalidation à publier au commit de la session (user_id None: tous les rôles)"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_INVALIDATIONS, set()).add(user_id)
+
+@event.listens_for(Utilisateur, "after_update")
+def _invalidate_user(mapper, connection, target: Utilisateur) -> None:
+    get_principal_cache().invalidate_user(target.id)
+    _record_invalidation(target, str(target.id))
+
+@event.listens_for(Utilisateur, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: Utilisateur) -> None:
+    get_principal_cache().invalidate_user(target.id)
+    _record_invalidation(target, str(target.id))
+
+@event.listens_for(Role, "after_update")
+def _invalidate_role(mapper, connection, target: Role) -> None:
+    get_principal_cache().clear()
+    _record_invalidation(target, None)
+
+@event.listens_for(Session, "after_commit")
+def _publish_invalidations(session: Session) -> None:
+    pending = session.info.pop(PENDING_INVALIDATIONS, None)
+    if pending:
+        get_principal_cache().publish_invalidation(
+            [user_id for user_id in pending if user_id is not None],
+            roles=None in pending
+        )
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -0,0 +1,124 @@
+"""
+Cycle de vie de l'application (lifespan FastAPI)
+
+Au démarrage de chaque worker, dans l'ordre:
+- schema: version du schéma comparée à la tête Alembic (une requête)
+- pool: ouverture des premières connexions des pools synchrone et asynchrone
+- models: préchargement des modèles ML sauvegardés dans le registre
+- cache: connexion au client Redis partagé
+La durée de chaque phase est journalisée et conservée dans
+app.state.startup_timings. À l'arrêt, les pools sont fermés et les jauges
+Prometheus du worker retirées (mode multiprocessus).
+"""
+
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+import asyncio
+import logging
+import time
+
+from fastapi import FastAPI
+
+from core.config import DATABASE_CONFIG
+from db.database import engine, get_async_engine
+from core.telemetry import mark_metrics_process_dead
+from db.schema import check_schema_version
+
+logger = logging.getLogger(__name__)
+
+# Redis indisponible: le worker démarre sans attendre les tentatives du client
+CACHE_WARMUP_TIMEOUT_S = 1.0
+
+@contextmanager
+def _phase(name: str, timings: Dict[str, float]):
+    """Mesure une phase de démarrage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+        logger.info(f"Démarrage: {name} en {timings[name]:.1f} ms")
+
+def _prewarm_size() -> int:
+    if engine.dialect.name == "sqlite":
+        return 1
+    return max(0, min(DATABASE_CONFIG["POOL_PREWARM"], DATABASE_CONFIG["POOL_SIZE"]))
+
+def _prewarm_sync_pool(size: int) -> None:
+    """Ouvre puis rend au pool les premières connexions synchrones"""
+    connections = [engine.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+
+async def _prewarm_async_pool(size: int) -> None:
+    """Ouvre puis rend au pool les premières connexions asynchrones"""
+    try:
+        async_engine = get_async_engine()
+        connections = await asyncio.gather(*(async_engine.connect() for _ in range(size)))
+        for connection in connections:
+            await connection.close()
+    except Exception as e:
+        # Pilote asynchrone absent ou base injoignable: les routes
+        # asynchrones ouvriront leurs connexions à la demande
+        logger.warning(f"Préchauffage du pool asynchrone ignoré: {str(e)}")
+
+async def prewarm_pools() -> None:
+    size = _prewarm_size()
+    if size:
+        await asyncio.gather(
+            asyncio.to_thread(_prewarm_sync_pool, size),
+            _prewarm_async_pool(size)
+        )
+
+def preload_models() -> None:
+    from services.ml.core.inference import get_model_registry
+
+    loaded = get_model_registry().preload()
+    if loaded:
+        logger.info(f"Modèles préchargés: {', '.join(loaded)}")
+
+def warm_cache() -> None:
+    from services.cache_service import get_cache_service, get_redis_client
+    from services.weather_service import get_weather_service
+
+    get_cache_service()
+    get_weather_service()
+    try:
+        get_redis_client().ping()
+    except Exception as e:
+        logger.warning(f"Redis indisponible au démarrage: {str(e)}")
+
+async def startup(app: FastAPI) -> Dict[str, float]:
+    """Exécute les phases de démarrage et retourne leur durée (ms)"""
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+
+    with _phase("schema", timings):
+        await asyncio.to_thread(check_schema_version, engine, DATABASE_CONFIG["SCHEMA_MODE"])
+    with _phase("pool", timings):
+        await prewarm_pools()
+    with _phase("models", timings):
+        await asyncio.to_thread(preload_models)
+    with _phase("cache", timings):
+        try:
+            await asyncio.wait_for(asyncio.to_thread(warm_cache), CACHE_WARMUP_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            logger.warning("Préchauffage du cache interrompu (délai dépassé)")
+
+    timings["total"] = (time.perf_counter() - start) * 1000
+    logger.info(f"Worker prêt en {timings['total']:.1f} ms")
+    app.state.startup_timings = timings
+    return timings
+
+async def shutdown() -> None:
+    """Ferme les pools de connexions"""
+    engine.dispose()
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    mark_metrics_process_dead()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup(app)
+    yield
+    await shutdown()
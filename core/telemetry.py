@@ -0,0 +1,135 @@
+"""
+Traces distribuées (OpenTelemetry) et remontée d'erreurs (Sentry)
+
+Activées par configuration (OTEL_ENABLED, SENTRY_DSN). Les requêtes FastAPI,
+SQLAlchemy, Redis et httpx sont instrumentées lorsque les paquets
+opentelemetry-instrumentation-* sont installés. Le code applicatif enrichit
+la span courante (succès du cache, nom des modèles ML) via l'API
+OpenTelemetry: sans SDK configuré, ces appels sont sans effet.
+
+Métriques Prometheus: avec plusieurs workers, PROMETHEUS_MULTIPROC_DIR
+désigne un répertoire partagé (vidé au lancement du serveur, voir run.py)
+où chaque processus écrit ses valeurs; /metrics les agrège toutes.
+"""
+
+from typing import Any, Dict, Iterable
+import importlib.util
+import logging
+import os
+
+from fastapi import FastAPI
+from opentelemetry import trace
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+from core.config import TELEMETRY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("fofal.erp")
+
+def _available(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+def set_span_attributes(attributes: Dict[str, Any]) -> None:
+    """Ajoute des attributs à la span courante (valeurs None ignorées)"""
+    span = trace.get_current_span()
+    if not span.is_recording():
+        return
+    for name, value in attributes.items():
+        if value is not None:
+            span.set_attribute(name, value)
+
+def record_cache_lookup(key: str, hit: bool) -> None:
+    """Événement cache.lookup sur la span courante"""
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.add_event("cache.lookup", {"cache.key": key, "cache.hit": hit})
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Registre à exporter sur /metrics: agrégat de tous les workers en mode
+    multiprocessus, registre du processus sinon
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def mark_metrics_process_dead() -> None:
+    """Retire les jauges du worker qui s'arrête (mode multiprocessus)"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+def setup_sentry() -> bool:
+    if not TELEMETRY_CONFIG["sentry_dsn"] or not _available("sentry_sdk"):
+        return False
+    import sentry_sdk
+
+    sentry_sdk.init(
+        dsn=TELEMETRY_CONFIG["sentry_dsn"],
+        traces_sample_rate=TELEMETRY_CONFIG["sentry_traces_sample_rate"]
+    )
+    return True
+
+def setup_tracer_provider() -> bool:
+    """Fournisseur de traces exporté en OTLP (ou sur la console à défaut)"""
+    if not _available("opentelemetry.sdk"):
+        logger.warning("OTEL_ENABLED sans opentelemetry-sdk: traces désactivées")
+        return False
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": TELEMETRY_CONFIG["service_name"]})
+    )
+    if _available("opentelemetry.exporter.otlp.proto.http.trace_exporter"):
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=TELEMETRY_CONFIG["otlp_endpoint"])
+    else:
+        exporter = ConsoleSpanExporter()
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return True
+
+def instrument(app: FastAPI, engines: Iterable) -> list:
+    """Instrumente FastAPI, SQLAlchemy, Redis et httpx (paquets installés)"""
+    instrumented = []
+    if _available("opentelemetry.instrumentation.fastapi"):
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics")
+        instrumented.append("fastapi")
+    if _available("opentelemetry.instrumentation.sqlalchemy"):
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+        SQLAlchemyInstrumentor().instrument(engines=list(engines))
+        instrumented.append("sqlalchemy")
+    if _available("opentelemetry.instrumentation.redis"):
+        from opentelemetry.instrumentation.redis import RedisInstrumentor
+        RedisInstrumentor().instrument()
+        instrumented.append("redis")
+    if _available("opentelemetry.instrumentation.httpx"):
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+        HTTPXClientInstrumentor().instrument()
+        instrumented.append("httpx")
+    return instrumented
+
+def setup_telemetry(app: FastAPI) -> None:
+    """Initialise Sentry et OpenTelemetry selon la configuration"""
+    if setup_sentry():
+        logger.info("Sentry initialisé")
+    if not TELEMETRY_CONFIG["otel_enabled"] or not setup_tracer_provider():
+        return
+
+    from db.database import engine, get_async_engine
+
+    engines = [engine]
+    try:
+        engines.append(get_async_engine().sync_engine)
+    except Exception as e:
+        logger.warning(f"Moteur asynchrone non instrumenté: {str(e)}")
+    instrumented = instrument(app, engines)
+    logger.info(f"Traces OpenTelemetry actives: {', '.join(instrumented) or 'spans applicatives'}")
@@ -1,13 +1,39 @@
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Union
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from core.config import DATABASE_CONFIG
 
 # Utilisation directe de l'URL de connexion depuis la configuration
 SQLALCHEMY_DATABASE_URL = DATABASE_CONFIG["SQLALCHEMY_DATABASE_URI"]
+ASYNC_DATABASE_URL = DATABASE_CONFIG["ASYNC_DATABASE_URI"]
+
+def _engine_options(url: str, async_driver: bool = False) -> Dict[str, Any]:
+    """Options de pool et timeout de requête selon le dialecte"""
+    if url.startswith("sqlite"):
+        # SQLite: pool par défaut, pas de statement_timeout côté serveur
+        return {}
+
+    options: Dict[str, Any] = {
+        "pool_size": DATABASE_CONFIG["POOL_SIZE"],
+        "max_overflow": DATABASE_CONFIG["MAX_OVERFLOW"],
+        "pool_timeout": DATABASE_CONFIG["POOL_TIMEOUT"],
+        "pool_recycle": DATABASE_CONFIG["POOL_RECYCLE"],
+        "pool_pre_ping": DATABASE_CONFIG["POOL_PRE_PING"],
+    }
+    timeout_ms = DATABASE_CONFIG["STATEMENT_TIMEOUT_MS"]
+    if timeout_ms and url.startswith("postgresql"):
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
 
 # Création du moteur SQLAlchemy
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 
 # Session locale pour les opérations de base de données
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,3 +48,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    """
+    Moteur asynchrone (asyncpg / aiosqlite)
+
+    Créé au premier usage: le pilote asynchrone n'est importé que par les
+    routes qui en ont besoin.
+    """
+    return create_async_engine(
+        ASYNC_DATABASE_URL,
+        **_engine_options(ASYNC_DATABASE_URL, async_driver=True)
+    )
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Fabrique de sessions asynchrones liée au moteur asynchrone"""
+    return async_sessionmaker(
+        get_async_engine(),
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+# Dépendance pour obtenir une session asynchrone
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def execute(db: Union[Session, AsyncSession], statement):
+    """
+    Exécute une requête sur une session synchrone ou asynchrone
+
+    Permet aux services de lecture d'accepter les deux types de session:
+    la requête n'occupe pas la boucle d'événements avec une AsyncSession.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.execute(statement)
+    return db.execute(statement)
@@ -0,0 +1,148 @@
+"""
+Vérification de la version du schéma au démarrage
+
+Remplace le create_all exécuté à l'import par chaque worker: une seule
+requête sur alembic_version comparée aux têtes des scripts de migration.
+Les têtes sont lues dans alembic/versions sans charger Alembic ni les
+modules de migration.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import ast
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+
+SCHEMA_CHECK = "check"
+SCHEMA_WARN = "warn"
+SCHEMA_CREATE = "create"
+SCHEMA_OFF = "off"
+
+class SchemaVersionError(RuntimeError):
+    """Le schéma de la base est en retard sur les migrations du code"""
+
+def _read_revision(path: Path) -> Tuple[Optional[str], Tuple[str, ...]]:
+    """Lit revision et down_revision d'un script de migration"""
+    values: Dict[str, object] = {}
+    for node in ast.parse(path.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target, value = node.targets[0], node.value
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            target, value = node.target, node.value
+        else:
+            continue
+        if isinstance(target, ast.Name) and target.id in ("revision", "down_revision"):
+            values[target.id] = ast.literal_eval(value)
+
+    down = values.get("down_revision")
+    if down is None:
+        parents: Tuple[str, ...] = ()
+    elif isinstance(down, str):
+        parents = (down,)
+    else:
+        parents = tuple(down)
+    return values.get("revision"), parents
+
+@lru_cache(maxsize=None)
+def migration_graph(directory: Path = MIGRATIONS_DIR) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Révisions connues et têtes des scripts de migration
+
+    Returns:
+        (toutes les révisions, révisions sans descendant)
+    """
+    revisions, parents = set(), set()
+    for path in directory.glob("*.py"):
+        revision, down = _read_revision(path)
+        if revision:
+            revisions.add(revision)
+            parents.update(down)
+    return frozenset(revisions), frozenset(revisions - parents)
+
+def current_revisions(engine: Engine) -> FrozenSet[str]:
+    """Révisions appliquées à la base (vide si Alembic n'y est jamais passé)"""
+    try:
+        with engine.connect() as connection:
+            rows = connection.execute(text("SELECT version_num FROM alembic_version"))
+            return frozenset(rows.scalars().all())
+    except SQLAlchemyError:
+        return frozenset()
+
+def create_tables(engine: Engine) -> List[str]:
+    """
+    Crée les tables absentes depuis les modèles, sans contraintes de clés
+    étrangères (certaines tables référencées, comme entrepots, n'existent
+    que dans les migrations)
+
+    Returns:
+        Noms des tables créées
+    """
+    import models  # noqa: F401  (toutes les tables dans Base.metadata)
+    from models.base import Base
+
+    existing = set(inspect(engine).get_table_names())
+    created = []
+    with engine.begin() as connection:
+        for table in Base.metadata.tables.values():
+            if table.name in existing:
+                continue
+            connection.execute(CreateTable(table, include_foreign_key_constraints=[]))
+            for index in table.indexes:
+                connection.execute(CreateIndex(index))
+            created.append(table.name)
+    return created
+
+def check_schema_version(engine: Engine,
+                         mode: str = SCHEMA_CHECK,
+                         directory: Path = MIGRATIONS_DIR) -> FrozenSet[str]:
+    """
+    Vérifie que la base est à la tête des migrations
+
+    Une révision inconnue du code est tolérée: lors d'un déploiement
+    progressif, la migration de la nouvelle version est déjà appliquée
+    quand les anciens workers redémarrent.
+
+    Args:
+        engine: Moteur synchrone de l'application
+        mode: check (erreur si retard), warn (journalise), create
+            (tables créées depuis les modèles, développement), off
+        directory: Répertoire des scripts de migration
+
+    Returns:
+        Révisions appliquées à la base
+    """
+    if mode == SCHEMA_OFF:
+        return frozenset()
+
+    if mode == SCHEMA_CREATE:
+        created = create_tables(engine)
+        logger.info(f"Schéma créé depuis les modèles: {len(created)} table(s)")
+        return current_revisions(engine)
+
+    known, heads = migration_graph(directory)
+    current = current_revisions(engine)
+    if current and not current <= known:
+        logger.warning(
+            f"Schéma plus récent que le code (révisions {sorted(current - known)}), "
+            f"démarrage poursuivi"
+        )
+        return current
+
+    if current != heads:
+        message = (
+            f"Schéma en retard sur les migrations: base {sorted(current) or 'vide'}, "
+            f"attendu {sorted(heads)}. Exécuter 'alembic upgrade head'."
+        )
+        if mode == SCHEMA_CHECK:
+            raise SchemaVersionError(message)
+        logger.warning(message)
+    return current
@@ -1,18 +1,36 @@
-from fastapi import FastAPI
+import importlib.util
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from core.config import APP_CONFIG, SECURITY_CONFIG
-from db.database import engine, Base
+from fastapi.middleware.gzip import GZipMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from core.config import APP_CONFIG, SECURITY_CONFIG, TELEMETRY_CONFIG
+from core.query_profiler import QueryProfilerMiddleware
+from core.responses import APIJSONResponse
+from core.startup import lifespan
+from core.telemetry import metrics_registry, setup_telemetry
 from api.v1 import api_router
 
-# Création des tables dans la base de données
-Base.metadata.create_all(bind=engine)
-
+# Le schéma est géré par Alembic: vérifié au démarrage (core.startup)
 app = FastAPI(
     title=APP_CONFIG["title"],
     description=APP_CONFIG["description"],
-    version=APP_CONFIG["version"]
+    version=APP_CONFIG["version"],
+    lifespan=lifespan,
+    default_response_class=APIJSONResponse
 )
 
+# Compression des réponses: Brotli si brotli-asgi est installé, sinon GZip
+if importlib.util.find_spec("brotli_asgi") is not None:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=APP_CONFIG["compression_min_size"],
+        gzip_fallback=True
+    )
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=APP_CONFIG["compression_min_size"])
+
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,9 +40,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profilage SQL par requête (debug): nombre de requêtes et temps en base
+if TELEMETRY_CONFIG["query_profiling"]:
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Traces et erreurs, instrumentation la plus externe
+setup_telemetry(app)
+
 # Inclusion des routes API
 app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/")
 async def root():
-    return {"message": "Bienvenue sur FOFAL ERP API"}
\ No newline at end of file
+    return {"message": "Bienvenue sur FOFAL ERP API"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques Prometheus (latence, cache et dérive des modèles ML) de tous les workers"""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
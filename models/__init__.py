@@ -11,8 +11,11 @@ from .notification import Notification
 from .parametrage import ParametreSysteme as Parametrage
 from .production import CultureType, Parcelle, ParcelleStatus, Recolte
 from .document import Document, TypeDocument
-from .finance import Compte, Transaction
-from .comptabilite import CompteComptable, EcritureComptable, ExerciceComptable, JournalComptable, TypeCompte, TypeJournal
+from .finance import Compte, Transaction, AgregatFinanceMensuel, TauxChange
+from .comptabilite import (
+    CompteComptable, EcritureComptable, ExerciceComptable, JournalComptable, TypeCompte, TypeJournal,
+    ClotureJob, StatutClotureJob, KpiSnapshot
+)
 from .tache import Tache, PrioriteTache, StatutTache, CategorieTache, RessourceTache, CommentaireTache, DependanceTache
 from .project import Project
 from .hr_agricole import (
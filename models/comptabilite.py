@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Enum, JSON, ForeignKey, Text, Numeric, Date, DateTime, Boolean
+from sqlalchemy import Column, String, Float, Enum, JSON, ForeignKey, Text, Numeric, Date, DateTime, Boolean, Integer
 from sqlalchemy.orm import relationship
 from .base import Base
 import enum
@@ -59,6 +59,7 @@ class EcritureComptable(Base):
     periode = Column(String(7), nullable=False)  # Format: YYYY-MM
     validee_par_id = Column(UUID(as_uuid=True), ForeignKey("employes.id"))
     date_validation = Column(DateTime)
+    modifiable = Column(Boolean, default=True)  # Gelée à la clôture de la période
     donnees_supplementaires = Column(JSON)
     created_at = Column(DateTime, default=lambda: datetime.now())
     updated_at = Column(DateTime, default=lambda: datetime.now(), onupdate=lambda: datetime.now())
@@ -127,6 +128,46 @@ class ExerciceComptable(Base):
     cloture_par = relationship("Employe")
     documents = relationship("Document", secondary="exercices_documents")
 
+class StatutClotureJob(str, enum.Enum):
+    """Statuts d'un job de clôture mensuelle"""
+    EN_ATTENTE = "EN_ATTENTE"
+    EN_COURS = "EN_COURS"
+    TERMINE = "TERMINE"
+    ECHEC = "ECHEC"
+
+class ClotureJob(Base):
+    """Job de clôture mensuelle, avec l'état de chaque étape (reprise après échec)"""
+    __tablename__ = "cloture_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    periode = Column(String(7), unique=True, nullable=False, index=True)  # Format: YYYY-MM
+    statut = Column(Enum(StatutClotureJob), default=StatutClotureJob.EN_ATTENTE, nullable=False)
+    etapes = Column(JSON)  # {etape: {statut, debut, fin, resultat, erreur}}
+    progression = Column(Integer, default=0)  # Pourcentage d'étapes terminées
+    erreur = Column(Text)
+    utilisateur_id = Column(UUID(as_uuid=True), ForeignKey("employes.id"))
+    heartbeat = Column(DateTime)  # Dernier signe de vie de l'exécution en cours
+    date_debut = Column(DateTime)
+    date_fin = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.now())
+    updated_at = Column(DateTime, default=lambda: datetime.now(), onupdate=lambda: datetime.now())
+
+class KpiSnapshot(Base):
+    """Indicateurs financiers d'un mois, calculés depuis les agrégats de la balance"""
+    __tablename__ = "kpi_snapshots"
+
+    periode = Column(String(7), primary_key=True)  # Format: YYYY-MM
+    chiffre_affaires = Column(Numeric(15, 2), nullable=False, default=0)  # Produits du mois
+    charges = Column(Numeric(15, 2), nullable=False, default=0)  # Charges du mois
+    resultat_net = Column(Numeric(15, 2), nullable=False, default=0)
+    total_actif = Column(Numeric(15, 2), nullable=False, default=0)  # Soldes cumulés en fin de mois
+    total_passif = Column(Numeric(15, 2), nullable=False, default=0)
+    tresorerie = Column(Numeric(15, 2), nullable=False, default=0)  # Comptes de classe 5
+    ratio_liquidite = Column(Float)  # Actif / passif, nul sans passif
+    marge_nette = Column(Float)  # Résultat / chiffre d'affaires, nulle sans produits
+    nombre_ecritures = Column(Integer, nullable=False, default=0)
+    calcule_le = Column(DateTime, default=lambda: datetime.now(), onupdate=lambda: datetime.now())
+
 class EcritureDocument(Base):
     """Table de liaison entre écritures et documents"""
     __tablename__ = "ecritures_documents"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Enum, JSON, ForeignKey, Text, Numeric, Date, DateTime, Boolean
+from sqlalchemy import Column, String, Float, Enum, JSON, ForeignKey, Text, Numeric, Date, DateTime, Boolean, Integer
 from sqlalchemy.orm import relationship
 from .base import Base
 import enum
@@ -88,3 +88,28 @@ class Budget(Base):
     montant_realise = Column(Numeric(15, 2), default=0)
     notes = Column(Text)
     donnees_supplementaires = Column(JSON)  # Données de ventilation ou autres
+
+class AgregatFinanceMensuel(Base):
+    """
+    Totaux mensuels des transactions par type, catégorie et statut,
+    tenus à jour dans la même transaction que chaque création
+    """
+    __tablename__ = "finance_agregats_mensuels"
+
+    periode = Column(String(7), primary_key=True)  # Format: YYYY-MM
+    type_transaction = Column(Enum(TypeTransaction), primary_key=True)
+    categorie = Column(Enum(CategorieTransaction), primary_key=True)
+    statut = Column(Enum(StatutTransaction), primary_key=True)
+    montant_total = Column(Numeric(15, 2), nullable=False, default=0)
+    nombre_transactions = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(), onupdate=lambda: datetime.now())
+
+class TauxChange(Base):
+    """Taux de change journalier: valeur d'une unité de devise en devise de base"""
+    __tablename__ = "taux_change"
+
+    date_taux = Column(Date, primary_key=True)
+    devise = Column(String(3), primary_key=True)
+    taux = Column(Numeric(18, 8), nullable=False)
+    source = Column(String(50))
+    created_at = Column(DateTime, default=datetime.utcnow)
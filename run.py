@@ -1,6 +1,36 @@
 import uvicorn
 
+def prepare_metrics_dir(workers: int) -> None:
+    """
+    Répertoire des métriques Prometheus partagé par les workers, vidé à
+    chaque lancement (doit être défini avant l'import de prometheus_client)
+    """
+    import os
+    import tempfile
+    from pathlib import Path
+
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        if workers <= 1:
+            return
+        directory = tempfile.mkdtemp(prefix="prometheus_")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for path in Path(directory).glob("*.db"):
+        path.unlink()
+
 if __name__ == "__main__":
     import os
     port = int(os.getenv("PORT", 8001))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
+    workers = int(os.getenv("WORKERS", 1))
+    prepare_metrics_dir(workers)
+    from core.config import NOTIFICATIONS_CONFIG
+    # Ping du protocole WebSocket: détecte les clients disparus sans message applicatif
+    websocket_ping = {
+        "ws_ping_interval": NOTIFICATIONS_CONFIG["heartbeat_interval"],
+        "ws_ping_timeout": NOTIFICATIONS_CONFIG["heartbeat_interval"],
+    }
+    if workers > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, **websocket_ping)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True, **websocket_ping)
@@ -22,6 +22,12 @@ class StatutEcriture(str, Enum):
     VALIDEE = "VALIDEE"
     ANNULEE = "ANNULEE"
 
+class StatutClotureJob(str, Enum):
+    EN_ATTENTE = "EN_ATTENTE"
+    EN_COURS = "EN_COURS"
+    TERMINE = "TERMINE"
+    ECHEC = "ECHEC"
+
 class BaseSchema(BaseModel):
     """Schéma de base avec champs de traçabilité"""
     created_at: Optional[datetime] = None
@@ -126,6 +132,19 @@ class EcritureComptableUpdate(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
     updated_by_id: Optional[UUID4] = None
 
+class ValidationEcrituresRequest(BaseModel):
+    """Validation en masse des écritures en brouillon sélectionnées par filtres"""
+    validee_par_id: UUID4
+    periode: Optional[str] = Field(None, pattern=r'^\d{4}-(0[1-9]|1[0-2])$')
+    journal_id: Optional[UUID4] = None
+    ids: Optional[List[UUID4]] = Field(None, min_length=1)
+
+    @model_validator(mode='after')
+    def validate_filtres(self) -> 'ValidationEcrituresRequest':
+        if self.periode is None and self.journal_id is None and not self.ids:
+            raise ValueError('Au moins un filtre (periode, journal_id, ids) est requis')
+        return self
+
 # Schémas de réponse
 class CompteComptableResponse(CompteComptableBase):
     id: UUID4
@@ -140,6 +159,10 @@ class EcritureComptableResponse(EcritureComptableBase):
     validee_par_id: Optional[UUID4] = None
     date_validation: Optional[datetime] = None
 
+class ValidationEcrituresResponse(BaseModel):
+    validees: int
+    ids: List[UUID4]
+
 class JournalComptableResponse(JournalComptableBase):
     id: UUID4
     actif: bool
@@ -150,6 +173,30 @@ class ExerciceComptableResponse(ExerciceComptableBase):
     date_cloture: Optional[datetime] = None
     cloture_par_id: Optional[UUID4] = None
 
+class ClotureJobResponse(BaseModel):
+    id: UUID4
+    periode: str
+    statut: StatutClotureJob
+    progression: int = 0
+    etapes: Dict[str, Dict[str, Any]] = {}
+    erreur: Optional[str] = None
+    date_debut: Optional[datetime] = None
+    date_fin: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+class KpiSnapshotResponse(BaseModel):
+    periode: str
+    chiffre_affaires: float
+    charges: float
+    resultat_net: float
+    total_actif: float
+    total_passif: float
+    tresorerie: float
+    ratio_liquidite: Optional[float] = None
+    marge_nette: Optional[float] = None
+    nombre_ecritures: int
+
 # Schémas pour les rapports
 class LigneGrandLivre(BaseModel):
     date: date
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, Field, UUID4
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Annotated, Optional, Dict, List, Tuple
 from models.finance import TypeTransaction, StatutTransaction, CategorieTransaction, TypeCompte
 
 class TransactionBase(BaseModel):
@@ -80,4 +80,30 @@ class BudgetResponse(BudgetBase):
     montant_realise: float
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+MoisCalendaire = Annotated[int, Field(ge=1, le=12)]
+RendementKgHa = Annotated[float, Field(ge=0)]
+
+class HypothesesCultureSchema(BaseModel):
+    culture: str
+    surface_ha: float = Field(..., gt=0)
+    prix_kg: float = Field(..., gt=0)
+    volatilite_prix: float = Field(default=0.25, ge=0)
+    derive_prix: float = 0.0
+    charges_fixes_mensuelles: float = Field(default=0.0, ge=0)
+    cout_variable_kg: float = Field(default=0.0, ge=0)
+    probabilite_choc_meteo: float = Field(default=0.1, ge=0, le=1)
+    perte_rendement_choc: float = Field(default=0.2, ge=0, le=1)
+    surcout_choc_meteo: float = Field(default=0.15, ge=0)
+    montee_en_production_mois: int = Field(default=0, ge=0)
+    culture_reference: Optional[str] = None
+    historique: List[Tuple[MoisCalendaire, RendementKgHa]] = Field(default_factory=list)
+
+class ScenarioRequest(BaseModel):
+    cultures: List[HypothesesCultureSchema] = Field(..., min_length=1)
+    mois: int = Field(default=24, ge=1, le=60)
+    n_scenarios: int = Field(default=100_000, ge=100, le=200_000)
+    tresorerie_initiale: Optional[float] = None  # Par défaut: solde des comptes actifs
+    mois_depart: Optional[int] = Field(default=None, ge=1, le=12)
+    seed: Optional[int] = None
@@ -12,26 +12,42 @@ from services.production_service import ProductionService
 from services.finance_service import FinanceService
 from services.inventory_service import InventoryService
 from services.weather_service import WeatherService
-from services.projects_ml_service import ProjectsMLService
+from services.ml.projets.base import ProjectsMLService
 from services.cache_service import CacheService
 from services.storage_service import StorageService
+from services.container import ServiceContainer
+from core.responses import cached_json
 
 class CrossModuleAnalytics:
     """Service d'analytics cross-module"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, container: Optional[ServiceContainer] = None):
         """Initialisation du service."""
         self.db = db
-        self.hr_service = HRAnalyticsService(db)
-        self.production_service = ProductionService(db)
-        self.finance_service = FinanceService(db)
-        self.inventory_service = InventoryService(db)
-        self.weather_service = WeatherService(db)
-        self.projects_ml_service = ProjectsMLService(db)
-        self.cache = CacheService()
-        self.storage = StorageService()
+        container = container or ServiceContainer(db)
+        self.hr_service = container.get(HRAnalyticsService)
+        self.production_service = container.get(ProductionService)
+        self.finance_service = container.get(FinanceService)
+        self.inventory_service = container.get(InventoryService)
+        self.weather_service = container.get(WeatherService)
+        self.projects_ml_service = container.get(ProjectsMLService)
+        self.cache = container.get(CacheService)
+        self.storage = container.get(StorageService)
         self.cache_ttl = 900  # 15 minutes
 
+    async def get_unified_analytics_json(
+        self,
+        date_debut: Optional[date] = None,
+        date_fin: Optional[date] = None
+    ) -> bytes:
+        """Analytics unifiés encodés en JSON, octets mis en cache"""
+        return await cached_json(
+            self.cache,
+            f"unified_analytics_{date_debut}_{date_fin}:json",
+            lambda: self.get_unified_analytics(date_debut, date_fin),
+            expire_in=timedelta(seconds=self.cache_ttl)
+        )
+
     async def get_unified_analytics(
         self,
         date_debut: Optional[date] = None,
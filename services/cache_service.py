@@ -3,28 +3,57 @@ Service de cache pour l'optimisation des performances
 """
 
 from typing import Any, Optional, Callable
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from enum import Enum
 import asyncio
-from functools import wraps
+from functools import lru_cache, wraps
+import hashlib
 import json
 import redis
+import redis.asyncio
 import pickle
 from core.config import REDIS_CONFIG
+from core.telemetry import record_cache_lookup
+
+@lru_cache(maxsize=1)
+def get_redis_client() -> redis.Redis:
+    """
+    Client Redis partagé par le processus
+
+    redis.Redis est thread-safe et gère son propre pool de connexions:
+    un seul client suffit pour tous les services, au lieu d'un client
+    (et d'un pool) par service instancié.
+    """
+    return redis.Redis(
+        host=REDIS_CONFIG["HOST"],
+        port=REDIS_CONFIG["PORT"],
+        decode_responses=True
+    )
+
+@lru_cache(maxsize=1)
+def get_async_redis_client() -> redis.asyncio.Redis:
+    """
+    Client Redis asynchrone partagé (pub/sub)
+
+    Lié à la boucle d'événements du worker: réservé au code asynchrone.
+    """
+    return redis.asyncio.Redis(
+        host=REDIS_CONFIG["HOST"],
+        port=REDIS_CONFIG["PORT"]
+    )
 
 class CacheService:
     """Service de gestion du cache Redis"""
     
     def __init__(self):
-        self.redis = redis.Redis(
-            host=REDIS_CONFIG["HOST"],
-            port=REDIS_CONFIG["PORT"],
-            decode_responses=True
-        )
+        self.redis = get_redis_client()
         
     async def get(self, key: str) -> Optional[Any]:
         """Récupère une valeur du cache"""
         try:
             value = self.redis.get(key)
+            record_cache_lookup(key, value is not None)
             if value is None:
                 return None
             return pickle.loads(value.encode())
@@ -48,6 +77,31 @@ class CacheService:
         except Exception as e:
             print(f"Erreur lors du stockage dans le cache : {str(e)}")
             
+    async def get_json(self, key: str) -> Optional[bytes]:
+        """Récupère une réponse JSON déjà encodée (aucun ré-encodage)"""
+        try:
+            value = self.redis.get(key)
+            record_cache_lookup(key, value is not None)
+            return value.encode() if value is not None else None
+        except Exception as e:
+            print(f"Erreur lors de la récupération du cache : {str(e)}")
+            return None
+
+    async def set_json(
+        self,
+        key: str,
+        payload: bytes,
+        expire_in: Optional[timedelta] = None
+    ) -> None:
+        """Stocke une réponse JSON encodée (UTF-8)"""
+        try:
+            if expire_in:
+                self.redis.setex(key, int(expire_in.total_seconds()), payload)
+            else:
+                self.redis.set(key, payload)
+        except Exception as e:
+            print(f"Erreur lors du stockage dans le cache : {str(e)}")
+            
     async def invalidate(self, key: str) -> None:
         """Invalide une entrée du cache"""
         try:
@@ -55,6 +109,30 @@ class CacheService:
         except Exception as e:
             print(f"Erreur lors de l'invalidation du cache : {str(e)}")
             
+    async def reserve(self, key: str, expire_in: timedelta) -> bool:
+        """Pose une clé expirante si elle est absente (SET NX): vrai si elle était libre"""
+        try:
+            return bool(self.redis.set(key, "1", nx=True, ex=int(expire_in.total_seconds())))
+        except Exception as e:
+            print(f"Erreur lors de la réservation dans le cache : {str(e)}")
+            return False
+
+    async def delete_pattern(self, pattern: str, batch_size: int = 500) -> int:
+        """Supprime les clés correspondant à un motif (SCAN, suppression par lots)"""
+        deleted = 0
+        try:
+            batch = []
+            for key in self.redis.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += self.redis.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += self.redis.unlink(*batch)
+        except Exception as e:
+            print(f"Erreur lors de l'invalidation du cache : {str(e)}")
+        return deleted
+
     async def clear(self) -> None:
         """Vide le cache"""
         try:
@@ -77,13 +155,47 @@ class CacheService:
         await self.set(key, value, expire_in)
         return value
 
+def stable_repr(value: Any) -> Any:
+    """
+    Représentation stable d'une valeur pour construire des clés de cache
+    
+    Les objets ORM sont réduits à (classe, id), les objets sans
+    représentation stable à leur nom de classe: contrairement à str(),
+    le résultat ne dépend pas des adresses mémoire.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, dict):
+        return {str(k): stable_repr(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [stable_repr(v) for v in value]
+        return sorted(items, key=str) if isinstance(value, (set, frozenset)) else items
+    if hasattr(value, "__table__"):
+        return f"{type(value).__name__}:{getattr(value, 'id', None)}"
+    return type(value).__qualname__
+
+def fingerprint(*parts: Any) -> str:
+    """Empreinte SHA-1 stable d'un ensemble de valeurs"""
+    payload = json.dumps([stable_repr(p) for p in parts], default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def make_cache_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """Clé de cache stable pour un appel de fonction"""
+    return f"{func.__module__}.{func.__qualname__}:{fingerprint(args, kwargs)}"
+
 def cache_result(ttl_seconds: int = 3600):
     """Décorateur pour mettre en cache le résultat d'une fonction"""
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # Création d'une clé unique basée sur la fonction et ses arguments
-            cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
+            cache_key = make_cache_key(func, args, kwargs)
             
             # Initialisation du service de cache
             cache_service = CacheService()
@@ -0,0 +1,271 @@
+"""
+Service de change: taux journaliers et conversion des rapports
+
+Les taux (valeur d'une unité de devise en devise de base) sont persistés dans
+taux_change et complétés à la demande auprès d'un fournisseur interchangeable.
+Une table de taux par devise est gardée en mémoire dans le processus: un
+rapport converti coûte au plus un chargement de taux, puis ses colonnes sont
+converties d'un bloc avec numpy.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import httpx
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.finance import TauxChange
+
+logger = logging.getLogger(__name__)
+
+# Parités fixes par rapport au franc CFA (1 EUR = 655,957 XAF)
+TAUX_FIXES = {
+    "XAF": Decimal("1"),
+    "XOF": Decimal("1"),
+    "EUR": Decimal("655.957")
+}
+
+# Jours antérieurs demandés au fournisseur quand aucun taux n'est connu
+# (taux du jour pas encore publié, week-end)
+JOURS_REPLI = 7
+
+class FournisseurTaux:
+    """Source de taux journaliers exprimés en devise de base"""
+    source = "inconnue"
+
+    def __init__(self, devise_base: str):
+        self.devise_base = devise_base
+
+    async def taux(self, devise: str, jours: Sequence[date]) -> Dict[date, Decimal]:
+        """Taux disponibles pour les jours demandés (les jours absents sont omis)"""
+        raise NotImplementedError
+
+class FournisseurTauxFixe(FournisseurTaux):
+    """Parités fixes, sans réseau: développement, tests et zone franc"""
+    source = "fixe"
+
+    def __init__(self, devise_base: str, taux: Optional[Dict[str, Decimal]] = None):
+        super().__init__(devise_base)
+        self.taux_fixes = taux or TAUX_FIXES
+
+    async def taux(self, devise: str, jours: Sequence[date]) -> Dict[date, Decimal]:
+        if devise not in self.taux_fixes or self.devise_base not in self.taux_fixes:
+            return {}
+        valeur = self.taux_fixes[devise] / self.taux_fixes[self.devise_base]
+        return {jour: valeur for jour in jours}
+
+class FournisseurExchangeRateApi(FournisseurTaux):
+    """Historique exchangerate-api.com, un appel par jour manquant"""
+    source = "exchangerate-api"
+
+    def __init__(self, devise_base: str, api_key: str, base_url: Optional[str] = None):
+        super().__init__(devise_base)
+        self.api_key = api_key
+        self.base_url = base_url or settings.EXCHANGE_RATE_API_URL
+        self.timeout = 10.0
+        self.appels_simultanes = 5
+
+    async def taux(self, devise: str, jours: Sequence[date]) -> Dict[date, Decimal]:
+        limite = asyncio.Semaphore(self.appels_simultanes)
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async def un_jour(jour: date) -> Tuple[date, Optional[Decimal]]:
+                url = f"{self.base_url}/{self.api_key}/history/{self.devise_base}/{jour.year}/{jour.month}/{jour.day}"
+                async with limite:
+                    try:
+                        response = await client.get(url)
+                        response.raise_for_status()
+                        cours = response.json().get("conversion_rates", {}).get(devise)
+                    except (httpx.HTTPError, ValueError) as e:
+                        logger.warning("Taux %s du %s indisponible: %s", devise, jour, e)
+                        return jour, None
+                # L'API donne 1 devise de base = cours devise
+                return jour, (Decimal("1") / Decimal(str(cours))) if cours else None
+
+            resultats = await asyncio.gather(*(un_jour(jour) for jour in jours))
+        return {jour: valeur for jour, valeur in resultats if valeur is not None}
+
+def get_fournisseur_taux() -> FournisseurTaux:
+    """Fournisseur configuré: l'API si une clé est fournie, sinon les parités fixes"""
+    if settings.EXCHANGE_RATE_API_KEY:
+        return FournisseurExchangeRateApi(settings.DEFAULT_CURRENCY, settings.EXCHANGE_RATE_API_KEY)
+    return FournisseurTauxFixe(settings.DEFAULT_CURRENCY)
+
+@dataclass
+class TableTaux:
+    """Taux d'une devise, triés par jour (ordinal); le dernier taux connu s'applique"""
+    devise: str
+    jours: np.ndarray
+    taux: np.ndarray
+    debut: date
+    fin: date
+    charge_le: float = 0.0
+
+    @classmethod
+    def identite(cls, devise: str) -> "TableTaux":
+        return cls(devise, np.zeros(1, dtype=np.int64), np.ones(1), date.min, date.max)
+
+    def couvre(self, debut: date, fin: date) -> bool:
+        return self.debut <= debut and fin <= self.fin
+
+    def taux_aux(self, jours: Union[date, Sequence[date], np.ndarray]) -> np.ndarray:
+        """Taux applicables aux dates données (dernier taux publié à cette date)"""
+        if isinstance(jours, date):
+            ordinaux = np.asarray([jours.toordinal()], dtype=np.int64)
+        elif isinstance(jours, np.ndarray):
+            ordinaux = jours.astype(np.int64)
+        else:
+            ordinaux = np.fromiter((j.toordinal() for j in jours), dtype=np.int64, count=len(jours))
+        index = np.searchsorted(self.jours, ordinaux, side="right") - 1
+        return self.taux[np.clip(index, 0, self.taux.size - 1)]
+
+class CacheTaux:
+    """Tables de taux par devise, partagées dans le processus"""
+
+    def __init__(self, ttl: int = settings.EXCHANGE_RATE_CACHE_TTL):
+        self.ttl = ttl
+        self._tables: Dict[str, TableTaux] = {}
+
+    def get(self, devise: str, debut: date, fin: date) -> Optional[TableTaux]:
+        table = self._tables.get(devise)
+        if table is None or time.monotonic() - table.charge_le > self.ttl or not table.couvre(debut, fin):
+            return None
+        return table
+
+    def etendue(self, devise: str, debut: date, fin: date) -> Tuple[date, date]:
+        """Plage à charger: la demande, élargie à ce qui est déjà en cache"""
+        table = self._tables.get(devise)
+        if table is None:
+            return debut, fin
+        return min(debut, table.debut), max(fin, table.fin)
+
+    def set(self, table: TableTaux) -> None:
+        table.charge_le = time.monotonic()
+        self._tables[table.devise] = table
+
+    def clear(self) -> None:
+        self._tables.clear()
+
+# Instance singleton du cache de taux
+_cache_taux = None
+
+def get_cache_taux() -> CacheTaux:
+    """Retourne l'instance singleton du cache de taux"""
+    global _cache_taux
+    if _cache_taux is None:
+        _cache_taux = CacheTaux()
+    return _cache_taux
+
+def convertir_colonnes(
+    lignes: List[Dict[str, Any]],
+    colonnes: Sequence[str],
+    taux: Union[float, np.ndarray]
+) -> List[Dict[str, Any]]:
+    """
+    Divise les colonnes de montants par le taux (scalaire ou un par ligne) et
+    retourne de nouvelles lignes, montants arrondis au centime
+    """
+    if not lignes:
+        return []
+    converties = [dict(ligne) for ligne in lignes]
+    for colonne in colonnes:
+        valeurs = np.fromiter((float(l[colonne] or 0) for l in lignes), dtype=np.float64, count=len(lignes))
+        for ligne, valeur in zip(converties, np.round(valeurs / taux, 2).tolist()):
+            ligne[colonne] = valeur
+    return converties
+
+class ChangeService:
+    def __init__(self, db: Session, fournisseur: Optional[FournisseurTaux] = None):
+        self.db = db
+        self.devise_base = settings.DEFAULT_CURRENCY
+        self.fournisseur = fournisseur or get_fournisseur_taux()
+        self.cache = get_cache_taux()
+
+    async def table(self, devise: str, debut: date, fin: date) -> TableTaux:
+        """Table des taux d'une devise couvrant [debut, fin]"""
+        devise = devise.upper()
+        if devise == self.devise_base:
+            return TableTaux.identite(devise)
+        table = self.cache.get(devise, debut, fin)
+        if table is not None:
+            return table
+
+        debut, fin = self.cache.etendue(devise, debut, fin)
+        taux = await self._charger(devise, debut, fin)
+        if not taux:
+            raise ValueError(f"Aucun taux de change disponible pour {devise}")
+        jours = sorted(taux)
+        table = TableTaux(
+            devise=devise,
+            jours=np.fromiter((j.toordinal() for j in jours), dtype=np.int64, count=len(jours)),
+            taux=np.fromiter((float(taux[j]) for j in jours), dtype=np.float64, count=len(jours)),
+            debut=debut,
+            fin=fin
+        )
+        self.cache.set(table)
+        return table
+
+    async def taux_au(self, devise: str, jour: date) -> float:
+        """Taux d'une devise à une date (devise de base par unité)"""
+        table = await self.table(devise, jour, jour)
+        return float(table.taux_aux(jour)[0])
+
+    async def _charger(self, devise: str, debut: date, fin: date) -> Dict[date, Decimal]:
+        """
+        Taux persistés de la plage (et dernier taux antérieur), complétés par le
+        fournisseur. Les dates futures prennent le dernier taux publié.
+        """
+        # Pas de taux futurs: la recherche s'arrête à aujourd'hui
+        dernier = min(fin, date.today())
+        premier = min(debut, dernier)
+        precedent = self.db.query(func.max(TauxChange.date_taux)).filter(
+            TauxChange.devise == devise,
+            TauxChange.date_taux <= premier
+        ).scalar_subquery()
+        taux = dict(self.db.query(TauxChange.date_taux, TauxChange.taux).filter(
+            TauxChange.devise == devise,
+            TauxChange.date_taux >= func.coalesce(precedent, premier),
+            TauxChange.date_taux <= fin
+        ).all())
+
+        # Jours publiés manquants
+        manquants = [
+            premier + timedelta(days=i) for i in range((dernier - premier).days + 1)
+            if premier + timedelta(days=i) not in taux
+        ]
+        if manquants:
+            taux.update(await self._completer(devise, manquants))
+        if not taux:
+            # Rien de publié sur la plage: derniers jours précédents
+            taux.update(await self._completer(
+                devise, [premier - timedelta(days=i) for i in range(JOURS_REPLI, 0, -1)]
+            ))
+        return taux
+
+    async def _completer(self, devise: str, jours: List[date]) -> Dict[date, Decimal]:
+        """Taux des jours demandés au fournisseur, enregistrés"""
+        nouveaux = await self.fournisseur.taux(devise, jours)
+        if nouveaux:
+            self._enregistrer(devise, nouveaux)
+        return nouveaux
+
+    def _enregistrer(self, devise: str, taux: Dict[date, Decimal]) -> None:
+        """Insertion groupée; un taux déjà présent n'est pas remplacé"""
+        insert = sqlite_insert if self.db.get_bind().dialect.name == "sqlite" else pg_insert
+        self.db.execute(
+            insert(TauxChange).on_conflict_do_nothing(index_elements=["date_taux", "devise"]),
+            [
+                {"date_taux": jour, "devise": devise, "taux": valeur, "source": self.fournisseur.source}
+                for jour, valeur in taux.items()
+            ]
+        )
+        self.db.commit()
@@ -2,25 +2,41 @@
 Service de gestion comptable avec ML et cache
 """
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 from models.comptabilite import (
     CompteComptable, EcritureComptable, JournalComptable,
-    ExerciceComptable, TypeCompte, StatutEcriture
+    ExerciceComptable, TypeCompte, StatutEcriture,
+    ClotureJob, StatutClotureJob
 )
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, update
 from decimal import Decimal
+import numpy as np
 from .comptabilite_stats_service import ComptabiliteStatsService
 from .cache_service import CacheService
+from .change_service import ChangeService, convertir_colonnes
+from .container import ServiceContainer
 from .finance_comptabilite.analyse import AnalyseFinanceCompta
+from .finance_comptabilite.budget import SuiviBudgetaire
+from .finance_comptabilite.kpi import SnapshotsKpi, periode_de, periodes_entre
 
 class ComptabiliteService:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        async_db: Optional[AsyncSession] = None,
+        container: Optional[ServiceContainer] = None
+    ):
         self.db = db
-        self.stats_service = ComptabiliteStatsService(db)
-        self.cache = CacheService()
-        self.analyse = AnalyseFinanceCompta(db)
+        container = container or ServiceContainer(db, async_db)
+        self.stats_service = container.get(ComptabiliteStatsService)
+        self.cache = container.get(CacheService)
+        self.analyse = container.get(AnalyseFinanceCompta)
+        self.change = container.get(ChangeService)
+        self.kpi = container.get(SnapshotsKpi)
+        self.suivi_budget = container.get(SuiviBudgetaire)
 
     async def create_compte(self, compte_data: Dict[str, Any]) -> CompteComptable:
         """Crée un nouveau compte comptable"""
@@ -43,9 +59,12 @@ class ComptabiliteService:
 
         ecriture = EcritureComptable(**ecriture_data)
         ecriture.periode = ecriture_data["date_ecriture"].strftime("%Y-%m")
+        if self._periode_cloturee(ecriture.periode):
+            raise ValueError(f"Période {ecriture.periode} clôturée")
         
         self.db.add(ecriture)
-        await self._update_compte_soldes(ecriture)
+        compte = await self._update_compte_soldes(ecriture)
+        self.suivi_budget.imputer_ecriture(ecriture, compte)
         
         # Invalidation cache
         await self._invalidate_cache()
@@ -65,10 +84,12 @@ class ComptabiliteService:
         
         if ecriture.statut != StatutEcriture.BROUILLON:
             raise ValueError("Seules les écritures en brouillon peuvent être validées")
+        if ecriture.modifiable is False:
+            raise ValueError("Écriture gelée par la clôture de la période")
 
         ecriture.statut = StatutEcriture.VALIDEE
         ecriture.validee_par_id = validee_par_id
-        ecriture.date_validation = datetime.now(datetime.timezone.utc)
+        ecriture.date_validation = datetime.now(timezone.utc)
         
         # Invalidation cache
         await self._invalidate_cache()
@@ -77,18 +98,73 @@ class ComptabiliteService:
         self.db.refresh(ecriture)
         return ecriture
 
+    async def valider_ecritures(
+        self,
+        validee_par_id: str,
+        periode: Optional[str] = None,
+        journal_id: Optional[str] = None,
+        ids: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Valide en une requête les écritures en brouillon sélectionnées.
+        Chaque pièce (numero_piece) de la sélection doit être équilibrée.
+        """
+        filtres = [
+            EcritureComptable.statut == StatutEcriture.BROUILLON,
+            EcritureComptable.modifiable.isnot(False)
+        ]
+        if periode:
+            filtres.append(EcritureComptable.periode == periode)
+        if journal_id:
+            filtres.append(EcritureComptable.journal_id == journal_id)
+        if ids:
+            filtres.append(EcritureComptable.id.in_(ids))
+        if len(filtres) == 2:
+            raise ValueError("Au moins un filtre (periode, journal_id, ids) est requis")
+
+        # Pièces déséquilibrées de la sélection
+        desequilibrees = self.db.query(EcritureComptable.numero_piece).filter(
+            *filtres
+        ).group_by(EcritureComptable.numero_piece).having(
+            func.abs(
+                func.coalesce(func.sum(EcritureComptable.debit), 0) -
+                func.coalesce(func.sum(EcritureComptable.credit), 0)
+            ) >= Decimal("0.01")
+        ).limit(10).all()
+        if desequilibrees:
+            pieces = ", ".join(piece for piece, in desequilibrees)
+            raise ValueError(f"Pièces non équilibrées: {pieces}")
+
+        validees = self.db.execute(
+            update(EcritureComptable).where(*filtres).values(
+                statut=StatutEcriture.VALIDEE,
+                validee_par_id=validee_par_id,
+                date_validation=datetime.now(timezone.utc)
+            ).returning(EcritureComptable.id).execution_options(synchronize_session=False)
+        ).scalars().all()
+        self.db.commit()
+
+        if validees:
+            await self._invalidate_cache()
+
+        return {
+            "validees": len(validees),
+            "ids": validees
+        }
+
     async def get_grand_livre(
         self,
         compte_id: Optional[str] = None,
         date_debut: Optional[date] = None,
-        date_fin: Optional[date] = None
+        date_fin: Optional[date] = None,
+        devise: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Génère le grand livre avec cache"""
-        # Clé de cache
+        """Génère le grand livre avec cache, éventuellement converti dans une devise"""
+        # Clé de cache (montants en devise de base)
         cache_key = f"grand_livre_{compte_id or 'all'}_{date_debut}_{date_fin}"
         cached_data = await self.cache.get(cache_key)
         if cached_data:
-            return cached_data
+            return await self._convertir_grand_livre(cached_data, devise)
 
         query = self.db.query(EcritureComptable)
 
@@ -121,45 +197,69 @@ class ComptabiliteService:
             })
 
         # Mise en cache
-        await self.cache.set(cache_key, grand_livre, expire=3600)
+        await self.cache.set(cache_key, grand_livre, expire_in=timedelta(hours=1))
         
-        return grand_livre
+        return await self._convertir_grand_livre(grand_livre, devise)
+
+    async def _convertir_grand_livre(
+        self,
+        grand_livre: List[Dict[str, Any]],
+        devise: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Convertit chaque ligne au taux de sa date; le solde est recumulé en devise"""
+        if not devise or not grand_livre:
+            return grand_livre
+        dates = [ligne["date"] for ligne in grand_livre]
+        table = await self.change.table(devise, min(dates), max(dates))
+        lignes = convertir_colonnes(grand_livre, ("debit", "credit"), table.taux_aux(dates))
+        soldes = np.cumsum([ligne["debit"] - ligne["credit"] for ligne in lignes])
+        for ligne, solde in zip(lignes, np.round(soldes, 2).tolist()):
+            ligne["solde"] = solde
+        return lignes
 
     async def get_balance_generale(
         self,
         date_debut: Optional[date] = None,
-        date_fin: Optional[date] = None
+        date_fin: Optional[date] = None,
+        devise: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Génère la balance générale avec cache"""
-        # Clé de cache
+        """Génère la balance générale avec cache, éventuellement convertie dans une devise"""
+        # Clé de cache (montants en devise de base)
         cache_key = f"balance_{date_debut}_{date_fin}"
         cached_data = await self.cache.get(cache_key)
         if cached_data:
-            return cached_data
+            return await self._convertir_balance(cached_data, date_fin, devise)
 
+        # Une seule requête: agrégats et libellés des comptes par jointure
         query = self.db.query(
-            EcritureComptable.compte_id,
+            CompteComptable.numero,
+            CompteComptable.libelle,
+            CompteComptable.type_compte,
             func.sum(EcritureComptable.debit).label('total_debit'),
             func.sum(EcritureComptable.credit).label('total_credit')
-        )
+        ).join(CompteComptable, CompteComptable.id == EcritureComptable.compte_id)
 
         if date_debut:
             query = query.filter(EcritureComptable.date_ecriture >= date_debut)
         if date_fin:
             query = query.filter(EcritureComptable.date_ecriture <= date_fin)
 
-        query = query.group_by(EcritureComptable.compte_id)
+        query = query.group_by(
+            CompteComptable.id,
+            CompteComptable.numero,
+            CompteComptable.libelle,
+            CompteComptable.type_compte
+        ).order_by(CompteComptable.numero)
         
         resultats = query.all()
         balance = []
 
         for resultat in resultats:
-            compte = self.db.query(CompteComptable).get(resultat.compte_id)
             balance.append({
                 "compte": {
-                    "numero": compte.numero,
-                    "libelle": compte.libelle,
-                    "type": compte.type_compte
+                    "numero": resultat.numero,
+                    "libelle": resultat.libelle,
+                    "type": resultat.type_compte
                 },
                 "debit": float(resultat.total_debit or 0),
                 "credit": float(resultat.total_credit or 0),
@@ -167,9 +267,21 @@ class ComptabiliteService:
             })
 
         # Mise en cache
-        await self.cache.set(cache_key, balance, expire=3600)
+        await self.cache.set(cache_key, balance, expire_in=timedelta(hours=1))
         
-        return balance
+        return await self._convertir_balance(balance, date_fin, devise)
+
+    async def _convertir_balance(
+        self,
+        balance: List[Dict[str, Any]],
+        date_fin: Optional[date],
+        devise: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Convertit la balance au taux de clôture (date de fin, à défaut aujourd'hui)"""
+        if not devise or not balance:
+            return balance
+        taux = await self.change.taux_au(devise, date_fin or date.today())
+        return convertir_colonnes(balance, ("debit", "credit", "solde"), taux)
 
     async def get_journal(
         self,
@@ -196,7 +308,7 @@ class ComptabiliteService:
         ecritures = query.order_by(EcritureComptable.date_ecriture).all()
         
         # Mise en cache
-        await self.cache.set(cache_key, ecritures, expire=3600)
+        await self.cache.set(cache_key, ecritures, expire_in=timedelta(hours=1))
         
         return ecritures
 
@@ -285,17 +397,19 @@ class ComptabiliteService:
             date_fin=date_fin
         )
         
+        # Instantané du mois pour une fin de mois close seulement: en cours
+        # de mois, les recommandations suivent le bilan affiché
+        mois_clos = (date_fin + timedelta(days=1)).day == 1 and date_fin < date.today()
+        snapshot = self.kpi.get_snapshot(periode_de(date_fin)) if mois_clos else None
+
         # Enrichissement ML
         bilan.update({
             "ml_analysis": ml_analysis["ml_analysis"],
-            "recommendations": await self._generate_bilan_recommendations(
-                bilan,
-                ml_analysis
-            )
+            "recommendations": await self._generate_bilan_recommendations(bilan, ml_analysis, snapshot)
         })
         
         # Mise en cache
-        await self.cache.set(cache_key, bilan, expire=3600)
+        await self.cache.set(cache_key, bilan, expire_in=timedelta(hours=1))
         
         return bilan
 
@@ -361,6 +475,10 @@ class ComptabiliteService:
         
         # Performance ML
         performance = await self.analyse.predict_performance(months_ahead=3)
+
+        # Instantanés d'indicateurs, retenus seulement s'ils couvrent tous les mois
+        periodes = periodes_entre(periode_de(date_debut), periode_de(date_fin))
+        snapshots = self.kpi.get_snapshots(periodes[0], periodes[-1]) if periodes else []
         
         # Enrichissement ML
         resultat.update({
@@ -371,15 +489,23 @@ class ComptabiliteService:
                 resultat,
                 ml_analysis,
                 optimization,
-                performance
+                performance,
+                snapshots if periodes and len(snapshots) == len(periodes) else None
             )
         })
         
         # Mise en cache
-        await self.cache.set(cache_key, resultat, expire=3600)
+        await self.cache.set(cache_key, resultat, expire_in=timedelta(hours=1))
         
         return resultat
 
+    def _periode_cloturee(self, periode: str) -> bool:
+        """Vrai si la clôture mensuelle de la période est terminée"""
+        return self.db.query(ClotureJob.id).filter(
+            ClotureJob.periode == periode,
+            ClotureJob.statut == StatutClotureJob.TERMINE
+        ).first() is not None
+
     async def _get_exercice_for_date(self, date_ecriture: date) -> Optional[ExerciceComptable]:
         """Récupère l'exercice comptable correspondant à une date"""
         return self.db.query(ExerciceComptable).filter(
@@ -389,7 +515,7 @@ class ComptabiliteService:
             )
         ).first()
 
-    async def _update_compte_soldes(self, ecriture: EcritureComptable):
+    async def _update_compte_soldes(self, ecriture: EcritureComptable) -> CompteComptable:
         """Met à jour les soldes du compte après une écriture"""
         compte = self.db.query(CompteComptable).get(ecriture.compte_id)
         if not compte:
@@ -397,6 +523,7 @@ class ComptabiliteService:
 
         compte.solde_debit += ecriture.debit or 0
         compte.solde_credit += ecriture.credit or 0
+        return compte
 
     async def _invalidate_cache(self):
         """Invalide tous les caches comptables"""
@@ -413,13 +540,17 @@ class ComptabiliteService:
     async def _generate_bilan_recommendations(
         self,
         bilan: Dict[str, Any],
-        ml_analysis: Dict[str, Any]
+        ml_analysis: Dict[str, Any],
+        snapshot: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """Génère des recommandations pour le bilan"""
         recommendations = []
         
-        # Analyse ratios
-        ratio_liquidite = bilan["total_actif"] / bilan["total_passif"] if bilan["total_passif"] != 0 else 0
+        # Analyse ratios: instantané du mois s'il existe
+        if snapshot is not None:
+            ratio_liquidite = snapshot["ratio_liquidite"] or 0
+        else:
+            ratio_liquidite = bilan["total_actif"] / bilan["total_passif"] if bilan["total_passif"] != 0 else 0
         if ratio_liquidite < 1.5:
             recommendations.append({
                 "type": "RATIO",
@@ -449,13 +580,18 @@ class ComptabiliteService:
         resultat: Dict[str, Any],
         ml_analysis: Dict[str, Any],
         optimization: Dict[str, Any],
-        performance: Dict[str, Any]
+        performance: Dict[str, Any],
+        snapshots: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
         """Génère des recommandations pour le compte de résultat"""
         recommendations = []
         
-        # Analyse rentabilité
-        marge = resultat["resultat_net"] / resultat["total_produits"] if resultat["total_produits"] != 0 else 0
+        # Analyse rentabilité: instantanés des mois couverts s'ils sont fournis
+        if snapshots:
+            chiffre_affaires = sum(s["chiffre_affaires"] for s in snapshots)
+            marge = sum(s["resultat_net"] for s in snapshots) / chiffre_affaires if chiffre_affaires != 0 else 0
+        else:
+            marge = resultat["resultat_net"] / resultat["total_produits"] if resultat["total_produits"] != 0 else 0
         if marge < 0.1:
             recommendations.append({
                 "type": "MARGIN",
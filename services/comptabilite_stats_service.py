@@ -2,30 +2,45 @@
 Service de statistiques comptables avec ML
 """
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
-from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, date, timedelta, timezone
 from models.comptabilite import (
     CompteComptable, 
     EcritureComptable,
     TypeCompte,
     StatutEcriture
 )
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select, case
 from decimal import Decimal
+import numpy as np
 
+from db.database import execute
+
+from services.container import ServiceContainer
 from services.weather_service import WeatherService
 from services.iot_service import IoTService
 from services.cache_service import CacheService
 from services.finance_comptabilite.analyse import AnalyseFinanceCompta
+from services.finance_comptabilite.kpi import SnapshotsKpi, periode_de, periode_decalee
 
 class ComptabiliteStatsService:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        async_db: Optional[AsyncSession] = None,
+        container: Optional[ServiceContainer] = None
+    ):
         self.db = db
-        self.weather_service = WeatherService(db)
-        self.iot_service = IoTService(db)
-        self.cache = CacheService()
-        self.analyse = AnalyseFinanceCompta(db)
+        # Les agrégats de lecture passent par la session asynchrone si fournie
+        self.read_db = async_db or db
+        container = container or ServiceContainer(db, async_db)
+        self.weather_service = container.get(WeatherService)
+        self.iot_service = container.get(IoTService)
+        self.cache = container.get(CacheService)
+        self.analyse = container.get(AnalyseFinanceCompta)
+        self.kpi = container.get(SnapshotsKpi)
 
     async def get_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques financières avec ML"""
@@ -34,14 +49,20 @@ class ComptabiliteStatsService:
         
         # Prédictions ML
         predictions = await self._get_ml_predictions()
+
+        # Historique des indicateurs: instantanés des 12 derniers mois (une lecture)
+        periode = periode_de(datetime.now(timezone.utc).date())
+        kpi_history = self.kpi.get_snapshots(periode_decalee(periode, -11), periode)
         
         # Fusion des résultats
         return {
             **basic_stats,
             "predictions": predictions,
+            "kpiHistory": kpi_history,
             "recommendations": await self._generate_recommendations(
                 basic_stats,
-                predictions
+                predictions,
+                kpi_history
             )
         }
 
@@ -71,110 +92,79 @@ class ComptabiliteStatsService:
 
     async def get_cashflow(self, days: int = 30) -> List[Dict[str, Any]]:
         """Récupère les données de trésorerie avec ML"""
+        start_date, end_date = self._cashflow_bounds(days)
+
         # Données de base
         basic_cashflow = await self._get_basic_cashflow(days)
         
         # Analyse ML
-        end_date = datetime.now(datetime.timezone.utc).date()
-        start_date = end_date - timedelta(days=days)
-        
         ml_analysis = await self.analyse.get_analyse_parcelle(
             parcelle_id=None,  # Analyse globale
             date_debut=start_date,
-            date_fin=end_date,
-            include_predictions=True
+            date_fin=end_date
         )
+        ml_analysis = (ml_analysis or {}).get("ml_analysis", {})
+
+        # Prédictions et risques indexés par date une seule fois pour la période
+        predictions = self._index_predictions(ml_analysis.get("predictions", {}))
+        risks = self._index_risks(ml_analysis.get("risks", []), start_date, end_date)
         
         # Enrichissement des données
         for entry in basic_cashflow:
-            date_entry = datetime.strptime(entry["date"], "%Y-%m-%d").date()
-            
-            # Ajout prédictions ML
+            date_entry = date.fromisoformat(entry["date"])
+            prediction = predictions.get(date_entry, predictions.get(None, {}))
             entry["ml_predictions"] = {
-                "revenue": self._get_prediction_for_date(
-                    ml_analysis["ml_analysis"]["predictions"],
-                    date_entry,
-                    "revenue"
-                ),
-                "costs": self._get_prediction_for_date(
-                    ml_analysis["ml_analysis"]["predictions"],
-                    date_entry,
-                    "costs"
-                )
+                "revenue": prediction.get("revenue", 0),
+                "costs": prediction.get("costs", 0)
             }
-            
-            # Ajout risques ML
-            entry["ml_risks"] = [
-                risk for risk in ml_analysis["ml_analysis"]["risks"]
-                if self._risk_applies_to_date(risk, date_entry)
-            ]
+            entry["ml_risks"] = risks.get(None, []) + risks.get(date_entry, [])
             
         return basic_cashflow
 
+    @staticmethod
+    def _cashflow_bounds(days: int) -> Tuple[date, date]:
+        """Bornes incluses des `days` derniers jours (aujourd'hui compris)"""
+        end_date = datetime.now(timezone.utc).date()
+        return end_date - timedelta(days=max(days, 1) - 1), end_date
+
+    @staticmethod
+    def _month_bounds(reference: date) -> Tuple[date, date]:
+        """Bornes [début, fin) du mois contenant la date de référence"""
+        start = reference.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+
     async def _get_basic_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques de base"""
-        now = datetime.now(datetime.timezone.utc)
-        current_month = now.strftime("%Y-%m")
-        last_month = (now - timedelta(days=30)).strftime("%Y-%m")
-
-        # Chiffre d'affaires du mois
-        revenue = self.db.query(
-            func.sum(EcritureComptable.credit)
-        ).filter(
-            EcritureComptable.compte_id.in_(
-                self.db.query(CompteComptable.id).filter(
-                    CompteComptable.type_compte == TypeCompte.PRODUIT
-                )
-            ),
-            EcritureComptable.statut == StatutEcriture.VALIDEE,
-            func.to_char(EcritureComptable.date_ecriture, 'YYYY-MM') == current_month
-        ).scalar() or 0
-
-        # Chiffre d'affaires du mois précédent
-        previous_revenue = self.db.query(
-            func.sum(EcritureComptable.credit)
-        ).filter(
-            EcritureComptable.compte_id.in_(
-                self.db.query(CompteComptable.id).filter(
-                    CompteComptable.type_compte == TypeCompte.PRODUIT
-                )
-            ),
-            EcritureComptable.statut == StatutEcriture.VALIDEE,
-            func.to_char(EcritureComptable.date_ecriture, 'YYYY-MM') == last_month
-        ).scalar() or 0
-
-        # Calcul des charges
-        expenses = self.db.query(
-            func.sum(EcritureComptable.debit)
-        ).filter(
-            EcritureComptable.compte_id.in_(
-                self.db.query(CompteComptable.id).filter(
-                    CompteComptable.type_compte == TypeCompte.CHARGE
-                )
-            ),
-            EcritureComptable.statut == StatutEcriture.VALIDEE,
-            func.to_char(EcritureComptable.date_ecriture, 'YYYY-MM') == current_month
-        ).scalar() or 0
-
-        previous_expenses = self.db.query(
-            func.sum(EcritureComptable.debit)
-        ).filter(
-            EcritureComptable.compte_id.in_(
-                self.db.query(CompteComptable.id).filter(
-                    CompteComptable.type_compte == TypeCompte.CHARGE
-                )
-            ),
+        today = datetime.now(timezone.utc).date()
+        current_start, current_end = self._month_bounds(today)
+        previous_start, _ = self._month_bounds(today - timedelta(days=30))
+
+        est_produit = CompteComptable.type_compte == TypeCompte.PRODUIT
+        est_charge = CompteComptable.type_compte == TypeCompte.CHARGE
+        mois_courant = EcritureComptable.date_ecriture >= current_start
+
+        # Produits et charges du mois courant et précédent en une seule requête
+        totaux = (await execute(self.read_db, select(
+            func.sum(case((and_(est_produit, mois_courant), EcritureComptable.credit), else_=0)),
+            func.sum(case((and_(est_produit, ~mois_courant), EcritureComptable.credit), else_=0)),
+            func.sum(case((and_(est_charge, mois_courant), EcritureComptable.debit), else_=0)),
+            func.sum(case((and_(est_charge, ~mois_courant), EcritureComptable.debit), else_=0))
+        ).join(
+            CompteComptable,
+            CompteComptable.id == EcritureComptable.compte_id
+        ).where(
+            CompteComptable.type_compte.in_([TypeCompte.PRODUIT, TypeCompte.CHARGE]),
             EcritureComptable.statut == StatutEcriture.VALIDEE,
-            func.to_char(EcritureComptable.date_ecriture, 'YYYY-MM') == last_month
-        ).scalar() or 0
+            EcritureComptable.date_ecriture >= previous_start,
+            EcritureComptable.date_ecriture < current_end
+        ))).one()
+        revenue, previous_revenue, expenses, previous_expenses = (
+            valeur or 0 for valeur in totaux
+        )
 
         # Calcul de la trésorerie
-        cashflow = self.db.query(
-            func.sum(CompteComptable.solde_debit - CompteComptable.solde_credit)
-        ).filter(
-            CompteComptable.type_compte == TypeCompte.ACTIF,
-            CompteComptable.actif == True
-        ).scalar() or 0
+        cashflow = await self._get_solde_initial(today)
 
         previous_cashflow = cashflow - (revenue - expenses)
 
@@ -238,49 +228,44 @@ class ComptabiliteStatsService:
 
     async def _get_basic_cashflow(self, days: int) -> List[Dict[str, Any]]:
         """Récupère les données de trésorerie de base"""
-        end_date = datetime.now(datetime.timezone.utc).date()
-        start_date = end_date - timedelta(days=days)
+        start_date, end_date = self._cashflow_bounds(days)
         
-        # Récupération des écritures
-        query = self.db.query(
-            func.date_trunc('day', EcritureComptable.date_ecriture).label('date'),
+        # Flux journaliers en une seule requête groupée (jours sans écriture absents)
+        query = select(
+            EcritureComptable.date_ecriture,
             func.sum(EcritureComptable.debit).label('sorties'),
             func.sum(EcritureComptable.credit).label('entrees')
-        ).filter(
+        ).where(
             EcritureComptable.date_ecriture.between(start_date, end_date),
             EcritureComptable.statut == StatutEcriture.VALIDEE
         ).group_by(
-            func.date_trunc('day', EcritureComptable.date_ecriture)
-        ).order_by(
-            func.date_trunc('day', EcritureComptable.date_ecriture)
+            EcritureComptable.date_ecriture
         )
+        rows = (await execute(self.read_db, query)).all()
+
+        # Complétion des jours vides et solde cumulé vectorisés
+        nb_jours = (end_date - start_date).days + 1
+        entrees = np.zeros(nb_jours)
+        sorties = np.zeros(nb_jours)
+        for row in rows:
+            index = (row.date_ecriture - start_date).days
+            entrees[index] = float(row.entrees or 0)
+            sorties[index] = float(row.sorties or 0)
+        soldes = float(await self._get_solde_initial(start_date)) + np.cumsum(entrees - sorties)
+
+        # Impact météo de toute la période en un seul appel
+        impacts = await self.weather_service.get_daily_impacts(start_date, end_date)
 
         results = []
-        solde_cumule = self._get_solde_initial(start_date)
-        
-        # Génération des données jour par jour
-        current_date = start_date
-        while current_date <= end_date:
-            daily_data = query.filter(
-                func.date_trunc('day', EcritureComptable.date_ecriture) == current_date
-            ).first()
-
-            entrees = float(daily_data.entrees if daily_data else 0)
-            sorties = float(daily_data.sorties if daily_data else 0)
-            solde_cumule += entrees - sorties
-
-            # Récupération de l'impact météo
-            weather_data = await self.weather_service.get_daily_impact(current_date)
-            
+        for index in range(nb_jours):
+            jour = (start_date + timedelta(days=index)).isoformat()
             results.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "entrees": entrees,
-                "sorties": sorties,
-                "solde": float(solde_cumule),
-                "impact_meteo": weather_data["impact"]
+                "date": jour,
+                "entrees": float(entrees[index]),
+                "sorties": float(sorties[index]),
+                "solde": float(soldes[index]),
+                "impact_meteo": impacts.get(jour, 0)
             })
-            
-            current_date += timedelta(days=1)
 
         return results
 
@@ -312,9 +297,10 @@ class ComptabiliteStatsService:
     async def _generate_recommendations(
         self,
         stats: Dict[str, Any],
-        predictions: Dict[str, Any]
+        predictions: Dict[str, Any],
+        kpi_history: Optional[List[Dict[str, Any]]] = None
     ) -> List[Dict[str, Any]]:
-        """Génère des recommandations basées sur les stats et prédictions"""
+        """Génère des recommandations basées sur les stats, prédictions et instantanés"""
         recommendations = []
         
         # Recommandations basées sur les stats actuelles
@@ -330,6 +316,31 @@ class ComptabiliteStatsService:
                 ]
             })
             
+        # Recommandations basées sur les instantanés d'indicateurs
+        if kpi_history:
+            if (kpi_history[-1]["ratio_liquidite"] or 0) < 1.5:
+                recommendations.append({
+                    "type": "RATIO",
+                    "priority": "HIGH",
+                    "description": "Ratio de liquidité faible",
+                    "actions": [
+                        "Optimiser BFR",
+                        "Réduire délais paiement",
+                        "Négocier délais fournisseurs"
+                    ]
+                })
+            marges = [s["marge_nette"] or 0 for s in kpi_history[-3:]]
+            if self._calculate_trend(marges) == "decreasing":
+                recommendations.append({
+                    "type": "MARGIN",
+                    "priority": "MEDIUM",
+                    "description": "Marge nette en baisse sur les derniers mois",
+                    "actions": [
+                        "Analyser postes charges",
+                        "Revoir pricing"
+                    ]
+                })
+
         # Recommandations basées sur les prédictions
         for risk in predictions["risk_factors"]:
             recommendations.append({
@@ -382,8 +393,8 @@ class ComptabiliteStatsService:
         metric: str
     ) -> float:
         """Récupère la prédiction pour une date donnée"""
-        # TODO: Implémenter interpolation
-        return predictions.get(metric, 0)
+        prediction = self._index_predictions(predictions)
+        return prediction.get(target_date, prediction.get(None, {})).get(metric, 0)
 
     def _risk_applies_to_date(
         self,
@@ -391,8 +402,59 @@ class ComptabiliteStatsService:
         target_date: date
     ) -> bool:
         """Vérifie si un risque s'applique à une date"""
-        # TODO: Implémenter logique temporelle
-        return True
+        debut, fin = self._risk_bounds(risk)
+        return (debut is None or debut <= target_date) and (fin is None or target_date <= fin)
+
+    @staticmethod
+    def _parse_date(value: Any) -> Optional[date]:
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+
+    def _index_predictions(self, predictions: Any) -> Dict[Optional[date], Dict[str, Any]]:
+        """
+        Indexe les prédictions par date; une prédiction globale (dictionnaire
+        sans date) est rangée sous la clé None et vaut pour tous les jours
+        """
+        if isinstance(predictions, dict):
+            return {None: predictions}
+        return {
+            self._parse_date(prediction["date"]): prediction
+            for prediction in predictions or []
+            if prediction.get("date")
+        }
+
+    def _risk_bounds(self, risk: Dict[str, Any]) -> Tuple[Optional[date], Optional[date]]:
+        if risk.get("date"):
+            jour = self._parse_date(risk["date"])
+            return jour, jour
+        return self._parse_date(risk.get("date_debut")), self._parse_date(risk.get("date_fin"))
+
+    def _index_risks(
+        self,
+        risks: List[Dict[str, Any]],
+        start_date: date,
+        end_date: date
+    ) -> Dict[Optional[date], List[Dict[str, Any]]]:
+        """
+        Indexe les risques par jour de la période; les risques sans borne
+        temporelle sont rangés sous la clé None et valent pour tous les jours
+        """
+        index: Dict[Optional[date], List[Dict[str, Any]]] = {}
+        for risk in risks:
+            debut, fin = self._risk_bounds(risk)
+            if debut is None and fin is None:
+                index.setdefault(None, []).append(risk)
+                continue
+            jour = max(debut or start_date, start_date)
+            while jour <= min(fin or end_date, end_date):
+                index.setdefault(jour, []).append(risk)
+                jour += timedelta(days=1)
+        return index
 
     async def _get_charges_by_categorie(self, periode: str) -> Dict[str, Dict[str, float]]:
         """Récupère les charges par catégorie"""
@@ -408,7 +470,7 @@ class ComptabiliteStatsService:
         periode: str
     ) -> Dict[str, Dict[str, float]]:
         """Récupère les montants par catégorie pour un type de compte"""
-        query = self.db.query(
+        query = select(
             CompteComptable.numero,
             CompteComptable.libelle,
             func.sum(EcritureComptable.debit).label('debit'),
@@ -416,7 +478,7 @@ class ComptabiliteStatsService:
         ).join(
             EcritureComptable,
             CompteComptable.id == EcritureComptable.compte_id
-        ).filter(
+        ).where(
             CompteComptable.type_compte == type_compte,
             EcritureComptable.periode == periode
         ).group_by(
@@ -425,7 +487,7 @@ class ComptabiliteStatsService:
         )
 
         results = {}
-        for row in query.all():
+        for row in (await execute(self.read_db, query)).all():
             montant = float(row.credit - row.debit if type_compte == TypeCompte.PRODUIT else row.debit - row.credit)
             results[row.numero] = {
                 "libelle": row.libelle,
@@ -435,14 +497,14 @@ class ComptabiliteStatsService:
 
         return results
 
-    def _get_solde_initial(self, date: date) -> Decimal:
+    async def _get_solde_initial(self, date: date) -> Decimal:
         """Calcule le solde initial à une date donnée"""
-        return self.db.query(
+        return (await execute(self.read_db, select(
             func.sum(CompteComptable.solde_debit - CompteComptable.solde_credit)
-        ).filter(
+        ).where(
             CompteComptable.type_compte == TypeCompte.ACTIF,
             CompteComptable.actif == True
-        ).scalar() or Decimal('0')
+        ))).scalar() or Decimal('0')
 
     async def _analyze_weather_impact(self, periode: str) -> Dict[str, Any]:
         """Analyse l'impact de la météo sur les finances"""
@@ -0,0 +1,96 @@
+"""
+Conteneur de services par requête
+
+Les clients sans état (cache Redis, service météo, registre de modèles ML)
+sont des singletons du processus. Les services métier sont créés une seule
+fois par requête et partagent la même session de base de données: un
+service demandé par plusieurs autres n'est construit qu'une fois.
+"""
+
+from typing import Any, Callable, Dict, Optional, Type, TypeVar, get_args, get_type_hints
+import inspect
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.database import get_db, get_async_db
+from services.cache_service import CacheService, get_cache_service
+from services.weather_service import WeatherService, get_weather_service
+from services.ml.core.inference import ModelRegistry, get_model_registry
+
+T = TypeVar("T")
+
+# Clients partagés par toutes les requêtes du processus
+PROCESS_SINGLETONS: Dict[type, Callable[[], Any]] = {
+    CacheService: get_cache_service,
+    WeatherService: get_weather_service,
+    ModelRegistry: get_model_registry,
+}
+
+def _accepts_async(annotation: Any) -> bool:
+    """Le paramètre accepte-t-il une AsyncSession (directement ou via Union)"""
+    return annotation is AsyncSession or AsyncSession in get_args(annotation)
+
+class ServiceContainer:
+    """
+    Résout les services d'une requête
+
+    Les dépendances sont déduites de la signature du constructeur:
+    - db: session asynchrone si le paramètre l'accepte et qu'elle est
+      fournie, sinon la session synchrone
+    - async_db / container: la session asynchrone / le conteneur lui-même
+    - paramètre annoté par une classe: résolu par le conteneur
+    Les autres paramètres gardent leur valeur par défaut.
+    """
+
+    def __init__(self, db: Session, async_db: Optional[AsyncSession] = None):
+        self.db = db
+        self.async_db = async_db
+        self._services: Dict[type, Any] = {}
+
+    def get(self, cls: Type[T]) -> T:
+        """Retourne l'instance du service pour cette requête"""
+        factory = PROCESS_SINGLETONS.get(cls)
+        if factory is not None:
+            return factory()
+
+        service = self._services.get(cls)
+        if service is None:
+            service = self._build(cls)
+            self._services[cls] = service
+        return service
+
+    def _build(self, cls: type) -> Any:
+        try:
+            hints = get_type_hints(cls.__init__)
+        except Exception:
+            hints = {}
+
+        kwargs: Dict[str, Any] = {}
+        params = list(inspect.signature(cls.__init__).parameters.values())[1:]
+        for param in params:
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            annotation = hints.get(param.name)
+            if param.name == "db":
+                use_async = self.async_db is not None and _accepts_async(annotation)
+                kwargs["db"] = self.async_db if use_async else self.db
+            elif param.name == "async_db":
+                kwargs["async_db"] = self.async_db
+            elif param.name == "container":
+                kwargs["container"] = self
+            elif inspect.isclass(annotation) and annotation not in (Session, AsyncSession):
+                kwargs[param.name] = self.get(annotation)
+            elif param.default is inspect.Parameter.empty:
+                raise TypeError(
+                    f"Impossible de résoudre le paramètre '{param.name}' de {cls.__name__}"
+                )
+        return cls(**kwargs)
+
+# Dépendance FastAPI: un conteneur par requête
+def get_container(
+    db: Session = Depends(get_db),
+    async_db: AsyncSession = Depends(get_async_db)
+) -> ServiceContainer:
+    return ServiceContainer(db, async_db)
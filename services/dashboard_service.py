@@ -1,15 +1,18 @@
-from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from typing import Dict, Any, List, Tuple, Union
 from datetime import datetime, timedelta
 from models.production import Recolte, Parcelle
-from models.inventory import Stock, MouvementStock
+from models.inventory import Stock, MouvementStock, Produit
 from models.hr import Employe
 from models.finance import Transaction
-from sqlalchemy import func
+from sqlalchemy import func, select, case
+from db.database import execute
 import aiohttp
 
 class DashboardService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Union[AsyncSession, Session]):
+        # Session asynchrone depuis l'API (get_async_db), synchrone ailleurs
         self.db = db
 
     async def get_stats(self) -> Dict[str, Any]:
@@ -21,71 +24,93 @@ class DashboardService:
             "hr": await self._get_hr_stats()
         }
 
+    @staticmethod
+    def _month_bounds(reference: datetime) -> Tuple[datetime, datetime]:
+        """Bornes [début, fin) du mois contenant la date de référence"""
+        start = reference.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+
+    async def _scalar(self, statement) -> Any:
+        """Exécute une requête scalaire"""
+        return (await execute(self.db, statement)).scalar()
+
     async def _get_production_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques de production"""
         now = datetime.utcnow()
-        current_month = now.strftime("%Y-%m")
-        last_month = (now - timedelta(days=30)).strftime("%Y-%m")
-
-        current_production = self.db.query(
-            func.sum(Recolte.quantite_kg)
-        ).filter(
-            func.to_char(Recolte.date_recolte, 'YYYY-MM') == current_month
-        ).scalar() or 0
-
-        previous_production = self.db.query(
-            func.sum(Recolte.quantite_kg)
-        ).filter(
-            func.to_char(Recolte.date_recolte, 'YYYY-MM') == last_month
-        ).scalar() or 0
+        current_start, current_end = self._month_bounds(now)
+        previous_start, previous_end = self._month_bounds(now - timedelta(days=30))
+
+        # Mois courant et précédent en une seule requête
+        row = (await execute(self.db, select(
+            func.sum(case(
+                (Recolte.date_recolte >= current_start, Recolte.quantite_kg),
+                else_=0
+            )),
+            func.sum(case(
+                (Recolte.date_recolte < previous_end, Recolte.quantite_kg),
+                else_=0
+            ))
+        ).where(
+            Recolte.date_recolte >= previous_start,
+            Recolte.date_recolte < current_end
+        ))).one()
+        current_production = row[0] or 0
+        previous_production = row[1] or 0
+
+        parcelles_actives = await self._scalar(
+            select(func.count(Parcelle.id)).where(Parcelle.statut == "ACTIVE")
+        )
 
         return {
             "total": current_production / 1000,  # Conversion en tonnes
             "variation": self._calculate_variation(current_production, previous_production),
-            "parcelles_actives": self.db.query(Parcelle).filter(
-                Parcelle.statut == "ACTIVE"
-            ).count()
+            "parcelles_actives": parcelles_actives or 0
         }
 
     async def _get_inventory_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques d'inventaire"""
-        total_value = self.db.query(
-            func.sum(Stock.quantite * Stock.valeur_unitaire)
-        ).scalar() or 0
-
-        alerts_count = self.db.query(Stock).join(Stock.produit).filter(
-            Stock.quantite <= Stock.produit.seuil_alerte
-        ).count()
+        total_value = await self._scalar(
+            select(func.sum(Stock.quantite * Stock.valeur_unitaire))
+        ) or 0
+
+        alerts_count = await self._scalar(
+            select(func.count(Stock.id)).join(Stock.produit).where(
+                Stock.quantite <= Produit.seuil_alerte
+            )
+        )
+
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        mouvements_jour = await self._scalar(
+            select(func.count(MouvementStock.id)).where(
+                MouvementStock.date_mouvement >= today,
+                MouvementStock.date_mouvement < today + timedelta(days=1)
+            )
+        )
 
         return {
             "valeur_totale": total_value,
-            "alertes": alerts_count,
-            "mouvements_jour": self.db.query(MouvementStock).filter(
-                func.date(MouvementStock.date_mouvement) == datetime.utcnow().date()
-            ).count()
+            "alertes": alerts_count or 0,
+            "mouvements_jour": mouvements_jour or 0
         }
 
     async def _get_finance_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques financières"""
-        now = datetime.utcnow()
-        current_month = now.strftime("%Y-%m")
+        month_start, month_end = self._month_bounds(datetime.utcnow())
 
-        recettes = self.db.query(
+        rows = (await execute(self.db, select(
+            Transaction.type_transaction,
             func.sum(Transaction.montant)
-        ).filter(
-            Transaction.type_transaction == "RECETTE",
+        ).where(
+            Transaction.type_transaction.in_(["RECETTE", "DEPENSE"]),
             Transaction.statut == "VALIDEE",
-            func.to_char(Transaction.date_transaction, 'YYYY-MM') == current_month
-        ).scalar() or 0
-
-        depenses = self.db.query(
-            func.sum(Transaction.montant)
-        ).filter(
-            Transaction.type_transaction == "DEPENSE",
-            Transaction.statut == "VALIDEE",
-            func.to_char(Transaction.date_transaction, 'YYYY-MM') == current_month
-        ).scalar() or 0
+            Transaction.date_transaction >= month_start,
+            Transaction.date_transaction < month_end
+        ).group_by(Transaction.type_transaction))).all()
+        totaux = {getattr(type_, "value", type_): montant or 0 for type_, montant in rows}
 
+        recettes = totaux.get("RECETTE", 0)
+        depenses = totaux.get("DEPENSE", 0)
         return {
             "recettes": recettes,
             "depenses": depenses,
@@ -94,23 +119,29 @@ class DashboardService:
 
     async def _get_hr_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques RH"""
+        rows = (await execute(self.db, select(
+            Employe.statut,
+            func.count(Employe.id)
+        ).where(
+            Employe.statut.in_(["ACTIF", "CONGE"])
+        ).group_by(Employe.statut))).all()
+        effectifs = {getattr(statut, "value", statut): nombre for statut, nombre in rows}
+
         return {
-            "effectif_total": self.db.query(Employe).filter(
-                Employe.statut == "ACTIF"
-            ).count(),
-            "en_conge": self.db.query(Employe).filter(
-                Employe.statut == "CONGE"
-            ).count()
+            "effectif_total": effectifs.get("ACTIF", 0),
+            "en_conge": effectifs.get("CONGE", 0)
         }
 
     async def get_recent_activities(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Récupère les activités récentes tous types confondus"""
         activities = []
 
-        # Récoltes récentes
-        recoltes = self.db.query(Recolte).order_by(
+        # Récoltes récentes (parcelle chargée dans la même requête)
+        recoltes = (await execute(self.db, select(Recolte).options(
+            joinedload(Recolte.parcelle)
+        ).order_by(
             Recolte.date_recolte.desc()
-        ).limit(limit).all()
+        ).limit(limit))).scalars().all()
 
         for recolte in recoltes:
             activities.append({
@@ -120,10 +151,12 @@ class DashboardService:
                 "date": recolte.date_recolte.isoformat()
             })
 
-        # Mouvements de stock récents
-        mouvements = self.db.query(MouvementStock).order_by(
+        # Mouvements de stock récents (produit chargé dans la même requête)
+        mouvements = (await execute(self.db, select(MouvementStock).options(
+            joinedload(MouvementStock.produit)
+        ).order_by(
             MouvementStock.date_mouvement.desc()
-        ).limit(limit).all()
+        ).limit(limit))).scalars().all()
 
         for mouvement in mouvements:
             activities.append({
@@ -5,7 +5,6 @@ Service d'analyse financière et comptable
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-import pandas as pd
 import numpy as np
 
 from models.comptabilite import (
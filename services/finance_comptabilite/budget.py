@@ -0,0 +1,129 @@
+"""
+Suivi budgétaire: réalisé incrémental et écarts budget / réalisé
+
+Le réalisé de chaque budget (catégorie, période) est tenu à jour par un
+UPDATE atomique dans la transaction SQL qui crée la transaction financière
+ou l'écriture comptable (sans relecture du budget). Les écritures liées à
+une transaction ne sont pas imputées une seconde fois; les autres sont
+rattachées à une catégorie par le préfixe de leur compte (plan OHADA).
+Les écarts d'une période sont calculés en une requête, sans aucun modèle ML.
+"""
+
+from decimal import Decimal
+from typing import Any, Dict
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from models.comptabilite import CompteComptable, EcritureComptable, StatutEcriture, TypeCompte
+from models.finance import (
+    AgregatFinanceMensuel,
+    Budget,
+    CategorieTransaction,
+    StatutTransaction,
+    TypeTransaction
+)
+
+# Catégorie budgétaire des comptes de gestion (le préfixe le plus long l'emporte)
+CATEGORIES_PAR_COMPTE = {
+    "70": CategorieTransaction.VENTE,
+    "60": CategorieTransaction.ACHAT_INTRANT,
+    "61": CategorieTransaction.TRANSPORT,
+    "624": CategorieTransaction.MAINTENANCE,
+    "66": CategorieTransaction.SALAIRE,
+}
+
+def categorie_du_compte(numero: str) -> CategorieTransaction:
+    """Catégorie budgétaire d'un compte de charge ou de produit"""
+    prefixes = [p for p in CATEGORIES_PAR_COMPTE if numero.startswith(p)]
+    return CATEGORIES_PAR_COMPTE[max(prefixes, key=len)] if prefixes else CategorieTransaction.AUTRE
+
+class SuiviBudgetaire:
+    """Réalisé et écarts des budgets, indépendants de l'analyse ML"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def imputer(self, periode: str, categorie: CategorieTransaction, montant) -> None:
+        """Ajoute un montant au réalisé du budget (sans commit: transaction de l'appelant)"""
+        montant = Decimal(str(montant or 0))
+        if not montant:
+            return
+        self.db.execute(
+            update(Budget).where(
+                Budget.periode == periode,
+                Budget.categorie == categorie
+            ).values(montant_realise=func.coalesce(Budget.montant_realise, 0) + montant)
+        )
+
+    def imputer_ecriture(self, ecriture: EcritureComptable, compte: CompteComptable) -> None:
+        """Impute une écriture de gestion qui n'est pas issue d'une transaction"""
+        if ecriture.transaction_id is not None:
+            return
+        debit, credit = Decimal(str(ecriture.debit or 0)), Decimal(str(ecriture.credit or 0))
+        if compte.type_compte == TypeCompte.CHARGE:
+            montant = debit - credit
+        elif compte.type_compte == TypeCompte.PRODUIT:
+            montant = credit - debit
+        else:
+            return
+        self.imputer(ecriture.periode, categorie_du_compte(compte.numero), montant)
+
+    def realise(self, periode: str, categorie: CategorieTransaction) -> Decimal:
+        """
+        Réalisé courant d'une catégorie, pour initialiser un budget créé après
+        les premières opérations de la période
+        """
+        transactions = self.db.query(func.sum(AgregatFinanceMensuel.montant_total)).filter(
+            AgregatFinanceMensuel.periode == periode,
+            AgregatFinanceMensuel.categorie == categorie,
+            AgregatFinanceMensuel.type_transaction.in_([TypeTransaction.RECETTE, TypeTransaction.DEPENSE]),
+            AgregatFinanceMensuel.statut.notin_([StatutTransaction.ANNULEE, StatutTransaction.REJETEE])
+        ).scalar() or 0
+
+        ecritures = self.db.query(
+            CompteComptable.numero,
+            CompteComptable.type_compte,
+            func.sum(EcritureComptable.debit),
+            func.sum(EcritureComptable.credit)
+        ).join(
+            CompteComptable, CompteComptable.id == EcritureComptable.compte_id
+        ).filter(
+            EcritureComptable.periode == periode,
+            EcritureComptable.transaction_id.is_(None),
+            EcritureComptable.statut != StatutEcriture.ANNULEE,
+            CompteComptable.type_compte.in_([TypeCompte.CHARGE, TypeCompte.PRODUIT])
+        ).group_by(CompteComptable.numero, CompteComptable.type_compte).all()
+
+        total = Decimal(str(transactions))
+        for numero, type_compte, debit, credit in ecritures:
+            if categorie_du_compte(numero) == categorie:
+                solde = Decimal(str(debit or 0)) - Decimal(str(credit or 0))
+                total += solde if type_compte == TypeCompte.CHARGE else -solde
+        return total
+
+    def ecarts(self, periode: str) -> Dict[str, Any]:
+        """Prévu, réalisé et écart par catégorie et au total (une requête)"""
+        prevu = func.sum(Budget.montant_prevu)
+        realise = func.sum(func.coalesce(Budget.montant_realise, 0))
+        rows = self.db.query(
+            Budget.categorie,
+            prevu,
+            realise,
+            case((prevu != 0, (realise - prevu) * 100.0 / prevu), else_=0)
+        ).filter(
+            Budget.periode == periode
+        ).group_by(Budget.categorie).order_by(Budget.categorie).all()
+
+        analysis: Dict[str, Any] = {"total_prevu": 0, "total_realise": 0, "categories": {}}
+        for categorie, montant_prevu, montant_realise, ecart_percentage in rows:
+            montant_prevu, montant_realise = float(montant_prevu or 0), float(montant_realise or 0)
+            analysis["categories"][CategorieTransaction(categorie).value] = {
+                "prevu": montant_prevu,
+                "realise": montant_realise,
+                "ecart": montant_realise - montant_prevu,
+                "ecart_percentage": round(float(ecart_percentage or 0), 2)
+            }
+            analysis["total_prevu"] += montant_prevu
+            analysis["total_realise"] += montant_realise
+        return analysis
@@ -5,7 +5,6 @@ Service de gestion des clôtures comptables
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import pandas as pd
 
 from models.comptabilite import (
     CompteComptable,
@@ -15,18 +14,21 @@ from models.comptabilite import (
     StatutEcriture
 )
 from services.cache_service import cache_result
+from services.comptabilite_service import ComptabiliteService
 
 class GestionCloture:
     """Service de gestion des clôtures comptables"""
 
     def __init__(self, db: Session):
         self.db = db
+        self.comptabilite = ComptabiliteService(db)
         self._cache_duration = timedelta(minutes=15)
 
     @cache_result(ttl_seconds=900)  # 15 minutes
     async def executer_cloture_mensuelle(self,
                                        exercice_id: int,
-                                       mois: int) -> Dict:
+                                       mois: int,
+                                       validee_par_id: Optional[str] = None) -> Dict:
         """Exécute la clôture mensuelle"""
         exercice = self.db.query(ExerciceComptable).get(exercice_id)
         if not exercice:
@@ -44,7 +46,7 @@ class GestionCloture:
             }
 
         # Validation des écritures en attente
-        validation = await self._valider_ecritures_attente(exercice, mois)
+        validation = await self._valider_ecritures_attente(exercice, mois, validee_par_id)
         if not validation["success"]:
             return {
                 "status": "error",
@@ -109,26 +111,21 @@ class GestionCloture:
 
     async def _valider_ecritures_attente(self,
                                        exercice: ExerciceComptable,
-                                       mois: int) -> Dict:
-        """Valide les écritures en attente"""
+                                       mois: int,
+                                       validee_par_id: Optional[str] = None) -> Dict:
+        """
+        Valide les écritures en attente de la période: chaque pièce doit être
+        équilibrée, les caches des états comptables sont invalidés
+        """
         try:
-            # Récupération des écritures en attente
-            ecritures = self.db.query(EcritureComptable).filter(
-                EcritureComptable.exercice_id == exercice.id,
-                EcritureComptable.date.month == mois,
-                EcritureComptable.statut == "ATTENTE"
-            ).all()
-
-            # Validation des écritures
-            for ecriture in ecritures:
-                ecriture.statut = "VALIDE"
-                ecriture.date_validation = datetime.now(datetime.timezone.utc)
-
-            self.db.commit()
+            validation = await self.comptabilite.valider_ecritures(
+                validee_par_id,
+                periode=f"{exercice.annee}-{mois:02d}"
+            )
 
             return {
                 "success": True,
-                "message": f"{len(ecritures)} écritures validées"
+                "message": f"{validation['validees']} écritures validées"
             }
 
         except Exception as e:
@@ -1,29 +1,246 @@
 """
 Service de gestion des coûts
+
+Répartition analytique des charges sur toutes les parcelles en un seul calcul:
+les écritures de la période sont chargées une fois et rangées dans une
+matrice (parcelle × centre de coût), les centres étant les comptes de charge.
+Les charges imputées à une parcelle sont directes; les autres sont réparties
+selon la clé du centre (surface, poids récolté, heures de travail).
 """
 
+from dataclasses import dataclass
 from sqlalchemy.orm import Session
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-import pandas as pd
+from sqlalchemy import func
+from typing import Any, Dict, List, Optional, Tuple, Union
+from datetime import date, datetime, time, timedelta, timezone
 import numpy as np
 
 from models.comptabilite import (
     CompteComptable,
     EcritureComptable,
-    JournalComptable,
-    ExerciceComptable
+    StatutEcriture,
+    TypeCompte
 )
-from models.finance import Transaction, Budget, CategorieTransaction
-from models.production import Parcelle, CycleCulture
+from models.production import Parcelle, Recolte
+from models.tache import Tache
 from services.cache_service import cache_result
 
+CLE_SURFACE = "surface"
+CLE_RECOLTE = "recolte"
+CLE_HEURES = "heures"
+CLES = (CLE_SURFACE, CLE_RECOLTE, CLE_HEURES)
+
+# Clé de répartition des charges indirectes par préfixe de compte (plan OHADA),
+# le préfixe le plus long l'emporte; surface par défaut
+CLES_PAR_COMPTE = {
+    "61": CLE_RECOLTE,  # Transports
+    "66": CLE_HEURES,  # Charges de personnel
+    "632": CLE_HEURES,  # Rémunérations d'intermédiaires (main-d'œuvre temporaire)
+}
+
+@dataclass
+class RepartitionCouts:
+    """Coûts complets de toutes les parcelles sur une période"""
+    parcelles: List[Any]
+    codes: List[str]
+    centres: List[str]
+    cles_centres: List[str]
+    couts_directs: np.ndarray  # (parcelles, centres)
+    couts_indirects: np.ndarray  # (parcelles, centres)
+    produits: np.ndarray  # (parcelles,)
+    parts: np.ndarray  # (parcelles, clés)
+    non_reparti: float  # charges indirectes sans parcelle pour les recevoir
+
+    @property
+    def cout_complet(self) -> np.ndarray:
+        return (self.couts_directs + self.couts_indirects).sum(axis=1)
+
+    def rentabilite(self) -> Dict[str, Dict[str, Any]]:
+        """Rentabilité de chaque parcelle, calculée pour tout le domaine à la fois"""
+        directs = self.couts_directs.sum(axis=1)
+        indirects = self.couts_indirects.sum(axis=1)
+        complet = directs + indirects
+        marge = self.produits - complet
+        taux = np.divide(marge * 100, complet, out=np.zeros_like(marge), where=complet > 0)
+        return {
+            str(parcelle_id): {
+                "code": self.codes[i],
+                "couts_directs": round(float(directs[i]), 2),
+                "couts_indirects": round(float(indirects[i]), 2),
+                "cout_complet": round(float(complet[i]), 2),
+                "produits": round(float(self.produits[i]), 2),
+                "marge": round(float(marge[i]), 2),
+                "rentabilite": round(float(taux[i]), 2)
+            }
+            for i, parcelle_id in enumerate(self.parcelles)
+        }
+
+    def index(self, parcelle_id: Any) -> Optional[int]:
+        cible = str(parcelle_id)
+        return next((i for i, p in enumerate(self.parcelles) if str(p) == cible), None)
+
+    def detail(self, parcelle_id: Any) -> Optional[Dict[str, Any]]:
+        """Coûts d'une parcelle par centre"""
+        i = self.index(parcelle_id)
+        if i is None:
+            return None
+        total = self.couts_directs[i] + self.couts_indirects[i]
+        return {
+            "couts_par_categorie": {
+                centre: round(float(total[j]), 2)
+                for j, centre in enumerate(self.centres) if total[j]
+            },
+            "couts_directs": round(float(self.couts_directs[i].sum()), 2),
+            "couts_indirects": round(float(self.couts_indirects[i].sum()), 2),
+            "total": round(float(total.sum()), 2)
+        }
+
+def cle_du_compte(numero: str) -> str:
+    """Clé de répartition d'un compte de charge"""
+    prefixes = [p for p in CLES_PAR_COMPTE if numero.startswith(p)]
+    return CLES_PAR_COMPTE[max(prefixes, key=len)] if prefixes else CLE_SURFACE
+
+def calculer_parts(cles: np.ndarray) -> np.ndarray:
+    """
+    Parts (parcelles, clés) dont chaque colonne somme à 1. Une clé sans
+    mesure sur la période (aucune récolte, aucune heure) reprend la surface.
+    """
+    totaux = cles.sum(axis=0)
+    parts = np.divide(cles, totaux, out=np.zeros_like(cles), where=totaux > 0)
+    if totaux[0] > 0:
+        parts[:, totaux <= 0] = parts[:, [0]]
+    return parts
+
+def repartir(indirects: np.ndarray, parts: np.ndarray, cles_centres: np.ndarray) -> np.ndarray:
+    """
+    Charges indirectes réparties (parcelles, centres): chaque centre reçoit
+    la colonne de parts de sa clé, multipliée par son montant à répartir
+    """
+    return parts[:, cles_centres] * indirects[None, :]
+
+def _bornes(date_debut: Union[date, datetime], date_fin: Union[date, datetime]) -> Tuple[date, date]:
+    def as_date(value):
+        return value.date() if isinstance(value, datetime) else value
+    return as_date(date_debut), as_date(date_fin)
+
 class GestionCouts:
     """Service de gestion des coûts"""
 
     def __init__(self, db: Session):
         self.db = db
         self._cache_duration = timedelta(minutes=15)
+        # Répartitions déjà calculées par période pour ce service
+        self._repartitions: Dict[Tuple[date, date], RepartitionCouts] = {}
+
+    def repartir_couts(self,
+                       date_debut: Union[date, datetime],
+                       date_fin: Union[date, datetime]) -> RepartitionCouts:
+        """Coûts directs et indirects de toutes les parcelles (quatre requêtes)"""
+        debut, fin = _bornes(date_debut, date_fin)
+        if (debut, fin) in self._repartitions:
+            return self._repartitions[(debut, fin)]
+        debut_dt = datetime.combine(debut, time.min)
+        fin_dt = datetime.combine(fin + timedelta(days=1), time.min)
+
+        parcelles = self.db.query(Parcelle.id, Parcelle.code, Parcelle.surface_hectares).order_by(Parcelle.code).all()
+        index = {str(p.id): i for i, p in enumerate(parcelles)}
+
+        # Écritures de charge et de produit de la période, agrégées par parcelle et compte
+        ecritures = self.db.query(
+            EcritureComptable.parcelle_id,
+            CompteComptable.numero,
+            CompteComptable.type_compte,
+            func.sum(EcritureComptable.debit - EcritureComptable.credit)
+        ).join(
+            CompteComptable, CompteComptable.id == EcritureComptable.compte_id
+        ).filter(
+            CompteComptable.type_compte.in_([TypeCompte.CHARGE, TypeCompte.PRODUIT]),
+            EcritureComptable.statut == StatutEcriture.VALIDEE,
+            EcritureComptable.date_ecriture >= debut,
+            EcritureComptable.date_ecriture <= fin
+        ).group_by(
+            EcritureComptable.parcelle_id,
+            CompteComptable.numero,
+            CompteComptable.type_compte
+        ).all()
+
+        recoltes = self.db.query(
+            Recolte.parcelle_id, func.sum(Recolte.quantite_kg)
+        ).filter(
+            Recolte.date_recolte >= debut_dt,
+            Recolte.date_recolte < fin_dt
+        ).group_by(Recolte.parcelle_id).all()
+
+        heures = self.db.query(
+            Tache.parcelle_id, func.sum(Tache.heures_reelles)
+        ).filter(
+            Tache.parcelle_id.isnot(None),
+            Tache.date_fin_reelle >= debut_dt,
+            Tache.date_fin_reelle < fin_dt
+        ).group_by(Tache.parcelle_id).all()
+
+        centres = sorted({numero for _, numero, type_compte, _ in ecritures if type_compte == TypeCompte.CHARGE})
+        colonne = {numero: j for j, numero in enumerate(centres)}
+        n = len(parcelles)
+
+        # Triplets (ligne, colonne, montant): ligne -1 pour les charges sans parcelle
+        lignes, colonnes, montants = [], [], []
+        produits = np.zeros(n)
+        for parcelle_id, numero, type_compte, solde in ecritures:
+            ligne = index.get(str(parcelle_id), -1) if parcelle_id is not None else -1
+            if type_compte == TypeCompte.PRODUIT:
+                if ligne >= 0:
+                    produits[ligne] -= float(solde or 0)
+                continue
+            lignes.append(ligne)
+            colonnes.append(colonne[numero])
+            montants.append(float(solde or 0))
+
+        lignes = np.asarray(lignes, dtype=int)
+        colonnes = np.asarray(colonnes, dtype=int)
+        montants = np.asarray(montants, dtype=np.float64)
+        directs = np.zeros((n, len(centres)))
+        indirects = np.zeros(len(centres))
+        imputees = lignes >= 0
+        np.add.at(directs, (lignes[imputees], colonnes[imputees]), montants[imputees])
+        np.add.at(indirects, colonnes[~imputees], montants[~imputees])
+
+        cles = np.zeros((n, len(CLES)))
+        cles[:, 0] = [float(p.surface_hectares or 0) for p in parcelles]
+        for k, mesures in ((1, recoltes), (2, heures)):
+            for parcelle_id, valeur in mesures:
+                if str(parcelle_id) in index:
+                    cles[index[str(parcelle_id)], k] += float(valeur or 0)
+        parts = calculer_parts(cles)
+
+        cles_centres = np.asarray([CLES.index(cle_du_compte(numero)) for numero in centres], dtype=int)
+        reparties = repartir(indirects, parts, cles_centres)
+
+        repartition = RepartitionCouts(
+            parcelles=[p.id for p in parcelles],
+            codes=[p.code for p in parcelles],
+            centres=centres,
+            cles_centres=[CLES[k] for k in cles_centres],
+            couts_directs=directs,
+            couts_indirects=reparties,
+            produits=produits,
+            parts=parts,
+            non_reparti=round(float(indirects.sum() - reparties.sum()), 2)
+        )
+        self._repartitions[(debut, fin)] = repartition
+        return repartition
+
+    async def get_rentabilite_parcelles(self,
+                                        date_debut: Union[date, datetime],
+                                        date_fin: Union[date, datetime]) -> Dict[str, Any]:
+        """Rentabilité de toutes les parcelles du domaine sur la période"""
+        repartition = self.repartir_couts(date_debut, date_fin)
+        return {
+            "parcelles": repartition.rentabilite(),
+            "centres": dict(zip(repartition.centres, repartition.cles_centres)),
+            "non_reparti": repartition.non_reparti,
+            "date_calcul": datetime.now(timezone.utc).isoformat()
+        }
 
     @cache_result(ttl_seconds=900)  # 15 minutes
     async def _get_couts_parcelle(self,
@@ -31,46 +248,29 @@ class GestionCouts:
                                 date_debut: datetime,
                                 date_fin: datetime) -> Dict:
         """Récupère les coûts d'une parcelle"""
-        parcelle = self.db.query(Parcelle).get(parcelle_id)
-        if not parcelle:
+        detail = self.repartir_couts(date_debut, date_fin).detail(parcelle_id)
+        if detail is None:
             return {}
 
-        # Récupération des écritures comptables
-        ecritures = self.db.query(EcritureComptable).filter(
-            EcritureComptable.parcelle_id == parcelle.id,
-            EcritureComptable.date >= date_debut,
-            EcritureComptable.date <= date_fin
-        ).all()
-
-        # Calcul des coûts par catégorie
-        couts_par_categorie = {}
-        for ecriture in ecritures:
-            if ecriture.compte.type == "CHARGE":
-                categorie = ecriture.compte.categorie
-                if categorie not in couts_par_categorie:
-                    couts_par_categorie[categorie] = 0
-                couts_par_categorie[categorie] += ecriture.montant
-
         return {
-            "couts_par_categorie": couts_par_categorie,
-            "total": sum(couts_par_categorie.values()),
-            "date_calcul": datetime.now(datetime.timezone.utc).isoformat()
+            **detail,
+            "date_calcul": datetime.now(timezone.utc).isoformat()
         }
 
     @cache_result(ttl_seconds=900)  # 15 minutes
     async def _get_compte_charge(self, code: str) -> Optional[CompteComptable]:
         """Récupère un compte de charge"""
         return self.db.query(CompteComptable).filter(
-            CompteComptable.code == code,
-            CompteComptable.type == "CHARGE"
+            CompteComptable.numero == code,
+            CompteComptable.type_compte == TypeCompte.CHARGE
         ).first()
 
     @cache_result(ttl_seconds=900)  # 15 minutes
     async def _get_compte_produit(self, code: str) -> Optional[CompteComptable]:
         """Récupère un compte de produit"""
         return self.db.query(CompteComptable).filter(
-            CompteComptable.code == code,
-            CompteComptable.type == "PRODUIT"
+            CompteComptable.numero == code,
+            CompteComptable.type_compte == TypeCompte.PRODUIT
         ).first()
 
     async def _calculer_couts_directs(self,
@@ -78,35 +278,24 @@ class GestionCouts:
                                     date_debut: datetime,
                                     date_fin: datetime) -> float:
         """Calcule les coûts directs d'une parcelle"""
-        ecritures = self.db.query(EcritureComptable).filter(
-            EcritureComptable.parcelle_id == parcelle.id,
-            EcritureComptable.date >= date_debut,
-            EcritureComptable.date <= date_fin,
-            EcritureComptable.type_imputation == "DIRECT"
-        ).all()
-
-        return sum(e.montant for e in ecritures if e.compte.type == "CHARGE")
+        detail = self.repartir_couts(date_debut, date_fin).detail(parcelle.id)
+        return detail["couts_directs"] if detail else 0.0
 
     async def _calculer_couts_indirects(self,
                                       parcelle: Parcelle,
                                       date_debut: datetime,
                                       date_fin: datetime) -> float:
         """Calcule les coûts indirects d'une parcelle"""
-        ecritures = self.db.query(EcritureComptable).filter(
-            EcritureComptable.parcelle_id == parcelle.id,
-            EcritureComptable.date >= date_debut,
-            EcritureComptable.date <= date_fin,
-            EcritureComptable.type_imputation == "INDIRECT"
-        ).all()
-
-        return sum(e.montant for e in ecritures if e.compte.type == "CHARGE")
+        detail = self.repartir_couts(date_debut, date_fin).detail(parcelle.id)
+        return detail["couts_indirects"] if detail else 0.0
 
     async def _calculer_cle_repartition(self,
                                       parcelle: Parcelle,
                                       date: datetime) -> float:
-        """Calcule la clé de répartition pour une parcelle"""
-        # Par défaut, répartition égale entre toutes les parcelles
-        total_parcelles = self.db.query(Parcelle).count()
-        if total_parcelles == 0:
-            return 0
-        return 1 / total_parcelles
\ No newline at end of file
+        """Calcule la clé de répartition (part de surface) pour une parcelle"""
+        jour = date.date() if isinstance(date, datetime) else date
+        debut = jour.replace(day=1)
+        fin = (debut + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        repartition = self.repartir_couts(debut, fin)
+        i = repartition.index(parcelle.id)
+        return float(repartition.parts[i, 0]) if i is not None else 0
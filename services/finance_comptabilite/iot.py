@@ -6,13 +6,15 @@ from sqlalchemy.orm import Session
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import numpy as np
-import pandas as pd
 
 from models.iot_sensor import IoTSensor, SensorReading
 from models.production import Parcelle
 from models.comptabilite import CompteComptable, EcritureComptable
 from services.iot_service import IoTService
 from services.cache_service import cache_result
+from services.ml.core.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 class GestionIoT:
     """Service de gestion de l'intégration IoT"""
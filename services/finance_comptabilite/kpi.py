@@ -0,0 +1,193 @@
+"""
+Instantanés mensuels des indicateurs financiers
+
+Les indicateurs (chiffre d'affaires, résultat, marge nette, actif, passif,
+trésorerie, ratio de liquidité) sont calculés pour une plage de mois depuis
+une seule requête d'agrégats de balance (par période, type de compte et
+trésorerie), les soldes de bilan étant cumulés avec numpy. Ils sont stockés
+une ligne par mois dans kpi_snapshots: recommandations et courbes de
+tendance lisent ces lignes au lieu de reconstruire bilan et résultat, et une
+comparaison sur deux exercices se limite à 24 lignes.
+"""
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models.comptabilite import (
+    CompteComptable,
+    EcritureComptable,
+    KpiSnapshot,
+    StatutEcriture,
+    TypeCompte
+)
+
+PREFIXE_TRESORERIE = "5"  # Plan OHADA: comptes de trésorerie
+
+INDICATEURS = (
+    "chiffre_affaires",
+    "charges",
+    "resultat_net",
+    "total_actif",
+    "total_passif",
+    "tresorerie",
+    "ratio_liquidite",
+    "marge_nette",
+    "nombre_ecritures"
+)
+
+def periodes_entre(debut: str, fin: str) -> List[str]:
+    """Mois de debut à fin inclus (format YYYY-MM)"""
+    annee, mois = map(int, debut.split("-"))
+    annee_fin, mois_fin = map(int, fin.split("-"))
+    periodes = []
+    while (annee, mois) <= (annee_fin, mois_fin):
+        periodes.append(f"{annee:04d}-{mois:02d}")
+        annee, mois = (annee + 1, 1) if mois == 12 else (annee, mois + 1)
+    return periodes
+
+def periode_de(jour: date) -> str:
+    return jour.strftime("%Y-%m")
+
+def periode_decalee(periode: str, mois: int) -> str:
+    """Période décalée d'un nombre de mois (négatif: mois antérieurs)"""
+    annee, numero = map(int, periode.split("-"))
+    index = annee * 12 + numero - 1 + mois
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def _ratio(numerateur: np.ndarray, denominateur: np.ndarray) -> np.ndarray:
+    """Division terme à terme, nulle quand le dénominateur est nul"""
+    resultat = np.zeros_like(numerateur)
+    np.divide(numerateur, denominateur, out=resultat, where=denominateur != 0)
+    return resultat
+
+def snapshot_to_dict(snapshot: KpiSnapshot) -> Dict[str, Any]:
+    valeurs = {"periode": snapshot.periode}
+    for indicateur in INDICATEURS:
+        valeur = getattr(snapshot, indicateur)
+        valeurs[indicateur] = float(valeur) if isinstance(valeur, Decimal) else valeur
+    return valeurs
+
+class SnapshotsKpi:
+    """Calcul, stockage et lecture des indicateurs mensuels"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def calculer(self, debut: str, fin: str) -> List[Dict[str, Any]]:
+        """Indicateurs des mois [debut, fin], sans écriture en base"""
+        est_tresorerie = CompteComptable.numero.like(f"{PREFIXE_TRESORERIE}%")
+        rows = self.db.query(
+            EcritureComptable.periode,
+            CompteComptable.type_compte,
+            case((est_tresorerie, True), else_=False).label("tresorerie"),
+            func.coalesce(func.sum(EcritureComptable.debit), 0),
+            func.coalesce(func.sum(EcritureComptable.credit), 0),
+            func.count(EcritureComptable.id)
+        ).join(
+            CompteComptable, CompteComptable.id == EcritureComptable.compte_id
+        ).filter(
+            EcritureComptable.statut == StatutEcriture.VALIDEE,
+            EcritureComptable.periode <= fin
+        ).group_by(
+            EcritureComptable.periode,
+            CompteComptable.type_compte,
+            est_tresorerie
+        ).all()
+
+        periodes = periodes_entre(debut, fin)
+        index = {periode: i + 1 for i, periode in enumerate(periodes)}  # 0: avant la plage
+        n = len(periodes) + 1
+        mouvements = {type_compte: np.zeros(n) for type_compte in TypeCompte}
+        tresorerie = np.zeros(n)
+        nombre = np.zeros(n, dtype=np.int64)
+        for periode, type_compte, est_tresorerie_, debit, credit, compte in rows:
+            i = index.get(periode, 0)
+            mouvement = float(debit) - float(credit)  # Sens débiteur
+            mouvements[type_compte][i] += mouvement
+            if est_tresorerie_:
+                tresorerie[i] += mouvement
+            if i:
+                nombre[i] += compte
+
+        # Flux du mois pour le résultat, soldes cumulés pour le bilan
+        chiffre_affaires = -mouvements[TypeCompte.PRODUIT][1:]
+        charges = mouvements[TypeCompte.CHARGE][1:]
+        resultat_net = chiffre_affaires - charges
+        total_actif = np.cumsum(mouvements[TypeCompte.ACTIF])[1:]
+        total_passif = -np.cumsum(mouvements[TypeCompte.PASSIF])[1:]
+        tresorerie = np.cumsum(tresorerie)[1:]
+        ratio_liquidite = _ratio(total_actif, total_passif)
+        marge_nette = _ratio(resultat_net, chiffre_affaires)
+
+        colonnes = {
+            "chiffre_affaires": np.round(chiffre_affaires, 2),
+            "charges": np.round(charges, 2),
+            "resultat_net": np.round(resultat_net, 2),
+            "total_actif": np.round(total_actif, 2),
+            "total_passif": np.round(total_passif, 2),
+            "tresorerie": np.round(tresorerie, 2),
+            "ratio_liquidite": np.round(ratio_liquidite, 4),
+            "marge_nette": np.round(marge_nette, 4),
+            "nombre_ecritures": nombre[1:]
+        }
+        colonnes = {nom: valeurs.tolist() for nom, valeurs in colonnes.items()}
+        return [
+            {"periode": periode, **{nom: valeurs[i] for nom, valeurs in colonnes.items()}}
+            for i, periode in enumerate(periodes)
+        ]
+
+    async def enregistrer(self, debut: str, fin: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Calcule et enregistre (upsert) les instantanés des mois [debut, fin]"""
+        snapshots = self.calculer(debut, fin or debut)
+        insert = sqlite_insert if self.db.get_bind().dialect.name == "sqlite" else pg_insert
+        statement = insert(KpiSnapshot)
+        self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[KpiSnapshot.periode],
+                set_={
+                    **{nom: statement.excluded[nom] for nom in INDICATEURS},
+                    "calcule_le": func.now()
+                }
+            ),
+            snapshots
+        )
+        self.db.commit()
+        return snapshots
+
+    def get_snapshots(self, debut: str, fin: str) -> List[Dict[str, Any]]:
+        """Instantanés enregistrés de la plage, par mois croissant (une requête)"""
+        snapshots = self.db.query(KpiSnapshot).filter(
+            KpiSnapshot.periode >= debut,
+            KpiSnapshot.periode <= fin
+        ).order_by(KpiSnapshot.periode).all()
+        return [snapshot_to_dict(snapshot) for snapshot in snapshots]
+
+    def get_snapshot(self, periode: str) -> Optional[Dict[str, Any]]:
+        snapshot = self.db.query(KpiSnapshot).filter(KpiSnapshot.periode == periode).first()
+        return snapshot_to_dict(snapshot) if snapshot else None
+
+    def comparer_annees(self, annee: int) -> Dict[str, Any]:
+        """Indicateurs de chaque mois de l'année et du même mois de l'année précédente"""
+        snapshots = {
+            s["periode"]: s for s in self.get_snapshots(f"{annee - 1}-01", f"{annee}-12")
+        }
+        mois = []
+        for numero in range(1, 13):
+            courant = snapshots.get(f"{annee}-{numero:02d}")
+            precedent = snapshots.get(f"{annee - 1}-{numero:02d}")
+            variations = {}
+            if courant and precedent:
+                for indicateur in INDICATEURS:
+                    ancien = precedent[indicateur] or 0
+                    variations[indicateur] = (
+                        round((courant[indicateur] - ancien) / abs(ancien) * 100, 1) if ancien else None
+                    )
+            mois.append({"mois": numero, "n": courant, "n_1": precedent, "variations": variations})
+        return {"annee": annee, "mois": mois}
@@ -0,0 +1,267 @@
+"""
+Rapprochement bancaire entre transactions financières et écritures comptables
+
+Les transactions non rapprochées et les lignes de banque non liées du journal
+BANQUE sont chargées une fois pour la période, puis appariées:
+1. exactement sur (montant, date, référence) par table de hachage;
+2. sur les restes, par montant à une tolérance près et date dans une fenêtre:
+   les écritures sont groupées par montant et triées par date dans chaque
+   groupe, si bien qu'une transaction ne consulte, par recherche
+   dichotomique, que les dates voisines des montants de sa tolérance, même
+   pour des montants très répétés (salaires, frais bancaires).
+Les correspondances retenues sont écrites en un seul executemany.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, bindparam, exists, update
+from sqlalchemy.orm import Session
+
+from models.comptabilite import (
+    CompteComptable,
+    EcritureComptable,
+    JournalComptable,
+    StatutEcriture,
+    TypeJournal
+)
+from models.finance import StatutTransaction, Transaction, TypeTransaction
+
+PREFIXE_COMPTE_BANQUE = "52"  # Plan OHADA: banques
+RAPPROCHEMENT_EXACT = "EXACT"
+RAPPROCHEMENT_APPROCHE = "APPROCHE"
+
+@dataclass
+class LigneRapprochement:
+    """Ligne à rapprocher: montant signé en centimes (entrée en banque > 0)"""
+    id: Any
+    centimes: int
+    jour: int  # Ordinal de la date
+    reference: str = ""
+    sens_inconnu: bool = False  # Virement: entrée ou sortie
+
+@dataclass
+class ResultatRapprochement:
+    """Correspondances trouvées et lignes restées sans correspondance"""
+    correspondances: List[Tuple[Any, Any, str]] = field(default_factory=list)
+    transactions_non_rapprochees: List[Any] = field(default_factory=list)
+    ecritures_non_rapprochees: List[Any] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        types = [t for _, _, t in self.correspondances]
+        return {
+            "exacts": types.count(RAPPROCHEMENT_EXACT),
+            "approches": types.count(RAPPROCHEMENT_APPROCHE),
+            "correspondances": [
+                {"transaction_id": str(t), "ecriture_id": str(e), "type": type_}
+                for t, e, type_ in self.correspondances
+            ],
+            "transactions_non_rapprochees": [str(t) for t in self.transactions_non_rapprochees],
+            "ecritures_non_rapprochees": [str(e) for e in self.ecritures_non_rapprochees]
+        }
+
+def _centimes(montant) -> int:
+    return int((Decimal(str(montant or 0)) * 100).to_integral_value())
+
+def _normaliser_reference(reference: Optional[str]) -> str:
+    """Référence comparable: alphanumérique, en majuscules ("VIR 001" == "vir-001")"""
+    return "".join(c for c in (reference or "").upper() if c.isalnum())
+
+def apparier(
+    transactions: Sequence[LigneRapprochement],
+    ecritures: Sequence[LigneRapprochement],
+    tolerance_centimes: int = 0,
+    fenetre_jours: int = 3
+) -> List[Tuple[int, int, str]]:
+    """
+    Apparie transactions et écritures; retourne (index transaction, index
+    écriture, type). Chaque ligne est utilisée au plus une fois.
+    """
+    resultats = []
+    prise = np.zeros(len(ecritures), dtype=bool)
+
+    # 1. Exact: (montant, jour, référence)
+    index_exact: Dict[Tuple[int, int, str], deque] = defaultdict(deque)
+    for j, e in enumerate(ecritures):
+        index_exact[(e.centimes, e.jour, e.reference)].append(j)
+    restantes = []
+    for i, t in enumerate(transactions):
+        signes = (1, -1) if t.sens_inconnu else (1,)
+        for signe in signes:
+            candidats = index_exact.get((signe * t.centimes, t.jour, t.reference))
+            if candidats:
+                j = candidats.popleft()
+                prise[j] = True
+                resultats.append((i, j, RAPPROCHEMENT_EXACT))
+                break
+        else:
+            restantes.append(i)
+
+    # 2. Approché: écritures libres groupées par montant, chaque groupe trié par date
+    libres = np.flatnonzero(~prise)
+    if not restantes or libres.size == 0:
+        return resultats
+    montants = np.fromiter((ecritures[j].centimes for j in libres), dtype=np.int64, count=libres.size)
+    ordre = np.argsort(montants, kind="stable")
+    montants, libres = montants[ordre], libres[ordre]
+    distincts, premiers = np.unique(montants, return_index=True)
+    groupes_jours: List[List[int]] = []
+    groupes_ecritures: List[List[int]] = []
+    for debut, fin in zip(premiers, [*premiers[1:], montants.size]):
+        groupe = sorted((ecritures[j].jour, int(j)) for j in libres[debut:fin])
+        groupes_jours.append([jour for jour, _ in groupe])
+        groupes_ecritures.append([j for _, j in groupe])
+
+    cibles, origines = [], []
+    for i in restantes:
+        t = transactions[i]
+        for signe in ((1, -1) if t.sens_inconnu else (1,)):
+            cibles.append(signe * t.centimes)
+            origines.append(i)
+    cibles = np.asarray(cibles, dtype=np.int64)
+    debuts = np.searchsorted(montants, cibles - tolerance_centimes, side="left")
+    fins = np.searchsorted(montants, cibles + tolerance_centimes, side="right")
+    groupes_debut = np.searchsorted(distincts, cibles - tolerance_centimes, side="left")
+    groupes_fin = np.searchsorted(distincts, cibles + tolerance_centimes, side="right")
+
+    # Les transactions les plus contraintes (peu de candidats) choisissent en premier
+    deja = set()
+    for k in np.argsort(fins - debuts, kind="stable"):
+        i = origines[k]
+        if i in deja or debuts[k] == fins[k]:
+            continue
+        jour = transactions[i].jour
+        meilleur = None
+        for g in range(groupes_debut[k], groupes_fin[k]):
+            # Dans un groupe, seules les dates les plus proches de part et d'autre comptent
+            jours_groupe = groupes_jours[g]
+            p = bisect_left(jours_groupe, jour)
+            for q in (p - 1, p):
+                if not 0 <= q < len(jours_groupe):
+                    continue
+                ecart_jours = abs(jours_groupe[q] - jour)
+                if ecart_jours > fenetre_jours:
+                    continue
+                # Plus proche en date, puis en montant
+                cle = (ecart_jours * (2 * tolerance_centimes + 1) + abs(int(distincts[g]) - int(cibles[k])),
+                       jours_groupe[q])
+                if meilleur is None or cle < meilleur[0]:
+                    meilleur = (cle, g, bisect_left(jours_groupe, jours_groupe[q]))
+        if meilleur is None:
+            continue
+        _, g, q = meilleur
+        del groupes_jours[g][q]
+        deja.add(i)
+        resultats.append((i, groupes_ecritures[g].pop(q), RAPPROCHEMENT_APPROCHE))
+    return resultats
+
+class RapprochementBancaire:
+    """Rapprochement des transactions avec les écritures du journal de banque"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _charger_transactions(self, debut: datetime, fin: datetime) -> List[LigneRapprochement]:
+        """Transactions de la période sans écriture liée"""
+        rows = self.db.query(
+            Transaction.id,
+            Transaction.montant,
+            Transaction.date_transaction,
+            Transaction.reference,
+            Transaction.type_transaction
+        ).filter(
+            Transaction.date_transaction >= debut,
+            Transaction.date_transaction < fin,
+            Transaction.statut.notin_([StatutTransaction.ANNULEE, StatutTransaction.REJETEE]),
+            ~exists().where(EcritureComptable.transaction_id == Transaction.id)
+        ).all()
+        return [
+            LigneRapprochement(
+                id=id_,
+                centimes=_centimes(montant) * (-1 if type_transaction == TypeTransaction.DEPENSE else 1),
+                jour=date_transaction.toordinal(),
+                reference=_normaliser_reference(reference),
+                sens_inconnu=type_transaction == TypeTransaction.VIREMENT
+            )
+            for id_, montant, date_transaction, reference, type_transaction in rows
+        ]
+
+    def _charger_ecritures(self, debut: date, fin: date) -> List[LigneRapprochement]:
+        """Lignes de banque non liées du journal BANQUE"""
+        rows = self.db.query(
+            EcritureComptable.id,
+            EcritureComptable.debit,
+            EcritureComptable.credit,
+            EcritureComptable.date_ecriture,
+            EcritureComptable.numero_piece
+        ).join(
+            JournalComptable, JournalComptable.id == EcritureComptable.journal_id
+        ).join(
+            CompteComptable, CompteComptable.id == EcritureComptable.compte_id
+        ).filter(
+            JournalComptable.type_journal == TypeJournal.BANQUE,
+            CompteComptable.numero.like(f"{PREFIXE_COMPTE_BANQUE}%"),
+            EcritureComptable.transaction_id.is_(None),
+            EcritureComptable.statut != StatutEcriture.ANNULEE,
+            EcritureComptable.modifiable.isnot(False),
+            EcritureComptable.date_ecriture >= debut,
+            EcritureComptable.date_ecriture <= fin
+        ).all()
+        return [
+            LigneRapprochement(
+                id=id_,
+                centimes=_centimes(debit) - _centimes(credit),
+                jour=date_ecriture.toordinal(),
+                reference=_normaliser_reference(numero_piece)
+            )
+            for id_, debit, credit, date_ecriture, numero_piece in rows
+        ]
+
+    async def rapprocher(
+        self,
+        date_debut: date,
+        date_fin: date,
+        tolerance_montant: Decimal = Decimal("0"),
+        fenetre_jours: int = 3,
+        appliquer: bool = True
+    ) -> ResultatRapprochement:
+        """Rapproche la période; écrit les liens sauf en simulation (appliquer=False)"""
+        # Fenêtre élargie côté transactions pour les écarts de date de valeur
+        transactions = self._charger_transactions(
+            datetime.combine(date_debut - timedelta(days=fenetre_jours), time.min),
+            datetime.combine(date_fin + timedelta(days=fenetre_jours + 1), time.min)
+        )
+        ecritures = self._charger_ecritures(date_debut, date_fin)
+
+        paires = apparier(transactions, ecritures, _centimes(tolerance_montant), fenetre_jours)
+        resultat = ResultatRapprochement(
+            correspondances=[(transactions[i].id, ecritures[j].id, type_) for i, j, type_ in paires]
+        )
+        rapprochees_t = {i for i, _, _ in paires}
+        rapprochees_e = {j for _, j, _ in paires}
+        resultat.transactions_non_rapprochees = [
+            t.id for i, t in enumerate(transactions)
+            if i not in rapprochees_t and date_debut.toordinal() <= t.jour <= date_fin.toordinal()
+        ]
+        resultat.ecritures_non_rapprochees = [e.id for j, e in enumerate(ecritures) if j not in rapprochees_e]
+
+        if appliquer and paires:
+            self._enregistrer(resultat.correspondances)
+        return resultat
+
+    def _enregistrer(self, correspondances: List[Tuple[Any, Any, str]]) -> None:
+        """Écrit les liens en un executemany; une écriture déjà liée n'est pas écrasée"""
+        table = EcritureComptable.__table__
+        self.db.execute(
+            update(table).where(and_(
+                table.c.id == bindparam("e_id"),
+                table.c.transaction_id.is_(None)
+            )).values(transaction_id=bindparam("t_id")),
+            [{"e_id": e, "t_id": t} for t, e, _ in correspondances]
+        )
+        self.db.commit()
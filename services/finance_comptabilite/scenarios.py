@@ -0,0 +1,239 @@
+"""
+Moteur de scénarios Monte-Carlo: produits, charges, marge et trésorerie
+
+Chaque scénario tire, mois par mois et pour chaque culture:
+- un rendement (kg/ha) selon la loi observée dans l'historique des récoltes
+  pour le même mois calendaire (probabilité de mois sans récolte, puis
+  log-normale ajustée sur les mois productifs);
+- une trajectoire de prix (marche log-normale, dérive et volatilité annuelles);
+- un choc météo (Bernoulli) qui réduit le rendement et majore les charges.
+
+Tous les tirages sont des tableaux NumPy (mois, n_scenarios) évalués en une
+seule passe vectorisée; seules les bandes de quantiles sont retournées.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+
+import numpy as np
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+
+from models.production import Parcelle, ParcelleStatus, Recolte
+
+QUANTILES = (10, 50, 90)
+MAX_SCENARIOS = 200_000
+MAX_MOIS = 60
+
+@dataclass
+class HypothesesCulture:
+    """Hypothèses d'une culture pour la simulation"""
+    culture: str
+    surface_ha: float
+    prix_kg: float
+    volatilite_prix: float = 0.25  # écart-type annuel du log-prix
+    derive_prix: float = 0.0  # dérive annuelle du log-prix
+    charges_fixes_mensuelles: float = 0.0
+    cout_variable_kg: float = 0.0
+    probabilite_choc_meteo: float = 0.1  # par mois
+    perte_rendement_choc: float = 0.2
+    surcout_choc_meteo: float = 0.15  # part des charges du mois
+    montee_en_production_mois: int = 0  # plantation nouvelle: rendement progressif
+    # Culture dont l'historique sert de référence (nouvelle culture sans récolte)
+    culture_reference: Optional[str] = None
+    # Rendements observés: (mois calendaire 1-12, kg/ha)
+    historique: List[Tuple[int, float]] = field(default_factory=list)
+
+@dataclass
+class ResultatScenarios:
+    """Bandes de quantiles par mois"""
+    n_scenarios: int
+    mois: int
+    quantiles: Tuple[int, ...]
+    bandes: Dict[str, Dict[str, List[float]]]
+    probabilite_tresorerie_negative: List[float]
+
+    def to_dict(self) -> Dict:
+        return {
+            "n_scenarios": self.n_scenarios,
+            "mois": self.mois,
+            "quantiles": list(self.quantiles),
+            "bandes": self.bandes,
+            "probabilite_tresorerie_negative": self.probabilite_tresorerie_negative
+        }
+
+def loi_rendement(historique: Sequence[Tuple[int, float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Paramètres mensuels (12,) du rendement: probabilité d'un mois sans
+    récolte, moyenne et écart-type du log-rendement des mois productifs.
+    Les mois calendaires peu observés reprennent la loi globale.
+    """
+    if not historique:
+        raise ValueError("Historique de rendement vide")
+    observations = np.asarray(historique, dtype=np.float64)
+    mois = observations[:, 0].astype(int) - 1
+    rendements = observations[:, 1]
+    productifs = rendements > 0
+    if not productifs.any():
+        raise ValueError("Aucune récolte dans l'historique de rendement")
+
+    logs = np.log(rendements[productifs])
+    mu_global = logs.mean()
+    sigma_global = logs.std() if logs.size > 1 else 0.0
+    p_zero_global = 1 - productifs.mean()
+
+    p_zero = np.full(12, p_zero_global)
+    mu = np.full(12, mu_global)
+    sigma = np.full(12, sigma_global)
+    for m in range(12):
+        du_mois = mois == m
+        if du_mois.sum() < 2:
+            continue
+        p_zero[m] = 1 - productifs[du_mois].mean()
+        logs_mois = np.log(rendements[du_mois & productifs])
+        if logs_mois.size >= 2:
+            mu[m], sigma[m] = logs_mois.mean(), logs_mois.std()
+    return p_zero, mu, sigma
+
+def _bandes(valeurs: np.ndarray, quantiles: Sequence[int]) -> Dict[str, List[float]]:
+    """
+    Quantiles par mois (interpolation linéaire, comme np.percentile) d'un
+    tableau (mois, n_scenarios), partitionné sur place: il n'est plus lu après
+    """
+    positions = np.asarray(quantiles, dtype=np.float64) / 100 * (valeurs.shape[1] - 1)
+    bas = np.floor(positions).astype(int)
+    haut = np.minimum(bas + 1, valeurs.shape[1] - 1)
+    valeurs.partition(np.unique(np.concatenate([bas, haut])), axis=1)
+    poids = positions - bas
+    bornes = valeurs[:, bas] * (1 - poids) + valeurs[:, haut] * poids
+    return {f"p{q}": np.round(bornes[:, i].astype(np.float64), 2).tolist() for i, q in enumerate(quantiles)}
+
+def simuler_scenarios(
+    hypotheses: Sequence[HypothesesCulture],
+    mois: int = 24,
+    n_scenarios: int = 100_000,
+    tresorerie_initiale: float = 0.0,
+    mois_depart: int = 1,
+    seed: Optional[int] = None,
+    quantiles: Sequence[int] = QUANTILES
+) -> ResultatScenarios:
+    """
+    Évalue tous les scénarios en une passe et retourne les bandes de quantiles.
+
+    Les tirages sont rangés mois en premier (mois, n_scenarios) en float32:
+    le cumul de trésorerie et le calcul des quantiles parcourent ainsi des
+    lignes contiguës.
+    """
+    if not hypotheses:
+        raise ValueError("Aucune culture à simuler")
+    if not 1 <= mois <= MAX_MOIS or not 1 <= n_scenarios <= MAX_SCENARIOS:
+        raise ValueError(f"Simulation limitée à {MAX_MOIS} mois et {MAX_SCENARIOS} scénarios")
+
+    rng = np.random.default_rng(seed)
+    forme = (mois, n_scenarios)
+    calendrier = (mois_depart - 1 + np.arange(mois)) % 12
+    horizon = np.arange(1, mois + 1, dtype=np.float32)[:, None]
+
+    produits = np.zeros(forme, dtype=np.float32)
+    charges = np.zeros(forme, dtype=np.float32)
+    for h in hypotheses:
+        p_zero, mu, sigma = (loi[calendrier, None].astype(np.float32) for loi in loi_rendement(h.historique))
+
+        # Rendement kg/ha: mois sans récolte puis log-normale du mois calendaire
+        kg = rng.standard_normal(forme, dtype=np.float32)
+        kg *= sigma
+        kg += mu
+        np.exp(kg, out=kg)
+        kg[rng.random(forme, dtype=np.float32) < p_zero] = 0.0
+        kg *= np.float32(h.surface_ha)
+        if h.montee_en_production_mois > 0:
+            kg *= np.minimum(1.0, horizon / h.montee_en_production_mois)
+
+        chocs = rng.random(forme, dtype=np.float32) < h.probabilite_choc_meteo
+        kg[chocs] *= np.float32(1 - h.perte_rendement_choc)
+
+        # Marche log-normale mensuelle du prix, centrée sur la dérive annuelle
+        vol = h.volatilite_prix / np.sqrt(12)
+        prix = rng.standard_normal(forme, dtype=np.float32)
+        prix *= np.float32(vol)
+        prix += np.float32(h.derive_prix / 12 - vol ** 2 / 2)
+        np.cumsum(prix, axis=0, out=prix)
+        np.exp(prix, out=prix)
+        prix *= np.float32(h.prix_kg)
+
+        produits += kg * prix
+        charges_culture = kg * np.float32(h.cout_variable_kg)
+        charges_culture += np.float32(h.charges_fixes_mensuelles)
+        charges_culture[chocs] *= np.float32(1 + h.surcout_choc_meteo)
+        charges += charges_culture
+
+    marge = produits - charges
+    # Cumul en double précision: les soldes atteignent plusieurs centaines de millions
+    tresorerie = np.cumsum(marge, axis=0, dtype=np.float64)
+    tresorerie += tresorerie_initiale
+    probabilite_negative = np.round((tresorerie < 0).mean(axis=1), 4).tolist()
+
+    return ResultatScenarios(
+        n_scenarios=n_scenarios,
+        mois=mois,
+        quantiles=tuple(quantiles),
+        bandes={
+            "produits": _bandes(produits, quantiles),
+            "charges": _bandes(charges, quantiles),
+            "marge": _bandes(marge, quantiles),
+            "tresorerie": _bandes(tresorerie, quantiles)
+        },
+        probabilite_tresorerie_negative=probabilite_negative
+    )
+
+class SimulationScenarios:
+    """Simulation de scénarios alimentée par l'historique des récoltes"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def historique_rendements(self, culture: str) -> List[Tuple[int, float]]:
+        """
+        Rendements mensuels (mois calendaire, kg/ha) d'une culture, du premier
+        au dernier mois de récolte observé: les mois sans récolte de cette
+        période valent 0 (probabilité de mois sans récolte de loi_rendement)
+        """
+        surface = self.db.query(func.sum(Parcelle.surface_hectares)).filter(
+            Parcelle.culture_type == culture,
+            Parcelle.statut == ParcelleStatus.ACTIVE
+        ).scalar()
+        if not surface:
+            return []
+
+        annee = extract("year", Recolte.date_recolte)
+        mois = extract("month", Recolte.date_recolte)
+        rows = self.db.query(
+            annee, mois, func.sum(Recolte.quantite_kg)
+        ).join(
+            Parcelle, Parcelle.id == Recolte.parcelle_id
+        ).filter(
+            Parcelle.culture_type == culture
+        ).group_by(annee, mois).all()
+        if not rows:
+            return []
+
+        # Mois numérotés en continu (année * 12 + mois - 1)
+        recoltes = {int(a) * 12 + int(m) - 1: float(kg or 0) for a, m, kg in rows}
+        return [
+            (rang % 12 + 1, recoltes.get(rang, 0.0) / float(surface))
+            for rang in range(min(recoltes), max(recoltes) + 1)
+        ]
+
+    async def simuler(
+        self,
+        hypotheses: List[HypothesesCulture],
+        **options
+    ) -> ResultatScenarios:
+        """Complète les historiques manquants puis lance la simulation hors boucle d'événements"""
+        for h in hypotheses:
+            if not h.historique:
+                h.historique = self.historique_rendements(h.culture_reference or h.culture)
+            if not h.historique:
+                raise ValueError(f"Aucun historique de récolte pour la culture {h.culture}")
+        return await asyncio.to_thread(simuler_scenarios, hypotheses, **options)
@@ -3,14 +3,34 @@ Service de gestion financière avec ML
 """
 
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Iterable
 from datetime import datetime, timedelta
-from models.finance import Transaction, Compte, Budget, CategorieTransaction
-from schemas.finance import TransactionCreate, BudgetCreate, BudgetUpdate
-from sqlalchemy import func, and_
+from decimal import Decimal
+import asyncio
+import calendar
+from models.finance import (
+    Transaction, Compte, Budget, CategorieTransaction,
+    AgregatFinanceMensuel, TypeTransaction, StatutTransaction
+)
+from schemas.finance import TransactionCreate, BudgetCreate, BudgetUpdate, ScenarioRequest
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from services.weather_service import WeatherService
 from services.cache_service import CacheService
+from services.change_service import ChangeService, convertir_colonnes
 from services.finance_comptabilite.analyse import AnalyseFinanceCompta
+from services.finance_comptabilite.budget import SuiviBudgetaire
+from services.ml.finance_comptabilite.analyse import AnalyseFinanceCompta as AnalyseFinanceComptaML
+from services.finance_comptabilite.scenarios import HypothesesCulture, SimulationScenarios
+
+# Un calcul d'enrichissement ML par période à la fois; en cas d'échec, nouvel
+# essai au plus tôt après ce délai
+DUREE_ENRICHISSEMENT = timedelta(minutes=10)
+
+# Score journalier (0-50) à partir duquel une journée pèse sur les coûts:
+# fortes pluies, ou chaleur et pluies modérées
+SCORE_JOUR_DEFAVORABLE = 30
 
 class FinanceService:
     def __init__(self, db: Session):
@@ -18,6 +38,8 @@ class FinanceService:
         self.weather_service = WeatherService(db)
         self.cache = CacheService()
         self.analyse = AnalyseFinanceCompta(db)
+        self.change = ChangeService(db)
+        self.suivi_budget = SuiviBudgetaire(db)
 
     async def get_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques financières avec ML"""
@@ -30,11 +52,11 @@ class FinanceService:
         # Stats de base
         basic_stats = await self._get_basic_stats()
         
-        # Prédictions ML
-        ml_predictions = await self.analyse.predict_performance(months_ahead=3)
-        
-        # Optimisations ML
-        optimization = await self.analyse.optimize_costs(
+        # Prédictions et optimisations ML (analyse globale, toutes parcelles)
+        analyse_ml = AnalyseFinanceComptaML(self.db)
+        ml_predictions = await analyse_ml.predict_performance(parcelle_id=None, months_ahead=3)
+        optimization = await analyse_ml.optimize_costs(
+            parcelle_id=None,
             target_date=datetime.utcnow().date()
         )
         
@@ -51,7 +73,7 @@ class FinanceService:
         }
         
         # Mise en cache
-        await self.cache.set(cache_key, stats, expire=3600)
+        await self.cache.set(cache_key, stats, expire_in=timedelta(hours=1))
         
         return stats
 
@@ -68,40 +90,39 @@ class FinanceService:
         elif transaction.type_transaction == "VIREMENT":
             await self._handle_virement(transaction)
 
-        # Mise à jour du budget réalisé
+        # Mise à jour du budget réalisé et des agrégats mensuels (même transaction SQL)
         await self._update_budget_realise(transaction)
+        self._incrementer_agregat(
+            periode=transaction.date_transaction.strftime("%Y-%m"),
+            type_transaction=transaction.type_transaction,
+            categorie=transaction.categorie,
+            statut=db_transaction.statut or StatutTransaction.EN_ATTENTE,
+            montant=transaction.montant
+        )
 
         # Invalidation du cache
-        await self.cache.delete(f"finance_stats_{datetime.utcnow().strftime('%Y-%m-%d')}")
-        await self.cache.delete(f"budget_analysis_{transaction.date_transaction.strftime('%Y-%m')}")
+        await self.cache.invalidate(f"finance_stats_{datetime.utcnow().strftime('%Y-%m-%d')}")
 
         self.db.commit()
         self.db.refresh(db_transaction)
         return db_transaction
 
     async def create_budget(self, budget: BudgetCreate) -> Budget:
-        """Crée un nouveau budget avec ML"""
-        # Analyse ML pour optimisation
-        optimization = await self.analyse.optimize_costs(
-            target_date=datetime.strptime(budget.periode, "%Y-%m").date()
-        )
-        
-        # Ajustement du budget selon ML
-        if optimization["potential_savings"]:
-            budget.montant_prevu = float(budget.montant_prevu) - float(optimization["potential_savings"])
-        
+        """Crée un nouveau budget, le réalisé repris des opérations déjà passées"""
         db_budget = Budget(**budget.dict())
+        db_budget.montant_realise = self.suivi_budget.realise(budget.periode, budget.categorie)
         self.db.add(db_budget)
         
-        # Invalidation cache
-        await self.cache.delete(f"budget_analysis_{budget.periode}")
+        # Invalidation cache (liste de la période et liste complète)
+        await self.cache.invalidate(f"budgets_{budget.periode}")
+        await self.cache.invalidate("budgets_all")
         
         self.db.commit()
         self.db.refresh(db_budget)
         return db_budget
 
     async def get_budgets(self, periode: Optional[str] = None) -> List[Budget]:
-        """Récupère les budgets avec ML"""
+        """Récupère les budgets (sans enrichissement ML)"""
         # Vérification cache
         cache_key = f"budgets_{periode or 'all'}"
         cached_budgets = await self.cache.get(cache_key)
@@ -115,101 +136,95 @@ class FinanceService:
             
         budgets = query.all()
         
-        # Enrichissement ML
-        if periode:
-            ml_analysis = await self.analyse.get_analyse_parcelle(
-                parcelle_id=None,
-                date_debut=datetime.strptime(periode, "%Y-%m").date(),
-                date_fin=datetime.strptime(periode, "%Y-%m").date() + timedelta(days=30)
-            )
-            
-            for budget in budgets:
-                budget.ml_predictions = ml_analysis["ml_analysis"]["predictions"]
-                budget.ml_recommendations = ml_analysis["ml_analysis"]["recommendations"]
-        
         # Mise en cache
-        await self.cache.set(cache_key, budgets, expire=3600)
+        await self.cache.set(cache_key, budgets, expire_in=timedelta(hours=1))
         
         return budgets
 
     async def update_budget(self, budget_id: str, budget_update: BudgetUpdate) -> Budget:
-        """Met à jour un budget avec ML"""
+        """Met à jour un budget"""
         db_budget = self.db.query(Budget).filter(Budget.id == budget_id).first()
         if not db_budget:
             raise ValueError("Budget non trouvé")
         
-        # Analyse ML pour optimisation
-        if "montant_prevu" in budget_update.dict(exclude_unset=True):
-            optimization = await self.analyse.optimize_costs(
-                target_date=datetime.strptime(db_budget.periode, "%Y-%m").date()
-            )
-            if optimization["potential_savings"]:
-                budget_update.montant_prevu = float(budget_update.montant_prevu) - float(optimization["potential_savings"])
-        
         for field, value in budget_update.dict(exclude_unset=True).items():
             setattr(db_budget, field, value)
         
-        # Invalidation cache
-        await self.cache.delete(f"budget_analysis_{db_budget.periode}")
-        await self.cache.delete(f"budgets_{db_budget.periode}")
+        # Invalidation cache (liste de la période et liste complète)
+        await self.cache.invalidate(f"budgets_{db_budget.periode}")
+        await self.cache.invalidate("budgets_all")
         
         self.db.commit()
         self.db.refresh(db_budget)
         return db_budget
 
-    async def get_budget_analysis(self, periode: str) -> Dict[str, Any]:
-        """Analyse détaillée du budget avec ML"""
-        # Vérification cache
-        cache_key = f"budget_analysis_{periode}"
-        cached_analysis = await self.cache.get(cache_key)
-        if cached_analysis:
-            return cached_analysis
+    async def get_budget_analysis(self, periode: str, devise: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Écarts budget / réalisé de la période, calculés sans attendre aucun
+        modèle; l'enrichissement ML (météo, optimisation, performance) est
+        joint s'il est en cache, sinon ml_statut vaut EN_ATTENTE et l'appelant
+        lance enrichir_budget_analysis en tâche de fond (reserver_enrichissement)
+        """
+        analysis = self.suivi_budget.ecarts(periode)
+
+        enrichissement = await self.cache.get(f"budget_ml_{periode}")
+        if enrichissement:
+            analysis.update(enrichissement)
+            analysis["ml_statut"] = "DISPONIBLE"
+            analysis["recommendations"] = await self._generate_budget_recommendations(
+                analysis,
+                enrichissement["optimization"],
+                enrichissement["performance"]
+            )
+        else:
+            analysis["ml_statut"] = "EN_ATTENTE"
+            analysis["recommendations"] = self._recommandations_ecarts(analysis)
 
-        # Analyse de base
-        budgets = await self.get_budgets(periode)
-        
-        analysis = {
-            "total_prevu": 0,
-            "total_realise": 0,
-            "categories": {},
-            "weather_impact": await self._analyze_weather_impact(periode)
-        }
+        return await self._convertir_budget_analysis(analysis, periode, devise)
 
-        for budget in budgets:
-            cat = budget.categorie.value
-            analysis["categories"][cat] = {
-                "prevu": float(budget.montant_prevu),
-                "realise": float(budget.montant_realise),
-                "ecart": float(budget.montant_realise - budget.montant_prevu),
-                "ecart_percentage": round((budget.montant_realise - budget.montant_prevu) / budget.montant_prevu * 100, 2) if budget.montant_prevu != 0 else 0
-            }
-            analysis["total_prevu"] += float(budget.montant_prevu)
-            analysis["total_realise"] += float(budget.montant_realise)
+    async def reserver_enrichissement(self, periode: str) -> bool:
+        """
+        Réserve le calcul de l'enrichissement d'une période: faux si un calcul
+        est déjà en cours (ou a échoué il y a moins de DUREE_ENRICHISSEMENT)
+        """
+        return await self.cache.reserve(f"budget_ml_en_cours_{periode}", DUREE_ENRICHISSEMENT)
 
-        # Enrichissement ML
+    async def enrichir_budget_analysis(self, periode: str) -> Dict[str, Any]:
+        """Calcule et met en cache, sous sa propre clé, l'enrichissement ML d'une période"""
         target_date = datetime.strptime(periode, "%Y-%m").date()
-        
-        # Optimisation ML
-        optimization = await self.analyse.optimize_costs(target_date=target_date)
-        
-        # Performance ML
-        performance = await self.analyse.predict_performance(months_ahead=3)
-        
-        # Fusion résultats
-        analysis.update({
-            "optimization": optimization,
-            "performance": performance,
-            "recommendations": await self._generate_budget_recommendations(
-                analysis,
-                optimization,
-                performance
-            )
-        })
-        
-        # Mise en cache
-        await self.cache.set(cache_key, analysis, expire=3600)
-        
-        return analysis
+        analyse_ml = AnalyseFinanceComptaML(self.db)  # Analyse globale, toutes parcelles
+        enrichissement = {
+            "weather_impact": await self._analyze_weather_impact(periode),
+            "optimization": await analyse_ml.optimize_costs(parcelle_id=None, target_date=target_date),
+            "performance": await analyse_ml.predict_performance(parcelle_id=None, months_ahead=3)
+        }
+        await self.cache.set(f"budget_ml_{periode}", enrichissement, expire_in=timedelta(hours=1))
+        await self.cache.invalidate(f"budget_ml_en_cours_{periode}")
+        return enrichissement
+
+    async def _convertir_budget_analysis(
+        self,
+        analysis: Dict[str, Any],
+        periode: str,
+        devise: Optional[str]
+    ) -> Dict[str, Any]:
+        """Convertit les montants au taux de fin de période; les écarts en % sont inchangés"""
+        if not devise:
+            return analysis
+        annee, mois = map(int, periode.split("-"))
+        fin_periode = datetime(annee, mois, calendar.monthrange(annee, mois)[1]).date()
+        taux = await self.change.taux_au(devise, fin_periode)
+
+        categories = analysis["categories"]
+        lignes = convertir_colonnes(list(categories.values()), ("prevu", "realise", "ecart"), taux)
+        return {
+            **analysis,
+            "devise": devise.upper(),
+            "taux_change": taux,
+            "total_prevu": round(analysis["total_prevu"] / taux, 2),
+            "total_realise": round(analysis["total_realise"] / taux, 2),
+            "categories": dict(zip(categories, lignes))
+        }
 
     async def get_financial_projections(self, months_ahead: int = 3) -> Dict[str, Any]:
         """Génère des projections financières avec ML"""
@@ -227,19 +242,30 @@ class FinanceService:
             "ml_predictions": []
         }
 
-        # Analyse ML
-        ml_performance = await self.analyse.predict_performance(months_ahead=months_ahead)
+        # Analyse ML globale, toutes parcelles
+        ml_performance = await AnalyseFinanceComptaML(self.db).predict_performance(
+            parcelle_id=None,
+            months_ahead=months_ahead
+        )
+
+        periods = [
+            (now + timedelta(days=30 * i)).strftime("%Y-%m")
+            for i in range(months_ahead)
+        ]
+
+        # Historique de toutes les périodes et impacts météo chargés une seule fois
+        totaux = self._totaux_mensuels(periode_min=self._periode_reference(periods[0])) if periods else {}
+        distinct_periods = sorted(set(periods))
+        weather_impacts = dict(zip(distinct_periods, await asyncio.gather(
+            *(self._analyze_weather_impact(period) for period in distinct_periods)
+        )))
         
-        for i in range(months_ahead):
-            target_date = now + timedelta(days=30 * i)
-            period = target_date.strftime("%Y-%m")
-            
-            # Analyse météo
-            weather_impact = await self._analyze_weather_impact(period)
+        for i, period in enumerate(periods):
+            weather_impact = weather_impacts[period]
             
             # Calcul projections
-            base_revenue = await self._calculate_base_projection("RECETTE", period)
-            base_expenses = await self._calculate_base_projection("DEPENSE", period)
+            base_revenue = await self._calculate_base_projection("RECETTE", period, totaux)
+            base_expenses = await self._calculate_base_projection("DEPENSE", period, totaux)
             
             # Ajustement météo
             weather_adjustment = weather_impact["score"] / 100
@@ -267,60 +293,61 @@ class FinanceService:
             projections["ml_predictions"].append(ml_prediction)
         
         # Mise en cache
-        await self.cache.set(cache_key, projections, expire=3600)
+        await self.cache.set(cache_key, projections, expire_in=timedelta(hours=1))
         
         return projections
 
+    async def simulate_scenarios(self, request: ScenarioRequest) -> Dict[str, Any]:
+        """Distribution des produits, charges et trésorerie sur l'horizon demandé"""
+        now = datetime.utcnow()
+        mois_depart = request.mois_depart or now.month % 12 + 1
+        tresorerie = request.tresorerie_initiale
+        if tresorerie is None:
+            tresorerie = float(self.db.query(func.sum(Compte.solde)).filter(Compte.actif == True).scalar() or 0)
+
+        resultat = await SimulationScenarios(self.db).simuler(
+            [HypothesesCulture(**culture.dict()) for culture in request.cultures],
+            mois=request.mois,
+            n_scenarios=request.n_scenarios,
+            tresorerie_initiale=tresorerie,
+            mois_depart=mois_depart,
+            seed=request.seed
+        )
+
+        annee = now.year + (1 if mois_depart <= now.month else 0)
+        periodes = [
+            f"{annee + (mois_depart - 1 + i) // 12}-{(mois_depart - 1 + i) % 12 + 1:02d}"
+            for i in range(request.mois)
+        ]
+        return {**resultat.to_dict(), "periodes": periodes, "tresorerie_initiale": tresorerie}
+
     async def _get_basic_stats(self) -> Dict[str, Any]:
         """Calcule les statistiques de base"""
         now = datetime.utcnow()
         current_month = now.strftime("%Y-%m")
         last_month = (now - timedelta(days=30)).strftime("%Y-%m")
 
-        # Chiffre d'affaires
-        revenue = self.db.query(
-            func.sum(Transaction.montant)
-        ).filter(
-            Transaction.type_transaction == "RECETTE",
-            Transaction.statut == "VALIDEE",
-            func.to_char(Transaction.date_transaction, 'YYYY-MM') == current_month
-        ).scalar() or 0
+        # Produits et charges des deux mois lus dans les agrégats mensuels
+        totaux = self._totaux_mensuels(periodes=[current_month, last_month])
 
-        previous_revenue = self.db.query(
-            func.sum(Transaction.montant)
-        ).filter(
-            Transaction.type_transaction == "RECETTE",
-            Transaction.statut == "VALIDEE",
-            func.to_char(Transaction.date_transaction, 'YYYY-MM') == last_month
-        ).scalar() or 0
-
-        # Charges
-        expenses = self.db.query(
-            func.sum(Transaction.montant)
-        ).filter(
-            Transaction.type_transaction == "DEPENSE",
-            Transaction.statut == "VALIDEE",
-            func.to_char(Transaction.date_transaction, 'YYYY-MM') == current_month
-        ).scalar() or 0
+        def montant(periode: str, type_transaction: TypeTransaction) -> Decimal:
+            return totaux.get((periode, type_transaction), (Decimal('0'), 0))[0]
 
-        previous_expenses = self.db.query(
-            func.sum(Transaction.montant)
-        ).filter(
-            Transaction.type_transaction == "DEPENSE",
-            Transaction.statut == "VALIDEE",
-            func.to_char(Transaction.date_transaction, 'YYYY-MM') == last_month
-        ).scalar() or 0
+        revenue = montant(current_month, TypeTransaction.RECETTE)
+        previous_revenue = montant(last_month, TypeTransaction.RECETTE)
+        expenses = montant(current_month, TypeTransaction.DEPENSE)
+        previous_expenses = montant(last_month, TypeTransaction.DEPENSE)
 
         # Calculs
         profit = revenue - expenses
         previous_profit = previous_revenue - previous_expenses
 
         # Trésorerie
-        cashflow = self.db.query(
+        cashflow = Decimal(str(self.db.query(
             func.sum(Compte.solde)
         ).filter(
             Compte.actif == True
-        ).scalar() or 0
+        ).scalar() or 0))
 
         previous_cashflow = cashflow - (revenue - expenses)
 
@@ -360,7 +387,7 @@ class FinanceService:
         ).first()
         if not compte:
             raise ValueError("Compte de destination non trouvé")
-        compte.solde += transaction.montant
+        compte.solde += Decimal(str(transaction.montant))
 
     async def _handle_depense(self, transaction: TransactionCreate):
         """Gère une transaction de type dépense"""
@@ -371,7 +398,7 @@ class FinanceService:
             raise ValueError("Compte source non trouvé")
         if compte.solde < transaction.montant:
             raise ValueError("Solde insuffisant")
-        compte.solde -= transaction.montant
+        compte.solde -= Decimal(str(transaction.montant))
 
     async def _handle_virement(self, transaction: TransactionCreate):
         """Gère un virement entre comptes"""
@@ -379,21 +406,13 @@ class FinanceService:
         await self._handle_recette(transaction)
 
     async def _update_budget_realise(self, transaction: TransactionCreate):
-        """Met à jour le montant réalisé du budget"""
-        periode = transaction.date_transaction.strftime("%Y-%m")
-        
-        budget = self.db.query(Budget).filter(
-            and_(
-                Budget.periode == periode,
-                Budget.categorie == transaction.categorie
+        """Ajoute la transaction au réalisé du budget (UPDATE atomique, sans relecture)"""
+        if transaction.type_transaction in (TypeTransaction.RECETTE, TypeTransaction.DEPENSE):
+            self.suivi_budget.imputer(
+                transaction.date_transaction.strftime("%Y-%m"),
+                transaction.categorie,
+                transaction.montant
             )
-        ).first()
-
-        if budget:
-            if transaction.type_transaction == "DEPENSE":
-                budget.montant_realise += transaction.montant
-            elif transaction.type_transaction == "RECETTE":
-                budget.montant_realise += transaction.montant
 
     async def _analyze_weather_impact(self, periode: str) -> Dict[str, Any]:
         """Analyse l'impact de la météo avec ML"""
@@ -403,66 +422,131 @@ class FinanceService:
         if cached_impact:
             return cached_impact
 
-        # Données météo
-        weather_data = await self.weather_service.get_monthly_stats(periode)
-        
+        # Scores d'impact journaliers du mois (0-50, pluie et chaleur), une requête
+        annee, mois = map(int, periode.split("-"))
+        debut = datetime(annee, mois, 1).date()
+        fin = debut.replace(day=calendar.monthrange(annee, mois)[1])
+        scores = list((await self.weather_service.get_daily_impacts(debut, fin)).values())
+
         # Analyse ML
-        target_date = datetime.strptime(periode, "%Y-%m").date()
         ml_analysis = await self.analyse.get_analyse_parcelle(
             parcelle_id=None,
-            date_debut=target_date,
-            date_fin=target_date + timedelta(days=30)
+            date_debut=debut,
+            date_fin=fin
         )
-        
-        # Impact de base
+
+        # Impact: moyenne des scores journaliers (même échelle 0-50)
         impact = {
-            "score": 0,
+            "score": round(sum(scores) / len(scores), 1) if scores else 0,
             "factors": [],
             "projections": {}
         }
 
-        # Analyse précipitations
-        if weather_data.get("precipitation", 0) > 200:
-            impact["score"] += 30
-            impact["factors"].append("Fortes précipitations")
+        jours_defavorables = sum(score >= SCORE_JOUR_DEFAVORABLE for score in scores)
+        if jours_defavorables:
+            impact["factors"].append(
+                f"{jours_defavorables} jour(s) de fortes précipitations ou de chaleur"
+            )
             impact["projections"]["TRANSPORT"] = "Augmentation probable des coûts"
-
-        # Analyse températures
-        if weather_data.get("temperature_avg", 25) > 30:
-            impact["score"] += 20
-            impact["factors"].append("Températures élevées")
             impact["projections"]["MAINTENANCE"] = "Coûts supplémentaires possibles"
 
         # Enrichissement ML
         impact.update({
-            "ml_analysis": ml_analysis["ml_analysis"],
-            "recommendations": ml_analysis["recommendations"]
+            "ml_analysis": ml_analysis.get("ml_analysis", {}),
+            "recommendations": ml_analysis.get("recommendations", [])
         })
         
         # Mise en cache
-        await self.cache.set(cache_key, impact, expire=3600)
+        await self.cache.set(cache_key, impact, expire_in=timedelta(hours=1))
         
         return impact
 
+    @staticmethod
+    def _periode_reference(target_period: str) -> str:
+        """Première période de l'historique servant de base à une projection"""
+        return (
+            datetime.strptime(target_period, "%Y-%m") - timedelta(days=90)
+        ).strftime("%Y-%m")
+
     async def _calculate_base_projection(
         self,
         type_transaction: str,
-        target_period: str
+        target_period: str,
+        totaux: Optional[Dict[Tuple[str, TypeTransaction], Tuple[Decimal, int]]] = None
     ) -> float:
-        """Calcule la projection de base"""
-        three_months_ago = (
-            datetime.strptime(target_period, "%Y-%m") - timedelta(days=90)
-        ).strftime("%Y-%m")
-        
-        avg_amount = self.db.query(
-            func.avg(Transaction.montant)
+        """Calcule la projection de base (montant moyen depuis trois mois)"""
+        three_months_ago = self._periode_reference(target_period)
+        if totaux is None:
+            totaux = self._totaux_mensuels(periode_min=three_months_ago)
+
+        montant, nombre = Decimal('0'), 0
+        for (periode, type_agregat), (total, count) in totaux.items():
+            if type_agregat == type_transaction and periode >= three_months_ago:
+                montant += total
+                nombre += count
+
+        return float(montant / nombre) if nombre else 0.0
+
+    def _totaux_mensuels(
+        self,
+        periodes: Optional[Iterable[str]] = None,
+        periode_min: Optional[str] = None,
+        statut: StatutTransaction = StatutTransaction.VALIDEE
+    ) -> Dict[Tuple[str, TypeTransaction], Tuple[Decimal, int]]:
+        """Montant et nombre de transactions par (période, type) depuis les agrégats"""
+        query = self.db.query(
+            AgregatFinanceMensuel.periode,
+            AgregatFinanceMensuel.type_transaction,
+            func.sum(AgregatFinanceMensuel.montant_total),
+            func.sum(AgregatFinanceMensuel.nombre_transactions)
         ).filter(
-            Transaction.type_transaction == type_transaction,
-            Transaction.statut == "VALIDEE",
-            func.to_char(Transaction.date_transaction, 'YYYY-MM') >= three_months_ago
-        ).scalar() or 0
-        
-        return float(avg_amount)
+            AgregatFinanceMensuel.statut == statut,
+            AgregatFinanceMensuel.type_transaction.in_([TypeTransaction.RECETTE, TypeTransaction.DEPENSE])
+        )
+        if periodes is not None:
+            query = query.filter(AgregatFinanceMensuel.periode.in_(list(periodes)))
+        if periode_min is not None:
+            query = query.filter(AgregatFinanceMensuel.periode >= periode_min)
+        query = query.group_by(AgregatFinanceMensuel.periode, AgregatFinanceMensuel.type_transaction)
+
+        return {
+            (periode, TypeTransaction(type_transaction)): (Decimal(str(montant or 0)), int(nombre or 0))
+            for periode, type_transaction, montant, nombre in query.all()
+        }
+
+    def _incrementer_agregat(
+        self,
+        periode: str,
+        type_transaction: TypeTransaction,
+        categorie: CategorieTransaction,
+        statut: StatutTransaction,
+        montant: float,
+        nombre: int = 1
+    ) -> None:
+        """Ajoute un montant aux totaux du mois (upsert atomique, sans relecture)"""
+        insert = sqlite_insert if self.db.get_bind().dialect.name == "sqlite" else pg_insert
+        statement = insert(AgregatFinanceMensuel).values(
+            periode=periode,
+            type_transaction=type_transaction,
+            categorie=categorie,
+            statut=statut,
+            montant_total=montant,
+            nombre_transactions=nombre,
+            updated_at=datetime.now()
+        )
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=[
+                AgregatFinanceMensuel.periode,
+                AgregatFinanceMensuel.type_transaction,
+                AgregatFinanceMensuel.categorie,
+                AgregatFinanceMensuel.statut
+            ],
+            set_={
+                "montant_total": AgregatFinanceMensuel.montant_total + statement.excluded.montant_total,
+                "nombre_transactions": AgregatFinanceMensuel.nombre_transactions + statement.excluded.nombre_transactions,
+                "updated_at": statement.excluded.updated_at
+            }
+        ))
 
     async def _generate_recommendations(
         self,
@@ -508,16 +592,10 @@ class FinanceService:
             
         return recommendations
 
-    async def _generate_budget_recommendations(
-        self,
-        analysis: Dict[str, Any],
-        optimization: Dict[str, Any],
-        performance: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
-        """Génère des recommandations budgétaires ML"""
+    def _recommandations_ecarts(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Recommandations sur les écarts budget / réalisé (sans ML)"""
         recommendations = []
         
-        # Recommandations écarts
         for cat, data in analysis["categories"].items():
             if data["ecart_percentage"] < -10:
                 recommendations.append({
@@ -543,6 +621,17 @@ class FinanceService:
                         "Identifier opportunités"
                     ]
                 })
+
+        return recommendations
+
+    async def _generate_budget_recommendations(
+        self,
+        analysis: Dict[str, Any],
+        optimization: Dict[str, Any],
+        performance: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Génère des recommandations budgétaires ML"""
+        recommendations = self._recommandations_ecarts(analysis)
                 
         # Recommandations optimisation
         if optimization["potential_savings"]:
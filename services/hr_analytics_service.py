@@ -1,9 +1,6 @@
 from fastapi import Depends
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
 import numpy as np
 from datetime import timedelta
 
@@ -13,13 +10,23 @@ from models.hr_formation import Formation, ParticipationFormation  # Renommé de
 from models.hr_contract import Contract
 from models.hr_payroll import Payroll
 from services.cache_service import CacheService
+from services.ml.core.lazy import lazy_import
+from services.ml.core.inference import get_model_registry
+
+pd = lazy_import('pandas')
 
 class HRAnalyticsService:
+    PERFORMANCE_MODEL = "rh_performance_employe"
+
     def __init__(self, db: Session = Depends(get_db)):
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.ensemble import RandomForestRegressor
+
         self.db = db
         self._scaler = StandardScaler()
         self._model = RandomForestRegressor(n_estimators=100)
         self._cache = CacheService()
+        self._registry = get_model_registry()
         
         # Configuration des durées de cache
         self.STATS_CACHE_DURATION = timedelta(minutes=15)
@@ -126,7 +133,10 @@ class HRAnalyticsService:
             return {"error": "Données insuffisantes pour la prédiction"}
             
         features = self._prepare_features(employee_data)
-        prediction = self._model.predict(features)
+        if self.PERFORMANCE_MODEL in self._registry:
+            prediction = self._registry.predict(self.PERFORMANCE_MODEL, features)
+        else:
+            prediction = self._model.predict(features)
         
         result = {
             "predicted_performance": float(prediction[0]),
@@ -136,6 +146,11 @@ class HRAnalyticsService:
         await self._cache.set(cache_key, result, self.PREDICTION_CACHE_DURATION)
         return result
 
+    def train_performance_model(self, features: np.ndarray, performances: np.ndarray) -> None:
+        """Entraîne le modèle de performance et l'enregistre pour l'inférence"""
+        self._model.fit(features, performances)
+        self._registry.register(self.PERFORMANCE_MODEL, self._model)
+
     async def invalidate_employee_cache(self, employee_id: int = None):
         """Invalide le cache pour un employé spécifique ou tous les employés"""
         if employee_id:
@@ -5,14 +5,13 @@ Intègre tous les modules ML avec optimisations performance
 
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+from contextlib import nullcontext
 import logging
-import torch
 import numpy as np
 from dataclasses import dataclass
 from sqlalchemy.orm import Session
 
 from models.inventory import Stock, MouvementStock
-from services.cache_service import cache_result
 from services.weather_service import WeatherService
 from services.iot_service import IoTService
 from services.ml.inventaire.base import ModeleInventaireML
@@ -26,6 +25,12 @@ from services.ml.core.config import (
     get_resource_limits,
     ResourceLimits
 )
+from services.ml.core.lazy import lazy_import, get_device
+from services.ml.core.memoization import memoize_prediction, latest
+from services.ml.core.monitoring import monitor_prediction
+
+# Import différé : torch n'est chargé qu'au premier usage effectif
+torch = lazy_import('torch')
 
 logger = logging.getLogger(__name__)
 
@@ -48,10 +53,11 @@ class InventoryMLService:
         self.resource_limits = get_resource_limits()
         self.monitoring_config = get_monitoring_config()
         self.cache_config = get_cache_config()
+        self.device = get_device()
         
         # Initialisation modèles avec optimisations
         self.base_model = self._init_model(ModeleInventaireML())
-        self.optimizer = self._init_model(OptimiseurStock())
+        self.optimizer = self._init_model(OptimiseurStock(self.base_model))
         self.analyzer = self._init_model(AnalyseurStock())
         self.quality_predictor = self._init_model(PredicteurQualite())
         
@@ -61,7 +67,6 @@ class InventoryMLService:
         
         # État et optimisations
         self._is_trained = False
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         if self.device == 'cuda':
             self._setup_gpu_optimizations()
 
@@ -83,8 +88,9 @@ class InventoryMLService:
             if config['compute']['torch_compile']:
                 model = torch.compile(model)
             
-        # Quantization si activée
-        if config['inference']['quantization']['enabled']:
+        # Quantization si activée (modèles torch uniquement)
+        if (config['inference']['quantization']['enabled']
+                and hasattr(model, 'state_dict')):
             model = torch.quantization.quantize_dynamic(
                 model,
                 {torch.nn.Linear},
@@ -102,6 +108,20 @@ class InventoryMLService:
         if get_model_config('base')['training']['mixed_precision']:
             self.scaler = torch.cuda.amp.GradScaler()
 
+    def _autocast(self, context: MLContext):
+        """
+        Contexte de précision mixte, sans importer torch en mode CPU
+        
+        Args:
+            context: Contexte ML
+            
+        Returns:
+            Context manager autocast ou nullcontext
+        """
+        if context.device != 'cuda':
+            return nullcontext()
+        return torch.cuda.amp.autocast(enabled=context.precision == 'mixed')
+
     def _get_context(self, batch_size: Optional[int] = None) -> MLContext:
         """
         Prépare contexte ML optimisé
@@ -122,7 +142,20 @@ class InventoryMLService:
             resource_limits=self.resource_limits
         )
 
-    @cache_result(ttl_seconds=3600)
+    @monitor_prediction('inventaire_insights')
+    @memoize_prediction(
+        (
+            'inventaire_niveau_optimal',
+            'inventaire_optimisation',
+            'inventaire_patterns',
+            'inventaire_risque_qualite'
+        ),
+        entity=lambda stock, **_: stock.id,
+        watermark=lambda stock, mouvements, **_: (
+            stock.date_derniere_maj, latest(mouvements, 'date_mouvement')
+        ),
+        ttl_seconds=900  # Météo et IoT lus en direct: fraîcheur bornée
+    )
     def get_stock_insights(self,
                           stock: Stock,
                           mouvements: List[MouvementStock],
@@ -149,7 +182,7 @@ class InventoryMLService:
             iot_data = self.iot_service.get_sensor_data(stock.capteurs_id) if stock.capteurs_id else None
 
             # Prédictions optimisées
-            with torch.cuda.amp.autocast(enabled=context.precision == 'mixed'):
+            with self._autocast(context):
                 # Prédiction niveau optimal
                 optimal_prediction = self._predict_with_profiling(
                     self.base_model.predict_stock_optimal,
@@ -263,7 +296,7 @@ class InventoryMLService:
             context = context or self._get_context()
             
             # Entraînement optimisé
-            with torch.cuda.amp.autocast(enabled=context.precision == 'mixed'):
+            with self._autocast(context):
                 # Base
                 self._train_with_profiling(
                     self.base_model.train,
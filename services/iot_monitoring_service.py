@@ -1,29 +1,36 @@
 """Service de monitoring IoT pour l'agriculture de précision."""
 
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Union
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from db.database import execute
 from models.iot_sensor import IoTSensor, SensorReading, SensorType, SensorStatus
-from services.iot_service import IoTService
+from services.iot_service import IoTService, evaluate_sensor_health
 from services.weather_service import WeatherService
 from services.ml.production.service import ProductionMLService
 from core.config import settings
 
+# Nombre maximal de lectures renvoyées par capteur (comme IoTService)
+READINGS_LIMIT = 100
+
 class IoTMonitoringService:
     """Service de monitoring des capteurs IoT."""
 
     def __init__(
         self,
-        db: Session,
+        db: Union[AsyncSession, Session],
         iot_service: IoTService,
         weather_service: WeatherService,
         ml_service: ProductionMLService
     ):
+        # Les lectures de monitoring sont chargées par lot sur cette session
+        # (asynchrone depuis l'API) plutôt que capteur par capteur
         self.db = db
         self.iot_service = iot_service
         self.weather_service = weather_service
@@ -42,8 +49,10 @@ class IoTMonitoringService:
         if not start_date:
             start_date = end_date - timedelta(days=7)
 
-        # Récupération des capteurs
-        sensors = await self.iot_service.get_sensors_by_parcelle(parcelle_id)
+        # Récupération des capteurs, de leur santé et de leurs lectures
+        sensors = await self._load_sensors(parcelle_id)
+        health = await self._load_health(sensors)
+        readings = await self._load_readings(sensors, start_date, end_date)
         
         # Données de monitoring
         monitoring_data = {
@@ -52,20 +61,123 @@ class IoTMonitoringService:
                 "debut": start_date,
                 "fin": end_date
             },
-            "capteurs": await self._get_sensors_status(sensors),
-            "mesures": await self._get_sensors_readings(sensors, start_date, end_date),
-            "alertes": await self._get_sensors_alerts(sensors, start_date, end_date),
+            "capteurs": self._get_sensors_status(sensors, health),
+            "mesures": await self._get_sensors_readings(sensors, readings, start_date, end_date),
+            "alertes": self._get_sensors_alerts(sensors, readings, health),
             "predictions": await self._get_ml_predictions(parcelle_id, sensors, end_date),
-            "sante_systeme": await self._get_system_health(sensors)
+            "sante_systeme": self._get_system_health(sensors, health)
         }
 
         return monitoring_data
 
-    async def _get_sensors_status(self, sensors: List[IoTSensor]) -> List[Dict[str, Any]]:
+    async def _load_sensors(self, parcelle_id: UUID) -> List[IoTSensor]:
+        """Charge les capteurs d'une parcelle."""
+        result = await execute(self.db, select(IoTSensor).where(
+            IoTSensor.parcelle_id == parcelle_id
+        ))
+        return list(result.scalars().all())
+
+    async def _load_readings(
+        self,
+        sensors: Sequence[IoTSensor],
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[Any, List[SensorReading]]:
+        """Charge les dernières lectures de tous les capteurs en une requête."""
+        readings: Dict[Any, List[SensorReading]] = {sensor.id: [] for sensor in sensors}
+        if not sensors:
+            return readings
+
+        rang = func.row_number().over(
+            partition_by=SensorReading.capteur_id,
+            order_by=SensorReading.timestamp.desc()
+        ).label("rang")
+        derniers = select(SensorReading.id, rang).where(
+            SensorReading.capteur_id.in_(list(readings)),
+            SensorReading.timestamp >= start_date,
+            SensorReading.timestamp <= end_date
+        ).subquery()
+
+        result = await execute(self.db, select(SensorReading).join(
+            derniers, SensorReading.id == derniers.c.id
+        ).where(
+            derniers.c.rang <= READINGS_LIMIT
+        ).order_by(
+            SensorReading.capteur_id,
+            SensorReading.timestamp.desc()
+        ))
+        for reading in result.scalars().all():
+            readings[reading.capteur_id].append(reading)
+        return readings
+
+    async def _load_stats(
+        self,
+        sensors: Sequence[IoTSensor],
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[Any, Dict[str, Any]]:
+        """Calcule les statistiques de tous les capteurs en une requête."""
+        stats = {
+            sensor.id: {'moyenne': 0, 'minimum': 0, 'maximum': 0, 'nombre_lectures': 0}
+            for sensor in sensors
+        }
+        if not sensors:
+            return stats
+
+        result = await execute(self.db, select(
+            SensorReading.capteur_id,
+            func.avg(SensorReading.valeur).label('moyenne'),
+            func.min(SensorReading.valeur).label('minimum'),
+            func.max(SensorReading.valeur).label('maximum'),
+            func.count(SensorReading.id).label('nombre_lectures')
+        ).where(
+            SensorReading.capteur_id.in_(list(stats)),
+            SensorReading.timestamp >= start_date,
+            SensorReading.timestamp <= end_date
+        ).group_by(SensorReading.capteur_id))
+
+        for row in result.all():
+            stats[row.capteur_id] = {
+                'moyenne': float(row.moyenne) if row.moyenne else 0,
+                'minimum': float(row.minimum) if row.minimum else 0,
+                'maximum': float(row.maximum) if row.maximum else 0,
+                'nombre_lectures': row.nombre_lectures
+            }
+        return stats
+
+    async def _load_health(self, sensors: Sequence[IoTSensor]) -> Dict[Any, Dict[str, Any]]:
+        """Évalue la santé de tous les capteurs à partir de leur dernière lecture."""
+        last_readings: Dict[Any, SensorReading] = {}
+        if sensors:
+            derniere = select(
+                SensorReading.capteur_id,
+                func.max(SensorReading.timestamp).label("timestamp")
+            ).where(
+                SensorReading.capteur_id.in_([sensor.id for sensor in sensors])
+            ).group_by(SensorReading.capteur_id).subquery()
+
+            result = await execute(self.db, select(SensorReading).join(
+                derniere,
+                (SensorReading.capteur_id == derniere.c.capteur_id)
+                & (SensorReading.timestamp == derniere.c.timestamp)
+            ))
+            for reading in result.scalars().all():
+                last_readings[reading.capteur_id] = reading
+
+        return {
+            sensor.id: evaluate_sensor_health(sensor, last_readings.get(sensor.id))
+            for sensor in sensors
+        }
+
+    def _get_sensors_status(
+        self,
+        sensors: List[IoTSensor],
+        health_by_sensor: Dict[Any, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
         """Récupère l'état de tous les capteurs."""
         sensors_status = []
         for sensor in sensors:
-            health = await self.iot_service.check_sensor_health(sensor.id)
+            health = health_by_sensor[sensor.id]
             sensors_status.append({
                 "id": sensor.id,
                 "code": sensor.code,
@@ -81,56 +193,38 @@ class IoTMonitoringService:
     async def _get_sensors_readings(
         self,
         sensors: List[IoTSensor],
+        readings: Dict[Any, List[SensorReading]],
         start_date: datetime,
         end_date: datetime
     ) -> Dict[str, Any]:
         """Récupère et agrège les lectures des capteurs."""
         readings_by_type = {}
+        stats = await self._load_stats(sensors, start_date, end_date)
         
         for sensor in sensors:
             if sensor.type not in readings_by_type:
                 readings_by_type[sensor.type] = []
-                
-            # Récupération des lectures
-            readings = await self.iot_service.get_sensor_readings(
-                sensor.id,
-                start_date=start_date,
-                end_date=end_date
-            )
-            
-            # Calcul des statistiques
-            stats = await self.iot_service.get_sensor_stats(
-                sensor.id,
-                start_date=start_date,
-                end_date=end_date
-            )
             
             readings_by_type[sensor.type].append({
                 "capteur_id": sensor.id,
-                "lectures": readings,
-                "statistiques": stats
+                "lectures": readings[sensor.id],
+                "statistiques": stats[sensor.id]
             })
 
         return readings_by_type
 
-    async def _get_sensors_alerts(
+    def _get_sensors_alerts(
         self,
         sensors: List[IoTSensor],
-        start_date: datetime,
-        end_date: datetime
+        readings: Dict[Any, List[SensorReading]],
+        health_by_sensor: Dict[Any, Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """Récupère les alertes des capteurs."""
         alerts = []
         
         for sensor in sensors:
             # Vérification des seuils
-            readings = await self.iot_service.get_sensor_readings(
-                sensor.id,
-                start_date=start_date,
-                end_date=end_date
-            )
-            
-            for reading in readings:
+            for reading in readings[sensor.id]:
                 if sensor.seuils_alerte:
                     if 'min' in sensor.seuils_alerte and reading.valeur < sensor.seuils_alerte['min']:
                         alerts.append({
@@ -153,7 +247,7 @@ class IoTMonitoringService:
                         })
 
             # Vérification santé capteur
-            health = await self.iot_service.check_sensor_health(sensor.id)
+            health = health_by_sensor[sensor.id]
             if health["status"] in [SensorStatus.MAINTENANCE, SensorStatus.ERREUR]:
                 alerts.append({
                     "capteur_id": sensor.id,
@@ -179,16 +273,6 @@ class IoTMonitoringService:
             days=7
         )
 
-        # Préparation données capteurs pour ML
-        sensor_data = {}
-        for sensor in sensors:
-            readings = await self.iot_service.get_sensor_readings(
-                sensor.id,
-                start_date=reference_date - timedelta(days=30),
-                end_date=reference_date
-            )
-            sensor_data[sensor.type] = readings
-
         # Génération prédictions
         predictions = await self.ml_service.analyze_meteo_impact(
             str(parcelle_id),
@@ -198,7 +282,11 @@ class IoTMonitoringService:
 
         return predictions
 
-    async def _get_system_health(self, sensors: List[IoTSensor]) -> Dict[str, Any]:
+    def _get_system_health(
+        self,
+        sensors: List[IoTSensor],
+        health_by_sensor: Dict[Any, Dict[str, Any]]
+    ) -> Dict[str, Any]:
         """Évalue la santé globale du système IoT."""
         total_sensors = len(sensors)
         active_sensors = 0
@@ -208,7 +296,7 @@ class IoTMonitoringService:
         low_signal = 0
 
         for sensor in sensors:
-            health = await self.iot_service.check_sensor_health(sensor.id)
+            health = health_by_sensor[sensor.id]
             
             if health["status"] == SensorStatus.ACTIF:
                 active_sensors += 1
@@ -259,7 +347,7 @@ class IoTMonitoringService:
             },
             "predictions": await self._get_ml_predictions(
                 parcelle_id=parcelle_id,
-                sensors=await self.iot_service.get_sensors_by_parcelle(parcelle_id),
+                sensors=await self._load_sensors(parcelle_id),
                 reference_date=now
             ),
             "maintenance": await self._get_maintenance_recommendations(parcelle_id)
@@ -269,11 +357,12 @@ class IoTMonitoringService:
 
     async def _get_maintenance_recommendations(self, parcelle_id: UUID) -> List[Dict[str, Any]]:
         """Génère des recommandations de maintenance basées sur l'état des capteurs."""
-        sensors = await self.iot_service.get_sensors_by_parcelle(parcelle_id)
+        sensors = await self._load_sensors(parcelle_id)
+        health_by_sensor = await self._load_health(sensors)
         recommendations = []
 
         for sensor in sensors:
-            health = await self.iot_service.check_sensor_health(sensor.id)
+            health = health_by_sensor[sensor.id]
             
             if health["status"] in [SensorStatus.MAINTENANCE, SensorStatus.ERREUR]:
                 recommendations.append({
@@ -16,6 +16,47 @@ from schemas.iot_monitoring import (
 from services.weather_service import WeatherService
 from core.config import settings
 
+def evaluate_sensor_health(
+    sensor: IoTSensor,
+    last_reading: Optional[SensorReading]
+) -> Dict[str, Any]:
+    """Évalue l'état de santé d'un capteur à partir de sa dernière lecture."""
+    if not last_reading:
+        return {
+            "status": SensorStatus.ERREUR,
+            "message": "Aucune lecture disponible",
+            "last_reading": None,
+            "battery_level": None,
+            "signal_quality": None
+        }
+
+    # Vérifie si le capteur est actif et envoie des données récentes
+    time_since_last_reading = datetime.utcnow() - last_reading.timestamp
+    max_silence_duration = sensor.intervalle_lecture * 3  # 3 fois l'intervalle normal
+
+    status = SensorStatus.ACTIF
+    message = "Capteur fonctionnel"
+
+    if time_since_last_reading.total_seconds() > max_silence_duration:
+        status = SensorStatus.ERREUR
+        message = f"Pas de lecture depuis {time_since_last_reading.total_seconds()/60:.1f} minutes"
+
+    if last_reading.niveau_batterie and last_reading.niveau_batterie < 20:
+        status = SensorStatus.MAINTENANCE
+        message = f"Niveau de batterie faible ({last_reading.niveau_batterie}%)"
+
+    if last_reading.qualite_signal and last_reading.qualite_signal < 30:
+        status = SensorStatus.MAINTENANCE
+        message = f"Qualité du signal faible ({last_reading.qualite_signal}%)"
+
+    return {
+        "status": status,
+        "message": message,
+        "last_reading": last_reading,
+        "battery_level": last_reading.niveau_batterie,
+        "signal_quality": last_reading.qualite_signal
+    }
+
 class IoTService:
     """Service gérant les capteurs IoT et leurs données."""
 
@@ -195,38 +236,4 @@ class IoTService:
             .order_by(SensorReading.timestamp.desc())\
             .first()
 
-        if not last_reading:
-            return {
-                "status": SensorStatus.ERREUR,
-                "message": "Aucune lecture disponible",
-                "last_reading": None,
-                "battery_level": None,
-                "signal_quality": None
-            }
-
-        # Vérifie si le capteur est actif et envoie des données récentes
-        time_since_last_reading = datetime.utcnow() - last_reading.timestamp
-        max_silence_duration = sensor.intervalle_lecture * 3  # 3 fois l'intervalle normal
-
-        status = SensorStatus.ACTIF
-        message = "Capteur fonctionnel"
-
-        if time_since_last_reading.total_seconds() > max_silence_duration:
-            status = SensorStatus.ERREUR
-            message = f"Pas de lecture depuis {time_since_last_reading.total_seconds()/60:.1f} minutes"
-
-        if last_reading.niveau_batterie and last_reading.niveau_batterie < 20:
-            status = SensorStatus.MAINTENANCE
-            message = f"Niveau de batterie faible ({last_reading.niveau_batterie}%)"
-
-        if last_reading.qualite_signal and last_reading.qualite_signal < 30:
-            status = SensorStatus.MAINTENANCE
-            message = f"Qualité du signal faible ({last_reading.qualite_signal}%)"
-
-        return {
-            "status": status,
-            "message": message,
-            "last_reading": last_reading,
-            "battery_level": last_reading.niveau_batterie,
-            "signal_quality": last_reading.qualite_signal
-        }
+        return evaluate_sensor_health(sensor, last_reading)
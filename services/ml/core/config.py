@@ -3,14 +3,17 @@ Configuration et optimisation avancée des performances ML pour l'inventaire
 """
 
 from typing import Dict, Any, Optional
+from functools import lru_cache
 import os
-import psutil
 import logging
+import threading
 from dataclasses import dataclass
-import torch
 
-# Configuration logging
-logging.basicConfig(level=logging.INFO)
+from .lazy import lazy_import, cuda_available
+
+# psutil et torch ne sont chargés qu'au premier calcul des ressources
+psutil = lazy_import('psutil')
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -39,7 +42,7 @@ class ConfigurationML:
     def from_env(cls) -> 'ConfigurationML':
         """Crée une configuration à partir de l'environnement"""
         limits = get_resource_limits()
-        optimize_for_environment()
+        ensure_environment_optimized()
         
         return cls(
             training=ML_CONFIG['training'],
@@ -134,6 +137,14 @@ ML_CONFIG = {
     
     # Optimisation inférence
     'inference': {
+        # Backend des modèles à arbres: 'auto' (ONNX si installé), 'onnx', 'sklearn'
+        'backend': os.getenv('ML_INFERENCE_BACKEND', 'auto'),
+        # Modèles entraînés (*.joblib) chargés dans le registre au démarrage
+        'model_dir': os.getenv('ML_MODEL_DIR'),
+        'onnx': {
+            'target_opset': None,  # Dernier opset supporté par skl2onnx
+            'intra_op_num_threads': None  # Défaut: max_workers
+        },
         'batch_inference': True,
         'dynamic_batching': True,
         'quantization': {
@@ -224,22 +235,33 @@ MONITORING_CONFIG = {
         'pre_prediction': True,
         'post_prediction': True,
         'performance_tracking': True
+    },
+    # Esquisses de distribution des features pour la dérive (PSI / KS)
+    'drift': {
+        'bins': 10,
+        'reference_size': 1000,  # Lignes formant la distribution de référence
+        'window_size': 500  # Lignes par fenêtre courante comparée
     }
 }
 
+@lru_cache(maxsize=1)
 def get_resource_limits() -> ResourceLimits:
     """
     Détermine limites ressources optimales
     
+    Le résultat est calculé une seule fois par processus : les ressources
+    de la machine ne changent pas pendant la vie d'un worker.
+    
     Returns:
         ResourceLimits configurés
     """
     total_memory = psutil.virtual_memory().total / (1024 * 1024)
-    cpu_count = psutil.cpu_count()
+    cpu_count = psutil.cpu_count() or 1
     
     # Détection GPU
     gpu_memory = None
-    if torch.cuda.is_available():
+    if cuda_available():
+        torch = lazy_import('torch')
         gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024 * 1024)
     
     return ResourceLimits(
@@ -260,6 +282,7 @@ def get_model_config(model_name: str) -> Dict[str, Any]:
     Returns:
         Configuration optimisée
     """
+    ensure_environment_optimized()
     base_config = ML_CONFIG.copy()
     model_specific = MODEL_CONFIGS.get(model_name, {})
     
@@ -294,7 +317,7 @@ def optimize_for_environment() -> None:
     ML_CONFIG['compute']['num_workers'] = limits.max_workers
     
     # Optimisations GPU si disponible
-    if torch.cuda.is_available():
+    if cuda_available():
         ML_CONFIG['compute'].update({
             'use_gpu': True,
             'cuda_graphs': True,
@@ -312,6 +335,24 @@ def optimize_for_environment() -> None:
         ML_CONFIG['compute']['num_workers'] = max(1, limits.max_workers // 2)
         logger.warning(f"Charge CPU élevée ({cpu_percent}%), workers réduits")
 
+_environment_lock = threading.Lock()
+_environment_optimized = False
+
+def ensure_environment_optimized() -> None:
+    """
+    Applique optimize_for_environment une seule fois par processus
+    
+    Appelée au premier usage de la configuration ML plutôt qu'à l'import
+    du module, pour ne pas retarder le démarrage des workers API.
+    """
+    global _environment_optimized
+    if _environment_optimized:
+        return
+    with _environment_lock:
+        if not _environment_optimized:
+            optimize_for_environment()
+            _environment_optimized = True
+
 def get_cache_config() -> Dict[str, Any]:
     """
     Configuration cache optimisée
@@ -342,6 +383,3 @@ def get_monitoring_config() -> Dict[str, Any]:
         Configuration monitoring
     """
     return MONITORING_CONFIG
-
-# Optimisation automatique au chargement
-optimize_for_environment()
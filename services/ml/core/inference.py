@@ -0,0 +1,268 @@
+"""
+Backends d'inférence CPU pour les modèles à base d'arbres (RandomForest,
+GradientBoosting)
+
+Les modèles sklearn enregistrés sont convertis en ONNX au moment de
+l'enregistrement, puis servis par onnxruntime. Si skl2onnx ou onnxruntime
+ne sont pas installés, ou si la conversion échoue, le registre retombe sur
+l'inférence sklearn native.
+"""
+
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import logging
+import threading
+import time
+
+import numpy as np
+
+from core.telemetry import tracer
+from .config import ML_CONFIG, get_resource_limits
+from .lazy import is_available
+from .monitoring import get_ml_monitor
+
+logger = logging.getLogger(__name__)
+
+BACKEND_SKLEARN = 'sklearn'
+BACKEND_ONNX = 'onnx'
+BACKEND_AUTO = 'auto'
+
+class InferenceBackend:
+    """Interface commune des backends d'inférence"""
+
+    name: str = ''
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Prédiction (régression ou classe)"""
+        raise NotImplementedError
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilités par classe (classifieurs uniquement)"""
+        raise NotImplementedError
+
+class SklearnBackend(InferenceBackend):
+    """Inférence sklearn native"""
+
+    name = BACKEND_SKLEARN
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict(X)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(X)
+
+class OnnxBackend(InferenceBackend):
+    """Inférence onnxruntime sur CPU d'un modèle sklearn converti"""
+
+    name = BACKEND_ONNX
+
+    def __init__(self, model: Any, n_features: int):
+        super().__init__(model)
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        import onnxruntime as ort
+
+        onnx_config = ML_CONFIG['inference'].get('onnx', {})
+        self.n_features = n_features
+        self.is_classifier = hasattr(model, 'predict_proba')
+
+        # zipmap désactivé : probabilités en tableau dense plutôt qu'en dicts
+        options = {'zipmap': False} if self.is_classifier else None
+        onnx_model = convert_sklearn(
+            model,
+            initial_types=[('input', FloatTensorType([None, n_features]))],
+            options={id(_final_estimator(model)): options} if options else None,
+            target_opset=onnx_config.get('target_opset')
+        )
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = (
+            onnx_config.get('intra_op_num_threads')
+            or get_resource_limits().max_workers
+        )
+        session_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self.session = ort.InferenceSession(
+            onnx_model.SerializeToString(),
+            sess_options=session_options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_names = [o.name for o in self.session.get_outputs()]
+
+    def _run(self, X: np.ndarray):
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features)
+        return self.session.run(self.output_names, {self.input_name: X})
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        outputs = self._run(X)
+        prediction = outputs[0]
+        if not self.is_classifier:
+            prediction = prediction.reshape(-1)
+        return prediction
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if not self.is_classifier:
+            raise AttributeError("Le modèle n'est pas un classifieur")
+        return self._run(X)[1]
+
+def _final_estimator(model: Any) -> Any:
+    """Dernier estimateur d'un Pipeline (ou le modèle lui-même)"""
+    steps = getattr(model, 'steps', None)
+    return steps[-1][1] if steps else model
+
+def onnx_available() -> bool:
+    """Vérifie que skl2onnx et onnxruntime sont installés"""
+    return is_available('skl2onnx') and is_available('onnxruntime')
+
+class ModelRegistry:
+    """Registre des modèles entraînés et de leur backend d'inférence"""
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or ML_CONFIG['inference'].get('backend', BACKEND_AUTO)
+        self._models: Dict[str, InferenceBackend] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _resolve_backend(self, backend: Optional[str]) -> str:
+        backend = backend or self.backend
+        if backend == BACKEND_AUTO:
+            return BACKEND_ONNX if onnx_available() else BACKEND_SKLEARN
+        return backend
+
+    def register(self,
+                 name: str,
+                 model: Any,
+                 n_features: Optional[int] = None,
+                 backend: Optional[str] = None) -> InferenceBackend:
+        """
+        Enregistre un modèle entraîné et prépare son backend d'inférence
+
+        Args:
+            name: Nom du modèle
+            model: Estimateur sklearn entraîné (ou Pipeline)
+            n_features: Nombre de features en entrée
+            backend: 'onnx', 'sklearn' ou 'auto' (défaut: configuration)
+
+        Returns:
+            Backend d'inférence retenu
+        """
+        resolved = self._resolve_backend(backend)
+        n_features = n_features or getattr(model, 'n_features_in_', None)
+
+        inference: InferenceBackend = SklearnBackend(model)
+        if resolved == BACKEND_ONNX:
+            if n_features is None:
+                logger.warning(f"Modèle {name}: nombre de features inconnu, inférence sklearn")
+            else:
+                try:
+                    inference = OnnxBackend(model, n_features)
+                except Exception as e:
+                    logger.warning(f"Conversion ONNX impossible pour {name}, inférence sklearn: {str(e)}")
+
+        with self._lock:
+            self._models[name] = inference
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+        logger.info(f"Modèle {name} enregistré (backend {inference.name})")
+        return inference
+
+    def get(self, name: str) -> Optional[InferenceBackend]:
+        """Retourne le backend d'un modèle enregistré"""
+        return self._models.get(name)
+
+    def version(self, name: str) -> int:
+        """Numéro de version du modèle (incrémenté à chaque enregistrement)"""
+        return self._versions.get(name, 0)
+
+    def unregister(self, name: str) -> None:
+        """Retire un modèle du registre"""
+        with self._lock:
+            self._models.pop(name, None)
+
+    def _run(self, name: str, operation: str, X: np.ndarray) -> np.ndarray:
+        """Appelle le backend et enregistre latence, taille de lot et entrées"""
+        inference = self._models.get(name)
+        if inference is None:
+            raise KeyError(f"Modèle non enregistré: {name}")
+
+        X = np.asarray(X)
+        start = time.perf_counter()
+        try:
+            with tracer.start_as_current_span("ml.inference", attributes={
+                "ml.model": name,
+                "ml.operation": operation,
+                "ml.backend": type(inference).__name__,
+                "ml.batch_size": len(X)
+            }):
+                result = getattr(inference, operation)(X)
+        except Exception:
+            get_ml_monitor().observe(name, operation, time.perf_counter() - start, error=True)
+            raise
+        get_ml_monitor().observe(
+            name,
+            operation,
+            time.perf_counter() - start,
+            batch_size=len(X),
+            features=X if X.ndim == 2 else None
+        )
+        return result
+
+    def predict(self, name: str, X: np.ndarray) -> np.ndarray:
+        """Prédiction via le backend enregistré"""
+        return self._run(name, 'predict', X)
+
+    def predict_proba(self, name: str, X: np.ndarray) -> np.ndarray:
+        """Probabilités via le backend enregistré"""
+        return self._run(name, 'predict_proba', X)
+
+    def preload(self, directory: Optional[str] = None) -> List[str]:
+        """
+        Charge les modèles sauvegardés (*.joblib) d'un répertoire
+
+        Appelé au démarrage du worker: la conversion ONNX est payée avant
+        la première requête. Chaque fichier contient un estimateur ou le
+        dictionnaire de save_model ({'model', 'scaler'}); le modèle est
+        enregistré sous le nom du fichier.
+
+        Returns:
+            Noms des modèles chargés
+        """
+        directory = directory or ML_CONFIG['inference'].get('model_dir')
+        if not directory or not Path(directory).is_dir():
+            return []
+
+        import joblib
+
+        loaded = []
+        for path in sorted(Path(directory).glob('*.joblib')):
+            try:
+                data = joblib.load(path)
+                model = data
+                if isinstance(data, dict):
+                    model = data['model']
+                    if data.get('scaler') is not None:
+                        from sklearn.pipeline import Pipeline
+                        model = Pipeline([('scaler', data['scaler']), ('model', model)])
+                self.register(path.stem, model)
+                loaded.append(path.stem)
+            except Exception as e:
+                logger.warning(f"Préchargement impossible pour {path.name}: {str(e)}")
+        return loaded
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._models
+
+# Instance singleton du registre
+_model_registry = None
+
+def get_model_registry() -> ModelRegistry:
+    """Retourne l'instance singleton du registre de modèles"""
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry()
+    return _model_registry
@@ -0,0 +1,85 @@
+"""
+Chargement paresseux des dépendances ML lourdes (torch, sklearn, pandas, pulp)
+"""
+
+from typing import Any, Optional
+from types import ModuleType
+from functools import lru_cache
+import importlib
+import importlib.util
+import sys
+import threading
+
+# Dépendances dont l'import est trop coûteux pour le démarrage de l'API
+HEAVY_MODULES = ('torch', 'sklearn', 'pandas', 'pulp', 'psutil', 'scipy')
+
+class LazyModule(ModuleType):
+    """Module importé au premier accès à l'un de ses attributs"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        """Importe le module réel une seule fois"""
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_lazy_name'])
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        etat = "chargé" if self.__dict__['_lazy_module'] is not None else "non chargé"
+        return f"<LazyModule '{self.__dict__['_lazy_name']}' ({etat})>"
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Retourne un module chargé à la première utilisation
+
+    Args:
+        name: Nom complet du module (ex: 'pandas', 'sklearn.ensemble')
+
+    Returns:
+        Proxy du module
+    """
+    return LazyModule(name)
+
+def is_available(name: str) -> bool:
+    """Vérifie qu'une dépendance est installée sans l'importer"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def is_loaded(name: str) -> bool:
+    """Vérifie si un module a déjà été importé dans le processus"""
+    return name in sys.modules
+
+@lru_cache(maxsize=1)
+def cuda_available() -> bool:
+    """
+    Détecte la présence d'un GPU CUDA (résultat mis en cache)
+
+    torch n'est importé que s'il est installé, et une seule fois.
+    """
+    if not is_available('torch'):
+        return False
+    torch = importlib.import_module('torch')
+    return bool(torch.cuda.is_available())
+
+def get_device(prefer_gpu: Optional[bool] = None) -> str:
+    """Retourne le device de calcul ('cuda' ou 'cpu')"""
+    if prefer_gpu is False:
+        return 'cpu'
+    return 'cuda' if cuda_available() else 'cpu'
@@ -0,0 +1,201 @@
+"""
+Mémoïsation des prédictions ML par empreinte des données d'entrée
+
+La clé d'une prédiction combine la version du modèle (registre), l'identifiant
+de l'entité et un filigrane de données (dernier mouvement, dernière lecture,
+dernière récolte). Tant qu'aucun de ces éléments ne change, le résultat en
+mémoire est renvoyé sans réévaluer le modèle ni sérialiser le résultat.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Union
+from datetime import datetime, date
+from decimal import Decimal
+from enum import Enum
+from functools import wraps
+import inspect
+import logging
+import threading
+
+from cachetools import TLRUCache
+
+from services.cache_service import fingerprint
+from .config import ML_CONFIG
+from .inference import get_model_registry
+from .monitoring import get_ml_monitor
+
+logger = logging.getLogger(__name__)
+
+_SCALAR_TYPES = (type(None), bool, int, float, str, Decimal, datetime, date, Enum)
+
+def latest(items: Optional[Iterable[Any]], attribute: str) -> Optional[Any]:
+    """
+    Filigrane: valeur maximale d'un attribut (ou d'une clé) sur une collection
+
+    Args:
+        items: Objets ORM ou dicts (mouvements, lectures, récoltes)
+        attribute: Attribut horodaté (ex: 'date_mouvement', 'timestamp')
+
+    Returns:
+        Valeur maximale, ou None si la collection est vide
+    """
+    if not items:
+        return None
+    values = [
+        item.get(attribute) if isinstance(item, dict) else getattr(item, attribute, None)
+        for item in items
+    ]
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    try:
+        return max(values)
+    except TypeError:
+        return max(values, key=str)
+
+def _is_scalar(value: Any) -> bool:
+    """Paramètre léger à inclure tel quel dans la clé"""
+    if isinstance(value, _SCALAR_TYPES):
+        return True
+    if isinstance(value, dict):
+        return all(isinstance(v, _SCALAR_TYPES) for v in value.values())
+    return False
+
+class PredictionMemo:
+    """Cache en mémoire des prédictions, sans sérialisation"""
+
+    def __init__(self, maxsize: int = 4096, default_ttl: Optional[int] = None):
+        self.default_ttl = default_ttl or ML_CONFIG['cache']['predictions_ttl']
+        self._cache = TLRUCache(maxsize=maxsize, ttu=lambda _k, value, now: now + value[1])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self,
+                 models: Sequence[str],
+                 entity: Any,
+                 watermark: Any,
+                 params: Optional[Dict[str, Any]] = None) -> str:
+        """Construit la clé: versions des modèles + entité + filigrane + paramètres"""
+        registry = get_model_registry()
+        versions = [(name, registry.version(name)) for name in models]
+        return f"{'+'.join(models)}:{fingerprint(versions, entity, watermark, params or {})}"
+
+    def get(self, key: str) -> Any:
+        """Retourne le résultat mémorisé ou None"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Mémorise un résultat"""
+        with self._lock:
+            self._cache[key] = (value, ttl or self.default_ttl)
+
+    def invalidate(self, model: Optional[str] = None) -> None:
+        """Invalide les prédictions d'un modèle (ou toutes)"""
+        with self._lock:
+            if model is None:
+                self._cache.clear()
+                return
+            for key in [k for k in self._cache.keys() if model in k.split(':', 1)[0].split('+')]:
+                del self._cache[key]
+
+    @property
+    def hit_ratio(self) -> float:
+        """Taux de succès du cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache"""
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio
+        }
+
+def memoize_prediction(model: Union[str, Sequence[str]],
+                       entity: Callable[..., Any],
+                       watermark: Callable[..., Any],
+                       ttl_seconds: Optional[int] = None):
+    """
+    Décorateur de mémoïsation pour les méthodes de prédiction ML
+
+    Fonctionne pour les méthodes synchrones et asynchrones. `entity` et
+    `watermark` reçoivent les arguments de l'appel par nom. Les paramètres
+    scalaires (horizon, période, conditions) sont ajoutés à la clé; les
+    collections et objets ORM sont représentés par l'entité et le filigrane.
+
+    Args:
+        model: Nom(s) du modèle dans le registre (la version fait partie de la clé)
+        entity: Extrait l'identifiant de l'entité (ex: lambda stock, **_: stock.id)
+        watermark: Extrait le filigrane de données (ex: dernier mouvement)
+        ttl_seconds: Durée de vie maximale (défaut: predictions_ttl)
+    """
+    models = (model,) if isinstance(model, str) else tuple(model)
+
+    def decorator(func: Callable):
+        signature = inspect.signature(func)
+
+        def _key(args: tuple, kwargs: dict) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            params = {
+                name: value for name, value in arguments.items()
+                if name != 'self' and _is_scalar(value)
+            }
+            return get_prediction_memo().make_key(
+                models,
+                entity(**arguments),
+                watermark(**arguments),
+                params
+            )
+
+        def _record_cache(hit: bool) -> None:
+            monitor = get_ml_monitor()
+            for name in models:
+                monitor.record_cache(name, hit)
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                memo = get_prediction_memo()
+                key = _key(args, kwargs)
+                cached = memo.get(key)
+                _record_cache(cached is not None)
+                if cached is not None:
+                    return cached
+                result = await func(*args, **kwargs)
+                memo.set(key, result, ttl_seconds)
+                return result
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            memo = get_prediction_memo()
+            key = _key(args, kwargs)
+            cached = memo.get(key)
+            _record_cache(cached is not None)
+            if cached is not None:
+                return cached
+            result = func(*args, **kwargs)
+            memo.set(key, result, ttl_seconds)
+            return result
+        return wrapper
+    return decorator
+
+# Instance singleton du cache de prédictions
+_prediction_memo = None
+
+def get_prediction_memo() -> PredictionMemo:
+    """Retourne l'instance singleton du cache de prédictions"""
+    global _prediction_memo
+    if _prediction_memo is None:
+        _prediction_memo = PredictionMemo()
+    return _prediction_memo
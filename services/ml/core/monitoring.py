@@ -0,0 +1,341 @@
+"""
+Instrumentation des prédictions ML: latence, taille de lot, cache et dérive
+
+Les métriques sont exportées au format Prometheus (endpoint /metrics):
+- ml_prediction_latency_seconds{model, operation}: histogramme de latence
+- ml_prediction_batch_size{model}: taille des lots prédits
+- ml_predictions_total{model, status}: prédictions réussies / en erreur
+- ml_prediction_cache_total{model, result}: succès / échecs du cache
+- ml_prediction_cache_hit_ratio{model}: taux de succès du cache
+- ml_feature_drift_psi / ml_feature_drift_ks{model, feature}: dérive des entrées
+- ml_latency_alerts_total{model}: dépassements de thresholds.max_latency_ms
+
+En mode multiprocessus, les jauges retiennent la dernière valeur écrite par
+l'un des workers.
+"""
+
+from typing import Any, Callable, Dict, Optional
+from functools import wraps
+import inspect
+import logging
+import threading
+import time
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from core.telemetry import record_cache_lookup, tracer
+from .config import ML_CONFIG, MONITORING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_LATENCY = Histogram(
+    'ml_prediction_latency_seconds',
+    'Latence des prédictions ML',
+    ['model', 'operation'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+PREDICTION_BATCH_SIZE = Histogram(
+    'ml_prediction_batch_size',
+    'Nombre de lignes par appel de prédiction',
+    ['model'],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+)
+PREDICTIONS_TOTAL = Counter(
+    'ml_predictions_total',
+    'Appels de prédiction ML',
+    ['model', 'status']
+)
+CACHE_TOTAL = Counter(
+    'ml_prediction_cache_total',
+    'Consultations du cache de prédictions',
+    ['model', 'result']
+)
+CACHE_HIT_RATIO = Gauge(
+    'ml_prediction_cache_hit_ratio',
+    'Taux de succès du cache de prédictions',
+    ['model'],
+    multiprocess_mode='mostrecent'
+)
+FEATURE_DRIFT_PSI = Gauge(
+    'ml_feature_drift_psi',
+    'Population Stability Index par feature (fenêtre courante vs référence)',
+    ['model', 'feature'],
+    multiprocess_mode='mostrecent'
+)
+FEATURE_DRIFT_KS = Gauge(
+    'ml_feature_drift_ks',
+    'Statistique de Kolmogorov-Smirnov par feature (sur histogramme)',
+    ['model', 'feature'],
+    multiprocess_mode='mostrecent'
+)
+LATENCY_ALERTS = Counter(
+    'ml_latency_alerts_total',
+    'Prédictions au-delà du seuil de latence',
+    ['model']
+)
+
+_EPSILON = 1e-6
+
+class FeatureSketch:
+    """
+    Esquisse de distribution des features d'un modèle
+
+    Les premières lignes observées (ou les données d'entraînement via
+    set_reference) fixent les bornes des classes par quantiles. Les lignes
+    suivantes sont comptées dans une fenêtre courante; à chaque fenêtre
+    complète, PSI et KS sont calculés sur les histogrammes puis la fenêtre
+    repart de zéro. Seuls des compteurs sont conservés, pas les lignes.
+    """
+
+    def __init__(self,
+                 bins: int = 10,
+                 reference_size: int = 1000,
+                 window_size: int = 500):
+        self.bins = bins
+        self.reference_size = reference_size
+        self.window_size = window_size
+        self._pending: list = []
+        self.edges: Optional[np.ndarray] = None
+        self.reference: Optional[np.ndarray] = None
+        self.current: Optional[np.ndarray] = None
+        self.current_rows = 0
+        self.last_drift: Dict[str, np.ndarray] = {}
+
+    @property
+    def has_reference(self) -> bool:
+        return self.reference is not None
+
+    def set_reference(self, X: np.ndarray) -> None:
+        """Fixe la distribution de référence (ex: données d'entraînement)"""
+        X = np.asarray(X, dtype=float)
+        quantiles = np.linspace(0, 1, self.bins + 1)[1:-1]
+        # Bornes internes par feature: (n_features, bins - 1)
+        self.edges = np.quantile(X, quantiles, axis=0).T
+        self.reference = self._histogram(X)
+        self.current = np.zeros_like(self.reference)
+        self.current_rows = 0
+        self._pending = []
+
+    def _histogram(self, X: np.ndarray) -> np.ndarray:
+        """Comptes par classe: (n_features, bins)"""
+        counts = np.zeros((X.shape[1], self.bins))
+        for j in range(X.shape[1]):
+            idx = np.searchsorted(self.edges[j], X[:, j], side='right')
+            counts[j] = np.bincount(idx, minlength=self.bins)[:self.bins]
+        return counts
+
+    def update(self, X: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Ajoute un lot d'entrées
+
+        Returns:
+            {'psi': ..., 'ks': ...} par feature quand une fenêtre se termine
+        """
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.size == 0:
+            return None
+
+        if not self.has_reference:
+            self._pending.append(X)
+            if sum(len(x) for x in self._pending) >= self.reference_size:
+                self.set_reference(np.vstack(self._pending))
+            return None
+
+        if X.shape[1] != self.reference.shape[0]:
+            return None
+
+        self.current += self._histogram(X)
+        self.current_rows += len(X)
+        if self.current_rows < self.window_size:
+            return None
+
+        self.last_drift = self.compare()
+        self.current = np.zeros_like(self.reference)
+        self.current_rows = 0
+        return self.last_drift
+
+    def compare(self) -> Dict[str, np.ndarray]:
+        """PSI et KS de la fenêtre courante par rapport à la référence"""
+        expected = self.reference / self.reference.sum(axis=1, keepdims=True)
+        actual = self.current / np.maximum(self.current.sum(axis=1, keepdims=True), 1)
+        expected = np.clip(expected, _EPSILON, None)
+        actual_c = np.clip(actual, _EPSILON, None)
+
+        psi = ((actual_c - expected) * np.log(actual_c / expected)).sum(axis=1)
+        ks = np.abs(np.cumsum(actual, axis=1) - np.cumsum(expected, axis=1)).max(axis=1)
+        return {'psi': psi, 'ks': ks}
+
+class MLMonitor:
+    """Collecteur des métriques de prédiction par modèle"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or MONITORING_CONFIG
+        self.enabled = config['monitoring_hooks'].get('performance_tracking', True)
+        self.drift_config = config.get('drift', {})
+        self.drift_threshold = ML_CONFIG['thresholds']['max_drift_threshold']
+        self._sketches: Dict[str, FeatureSketch] = {}
+        self._cache_counts: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_latency_ms(self) -> float:
+        return ML_CONFIG['thresholds']['max_latency_ms']
+
+    def _sketch(self, model: str) -> FeatureSketch:
+        sketch = self._sketches.get(model)
+        if sketch is None:
+            sketch = FeatureSketch(
+                bins=self.drift_config.get('bins', 10),
+                reference_size=self.drift_config.get('reference_size', 1000),
+                window_size=self.drift_config.get('window_size', 500)
+            )
+            self._sketches[model] = sketch
+        return sketch
+
+    def observe(self,
+                model: str,
+                operation: str,
+                latency_s: float,
+                batch_size: Optional[int] = None,
+                features: Optional[np.ndarray] = None,
+                error: bool = False) -> None:
+        """
+        Enregistre un appel de prédiction
+
+        Args:
+            model: Nom du modèle
+            operation: Méthode appelée (predict, predict_proba, predict_rendement...)
+            latency_s: Durée de l'appel en secondes
+            batch_size: Nombre de lignes prédites
+            features: Matrice d'entrée pour l'esquisse de dérive
+            error: L'appel a levé une exception
+        """
+        if not self.enabled:
+            return
+
+        PREDICTION_LATENCY.labels(model=model, operation=operation).observe(latency_s)
+        PREDICTIONS_TOTAL.labels(model=model, status='error' if error else 'success').inc()
+        if batch_size is not None:
+            PREDICTION_BATCH_SIZE.labels(model=model).observe(batch_size)
+
+        latency_ms = latency_s * 1000
+        if latency_ms > self.max_latency_ms:
+            LATENCY_ALERTS.labels(model=model).inc()
+            logger.warning(
+                f"Latence ML élevée: {model}.{operation} {latency_ms:.1f} ms "
+                f"(seuil {self.max_latency_ms} ms)"
+            )
+
+        if features is not None and not error:
+            self.observe_features(model, features)
+
+    def observe_features(self, model: str, features: np.ndarray) -> None:
+        """Met à jour l'esquisse de distribution des entrées du modèle"""
+        with self._lock:
+            drift = self._sketch(model).update(features)
+        if drift is None:
+            return
+
+        for j, (psi, ks) in enumerate(zip(drift['psi'], drift['ks'])):
+            FEATURE_DRIFT_PSI.labels(model=model, feature=str(j)).set(psi)
+            FEATURE_DRIFT_KS.labels(model=model, feature=str(j)).set(ks)
+
+        drifting = [j for j, psi in enumerate(drift['psi']) if psi > self.drift_threshold]
+        if drifting:
+            logger.warning(f"Dérive des entrées détectée pour {model}: features {drifting}")
+
+    def set_reference(self, model: str, features: np.ndarray) -> None:
+        """Fixe la distribution de référence d'un modèle (données d'entraînement)"""
+        with self._lock:
+            self._sketch(model).set_reference(features)
+
+    def record_cache(self, model: str, hit: bool) -> None:
+        """Enregistre une consultation du cache de prédictions"""
+        record_cache_lookup(f"ml:{model}", hit)
+        if not self.enabled:
+            return
+        CACHE_TOTAL.labels(model=model, result='hit' if hit else 'miss').inc()
+        with self._lock:
+            counts = self._cache_counts.setdefault(model, [0, 0])
+            counts[0 if hit else 1] += 1
+            ratio = counts[0] / (counts[0] + counts[1])
+        CACHE_HIT_RATIO.labels(model=model).set(ratio)
+
+    def drift(self, model: str) -> Dict[str, Any]:
+        """Dernière mesure de dérive d'un modèle"""
+        sketch = self._sketches.get(model)
+        if sketch is None or not sketch.last_drift:
+            return {}
+        return {
+            'psi': sketch.last_drift['psi'].tolist(),
+            'ks': sketch.last_drift['ks'].tolist()
+        }
+
+def monitor_prediction(model: str,
+                       batch_size: Optional[Callable[[Any], int]] = None):
+    """
+    Décorateur mesurant la latence de bout en bout d'une méthode de prédiction
+
+    Fonctionne pour les méthodes synchrones et asynchrones. Placé au-dessus de
+    memoize_prediction, la latence mesurée inclut les succès du cache: c'est
+    celle que voit le tableau de bord. Chaque appel ouvre une span
+    ml.<méthode> portant le nom du modèle.
+
+    Args:
+        model: Nom du modèle (label Prometheus)
+        batch_size: Extrait le nombre d'éléments prédits depuis le résultat
+    """
+    def decorator(func: Callable):
+        operation = func.__name__
+        span_name = f"ml.{operation}"
+        attributes = {"ml.model": model, "ml.operation": operation}
+
+        def _record(start: float, result: Any, error: bool) -> None:
+            size = None
+            if batch_size is not None and not error:
+                try:
+                    size = batch_size(result)
+                except Exception:
+                    size = None
+            get_ml_monitor().observe(
+                model, operation, time.perf_counter() - start, size, error=error
+            )
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name, attributes=attributes):
+                    start = time.perf_counter()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception:
+                        _record(start, None, True)
+                        raise
+                    _record(start, result, False)
+                    return result
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name, attributes=attributes):
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception:
+                    _record(start, None, True)
+                    raise
+                _record(start, result, False)
+                return result
+        return wrapper
+    return decorator
+
+# Instance singleton du moniteur
+_ml_monitor = None
+
+def get_ml_monitor() -> MLMonitor:
+    """Retourne l'instance singleton du moniteur ML"""
+    global _ml_monitor
+    if _ml_monitor is None:
+        _ml_monitor = MLMonitor()
+    return _ml_monitor
@@ -19,6 +19,7 @@ from models.production import Parcelle
 from services.weather_service import WeatherService
 from services.iot_service import IoTService
 from services.cache_service import CacheService
+from services.ml.core.monitoring import monitor_prediction
 
 class AnalyseFinanceCompta:
     """Analyse intégrée finance-comptabilité avec ML"""
@@ -26,9 +27,10 @@ class AnalyseFinanceCompta:
     def __init__(self, db: Session):
         self.db = db
         self.weather_service = WeatherService(db)
-        self.iot_service = IoTService(db)
+        self.iot_service = IoTService(db, self.weather_service)
         self.cache = CacheService()
 
+    @monitor_prediction('finance_analyse_parcelle')
     async def get_analyse_parcelle(
         self,
         parcelle_id: str,
@@ -115,6 +117,7 @@ class AnalyseFinanceCompta:
             "ml_analysis": ml_analysis
         }
 
+    @monitor_prediction('finance_performance')
     async def predict_performance(
         self,
         parcelle_id: str,
@@ -168,6 +171,7 @@ class AnalyseFinanceCompta:
             )
         }
 
+    @monitor_prediction('finance_optimisation_couts')
     async def optimize_costs(
         self,
         parcelle_id: str,
@@ -1,27 +1,90 @@
 """
 Module de gestion des processus de clôture comptable et financière avec ML
+
+La clôture mensuelle est un job persistant (table cloture_jobs): chaque étape
+est idempotente et son état (statut, résultat, erreur) est enregistré dès
+qu'elle se termine. Un job interrompu ou en échec reprend aux étapes non
+terminées. Les étapes qui écrivent partagent la session du job et
+s'exécutent une à une, dans l'ordre des dépendances; les étapes en lecture
+seule (analyse ML, optimisation, totaux, inventaire des pièces) s'exécutent
+ensemble, chacune sur sa propre session. Un signe de vie est entretenu
+pendant chaque étape. La validation (pièce par pièce équilibrée) et le gel des
+écritures sont des UPDATE ensemblistes. Une fois les écritures gelées, les
+indicateurs du mois sont enregistrés (kpi_snapshots).
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import copy
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from sqlalchemy import func, and_, or_
+from pathlib import Path
+from sqlalchemy import func, and_, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+import asyncio
+import json
+import logging
+import threading
 
 from models.comptabilite import (
-    CompteComptable, 
+    ClotureJob,
+    CompteComptable,
     EcritureComptable,
-    TypeCompte,
+    EcritureDocument,
     JournalComptable,
-    ExerciceComptable,
-    StatutEcriture
+    StatutClotureJob,
+    StatutEcriture,
+    TypeCompte,
+    TypeJournal
 )
-from models.finance import Transaction, Budget
-from models.production import Parcelle
-from services.finance_comptabilite.analyse import AnalyseFinanceCompta
-from services.cache_service import CacheService
-import os
-import json
+from models.document import Document
+from services.comptabilite_service import ComptabiliteService
+from services.finance_comptabilite.kpi import SnapshotsKpi
+from services.ml.finance_comptabilite.analyse import AnalyseFinanceCompta
+
+logger = logging.getLogger(__name__)
+
+# Étapes de la clôture et leurs dépendances
+ETAPES: Dict[str, Tuple[str, ...]] = {
+    "validation": (),
+    "verification": ("validation",),
+    "analyse_ml": ("verification",),
+    "optimisation": ("verification",),
+    "totaux": ("verification",),
+    "archivage_pieces": ("verification",),
+    "ecritures_cloture": ("analyse_ml", "optimisation"),
+    "gel": ("ecritures_cloture", "totaux"),
+    "etats": ("gel", "archivage_pieces"),
+    "kpi": ("gel",),
+}
+
+# Étapes en lecture seule, exécutées ensemble sur des sessions dédiées
+ETAPES_PARALLELES = {"analyse_ml", "optimisation", "totaux", "archivage_pieces"}
+
+# Étapes consultatives: leur échec est consigné sans bloquer la clôture
+ETAPES_NON_BLOQUANTES = {"analyse_ml", "optimisation", "kpi"}
+
+ETAPE_EN_ATTENTE = "EN_ATTENTE"
+ETAPE_EN_COURS = "EN_COURS"
+ETAPE_TERMINEE = "TERMINEE"
+ETAPE_IGNOREE = "IGNOREE"
+ETAPE_ECHEC = "ECHEC"
+ETAPES_FINIES = {ETAPE_TERMINEE, ETAPE_IGNOREE}
+
+# Sans signe de vie depuis ce délai, un job EN_COURS peut être repris
+DELAI_REPRISE = timedelta(minutes=10)
+
+# Fréquence du signe de vie pendant une étape, bien en deçà de DELAI_REPRISE
+INTERVALLE_HEARTBEAT = DELAI_REPRISE / 5
+
+# Comptes (débit, crédit) des écritures de clôture ML (plan OHADA)
+COMPTES_CLOTURE = {
+    "provision": ("691", "191"),
+    "amortissement": ("681", "281"),
+    "variation_stock": ("603", "31"),
+    "regularisation": (None, "408"),  # Débit: le compte de charge régularisé
+}
 
 class ValidationResult:
     """Résultat de validation"""
@@ -35,428 +98,627 @@ class ValidationResult:
         self.errors = errors or []
         self.warnings = warnings or []
 
+def _bornes_periode(periode: str) -> Tuple[date, date]:
+    """Premier et dernier jour d'une période YYYY-MM"""
+    debut = datetime.strptime(periode, "%Y-%m").date()
+    fin = (debut + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return debut, fin
+
+def _serialisable(valeur: Any) -> Any:
+    """Résultat d'étape enregistrable en JSON"""
+    return json.loads(json.dumps(valeur, default=str))
+
 class GestionCloture:
     """Gestion des processus de clôture comptable et financière avec ML"""
-    
-    def __init__(self, db: Session):
+
+    def __init__(self, db: Session, archive_dir: str = "archives/cloture"):
         self.db = db
-        self.analyse = AnalyseFinanceCompta(db)
-        self.cache = CacheService()
+        self.creer_analyse = AnalyseFinanceCompta
+        self.analyse = self.creer_analyse(db)
+        self.kpi = SnapshotsKpi(db)
+        self.comptabilite = ComptabiliteService(db)
+        self.archive_dir = Path(archive_dir)
+        self.intervalle_heartbeat = INTERVALLE_HEARTBEAT
+
+    def creer_job(self, periode: str, utilisateur_id: Optional[str] = None) -> ClotureJob:
+        """Crée le job de clôture de la période, ou retourne le job existant"""
+        _bornes_periode(periode)  # ValueError si le format est invalide
+        job = self.get_job(periode)
+        if job:
+            return job
+
+        job = ClotureJob(
+            periode=periode,
+            statut=StatutClotureJob.EN_ATTENTE,
+            etapes={etape: {"statut": ETAPE_EN_ATTENTE} for etape in ETAPES},
+            progression=0,
+            utilisateur_id=utilisateur_id
+        )
+        self.db.add(job)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Job créé entre-temps par une autre requête
+            self.db.rollback()
+            return self.get_job(periode)
+        return job
+
+    def get_job(self, periode: str) -> Optional[ClotureJob]:
+        """Job de clôture d'une période"""
+        return self.db.query(ClotureJob).filter(ClotureJob.periode == periode).first()
 
     async def executer_cloture_mensuelle(
         self,
         periode: str,
         utilisateur_id: str
     ) -> Dict[str, Any]:
-        """Exécute le processus de clôture mensuelle avec ML"""
-        # Cache key
-        cache_key = f"cloture_ml_{periode}"
-        cached = await self.cache.get(cache_key)
-        if cached:
-            return cached
-            
-        # Vérification des conditions préalables
-        validation = await self._verifier_conditions_cloture(periode)
+        """Exécute (ou reprend) la clôture mensuelle et retourne l'état du job"""
+        job = self.creer_job(periode, utilisateur_id)
+        job = await self.executer_job(job.id)
+        if job.statut == StatutClotureJob.ECHEC:
+            raise ValueError(f"Clôture {periode} en échec: {job.erreur}")
+        return self.etat_job(job)
+
+    def etat_job(self, job: ClotureJob) -> Dict[str, Any]:
+        """État d'avancement d'un job"""
+        return {
+            "id": str(job.id),
+            "periode": job.periode,
+            "statut": job.statut.value,
+            "progression": job.progression,
+            "etapes": job.etapes,
+            "erreur": job.erreur,
+            "date_debut": job.date_debut.isoformat() if job.date_debut else None,
+            "date_fin": job.date_fin.isoformat() if job.date_fin else None
+        }
+
+    async def executer_job(self, job_id) -> ClotureJob:
+        """
+        Exécute les étapes non terminées d'un job, dans l'ordre des
+        dépendances. Les étapes en lecture seule prêtes en même temps sont
+        lancées ensemble; les autres écrivent sur la session du job et
+        passent une à une, le rollback d'une étape en échec ne devant pas
+        annuler le travail non enregistré d'une autre.
+        """
+        if not self._reserver_job(job_id):
+            # Déjà terminé ou exécuté ailleurs
+            return self.db.query(ClotureJob).get(job_id)
+
+        job = self.db.query(ClotureJob).get(job_id)
+        try:
+            while True:
+                pretes = [
+                    etape for etape, dependances in ETAPES.items()
+                    if self._statut_etape(job, etape) not in ETAPES_FINIES
+                    and all(self._statut_etape(job, d) in ETAPES_FINIES for d in dependances)
+                ]
+                if not pretes:
+                    break
+                paralleles = [etape for etape in pretes if etape in ETAPES_PARALLELES]
+                if paralleles:
+                    await self._executer_etapes_paralleles(job, paralleles)
+                else:
+                    await self._executer_etape(job, pretes[0])
+
+            job.statut = StatutClotureJob.TERMINE
+            job.date_fin = datetime.utcnow()
+            job.erreur = None
+        except Exception as e:
+            self.db.rollback()
+            job.statut = StatutClotureJob.ECHEC
+            job.erreur = str(e)
+        self.db.commit()
+        return job
+
+    def _reserver_job(self, job_id) -> bool:
+        """Passe le job EN_COURS si aucun autre processus ne l'exécute"""
+        maintenant = datetime.utcnow()
+        reserve = self.db.query(ClotureJob).filter(
+            ClotureJob.id == job_id,
+            or_(
+                ClotureJob.statut.in_([StatutClotureJob.EN_ATTENTE, StatutClotureJob.ECHEC]),
+                and_(
+                    ClotureJob.statut == StatutClotureJob.EN_COURS,
+                    or_(ClotureJob.heartbeat.is_(None), ClotureJob.heartbeat < maintenant - DELAI_REPRISE)
+                )
+            )
+        ).update({
+            "statut": StatutClotureJob.EN_COURS,
+            "heartbeat": maintenant,
+            "erreur": None,
+            "date_debut": func.coalesce(ClotureJob.date_debut, maintenant)
+        }, synchronize_session=False)
+        self.db.commit()
+        return reserve == 1
+
+    def _statut_etape(self, job: ClotureJob, etape: str) -> str:
+        return (job.etapes or {}).get(etape, {}).get("statut", ETAPE_EN_ATTENTE)
+
+    def _resultat_etape(self, job: ClotureJob, etape: str) -> Any:
+        return (job.etapes or {}).get(etape, {}).get("resultat")
+
+    def _checkpoint(self, job: ClotureJob, etape: str, **etat: Any) -> None:
+        """Enregistre l'état d'une étape, avec les écritures de l'étape (même transaction)"""
+        etapes = dict(job.etapes or {})
+        etapes[etape] = {**etapes.get(etape, {}), **etat}
+        job.etapes = etapes
+        job.progression = round(
+            100 * sum(e.get("statut") in ETAPES_FINIES for e in etapes.values()) / len(ETAPES)
+        )
+        job.heartbeat = datetime.utcnow()
+        self.db.commit()
+
+    @contextmanager
+    def _heartbeat(self, job_id) -> Iterator[None]:
+        """
+        Entretient le signe de vie du job pendant une étape longue, depuis
+        un thread et une connexion séparés: la transaction de l'étape reste
+        ouverte et une étape synchrone bloque la boucle d'événements.
+        """
+        arret = threading.Event()
+        engine = self.db.get_bind()
+
+        def battre():
+            while not arret.wait(self.intervalle_heartbeat.total_seconds()):
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(
+                            update(ClotureJob).where(
+                                ClotureJob.id == job_id,
+                                ClotureJob.statut == StatutClotureJob.EN_COURS
+                            ).values(heartbeat=datetime.utcnow())
+                        )
+                except Exception as e:
+                    logger.warning(f"Signe de vie du job de clôture {job_id} non enregistré: {e}")
+
+        thread = threading.Thread(target=battre, name=f"cloture-heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            arret.set()
+            thread.join()
+
+    async def _executer_etape(self, job: ClotureJob, etape: str) -> None:
+        """Exécute une étape et enregistre son résultat"""
+        self._checkpoint(job, etape, statut=ETAPE_EN_COURS, debut=datetime.utcnow().isoformat(), erreur=None)
+        try:
+            with self._heartbeat(job.id):
+                resultat = await getattr(self, f"_etape_{etape}")(job)
+        except Exception as e:
+            self.db.rollback()
+            statut = ETAPE_IGNOREE if etape in ETAPES_NON_BLOQUANTES else ETAPE_ECHEC
+            self._checkpoint(job, etape, statut=statut, erreur=str(e), fin=datetime.utcnow().isoformat())
+            if statut == ETAPE_ECHEC:
+                raise
+            return
+
+        self._checkpoint(
+            job, etape,
+            statut=ETAPE_TERMINEE,
+            resultat=_serialisable(resultat),
+            fin=datetime.utcnow().isoformat()
+        )
+
+    async def _executer_etapes_paralleles(self, job: ClotureJob, etapes: List[str]) -> None:
+        """
+        Exécute ensemble des étapes en lecture seule, chacune sur sa propre
+        session; leurs états sont enregistrés sur la session du job
+        """
+        for etape in etapes:
+            self._checkpoint(job, etape, statut=ETAPE_EN_COURS, debut=datetime.utcnow().isoformat(), erreur=None)
+        with self._heartbeat(job.id):
+            resultats = await asyncio.gather(
+                *(self._executer_etape_isolee(job, etape) for etape in etapes),
+                return_exceptions=True
+            )
+
+        echec = None
+        for etape, resultat in zip(etapes, resultats):
+            if isinstance(resultat, Exception):
+                statut = ETAPE_IGNOREE if etape in ETAPES_NON_BLOQUANTES else ETAPE_ECHEC
+                self._checkpoint(job, etape, statut=statut, erreur=str(resultat), fin=datetime.utcnow().isoformat())
+                if statut == ETAPE_ECHEC and echec is None:
+                    echec = resultat
+            else:
+                self._checkpoint(
+                    job, etape,
+                    statut=ETAPE_TERMINEE,
+                    resultat=_serialisable(resultat),
+                    fin=datetime.utcnow().isoformat()
+                )
+        if echec is not None:
+            raise echec
+
+    async def _executer_etape_isolee(self, job: ClotureJob, etape: str) -> Any:
+        with Session(bind=self.db.get_bind()) as db:
+            return await getattr(self._pour_session(db), f"_etape_{etape}")(job)
+
+    def _pour_session(self, db: Session) -> "GestionCloture":
+        """Copie du service travaillant sur une autre session"""
+        copie = copy.copy(self)
+        copie.db = db
+        copie.analyse = self.creer_analyse(db)
+        return copie
+
+    async def _etape_validation(self, job: ClotureJob) -> Dict[str, Any]:
+        """Valide les écritures en brouillon de la période; bloque sur une pièce déséquilibrée"""
+        validation = await self.comptabilite.valider_ecritures(job.utilisateur_id, periode=job.periode)
+        return {"ecritures_validees": validation["validees"]}
+
+    async def _etape_verification(self, job: ClotureJob) -> Dict[str, Any]:
+        """Vérifie les conditions de clôture; bloque si elles ne sont pas remplies"""
+        validation = await self._verifier_conditions_cloture(job.periode)
         if not validation.is_valid:
             raise ValueError(f"Conditions de clôture non remplies: {validation.errors}")
-            
-        # Analyse ML
-        analyse_ml = await self.analyse.get_analyse_parcelle(
+        return {"avertissements": validation.warnings}
+
+    async def _etape_analyse_ml(self, job: ClotureJob) -> Dict[str, Any]:
+        debut, fin = _bornes_periode(job.periode)
+        analyse = await self.analyse.get_analyse_parcelle(
             parcelle_id=None,  # Analyse globale
-            date_debut=datetime.strptime(periode, "%Y-%m").date(),
-            date_fin=datetime.strptime(periode, "%Y-%m").date() + timedelta(days=30),
+            date_debut=debut,
+            date_fin=fin,
             include_predictions=True
         )
-        
-        # Optimisation ML
-        optimization = await self.analyse.optimize_costs(
-            target_date=datetime.strptime(periode, "%Y-%m").date()
-        )
-            
-        # Validation des écritures en attente
-        ecritures_validees = await self._valider_ecritures_attente(
-            periode,
-            utilisateur_id
-        )
-        
-        # Génération des écritures de clôture avec ML
-        ecritures_cloture = await self._generer_ecritures_cloture_ml(
-            periode,
-            analyse_ml,
-            optimization
+        return analyse.get("ml_analysis") or {}
+
+    async def _etape_optimisation(self, job: ClotureJob) -> Dict[str, Any]:
+        debut, _ = _bornes_periode(job.periode)
+        return await self.analyse.optimize_costs(parcelle_id=None, target_date=debut)
+
+    async def _etape_totaux(self, job: ClotureJob) -> Dict[str, Any]:
+        return await self._calculer_totaux_periode(job.periode)
+
+    async def _etape_archivage_pieces(self, job: ClotureJob) -> Dict[str, Any]:
+        return await self._archiver_pieces_justificatives(job.periode, self._dossier_archive(job.periode))
+
+    async def _etape_ecritures_cloture(self, job: ClotureJob) -> List[Dict[str, Any]]:
+        return await self._generer_ecritures_cloture_ml(
+            job.periode,
+            self._resultat_etape(job, "analyse_ml") or {},
+            self._resultat_etape(job, "optimisation") or {}
         )
-        
-        # Calcul des totaux de la période
-        totaux = await self._calculer_totaux_periode(periode)
-        
-        # Gel des écritures de la période
-        await self._geler_ecritures(periode)
-        
-        # Génération des états de clôture avec ML
+
+    async def _etape_gel(self, job: ClotureJob) -> Dict[str, Any]:
+        return {"ecritures_gelees": await self._geler_ecritures(job.periode)}
+
+    async def _etape_kpi(self, job: ClotureJob) -> Dict[str, Any]:
+        """Instantané des indicateurs du mois, définitif une fois les écritures gelées"""
+        return (await self.kpi.enregistrer(job.periode))[0]
+
+    async def _etape_etats(self, job: ClotureJob) -> Dict[str, Any]:
+        totaux = self._resultat_etape(job, "totaux")
+        analyse_ml = self._resultat_etape(job, "analyse_ml") or {}
+        optimization = self._resultat_etape(job, "optimisation") or {}
         etats = await self._generer_etats_cloture_ml(
-            periode,
+            job.periode,
             totaux,
-            ecritures_validees,
-            ecritures_cloture,
+            self._resultat_etape(job, "validation"),
+            self._resultat_etape(job, "ecritures_cloture") or [],
             analyse_ml,
             optimization
         )
-        
-        # Archivage des documents
-        await self._archiver_documents(periode, etats)
-        
-        resultat = {
-            "periode": periode,
-            "statut": "CLOTURE",
-            "date_cloture": datetime.utcnow().isoformat(),
-            "utilisateur_id": utilisateur_id,
-            "totaux": totaux,
-            "etats": etats,
-            "ecritures_validees": len(ecritures_validees),
-            "ecritures_cloture": len(ecritures_cloture),
-            "ml_analysis": analyse_ml["ml_analysis"],
-            "optimization": optimization,
-            "recommendations": await self._generate_cloture_recommendations(
-                totaux,
-                analyse_ml,
-                optimization
-            )
+        dossier = self._dossier_archive(job.periode)
+        await self._archiver_documents(dossier, etats)
+        return {
+            "archive": str(dossier),
+            "etats": sorted(etats),
+            "recommendations": await self._generate_cloture_recommendations(totaux, analyse_ml, optimization)
         }
-        
-        # Cache result
-        await self.cache.set(cache_key, resultat, expire=3600)
-        return resultat
 
     async def _verifier_conditions_cloture(self, periode: str) -> ValidationResult:
-        """Vérifie les conditions nécessaires à la clôture avec ML"""
+        """Vérifie les conditions nécessaires à la clôture"""
         errors = []
         warnings = []
-        
+
         # Vérification de l'équilibre des comptes
         balance = await self._verifier_equilibre_comptes(periode)
         if not balance["equilibre"]:
             errors.append(
                 f"Comptes non équilibrés: différence de {balance['difference']}"
             )
-            
-        # Vérification des écritures en attente
-        ecritures_attente = await self._compter_ecritures_attente(periode)
-        if ecritures_attente > 0:
-            errors.append(
-                f"{ecritures_attente} écritures en attente de validation"
-            )
-            
-        # Vérification des rapprochements bancaires
-        rapprochements = await self._verifier_rapprochements(periode)
-        if not rapprochements["complet"]:
-            warnings.append(
-                f"Rapprochements bancaires incomplets: {rapprochements['manquants']} relevés manquants"
-            )
-            
-        # Vérification des provisions obligatoires avec ML
-        provisions = await self._verifier_provisions_obligatoires_ml(periode)
-        if not provisions["complet"]:
-            errors.append(
-                f"Provisions obligatoires manquantes: {provisions['manquantes']}"
-            )
-            
+        if balance["nombre_ecritures"] == 0:
+            warnings.append("Aucune écriture validée sur la période")
+
         return ValidationResult(
             is_valid=len(errors) == 0,
             errors=errors,
             warnings=warnings
         )
 
-    async def _valider_ecritures_attente(
-        self,
-        periode: str,
-        utilisateur_id: str
-    ) -> List[EcritureComptable]:
-        """Valide les écritures en attente de la période"""
-        ecritures = self.db.query(EcritureComptable).filter(
+    async def _verifier_equilibre_comptes(self, periode: str) -> Dict[str, Any]:
+        """Totaux débit/crédit des écritures validées de la période"""
+        nombre, debit, credit = self.db.query(
+            func.count(EcritureComptable.id),
+            func.coalesce(func.sum(EcritureComptable.debit), 0),
+            func.coalesce(func.sum(EcritureComptable.credit), 0)
+        ).filter(
             EcritureComptable.periode == periode,
-            EcritureComptable.statut == StatutEcriture.BROUILLON
-        ).all()
-        
-        for ecriture in ecritures:
-            ecriture.statut = StatutEcriture.VALIDEE
-            ecriture.validee_par_id = utilisateur_id
-            ecriture.date_validation = datetime.utcnow()
-            
-        self.db.commit()
-        return ecritures
+            EcritureComptable.statut == StatutEcriture.VALIDEE
+        ).one()
+        difference = Decimal(str(debit)) - Decimal(str(credit))
+        return {
+            "equilibre": abs(difference) < Decimal("0.01"),  # Tolérance pour les arrondis
+            "difference": float(difference),
+            "nombre_ecritures": nombre
+        }
 
     async def _generer_ecritures_cloture_ml(
         self,
         periode: str,
         analyse_ml: Dict[str, Any],
         optimization: Dict[str, Any]
-    ) -> List[EcritureComptable]:
-        """Génère les écritures de clôture avec ML"""
-        ecritures_cloture = []
-        
-        # Écritures de régularisation des charges avec ML
-        regularisations = await self._calculer_regularisations_charges_ml(
-            periode,
-            analyse_ml,
-            optimization
-        )
-        ecritures_cloture.extend(regularisations)
-        
-        # Écritures de variation des stocks avec ML
-        variations = await self._calculer_variations_stocks_ml(
-            periode,
-            analyse_ml
-        )
-        ecritures_cloture.extend(variations)
-        
-        # Écritures de provisions avec ML
-        provisions = await self._calculer_provisions_ml(
-            periode,
-            analyse_ml,
-            optimization
-        )
-        ecritures_cloture.extend(provisions)
-        
-        # Écritures d'amortissements avec ML
-        amortissements = await self._calculer_amortissements_ml(
-            periode,
-            analyse_ml
+    ) -> List[Dict[str, Any]]:
+        """
+        Génère les écritures de clôture avec ML. Les écritures d'une tentative
+        précédente (pièces CLO-{periode}-*) sont remplacées.
+        """
+        operations = (
+            self._regularisations_charges_ml(periode, analyse_ml)
+            + self._variations_stocks_ml(analyse_ml)
+            + self._provisions_ml(analyse_ml, optimization)
+            + self._amortissements_ml(analyse_ml)
         )
-        ecritures_cloture.extend(amortissements)
-        
-        # Sauvegarde des écritures
-        for ecriture in ecritures_cloture:
-            self.db.add(ecriture)
-            
-        self.db.commit()
-        return ecritures_cloture
 
-    async def _calculer_regularisations_charges_ml(
-        self,
-        periode: str,
-        analyse_ml: Dict[str, Any],
-        optimization: Dict[str, Any]
-    ) -> List[EcritureComptable]:
-        """Calcule les régularisations de charges avec ML"""
-        regularisations = []
-        
-        # Récupération des charges à régulariser
-        charges = self.db.query(EcritureComptable).filter(
+        prefixe = f"CLO-{periode}-"
+        self.db.query(EcritureComptable).filter(
             EcritureComptable.periode == periode,
-            EcritureComptable.type_compte == TypeCompte.CHARGE
-        ).all()
-        
-        # Ajustement ML des régularisations
-        if "charge_adjustments" in analyse_ml["ml_analysis"]:
-            adjustments = analyse_ml["ml_analysis"]["charge_adjustments"]
-            for charge in charges:
-                if charge.categorie in adjustments:
-                    adj_data = adjustments[charge.categorie]
-                    montant_ajuste = charge.montant * adj_data.get("factor", 1.0)
-                    
-                    regularisations.append(
-                        EcritureComptable(
-                            compte_id=charge.compte_id,
-                            date=datetime.now(),
-                            libelle=f"Régularisation ML - {charge.libelle}",
-                            montant=montant_ajuste - charge.montant,
-                            sens="DEBIT" if montant_ajuste > charge.montant else "CREDIT"
-                        )
-                    )
-                    
-        return regularisations
+            EcritureComptable.numero_piece.like(f"{prefixe}%")
+        ).delete(synchronize_session=False)
+        if not operations:
+            return []
 
-    async def _calculer_variations_stocks_ml(
-        self,
-        periode: str,
-        analyse_ml: Dict[str, Any]
-    ) -> List[EcritureComptable]:
-        """Calcule les variations de stocks avec ML"""
-        variations = []
-        
-        # Prédictions ML des variations
-        if "stock_predictions" in analyse_ml["ml_analysis"]:
-            predictions = analyse_ml["ml_analysis"]["stock_predictions"]
-            for categorie, pred in predictions.items():
-                variations.append(
-                    EcritureComptable(
-                        compte_id=self._get_compte_variation_stock(categorie),
-                        date=datetime.now(),
-                        libelle=f"Variation stock ML - {categorie}",
-                        montant=pred["variation"],
-                        sens="DEBIT" if pred["variation"] > 0 else "CREDIT"
-                    )
-                )
-                
-        return variations
+        numeros = {n for op in operations for n in (op["debit"], op["credit"])}
+        comptes = dict(self.db.query(CompteComptable.numero, CompteComptable.id).filter(
+            CompteComptable.numero.in_(numeros)
+        ).all())
+        journal = self.db.query(JournalComptable.id).filter(
+            JournalComptable.type_journal == TypeJournal.OPERATIONS_DIVERSES
+        ).first()
+        if journal is None:
+            raise ValueError("Aucun journal d'opérations diverses pour les écritures de clôture")
 
-    async def _calculer_provisions_ml(
-        self,
-        periode: str,
-        analyse_ml: Dict[str, Any],
-        optimization: Dict[str, Any]
-    ) -> List[EcritureComptable]:
-        """Calcule les provisions avec ML"""
-        provisions = []
-        
-        # Calcul ML des provisions
-        if "provision_recommendations" in analyse_ml["ml_analysis"]:
-            recommendations = analyse_ml["ml_analysis"]["provision_recommendations"]
-            for rec in recommendations:
-                # Optimisation du montant
-                montant = rec["amount"]
-                if "provision_optimizations" in optimization:
-                    if rec["category"] in optimization["provision_optimizations"]:
-                        opt_data = optimization["provision_optimizations"][rec["category"]]
-                        montant = opt_data.get("optimized_amount", montant)
-                
-                provisions.append(
-                    EcritureComptable(
-                        compte_id=self._get_compte_provision(rec["category"]),
-                        date=datetime.now(),
-                        libelle=f"Provision ML - {rec['description']}",
-                        montant=montant,
-                        sens="DEBIT",
-                        ml_confidence=rec.get("confidence", 0.8)
-                    )
-                )
-                
-        return provisions
+        _, date_cloture = _bornes_periode(periode)
+        ecritures = []
+        for i, op in enumerate(operations, start=1):
+            if op["debit"] not in comptes or op["credit"] not in comptes:
+                continue
+            numero_piece = f"{prefixe}{i:03d}"
+            montant = Decimal(str(round(op["montant"], 2)))
+            for numero, debit, credit in ((op["debit"], montant, 0), (op["credit"], 0, montant)):
+                self.db.add(EcritureComptable(
+                    date_ecriture=date_cloture,
+                    numero_piece=numero_piece,
+                    compte_id=comptes[numero],
+                    libelle=op["libelle"][:200],
+                    debit=debit,
+                    credit=credit,
+                    statut=StatutEcriture.VALIDEE,
+                    journal_id=journal.id,
+                    periode=periode,
+                    date_validation=datetime.utcnow()
+                ))
+            ecritures.append({**op, "numero_piece": numero_piece, "montant": float(montant)})
 
-    async def _calculer_amortissements_ml(
-        self,
-        periode: str,
-        analyse_ml: Dict[str, Any]
-    ) -> List[EcritureComptable]:
-        """Calcule les amortissements avec ML"""
-        amortissements = []
-        
-        # Calcul ML des amortissements
-        if "amortization_predictions" in analyse_ml["ml_analysis"]:
-            predictions = analyse_ml["ml_analysis"]["amortization_predictions"]
-            for pred in predictions:
-                amortissements.append(
-                    EcritureComptable(
-                        compte_id=self._get_compte_amortissement(pred["category"]),
-                        date=datetime.now(),
-                        libelle=f"Amortissement ML - {pred['description']}",
-                        montant=pred["amount"],
-                        sens="DEBIT",
-                        ml_confidence=pred.get("confidence", 0.8)
-                    )
-                )
-                
-        return amortissements
+        self.db.flush()
+        return ecritures
+
+    def _regularisations_charges_ml(self, periode: str, analyse_ml: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Régularisations des charges ajustées par le ML (clé: numéro de compte)"""
+        adjustments = analyse_ml.get("charge_adjustments") or {}
+        if not adjustments:
+            return []
+        soldes = self.db.query(
+            CompteComptable.numero,
+            func.sum(EcritureComptable.debit - EcritureComptable.credit)
+        ).join(
+            CompteComptable, CompteComptable.id == EcritureComptable.compte_id
+        ).filter(
+            EcritureComptable.periode == periode,
+            EcritureComptable.statut == StatutEcriture.VALIDEE,
+            CompteComptable.type_compte == TypeCompte.CHARGE,
+            CompteComptable.numero.in_(list(adjustments))
+        ).group_by(CompteComptable.numero).all()
+
+        operations = []
+        _, contrepartie = COMPTES_CLOTURE["regularisation"]
+        for numero, solde in soldes:
+            ecart = float(solde or 0) * (adjustments[numero].get("factor", 1.0) - 1)
+            if abs(ecart) < 0.01:
+                continue
+            debit, credit = (numero, contrepartie) if ecart > 0 else (contrepartie, numero)
+            operations.append({
+                "type": "regularisation", "debit": debit, "credit": credit,
+                "montant": abs(ecart), "libelle": f"Régularisation ML - {numero}"
+            })
+        return operations
+
+    def _variations_stocks_ml(self, analyse_ml: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Variations de stocks prédites par le ML"""
+        operations = []
+        charge, stock = COMPTES_CLOTURE["variation_stock"]
+        for categorie, pred in (analyse_ml.get("stock_predictions") or {}).items():
+            variation = float(pred.get("variation", 0))
+            if abs(variation) < 0.01:
+                continue
+            # Diminution du stock: charge au débit; augmentation: stock au débit
+            debit, credit = (charge, stock) if variation < 0 else (stock, charge)
+            operations.append({
+                "type": "variation_stock", "debit": debit, "credit": credit,
+                "montant": abs(variation), "libelle": f"Variation stock ML - {categorie}"
+            })
+        return operations
+
+    def _provisions_ml(self, analyse_ml: Dict[str, Any], optimization: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Provisions recommandées par le ML, montants optimisés le cas échéant"""
+        operations = []
+        optimisations = optimization.get("provision_optimizations") or {}
+        debit, credit = COMPTES_CLOTURE["provision"]
+        for rec in analyse_ml.get("provision_recommendations") or []:
+            montant = optimisations.get(rec["category"], {}).get("optimized_amount", rec["amount"])
+            operations.append({
+                "type": "provision", "debit": debit, "credit": credit, "montant": float(montant),
+                "libelle": f"Provision ML - {rec['description']}", "confidence": rec.get("confidence", 0.8)
+            })
+        return operations
+
+    def _amortissements_ml(self, analyse_ml: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Amortissements prédits par le ML"""
+        debit, credit = COMPTES_CLOTURE["amortissement"]
+        return [
+            {
+                "type": "amortissement", "debit": debit, "credit": credit, "montant": float(pred["amount"]),
+                "libelle": f"Amortissement ML - {pred['description']}", "confidence": pred.get("confidence", 0.8)
+            }
+            for pred in analyse_ml.get("amortization_predictions") or []
+        ]
 
     async def _calculer_totaux_periode(self, periode: str) -> Dict[str, Any]:
-        """Calcule les totaux de la période"""
+        """Calcule les totaux de la période par compte de charge et de produit"""
         totaux = {
             "charges": {},
             "produits": {},
-            "resultat": 0,
-            "tresorerie": {},
-            "bilan": {
-                "actif": {},
-                "passif": {}
-            }
+            "resultat": 0
         }
-        
-        # Calcul des charges par catégorie
-        charges = self.db.query(
-            EcritureComptable.categorie,
-            func.sum(EcritureComptable.debit)
-        ).filter(
-            EcritureComptable.periode == periode,
-            EcritureComptable.type_compte == TypeCompte.CHARGE
-        ).group_by(EcritureComptable.categorie).all()
-        
-        for categorie, montant in charges:
-            totaux["charges"][categorie] = float(montant)
-            
-        # Calcul des produits par catégorie
-        produits = self.db.query(
-            EcritureComptable.categorie,
+
+        soldes = self.db.query(
+            CompteComptable.type_compte,
+            CompteComptable.numero,
+            func.sum(EcritureComptable.debit),
             func.sum(EcritureComptable.credit)
+        ).join(
+            CompteComptable, CompteComptable.id == EcritureComptable.compte_id
         ).filter(
             EcritureComptable.periode == periode,
-            EcritureComptable.type_compte == TypeCompte.PRODUIT
-        ).group_by(EcritureComptable.categorie).all()
-        
-        for categorie, montant in produits:
-            totaux["produits"][categorie] = float(montant)
-            
+            EcritureComptable.statut == StatutEcriture.VALIDEE,
+            CompteComptable.type_compte.in_([TypeCompte.CHARGE, TypeCompte.PRODUIT])
+        ).group_by(CompteComptable.type_compte, CompteComptable.numero).all()
+
+        for type_compte, numero, debit, credit in soldes:
+            if type_compte == TypeCompte.CHARGE:
+                totaux["charges"][numero] = float((debit or 0) - (credit or 0))
+            else:
+                totaux["produits"][numero] = float((credit or 0) - (debit or 0))
+
         # Calcul du résultat
-        totaux["resultat"] = (
-            sum(totaux["produits"].values()) - 
-            sum(totaux["charges"].values())
+        totaux["resultat"] = round(
+            sum(totaux["produits"].values()) -
+            sum(totaux["charges"].values()),
+            2
         )
-        
+
         return totaux
 
-    async def _geler_ecritures(self, periode: str) -> None:
+    async def _geler_ecritures(self, periode: str) -> int:
         """Gèle les écritures de la période"""
-        self.db.query(EcritureComptable).filter(
-            EcritureComptable.periode == periode
+        return self.db.query(EcritureComptable).filter(
+            EcritureComptable.periode == periode,
+            EcritureComptable.modifiable.isnot(False)
         ).update({
             "modifiable": False
-        })
-        
-        self.db.commit()
+        }, synchronize_session=False)
 
     async def _generer_etats_cloture_ml(
         self,
         periode: str,
         totaux: Dict[str, Any],
-        ecritures_validees: List[EcritureComptable],
-        ecritures_cloture: List[EcritureComptable],
+        validation: Dict[str, Any],
+        ecritures_cloture: List[Dict[str, Any]],
         analyse_ml: Dict[str, Any],
         optimization: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Génère les états de clôture avec ML"""
+        balance = await self._generer_balance(periode)
+        charges = sum(l["solde"] for l in balance if l["type_compte"] == TypeCompte.CHARGE.value)
+        produits = -sum(l["solde"] for l in balance if l["type_compte"] == TypeCompte.PRODUIT.value)
         return {
-            "grand_livre": await self._generer_grand_livre(periode),
-            "balance": await self._generer_balance(periode),
-            "compte_resultat": await self._generer_compte_resultat(periode, totaux),
-            "bilan": await self._generer_bilan(periode, totaux),
+            "balance": balance,
+            "compte_resultat": {
+                "avant_cloture": totaux,
+                "charges": round(charges, 2),
+                "produits": round(produits, 2),
+                "resultat": round(produits - charges, 2)
+            },
             "annexes": {
-                "detail_ecritures": {
-                    "validees": [e.to_dict() for e in ecritures_validees],
-                    "cloture": [e.to_dict() for e in ecritures_cloture]
-                },
-                "rapprochements": await self._generer_rapprochements(periode),
-                "provisions": await self._generer_detail_provisions_ml(
-                    periode,
-                    analyse_ml,
-                    optimization
-                )
+                "validation": validation,
+                "ecritures_cloture": ecritures_cloture
             },
             "ml_analysis": {
-                "predictions": analyse_ml["ml_analysis"].get("predictions", {}),
-                "risk_factors": analyse_ml["ml_analysis"].get("risk_factors", []),
+                "predictions": analyse_ml.get("predictions", {}),
+                "risk_factors": analyse_ml.get("risk_factors", []),
                 "optimization_results": optimization.get("results", {})
             }
         }
 
+    async def _generer_balance(self, periode: str) -> List[Dict[str, Any]]:
+        """Balance de la période, écritures de clôture comprises"""
+        lignes = self.db.query(
+            CompteComptable.numero,
+            CompteComptable.libelle,
+            CompteComptable.type_compte,
+            func.sum(EcritureComptable.debit),
+            func.sum(EcritureComptable.credit)
+        ).join(
+            CompteComptable, CompteComptable.id == EcritureComptable.compte_id
+        ).filter(
+            EcritureComptable.periode == periode,
+            EcritureComptable.statut == StatutEcriture.VALIDEE
+        ).group_by(
+            CompteComptable.numero, CompteComptable.libelle, CompteComptable.type_compte
+        ).order_by(CompteComptable.numero).all()
+        return [
+            {
+                "numero": numero,
+                "libelle": libelle,
+                "type_compte": type_compte.value,
+                "debit": float(debit or 0),
+                "credit": float(credit or 0),
+                "solde": float((debit or 0) - (credit or 0))
+            }
+            for numero, libelle, type_compte, debit, credit in lignes
+        ]
+
+    def _dossier_archive(self, periode: str) -> Path:
+        return self.archive_dir / periode
+
     async def _archiver_documents(
         self,
-        periode: str,
+        dossier: Path,
         etats: Dict[str, Any]
     ) -> None:
-        """Archive les documents de clôture"""
-        # Création du dossier d'archive
-        archive_path = f"archives/cloture/{periode}"
-        os.makedirs(archive_path, exist_ok=True)
-        
-        # Sauvegarde des états
-        for nom_etat, contenu in etats.items():
-            with open(f"{archive_path}/{nom_etat}.json", "w") as f:
-                json.dump(contenu, f, indent=2)
-                
-        # Archivage des pièces justificatives
-        await self._archiver_pieces_justificatives(periode, archive_path)
-        
-        # Génération du rapport de clôture avec ML
-        await self._generer_rapport_cloture_ml(periode, archive_path, etats)
+        """Archive les états de clôture (fichiers réécrits à chaque reprise)"""
+        def ecrire():
+            dossier.mkdir(parents=True, exist_ok=True)
+            for nom_etat, contenu in etats.items():
+                (dossier / f"{nom_etat}.json").write_text(json.dumps(contenu, indent=2, default=str))
+        await asyncio.to_thread(ecrire)
+
+    async def _archiver_pieces_justificatives(self, periode: str, dossier: Path) -> Dict[str, Any]:
+        """Inventaire des pièces justificatives liées aux écritures de la période"""
+        pieces = self.db.query(
+            Document.id,
+            Document.nom,
+            Document.chemin_fichier,
+            EcritureDocument.type_document,
+            EcritureComptable.numero_piece
+        ).join(
+            EcritureDocument, EcritureDocument.document_id == Document.id
+        ).join(
+            EcritureComptable, EcritureComptable.id == EcritureDocument.ecriture_id
+        ).filter(
+            EcritureComptable.periode == periode
+        ).all()
+        inventaire = [
+            {"document_id": str(doc_id), "nom": nom, "chemin": chemin, "type": type_document, "piece": piece}
+            for doc_id, nom, chemin, type_document, piece in pieces
+        ]
+
+        def ecrire():
+            dossier.mkdir(parents=True, exist_ok=True)
+            (dossier / "pieces_justificatives.json").write_text(json.dumps(inventaire, indent=2))
+        await asyncio.to_thread(ecrire)
+        return {"pieces": len(inventaire)}
 
     async def _generate_cloture_recommendations(
         self,
@@ -466,33 +728,31 @@ class GestionCloture:
     ) -> List[Dict[str, Any]]:
         """Génère des recommandations ML pour la clôture"""
         recommendations = []
-        
+
         # Recommandations ML
-        if "recommendations" in analyse_ml["ml_analysis"]:
-            for rec in analyse_ml["ml_analysis"]["recommendations"]:
-                if rec["type"] == "CLOSING":
-                    recommendations.append({
-                        "type": "ML",
-                        "priority": rec["priority"],
-                        "description": rec["description"],
-                        "actions": rec["actions"],
-                        "expected_impact": rec.get("expected_impact")
-                    })
-                    
-        # Recommandations optimisation
-        if "closing_optimizations" in optimization:
-            for opt in optimization["closing_optimizations"]:
+        for rec in analyse_ml.get("recommendations") or []:
+            if rec.get("type") == "CLOSING":
                 recommendations.append({
-                    "type": "OPTIMIZATION",
-                    "priority": "HIGH",
-                    "description": opt["description"],
-                    "actions": opt["actions"],
-                    "expected_impact": {
-                        "savings": opt.get("savings", 0),
-                        "timeline": opt.get("timeline", "N/A")
-                    }
+                    "type": "ML",
+                    "priority": rec["priority"],
+                    "description": rec["description"],
+                    "actions": rec["actions"],
+                    "expected_impact": rec.get("expected_impact")
                 })
-                
+
+        # Recommandations optimisation
+        for opt in optimization.get("closing_optimizations") or []:
+            recommendations.append({
+                "type": "OPTIMIZATION",
+                "priority": "HIGH",
+                "description": opt["description"],
+                "actions": opt["actions"],
+                "expected_impact": {
+                    "savings": opt.get("savings", 0),
+                    "timeline": opt.get("timeline", "N/A")
+                }
+            })
+
         # Recommandations basées sur les totaux
         if totaux["resultat"] < 0:
             recommendations.append({
@@ -505,5 +765,5 @@ class GestionCloture:
                     "Revoir pricing"
                 ]
             })
-            
+
         return recommendations
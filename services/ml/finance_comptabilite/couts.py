@@ -20,6 +20,7 @@ from services.finance_comptabilite.analyse import AnalyseFinanceCompta
 from services.weather_service import WeatherService
 from services.iot_service import IoTService
 from services.cache_service import CacheService
+from services.ml.core.monitoring import monitor_prediction
 
 class GestionCouts:
     """Gestion intégrée des coûts finance-comptabilité avec ML"""
@@ -151,6 +152,7 @@ class GestionCouts:
             
         return compte.id
 
+    @monitor_prediction('finance_analyse_couts')
     async def get_analyse_couts(
         self,
         date_debut: Optional[date] = None,
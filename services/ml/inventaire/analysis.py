@@ -5,22 +5,36 @@ Module d'analyse des stocks utilisant le ML
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import numpy as np
-import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+
+from services.ml.core.lazy import lazy_import
 
 from models.inventory import Stock, MouvementStock, CategoryProduit
-from services.cache_service import cache_result
+from services.ml.core.inference import get_model_registry
+from services.ml.core.memoization import memoize_prediction, latest
+from services.ml.core.monitoring import monitor_prediction
+
+pd = lazy_import('pandas')
 
 class AnalyseurStock:  # Renommé pour correspondre à la nomenclature française
     """Analyseur de stocks utilisant le ML"""
 
     def __init__(self):
+        from sklearn.cluster import KMeans
+        from sklearn.preprocessing import StandardScaler
+
         self.scaler = StandardScaler()
         self.cluster_model = KMeans(n_clusters=3, random_state=42)
         self._is_trained = False
 
-    @cache_result(ttl_seconds=3600)
+    @monitor_prediction('inventaire_patterns')
+    @memoize_prediction(
+        'inventaire_patterns',
+        entity=lambda stock, **_: stock.id,
+        watermark=lambda mouvements, **_: (
+            latest(mouvements, 'date_mouvement'), len(mouvements or [])
+        ),
+        ttl_seconds=3600
+    )
     def analyze_stock_patterns(self, 
                              stock: Stock,
                              mouvements: List[MouvementStock],
@@ -64,7 +78,7 @@ class AnalyseurStock:  # Renommé pour correspondre à la nomenclature français
     def _prepare_dataframe(self, 
                           stock: Stock,
                           mouvements: List[MouvementStock],
-                          periode_jours: int) -> pd.DataFrame:
+                          periode_jours: int) -> 'pd.DataFrame':
         """Prépare les données pour l'analyse"""
         date_debut = datetime.now(datetime.timezone.utc) - timedelta(days=periode_jours)
         
@@ -91,7 +105,7 @@ class AnalyseurStock:  # Renommé pour correspondre à la nomenclature français
         
         return df
 
-    def _analyze_trend(self, df: pd.DataFrame) -> Dict:
+    def _analyze_trend(self, df: 'pd.DataFrame') -> Dict:
         """Analyse la tendance des stocks"""
         if df.empty:
             return {"direction": "stable", "force": 0.0}
@@ -117,7 +131,7 @@ class AnalyseurStock:  # Renommé pour correspondre à la nomenclature français
             "force": float(force)
         }
 
-    def _analyze_seasonality(self, df: pd.DataFrame) -> Optional[Dict]:
+    def _analyze_seasonality(self, df: 'pd.DataFrame') -> Optional[Dict]:
         """Analyse la saisonnalité des stocks"""
         if df.empty or len(df) < 30:  # Minimum 30 jours pour l'analyse
             return None
@@ -141,7 +155,7 @@ class AnalyseurStock:  # Renommé pour correspondre à la nomenclature français
             }
         }
 
-    def _detect_anomalies(self, df: pd.DataFrame) -> List[Dict]:
+    def _detect_anomalies(self, df: 'pd.DataFrame') -> List[Dict]:
         """Détecte les anomalies dans les mouvements de stock"""
         if df.empty:
             return []
@@ -240,6 +254,9 @@ class AnalyseurStock:  # Renommé pour correspondre à la nomenclature français
             features = np.array(features)
             features_scaled = self.scaler.fit_transform(features)
             self.cluster_model.fit(features_scaled)
+            get_model_registry().register(
+                'inventaire_patterns', self.cluster_model, backend='sklearn'
+            )
             self._is_trained = True
 
     @property
@@ -5,17 +5,27 @@ Modèle ML de base pour l'inventaire
 from typing import Dict, List, Optional
 from datetime import datetime
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-import joblib
 
 from models.inventory import CategoryProduit, Stock, MouvementStock
-from services.cache_service import cache_result
+from services.ml.core.inference import get_model_registry
+from services.ml.core.memoization import memoize_prediction, latest
+from services.ml.core.monitoring import get_ml_monitor, monitor_prediction
 
 class ModeleInventaireML:  # Renommé pour correspondre à l'import attendu
-    """Modèle ML de base pour les prédictions d'inventaire"""
+    """
+    Modèle ML de base pour les prédictions d'inventaire
+
+    Le registre d'inférence garde un seul modèle 'inventaire_niveau_optimal':
+    les composants d'un service partagent donc une instance (l'optimiseur
+    reçoit celle du service), et prédiction comme confiance viennent du
+    modèle enregistré.
+    """
 
     def __init__(self):
+        # sklearn est importé à la construction, pas au chargement du module
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+
         self.model = RandomForestRegressor(
             n_estimators=100,
             max_depth=10,
@@ -24,6 +34,13 @@ class ModeleInventaireML:  # Renommé pour correspondre à l'import attendu
         self.scaler = StandardScaler()
         self._is_trained = False
 
+    def _register_inference(self) -> None:
+        """Enregistre scaler + modèle comme un seul graphe d'inférence"""
+        from sklearn.pipeline import Pipeline
+
+        pipeline = Pipeline([('scaler', self.scaler), ('model', self.model)])
+        get_model_registry().register('inventaire_niveau_optimal', pipeline)
+
     def _prepare_features(self, stock: Stock, mouvements: List[MouvementStock]) -> np.ndarray:
         """Prépare les features pour le modèle ML"""
         features = []
@@ -58,19 +75,29 @@ class ModeleInventaireML:  # Renommé pour correspondre à l'import attendu
 
         return np.array(features).reshape(1, -1)
 
-    @cache_result(ttl_seconds=3600)  # Changé de timeout à ttl_seconds
+    @monitor_prediction('inventaire_niveau_optimal')
+    @memoize_prediction(
+        'inventaire_niveau_optimal',
+        entity=lambda stock, **_: stock.id,
+        watermark=lambda stock, mouvements, **_: (
+            stock.date_derniere_maj, latest(mouvements, 'date_mouvement')
+        ),
+        ttl_seconds=3600
+    )
     def predict_stock_optimal(self, stock: Stock, mouvements: List[MouvementStock]) -> Dict:
         """Prédit le niveau de stock optimal"""
         if not self._is_trained:
             raise ValueError("Le modèle doit être entraîné avant de faire des prédictions")
 
         features = self._prepare_features(stock, mouvements)
-        features_scaled = self.scaler.transform(features)
-        prediction = self.model.predict(features_scaled)[0]
+        registry = get_model_registry()
+        prediction = registry.predict('inventaire_niveau_optimal', features)[0]
+        # Pipeline (scaler + modèle) enregistré: même modèle que la prédiction
+        pipeline = registry.get('inventaire_niveau_optimal').model
 
         return {
             "niveau_optimal": float(prediction),
-            "confiance": float(self.model.score(features_scaled, [stock.quantite])),
+            "confiance": float(pipeline.score(features, [stock.quantite])),
             "date_prediction": datetime.now(datetime.timezone.utc).isoformat()
         }
 
@@ -89,6 +116,8 @@ class ModeleInventaireML:  # Renommé pour correspondre à l'import attendu
 
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
+        self._register_inference()
+        get_ml_monitor().set_reference('inventaire_niveau_optimal', X)
         self._is_trained = True
 
     def save_model(self, path: str):
@@ -101,14 +130,18 @@ class ModeleInventaireML:  # Renommé pour correspondre à l'import attendu
             'scaler': self.scaler,
             'is_trained': self._is_trained
         }
+        import joblib
         joblib.dump(model_data, path)
 
     def load_model(self, path: str):
         """Charge le modèle ML"""
+        import joblib
         model_data = joblib.load(path)
         self.model = model_data['model']
         self.scaler = model_data['scaler']
         self._is_trained = model_data['is_trained']
+        if self._is_trained:
+            self._register_inference()
 
     @property
     def is_trained(self) -> bool:
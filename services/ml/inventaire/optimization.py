@@ -5,18 +5,24 @@ Module d'optimisation des stocks utilisant le ML
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.ensemble import GradientBoostingRegressor
-import pandas as pd
+
+from services.ml.core.lazy import lazy_import
 
 from models.inventory import Stock, MouvementStock, CategoryProduit
-from services.cache_service import cache_result
+from services.ml.core.memoization import memoize_prediction, latest
+from services.ml.core.monitoring import monitor_prediction
 from .base import ModeleInventaireML
 
+pd = lazy_import('pandas')
+
 class OptimiseurStock:  # Renommé pour correspondre à l'import attendu
     """Optimiseur de stocks utilisant le ML"""
 
-    def __init__(self):
-        self.base_model = ModeleInventaireML()
+    def __init__(self, base_model: Optional[ModeleInventaireML] = None):
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        # Modèle de base partagé avec le service (un seul modèle enregistré)
+        self.base_model = base_model or ModeleInventaireML()
         self.optimizer = GradientBoostingRegressor(
             n_estimators=100,
             learning_rate=0.1,
@@ -25,7 +31,15 @@ class OptimiseurStock:  # Renommé pour correspondre à l'import attendu
         )
         self._is_trained = False
 
-    @cache_result(ttl_seconds=3600)
+    @monitor_prediction('inventaire_optimisation')
+    @memoize_prediction(
+        ('inventaire_niveau_optimal', 'inventaire_optimisation'),
+        entity=lambda stock, **_: stock.id,
+        watermark=lambda stock, mouvements, **_: (
+            stock.date_derniere_maj, latest(mouvements, 'date_mouvement')
+        ),
+        ttl_seconds=3600
+    )
     def optimize_stock_levels(self, 
                             stock: Stock, 
                             mouvements: List[MouvementStock],
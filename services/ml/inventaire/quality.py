@@ -5,17 +5,19 @@ Module de prédiction de qualité des stocks utilisant le ML
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import pandas as pd
 
 from models.inventory import Stock, MouvementStock
-from services.cache_service import cache_result
+from services.ml.core.inference import get_model_registry
+from services.ml.core.memoization import memoize_prediction, latest
+from services.ml.core.monitoring import get_ml_monitor, monitor_prediction
 
 class PredicteurQualite:  # Renommé pour correspondre à la nomenclature française
     """Prédicteur de qualité des stocks utilisant le ML"""
 
     def __init__(self):
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+
         self.model = RandomForestClassifier(
             n_estimators=100,
             max_depth=5,
@@ -24,7 +26,17 @@ class PredicteurQualite:  # Renommé pour correspondre à la nomenclature franç
         self.scaler = StandardScaler()
         self._is_trained = False
 
-    @cache_result(ttl_seconds=1800)
+    @monitor_prediction('inventaire_risque_qualite')
+    @memoize_prediction(
+        'inventaire_risque_qualite',
+        entity=lambda stock, **_: stock.id,
+        watermark=lambda stock, historique_conditions, **_: (
+            stock.date_derniere_maj,
+            latest(historique_conditions, 'timestamp'),
+            len(historique_conditions or [])
+        ),
+        ttl_seconds=1800
+    )
     def predict_quality_risk(self,
                            stock: Stock,
                            conditions_actuelles: Dict,
@@ -35,10 +47,11 @@ class PredicteurQualite:  # Renommé pour correspondre à la nomenclature franç
 
         # Préparation des features
         features = self._prepare_features(stock, conditions_actuelles, historique_conditions)
-        features_scaled = self.scaler.transform(features.reshape(1, -1))
         
-        # Prédiction du risque
-        risk_proba = self.model.predict_proba(features_scaled)[0]
+        # Prédiction du risque (scaler inclus dans le graphe d'inférence)
+        risk_proba = get_model_registry().predict_proba(
+            'inventaire_risque_qualite', features.reshape(1, -1)
+        )[0]
         risk_level = self._calculate_risk_level(risk_proba)
         
         # Analyse des facteurs de risque
@@ -236,8 +249,17 @@ class PredicteurQualite:  # Renommé pour correspondre à la nomenclature franç
             y = np.array(y)
             X_scaled = self.scaler.fit_transform(X)
             self.model.fit(X_scaled, y)
+            self._register_inference()
+            get_ml_monitor().set_reference('inventaire_risque_qualite', X)
             self._is_trained = True
 
+    def _register_inference(self) -> None:
+        """Enregistre scaler + classifieur comme un seul graphe d'inférence"""
+        from sklearn.pipeline import Pipeline
+
+        pipeline = Pipeline([('scaler', self.scaler), ('model', self.model)])
+        get_model_registry().register('inventaire_risque_qualite', pipeline)
+
     @property
     def is_trained(self) -> bool:
         """Retourne si le prédicteur est entraîné"""
@@ -2,10 +2,11 @@
 Classes et fonctions de base pour le module ML production.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence
 from datetime import date
 import numpy as np
 from sqlalchemy.orm import Session
+from sqlalchemy import func, cast, Float
 
 from models.production import (
     Parcelle,
@@ -79,6 +80,40 @@ class BaseProductionML:
             "conditions_meteo": r.conditions_meteo
         } for r in recoltes]
 
+    async def _get_stats_rendements_batch(
+        self,
+        parcelle_ids: Optional[Sequence[Any]] = None
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Statistiques des rendements de plusieurs parcelles en une requête
+        
+        Args:
+            parcelle_ids: Parcelles ciblées (toutes si None)
+            
+        Returns:
+            Dict parcelle_id -> {nombre, moyenne, ecart_type}
+        """
+        quantite = cast(Recolte.quantite_kg, Float)
+        query = self.db.query(
+            Recolte.parcelle_id,
+            func.count(Recolte.id).label("nombre"),
+            func.avg(quantite).label("moyenne"),
+            func.avg(quantite * quantite).label("moyenne_carres")
+        )
+        if parcelle_ids is not None:
+            query = query.filter(Recolte.parcelle_id.in_(list(parcelle_ids)))
+
+        stats = {}
+        for row in query.group_by(Recolte.parcelle_id).all():
+            moyenne = float(row.moyenne or 0)
+            variance = max(float(row.moyenne_carres or 0) - moyenne ** 2, 0.0)
+            stats[str(row.parcelle_id)] = {
+                "nombre": int(row.nombre),
+                "moyenne": moyenne,
+                "ecart_type": float(np.sqrt(variance))
+            }
+        return stats
+
     async def _get_historique_cycles(
         self,
         parcelle_id: str
@@ -2,17 +2,26 @@
 Module pour la prédiction des rendements de production.
 """
 
-from typing import Dict, Any, List
-from datetime import date
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from datetime import date, timedelta
 import numpy as np
 from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
 
 from .base import BaseProductionML
+from models.production import Parcelle
+from models.iot_sensor import IoTSensor, SensorReading
 from services.weather_service import WeatherService
 from services.iot_service import IoTService
 
 class PredicteurRendement(BaseProductionML):
     """Service ML pour la prédiction des rendements"""
+
+    # Poids du modèle linéaire (historique x3, météo x3, IoT x3)
+    POIDS_FEATURES = np.array([0.4, 0.1, 0.1, 0.2, 0.1, 0.1, 0.3, 0.1, 0.1])
+
+    # Précision de la grille météo en degrés (~11 km): une requête par cellule
+    PRECISION_GRILLE_METEO = 0.1
     
     def __init__(self, db: Session):
         super().__init__(db)
@@ -29,11 +38,12 @@ class PredicteurRendement(BaseProductionML):
         # Récupération des données historiques
         historique = await self._get_historique_rendements(parcelle_id)
         
-        # Récupération des données météo
-        meteo = await self.weather_service.get_historical_data(
-            parcelle_id,
+        # Récupération des données météo (cellule de grille de la parcelle)
+        parcelle = self.db.get(Parcelle, parcelle_id)
+        meteo = await self.weather_service.get_daily_conditions(
             date_debut,
-            date_fin
+            date_fin,
+            self._grid_cell(parcelle) if parcelle else None
         )
         
         # Récupération des données IoT
@@ -65,8 +75,215 @@ class PredicteurRendement(BaseProductionML):
         """Prédit le rendement avec le modèle ML"""
         # TODO: Implémenter le modèle ML
         # Pour l'instant, utilise une moyenne pondérée
-        weights = np.array([0.4, 0.1, 0.1, 0.2, 0.1, 0.1, 0.3, 0.1, 0.1])
-        return float(np.sum(features * weights))
+        return float(np.sum(features * self.POIDS_FEATURES))
+
+    async def predict_rendement_batch(
+        self,
+        parcelle_ids: Optional[Sequence[Any]] = None,
+        horizon: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Prédit le rendement de plusieurs parcelles en une seule passe
+        
+        L'historique des récoltes et les données IoT sont agrégés par
+        parcelle en une requête chacun, la météo est récupérée une fois par
+        cellule de grille, et les features sont calculées sous forme de
+        matrice (une ligne par parcelle).
+        
+        Args:
+            parcelle_ids: Parcelles ciblées (toutes si None)
+            horizon: Horizon de prédiction en jours
+            
+        Returns:
+            Dict avec prédictions par parcelle et totaux de l'exploitation
+        """
+        if horizon <= 0:
+            raise ValueError("L'horizon de prédiction doit être positif")
+
+        date_debut = date.today()
+        date_fin = date_debut + timedelta(days=horizon)
+
+        parcelles = self._get_parcelles(parcelle_ids)
+        if not parcelles:
+            return {
+                "parcelles": {},
+                "totaux": self._calculate_totaux(np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)),
+                "horizon": horizon
+            }
+
+        ids = [str(p.id) for p in parcelles]
+        stats_historique = await self._get_stats_rendements_batch([p.id for p in parcelles])
+        stats_meteo = await self._get_meteo_par_cellule(parcelles, date_debut, date_fin)
+        stats_iot = await self._get_stats_iot_batch([p.id for p in parcelles], date_debut, date_fin)
+
+        features = self._calculate_features_matrix(
+            ids, stats_historique, stats_meteo, stats_iot
+        )
+
+        # Prédiction vectorisée: une multiplication matricielle pour toutes les parcelles
+        predictions = features @ self.POIDS_FEATURES
+        ecarts_types = features[:, 1]
+        avec_historique = features[:, 2] > 0
+        mins = np.where(avec_historique, predictions - 2 * ecarts_types, predictions * 0.8)
+        maxs = np.where(avec_historique, predictions + 2 * ecarts_types, predictions * 1.2)
+        surfaces = np.array([float(p.surface_hectares or 0) for p in parcelles])
+
+        resultats = {
+            parcelle_id: {
+                "rendement_prevu": float(predictions[i]),
+                "intervalle_confiance": {"min": float(mins[i]), "max": float(maxs[i])},
+                "surface_hectares": float(surfaces[i]),
+                "culture_type": getattr(parcelles[i].culture_type, "value", parcelles[i].culture_type)
+            }
+            for i, parcelle_id in enumerate(ids)
+        }
+
+        return {
+            "parcelles": resultats,
+            "totaux": self._calculate_totaux(predictions, mins, maxs, surfaces),
+            "horizon": horizon,
+            "date_debut": date_debut.isoformat(),
+            "date_fin": date_fin.isoformat(),
+            "facteurs_impact": await self._analyze_impact_factors(features)
+        }
+
+    def _get_parcelles(self, parcelle_ids: Optional[Sequence[Any]]) -> List[Parcelle]:
+        """Charge les parcelles ciblées en une requête"""
+        query = self.db.query(Parcelle)
+        if parcelle_ids is not None:
+            query = query.filter(Parcelle.id.in_(list(parcelle_ids)))
+        return query.all()
+
+    def _grid_cell(self, parcelle: Parcelle) -> Optional[Tuple[float, float]]:
+        """Cellule de grille météo d'une parcelle (coordonnées arrondies)"""
+        coords = parcelle.coordonnees_gps or {}
+        precision = self.PRECISION_GRILLE_METEO
+        latitude = coords.get("latitude")
+        longitude = coords.get("longitude")
+        if latitude is None or longitude is None:
+            return None  # Parcelles sans GPS: météo de l'exploitation
+        return (
+            round(round(float(latitude) / precision) * precision, 4),
+            round(round(float(longitude) / precision) * precision, 4)
+        )
+
+    async def _get_meteo_par_cellule(
+        self,
+        parcelles: List[Parcelle],
+        date_debut: date,
+        date_fin: date
+    ) -> Dict[str, List[float]]:
+        """
+        Récupère la météo une fois par cellule de grille
+        
+        Returns:
+            Dict parcelle_id -> [temperature moyenne, humidite moyenne, precipitations]
+        """
+        cellules: Dict[Optional[Tuple[float, float]], List[Parcelle]] = {}
+        for parcelle in parcelles:
+            cellules.setdefault(self._grid_cell(parcelle), []).append(parcelle)
+
+        stats = {}
+        for cellule, membres in cellules.items():
+            meteo = await self.weather_service.get_daily_conditions(
+                date_debut,
+                date_fin,
+                cellule
+            )
+            if meteo:
+                valeurs = [
+                    float(np.mean([m["temperature"] for m in meteo])),
+                    float(np.mean([m["humidite"] for m in meteo])),
+                    float(np.sum([m["precipitation"] for m in meteo]))
+                ]
+            else:
+                valeurs = [0.0, 0.0, 0.0]
+            for parcelle in membres:
+                stats[str(parcelle.id)] = valeurs
+        return stats
+
+    async def _get_stats_iot_batch(
+        self,
+        parcelle_ids: Sequence[Any],
+        date_debut: date,
+        date_fin: date
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Statistiques des lectures IoT par parcelle en une requête
+        
+        Returns:
+            Dict parcelle_id -> {nombre, moyenne, ecart_type}
+        """
+        rows = self.db.query(
+            IoTSensor.parcelle_id,
+            func.count(SensorReading.id).label("nombre"),
+            func.avg(SensorReading.valeur).label("moyenne"),
+            func.avg(SensorReading.valeur * SensorReading.valeur).label("moyenne_carres")
+        ).join(
+            SensorReading, SensorReading.capteur_id == IoTSensor.id
+        ).filter(
+            and_(
+                IoTSensor.parcelle_id.in_(list(parcelle_ids)),
+                SensorReading.timestamp >= date_debut - timedelta(days=30),
+                SensorReading.timestamp <= date_fin
+            )
+        ).group_by(IoTSensor.parcelle_id).all()
+
+        stats = {}
+        for row in rows:
+            moyenne = float(row.moyenne or 0)
+            variance = max(float(row.moyenne_carres or 0) - moyenne ** 2, 0.0)
+            stats[str(row.parcelle_id)] = {
+                "nombre": int(row.nombre),
+                "moyenne": moyenne,
+                "ecart_type": float(np.sqrt(variance))
+            }
+        return stats
+
+    def _calculate_features_matrix(
+        self,
+        parcelle_ids: List[str],
+        stats_historique: Dict[str, Dict[str, float]],
+        stats_meteo: Dict[str, List[float]],
+        stats_iot: Dict[str, Dict[str, float]]
+    ) -> np.ndarray:
+        """
+        Construit la matrice de features (n_parcelles x 9)
+        
+        Même ordre de colonnes que _calculate_features: historique
+        (moyenne, écart-type, nombre), météo (température, humidité,
+        précipitations), IoT (moyenne, écart-type, nombre).
+        """
+        vide = {"moyenne": 0.0, "ecart_type": 0.0, "nombre": 0}
+        features = np.zeros((len(parcelle_ids), 9))
+        for i, parcelle_id in enumerate(parcelle_ids):
+            hist = stats_historique.get(parcelle_id, vide)
+            iot = stats_iot.get(parcelle_id, vide)
+            features[i, 0:3] = (hist["moyenne"], hist["ecart_type"], hist["nombre"])
+            features[i, 3:6] = stats_meteo.get(parcelle_id, (0.0, 0.0, 0.0))
+            features[i, 6:9] = (iot["moyenne"], iot["ecart_type"], iot["nombre"])
+        return features
+
+    def _calculate_totaux(
+        self,
+        predictions: np.ndarray,
+        mins: np.ndarray,
+        maxs: np.ndarray,
+        surfaces: np.ndarray
+    ) -> Dict[str, float]:
+        """Totaux de l'exploitation"""
+        surface_totale = float(surfaces.sum())
+        rendement_total = float(predictions.sum())
+        return {
+            "rendement_prevu": rendement_total,
+            "intervalle_confiance": {
+                "min": float(mins.sum()),
+                "max": float(maxs.sum())
+            },
+            "surface_hectares": surface_totale,
+            "rendement_par_hectare": rendement_total / surface_totale if surface_totale else 0.0,
+            "nombre_parcelles": int(len(predictions))
+        }
 
     def _calculate_confidence(
         self,
@@ -3,10 +3,12 @@ Service d'apprentissage automatique pour la production agricole.
 Utilise des services spécialisés pour chaque type d'analyse.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Sequence
 from datetime import date
 from sqlalchemy.orm import Session
 
+from services.ml.core.monitoring import monitor_prediction
+
 from .rendement import PredicteurRendement
 from .cycle import OptimiseurCycle
 from .meteo import MeteoAnalyzer
@@ -28,13 +30,42 @@ class ProductionMLService:
         date_debut: date,
         date_fin: date
     ) -> Dict[str, Any]:
-        """Prédit le rendement d'une parcelle pour une période donnée"""
+        """
+        Prédit le rendement d'une parcelle pour une période donnée ("all":
+        toutes les parcelles). Chaque chemin est mesuré une seule fois.
+        """
+        if parcelle_id == "all":
+            horizon = (date_fin - date_debut).days if date_debut and date_fin else 30
+            return await self.predict_rendement_batch(horizon=horizon)
+        return await self.predict_rendement_parcelle(parcelle_id, date_debut, date_fin)
+
+    @monitor_prediction('production_rendement')
+    async def predict_rendement_parcelle(
+        self,
+        parcelle_id: str,
+        date_debut: date,
+        date_fin: date
+    ) -> Dict[str, Any]:
+        """Prédit le rendement d'une seule parcelle"""
         return await self.rendement_predictor.predict_rendement(
             parcelle_id,
             date_debut,
             date_fin
         )
 
+    @monitor_prediction('production_rendement', batch_size=lambda r: len(r.get('parcelles', {})))
+    async def predict_rendement_batch(
+        self,
+        parcelle_ids: Optional[Sequence[Any]] = None,
+        horizon: int = 30
+    ) -> Dict[str, Any]:
+        """Prédit le rendement de toutes les parcelles (ou d'une sélection) en une passe"""
+        return await self.rendement_predictor.predict_rendement_batch(
+            parcelle_ids,
+            horizon
+        )
+
+    @monitor_prediction('production_cycle')
     async def optimize_cycle_culture(
         self,
         parcelle_id: str,
@@ -46,6 +77,7 @@ class ProductionMLService:
             date_debut
         )
 
+    @monitor_prediction('production_meteo')
     async def analyze_meteo_impact(
         self,
         parcelle_id: str,
@@ -59,6 +91,7 @@ class ProductionMLService:
             date_fin
         )
 
+    @monitor_prediction('production_qualite')
     async def predict_qualite(
         self,
         parcelle_id: str,
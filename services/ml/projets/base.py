@@ -5,8 +5,6 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 import numpy as np
 from sqlalchemy.orm import Session
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
 
 from models.tache import Tache as Task, StatutTache as TaskStatus  # Renommé pour utiliser les noms français
 from models.resource import Resource, ResourceType
@@ -25,7 +23,10 @@ class ProjectsMLService:
         self.iot_service = IoTService(db, self.weather_service)
         self.cache = CacheService()
         
-        # Initialisation du modèle ML
+        # Initialisation du modèle ML (sklearn importé à la demande)
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+
         self.scaler = StandardScaler()
         self.model = RandomForestClassifier(
             n_estimators=100,
@@ -1,14 +1,16 @@
 """Service d'optimisation des ressources des projets."""
 
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List
 from datetime import date, timedelta
-from pulp import LpProblem, LpMinimize, LpVariable, lpSum, LpStatus
 from sqlalchemy.orm import Session
 
 from models.task import Task
 from models.resource import Resource
 from services.cache_service import CacheService
 
+if TYPE_CHECKING:
+    from pulp import LpProblem, LpVariable
+
 class ResourceOptimizer:
     """Optimiseur de ressources pour les projets."""
     
@@ -34,7 +36,9 @@ class ResourceOptimizer:
         tasks = await self._get_tasks(project_id)
         resources = await self._get_resources(project_id)
         
-        # Création du problème d'optimisation
+        # Création du problème d'optimisation (pulp importé à la demande)
+        from pulp import LpProblem, LpMinimize, LpVariable, lpSum, LpStatus
+
         prob = LpProblem("resource_allocation", LpMinimize)
         
         # Variables de décision
@@ -126,10 +130,10 @@ class ResourceOptimizer:
 
     def _analyze_solution(
         self,
-        x: Dict[Any, LpVariable],
+        x: Dict[Any, 'LpVariable'],
         tasks: List[Dict[str, Any]],
         resources: List[Dict[str, Any]],
-        prob: LpProblem
+        prob: 'LpProblem'
     ) -> Dict[str, Any]:
         """Analyse la solution d'optimisation."""
         # Extraction allocation
@@ -4,6 +4,8 @@ from typing import Dict, Any, Optional
 from datetime import date
 from sqlalchemy.orm import Session
 
+from services.ml.core.monitoring import monitor_prediction
+
 from services.ml.projets.base import ProjectsMLService
 
 class ProjetsMLService:  # Renommé pour correspondre à l'import attendu
@@ -13,6 +15,7 @@ class ProjetsMLService:  # Renommé pour correspondre à l'import attendu
         """Initialisation du service."""
         self.projects_ml = ProjectsMLService(db)
 
+    @monitor_prediction('projets_succes')
     async def predict_project_success(
         self,
         project_id: str,
@@ -24,6 +27,7 @@ class ProjetsMLService:  # Renommé pour correspondre à l'import attendu
             current_date
         )
 
+    @monitor_prediction('projets_allocation')
     async def optimize_resource_allocation(
         self,
         project_id: str,
@@ -37,6 +41,7 @@ class ProjetsMLService:  # Renommé pour correspondre à l'import attendu
             end_date
         )
 
+    @monitor_prediction('projets_performance')
     async def analyze_project_performance(
         self,
         project_id: str,
@@ -50,6 +55,7 @@ class ProjetsMLService:  # Renommé pour correspondre à l'import attendu
             end_date
         )
 
+    @monitor_prediction('projets_meteo')
     async def predict_weather_impact(
         self,
         project_id: str,
@@ -13,6 +13,7 @@ from services.comptabilite_service import ComptabiliteService
 from services.ml.projets.service import ProjetsMLService
 from services.hr_analytics_service import HRAnalyticsService
 from services.cache_service import CacheService
+from services.ml.core.monitoring import monitor_prediction
 from services.finance_comptabilite_integration_service import FinanceComptabiliteIntegrationService
 
 class TableauBordPredictionsService:
@@ -41,6 +42,7 @@ class TableauBordPredictionsService:
         self.cache_service = cache_service
         self.cache_ttl = 900  # 15 minutes
 
+    @monitor_prediction('tableau_bord_predictions')
     async def get_ml_predictions(self) -> Dict[str, Any]:
         """Agrège les prédictions ML de tous les modules."""
         cache_key = "ml_predictions"
@@ -63,11 +65,7 @@ class TableauBordPredictionsService:
     async def _get_production_predictions(self) -> Dict[str, Any]:
         """Récupère les prédictions ML pour la production."""
         return {
-            "rendement": await self.production_ml.predict_rendement(
-                parcelle_id="all",
-                date_debut=None,
-                date_fin=None
-            ),
+            "rendement": await self.production_ml.predict_rendement_batch(),
             "qualite": await self.production_ml.predict_qualite(
                 parcelle_id="all",
                 date_recolte=None
@@ -4,7 +4,9 @@ Regroupe les données de tous les modules pour présentation unifiée.
 """
 
 from typing import Dict, List, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from core.responses import cached_json
 
 from services.hr_analytics_service import HRAnalyticsService
 from services.production_service import ProductionService
@@ -37,6 +39,19 @@ class TableauBordUnifieService:
         self.cache_service = cache_service
         self.cache_ttl = 900  # 15 minutes
 
+    async def get_unified_dashboard_json(self) -> bytes:
+        """
+        Tableau de bord unifié encodé en JSON
+
+        Les octets sont mis en cache: un succès est servi sans ré-encodage.
+        """
+        return await cached_json(
+            self.cache_service,
+            "unified_dashboard_data:json",
+            self.get_unified_dashboard_data,
+            expire_in=timedelta(seconds=self.cache_ttl)
+        )
+
     async def get_unified_dashboard_data(self) -> Dict[str, Any]:
         """
         Récupère et agrège les données de tous les modules pour le tableau de bord unifié.
@@ -0,0 +1,211 @@
+"""
+Diffusion des notifications temps réel entre workers
+
+Les notifications sont publiées sur Redis (canal notifications:<utilisateur>).
+Chaque worker possédant des connexions WebSocket s'abonne à ces canaux et
+remet les messages à ses connexions locales. Chaque connexion dispose d'une
+file d'envoi bornée vidée par sa propre tâche: un client lent perd ses
+messages les plus anciens sans retarder les autres.
+
+Les pairs morts sont détectés par le ping du protocole WebSocket (paramètres
+ws_ping_interval / ws_ping_timeout d'uvicorn) et par l'échec des envois; un
+client qui ne fait que recevoir n'est jamais fermé pour inactivité.
+
+Battement applicatif (optionnel): un client qui se connecte avec
+?heartbeat=true reçoit {"type":"ping"} après heartbeat_interval secondes sans
+notification et doit répondre par un message texte, par convention
+{"type":"pong"}. Sans aucun message de sa part pendant idle_timeout secondes,
+la connexion est fermée avec le code 1001.
+"""
+
+from typing import Any, Dict, Optional, Set
+import asyncio
+import logging
+import time
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from core.config import NOTIFICATIONS_CONFIG
+from core.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "notifications:"
+CHANNEL_PATTERN = f"{CHANNEL_PREFIX}*"
+PING = '{"type":"ping"}'
+
+class ClientConnection:
+    """Connexion WebSocket locale et sa file d'envoi bornée"""
+
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.last_seen = time.monotonic()
+
+    def enqueue(self, message: str) -> None:
+        """Ajoute un message sans attendre (le plus ancien est abandonné si la file est pleine)"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def send_loop(self, heartbeat_interval: Optional[float] = None) -> None:
+        """Vide la file vers le client, avec un ping en l'absence de message si demandé"""
+        while True:
+            try:
+                message = await asyncio.wait_for(self.queue.get(), heartbeat_interval)
+            except asyncio.TimeoutError:
+                message = PING
+            await self.websocket.send_text(message)
+
+    async def receive_loop(self, idle_timeout: Optional[float] = None) -> None:
+        """Lit les messages du client (pong compris) jusqu'à la déconnexion ou au silence prolongé"""
+        while True:
+            await asyncio.wait_for(self.websocket.receive_text(), idle_timeout)
+            self.last_seen = time.monotonic()
+
+class NotificationHub:
+    """Connexions WebSocket du worker et abonnement Redis partagé"""
+
+    def __init__(self,
+                 queue_size: Optional[int] = None,
+                 heartbeat_interval: Optional[float] = None,
+                 idle_timeout: Optional[float] = None):
+        self.queue_size = queue_size or NOTIFICATIONS_CONFIG["send_queue_size"]
+        self.heartbeat_interval = heartbeat_interval or NOTIFICATIONS_CONFIG["heartbeat_interval"]
+        self.idle_timeout = idle_timeout or NOTIFICATIONS_CONFIG["idle_timeout"]
+        self._connections: Dict[str, Set[ClientConnection]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    async def serve(self, websocket: WebSocket, user_id: str, heartbeat: bool = False) -> None:
+        """
+        Gère une connexion acceptée jusqu'à sa déconnexion, l'échec d'un envoi
+        ou, pour les clients ayant choisi le battement, leur inactivité
+        """
+        connection = self.register(user_id, websocket)
+        tasks = {
+            asyncio.create_task(connection.send_loop(self.heartbeat_interval if heartbeat else None)),
+            asyncio.create_task(connection.receive_loop(self.idle_timeout if heartbeat else None)),
+        }
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if isinstance(error, asyncio.TimeoutError):
+                    logger.info(f"Connexion inactive fermée: {user_id}")
+                    await self._close(websocket)
+                elif error is not None and not isinstance(error, WebSocketDisconnect):
+                    logger.info(f"Connexion perdue: {user_id} ({str(error)})")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.unregister(connection)
+
+    def register(self, user_id: str, websocket: WebSocket) -> ClientConnection:
+        connection = ClientConnection(websocket, user_id, self.queue_size)
+        self._connections.setdefault(user_id, set()).add(connection)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return connection
+
+    def unregister(self, connection: ClientConnection) -> None:
+        connections = self._connections.get(connection.user_id, set())
+        connections.discard(connection)
+        if not connections:
+            self._connections.pop(connection.user_id, None)
+        if not self._connections and self._listener is not None:
+            # Plus aucune connexion locale: inutile de rester abonné
+            self._listener.cancel()
+            self._listener = None
+
+    def deliver_local(self, user_id: str, message: str) -> int:
+        """Remet un message aux connexions locales d'un utilisateur"""
+        connections = self._connections.get(user_id, ())
+        for connection in connections:
+            connection.enqueue(message)
+        return len(connections)
+
+    async def publish(self, user_id: str, notification: Dict[str, Any]) -> None:
+        """Publie une notification pour tous les workers"""
+        message = dumps(notification).decode()
+        try:
+            await self._redis().publish(f"{CHANNEL_PREFIX}{user_id}", message)
+        except Exception as e:
+            # Redis indisponible: seules les connexions de ce worker sont servies
+            logger.warning(f"Publication Redis impossible: {str(e)}")
+            self.deliver_local(user_id, message)
+
+    def publish_nowait(self, user_id: str, notification: Dict[str, Any]) -> None:
+        """Publie en tâche de fond, sans faire attendre l'appelant"""
+        task = asyncio.create_task(self.publish(user_id, notification))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def dispatch(self, item: Dict[str, Any]) -> None:
+        """Remet un message reçu de Redis aux connexions locales"""
+        if item.get("type") != "pmessage":
+            return
+        channel = item["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        data = item["data"]
+        self.deliver_local(
+            channel[len(CHANNEL_PREFIX):],
+            data.decode() if isinstance(data, bytes) else data
+        )
+
+    async def _listen(self) -> None:
+        """Abonnement aux canaux de notification, rétabli après une coupure"""
+        backoff = 1.0
+        while True:
+            pubsub = self._redis().pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PATTERN)
+                backoff = 1.0
+                async for item in pubsub.listen():
+                    self.dispatch(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Abonnement aux notifications interrompu: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def _close(self, websocket: WebSocket) -> None:
+        try:
+            await websocket.close(code=1001)
+        except Exception:
+            pass
+
+    def _redis(self):
+        from services.cache_service import get_async_redis_client
+        return get_async_redis_client()
+
+    def __len__(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+# Instance singleton du hub de notifications (une par worker)
+_notification_hub = None
+
+def get_notification_hub() -> NotificationHub:
+    """Retourne l'instance singleton du hub de notifications"""
+    global _notification_hub
+    if _notification_hub is None:
+        _notification_hub = NotificationHub()
+    return _notification_hub
+
+def notification_message(notification) -> Dict[str, Any]:
+    """Contenu temps réel d'une notification enregistrée"""
+    return {
+        column.name: getattr(notification, column.name)
+        for column in notification.__table__.columns
+    }
@@ -3,7 +3,7 @@ from models.notification import Notification, TypeNotification, ModuleNotificati
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from db.database import get_db
-from api.v1.endpoints.notifications import send_notification
+from services.notification_hub import get_notification_hub, notification_message
 
 class NotificationService:
     def __init__(self, db: Session = Depends(get_db)):
@@ -34,10 +34,10 @@ class NotificationService:
         self.db.commit()
         self.db.refresh(notification)
 
-        # Envoyer la notification en temps réel
-        await send_notification(
+        # Diffusion temps réel en tâche de fond (tous les workers, via Redis)
+        get_notification_hub().publish_nowait(
             str(destinataire_id),
-            notification.dict()
+            notification_message(notification)
         )
 
         return notification
@@ -1,27 +1,21 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from services.weather_service import WeatherService
+from services.cache_service import get_redis_client
+from services.weather_service import get_weather_service
 from services.notification_service import NotificationService
 from models.production import Parcelle, Recolte, ProductionEvent
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 import json
-from redis import Redis
-from core.config import settings
 
 class ProductionReportService:
     """Service de génération de rapports de production intégrés"""
 
     def __init__(self, db: Session):
         self.db = db
-        self.weather_service = WeatherService()
+        self.weather_service = get_weather_service()
         self.notification_service = NotificationService()
-        self.redis_client = Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=0,
-            decode_responses=True
-        )
+        self.redis_client = get_redis_client()
         self.cache_ttl = 3600  # 1 heure en secondes
 
     async def generate_weekly_report(
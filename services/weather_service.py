@@ -1,24 +1,23 @@
 import httpx
-from typing import Dict, Any, Optional
-from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, timezone, timedelta
 import json
-from redis import Redis
 from fastapi import HTTPException
 from core.config import settings
+from services.cache_service import get_redis_client
 from services.notification_service import NotificationService
 from models.notification import TypeNotification, ModuleNotification
 
+# Points d'impact financier par niveau de risque (mêmes poids que l'analyse budgétaire)
+IMPACT_PRECIPITATION = {"LOW": 0, "MEDIUM": 15, "HIGH": 30}
+IMPACT_TEMPERATURE = {"LOW": 0, "MEDIUM": 10, "HIGH": 20}
+
 class WeatherService:
     def __init__(self, db=None):
         self.api_key = settings.WEATHER_API_KEY
         self.base_url = settings.WEATHER_API_URL
         self.location = "Ebondi,Cameroon"  # Localisation des plantations FOFAL
-        self.redis_client = Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=0,
-            decode_responses=True
-        )
+        self.redis_client = get_redis_client()
         self.notification_service = NotificationService()
         self.cache_ttl = 1800  # 30 minutes en secondes
         self.max_retries = 3
@@ -111,6 +110,102 @@ class WeatherService:
                     return {"location": self.location, "days": []}
                 continue
 
+    async def get_daily_impacts(self, date_debut: date, date_fin: date) -> Dict[str, int]:
+        """
+        Score d'impact météo (0-50) par jour ISO sur une période, en une
+        seule requête à l'API (précipitations et chaleur)
+        """
+        cache_key = f"weather:impacts:{self.location}:{date_debut}:{date_fin}"
+        cached_data = self._get_from_cache(cache_key)
+        if cached_data:
+            return cached_data
+
+        url = f"{self.base_url}/{self.location}/{date_debut.isoformat()}/{date_fin.isoformat()}"
+        params = {
+            "key": self.api_key,
+            "unitGroup": "metric",
+            "include": "days",
+            "elements": "datetime,precip,tempmax",
+            "contentType": "json"
+        }
+
+        for attempt in range(self.max_retries):
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    response = await client.get(url, params=params)
+                    response.raise_for_status()
+                    data = response.json()
+
+                    result = {
+                        day["datetime"]: (
+                            IMPACT_PRECIPITATION[self._analyze_precipitation(day.get("precip") or 0, [])["level"]]
+                            + IMPACT_TEMPERATURE[self._analyze_temperature(day.get("tempmax") or 0, [])["level"]]
+                        )
+                        for day in data.get("days", [])
+                        if day.get("datetime")
+                    }
+
+                    self._save_to_cache(cache_key, result)
+                    return result
+            except httpx.HTTPError as e:
+                if attempt == self.max_retries - 1:
+                    await self._handle_error("Erreur lors de la récupération de l'historique météo", str(e))
+                    return {}
+                continue
+
+    async def get_daily_conditions(
+        self,
+        date_debut: date,
+        date_fin: date,
+        coordonnees: Optional[Tuple[float, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Conditions journalières (température, humidité, précipitations) sur
+        une période, observées ou prévues selon la date, en une seule requête
+        à l'API; aux coordonnées (latitude, longitude) données, sinon sur
+        l'exploitation
+        """
+        location = f"{coordonnees[0]},{coordonnees[1]}" if coordonnees else self.location
+        cache_key = f"weather:conditions:{location}:{date_debut}:{date_fin}"
+        cached_data = self._get_from_cache(cache_key)
+        if cached_data:
+            return cached_data
+
+        url = f"{self.base_url}/{location}/{date_debut.isoformat()}/{date_fin.isoformat()}"
+        params = {
+            "key": self.api_key,
+            "unitGroup": "metric",
+            "include": "days",
+            "elements": "datetime,temp,humidity,precip",
+            "contentType": "json"
+        }
+
+        for attempt in range(self.max_retries):
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    response = await client.get(url, params=params)
+                    response.raise_for_status()
+                    data = response.json()
+
+                    result = [
+                        {
+                            "date": day["datetime"],
+                            "temperature": day.get("temp") or 0,
+                            "humidite": day.get("humidity") or 0,
+                            "precipitation": day.get("precip") or 0
+                        }
+                        for day in data.get("days", [])
+                        if day.get("datetime")
+                    ]
+
+                    self._save_to_cache(cache_key, result)
+                    return result
+            except httpx.HTTPError as e:
+                if attempt == self.max_retries - 1:
+                    await self._handle_error("Erreur lors de la récupération des conditions météo", str(e))
+                    return []
+                continue
+
     async def get_agricultural_metrics(self) -> Dict[str, Any]:
         """Calcule les métriques agricoles basées sur les données météo"""
         cache_key = f"weather:metrics:{self.location}"
@@ -283,3 +378,13 @@ class WeatherService:
             module=ModuleNotification.WEATHER,
             destinataire_id="production"
         )
+
+# Instance singleton du service météo
+_weather_service = None
+
+def get_weather_service() -> WeatherService:
+    """Retourne l'instance singleton du service météo"""
+    global _weather_service
+    if _weather_service is None:
+        _weather_service = WeatherService()
+    return _weather_service
@@ -0,0 +1,196 @@
+"""
+Tests du job de clôture mensuelle (étapes enregistrées, reprise après échec)
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import (
+    ClotureJob,
+    CompteComptable,
+    EcritureComptable,
+    JournalComptable,
+    StatutClotureJob,
+    StatutEcriture,
+    TypeCompte,
+    TypeJournal
+)
+from services.ml.finance_comptabilite.cloture import GestionCloture
+
+PERIODE = "2024-03"
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cloture.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def ecritures(session):
+    """Un achat en brouillon et une vente validée sur mars 2024"""
+    comptes = {numero: uuid.uuid4() for numero in ("521", "601", "701", "691", "191")}
+    types = {"521": TypeCompte.ACTIF, "601": TypeCompte.CHARGE, "701": TypeCompte.PRODUIT,
+             "691": TypeCompte.CHARGE, "191": TypeCompte.PASSIF}
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": compte_id, "numero": numero, "libelle": numero, "type_compte": types[numero]}
+        for numero, compte_id in comptes.items()
+    ])
+    journal_id = uuid.uuid4()
+    session.execute(JournalComptable.__table__.insert(), [
+        {"id": journal_id, "code": "OD", "libelle": "Opérations diverses",
+         "type_journal": TypeJournal.OPERATIONS_DIVERSES}
+    ])
+    session.execute(EcritureComptable.__table__.insert(), [
+        {"id": uuid.uuid4(), "date_ecriture": date(2024, 3, jour), "numero_piece": piece,
+         "compte_id": comptes[numero], "libelle": piece, "debit": debit, "credit": credit,
+         "statut": statut, "journal_id": journal_id, "periode": PERIODE}
+        for jour, piece, numero, debit, credit, statut in [
+            (4, "ACH-1", "601", 1000, 0, StatutEcriture.BROUILLON),
+            (4, "ACH-1", "521", 0, 1000, StatutEcriture.BROUILLON),
+            (9, "VEN-1", "521", 3000, 0, StatutEcriture.VALIDEE),
+            (9, "VEN-1", "701", 0, 3000, StatutEcriture.VALIDEE),
+        ]
+    ])
+    session.commit()
+
+@pytest.fixture
+def service(session, tmp_path):
+    service = GestionCloture(session, archive_dir=str(tmp_path / "archives"))
+    service.analyse = Mock()
+    service.analyse.get_analyse_parcelle = AsyncMock(return_value={"ml_analysis": {
+        "provision_recommendations": [{"category": "LITIGE", "amount": 200, "description": "Litige client"}]
+    }})
+    service.analyse.optimize_costs = AsyncMock(side_effect=RuntimeError("Service ML indisponible"))
+    service.creer_analyse = Mock(return_value=service.analyse)
+    service.comptabilite.cache = AsyncMock()
+    return service
+
+async def test_cloture_complete(session, ecritures, service, tmp_path):
+    etat = await service.executer_cloture_mensuelle(PERIODE, uuid.uuid4())
+
+    assert (etat["statut"], etat["progression"]) == ("TERMINE", 100)
+    etapes = etat["etapes"]
+    assert etapes["validation"]["resultat"] == {"ecritures_validees": 2}
+    assert etapes["totaux"]["resultat"]["resultat"] == 2000
+    # L'optimisation est consultative: son échec n'arrête pas la clôture
+    assert etapes["optimisation"]["statut"] == "IGNOREE"
+    assert "indisponible" in etapes["optimisation"]["erreur"]
+    assert [e["numero_piece"] for e in etapes["ecritures_cloture"]["resultat"]] == ["CLO-2024-03-001"]
+    assert etapes["gel"]["resultat"] == {"ecritures_gelees": 6}
+    assert etapes["kpi"]["resultat"]["resultat_net"] == 1800
+
+    ecritures_periode = session.query(EcritureComptable).filter(EcritureComptable.periode == PERIODE).all()
+    assert all(e.statut == StatutEcriture.VALIDEE and e.modifiable is False for e in ecritures_periode)
+
+    archive = tmp_path / "archives" / PERIODE
+    compte_resultat = json.loads((archive / "compte_resultat.json").read_text())
+    assert compte_resultat["resultat"] == 1800
+    assert json.loads((archive / "pieces_justificatives.json").read_text()) == []
+
+    # Relancer une clôture terminée ne refait rien
+    await service.executer_cloture_mensuelle(PERIODE, uuid.uuid4())
+    assert service.analyse.get_analyse_parcelle.await_count == 1
+
+async def test_reprise_apres_echec(session, ecritures, service, monkeypatch):
+    geler = service._geler_ecritures
+    monkeypatch.setattr(service, "_geler_ecritures", AsyncMock(side_effect=RuntimeError("Connexion perdue")))
+
+    with pytest.raises(ValueError, match="Connexion perdue"):
+        await service.executer_cloture_mensuelle(PERIODE, uuid.uuid4())
+
+    job = service.get_job(PERIODE)
+    assert job.statut == StatutClotureJob.ECHEC
+    statuts = {etape: e["statut"] for etape, e in job.etapes.items()}
+    assert statuts["validation"] == statuts["totaux"] == statuts["ecritures_cloture"] == "TERMINEE"
+    assert (statuts["gel"], statuts["etats"]) == ("ECHEC", "EN_ATTENTE")
+    assert 0 < job.progression < 100
+
+    # Reprise: seules les étapes non terminées sont exécutées
+    monkeypatch.setattr(service, "_geler_ecritures", geler)
+    job = await service.executer_job(job.id)
+
+    assert job.statut == StatutClotureJob.TERMINE
+    assert service.analyse.get_analyse_parcelle.await_count == 1
+    assert session.query(EcritureComptable).filter(
+        EcritureComptable.numero_piece.like("CLO-%")
+    ).count() == 2
+
+async def test_cloture_refusee_si_desequilibre(session, ecritures, service):
+    session.query(EcritureComptable).filter(EcritureComptable.numero_piece == "VEN-1").update(
+        {"credit": 2500}, synchronize_session=False
+    )
+    session.commit()
+
+    with pytest.raises(ValueError, match="non équilibrés"):
+        await service.executer_cloture_mensuelle(PERIODE, uuid.uuid4())
+    job = session.query(ClotureJob).one()
+    assert job.etapes["verification"]["statut"] == "ECHEC"
+    assert job.etapes["analyse_ml"]["statut"] == "EN_ATTENTE"
+
+async def test_validation_refusee_si_piece_desequilibree(session, ecritures, service):
+    session.query(EcritureComptable).filter(
+        EcritureComptable.numero_piece == "ACH-1", EcritureComptable.debit > 0
+    ).update({"debit": 900}, synchronize_session=False)
+    session.commit()
+
+    with pytest.raises(ValueError, match="Pièces non équilibrées: ACH-1"):
+        await service.executer_cloture_mensuelle(PERIODE, uuid.uuid4())
+    job = session.query(ClotureJob).one()
+    assert job.etapes["validation"]["statut"] == "ECHEC"
+    assert session.query(EcritureComptable).filter(
+        EcritureComptable.statut == StatutEcriture.BROUILLON
+    ).count() == 2
+
+async def test_heartbeat_pendant_une_etape_longue(session, ecritures, service, monkeypatch):
+    service.intervalle_heartbeat = timedelta(milliseconds=50)
+    geler = service._geler_ecritures
+    heartbeats = []
+
+    async def geler_lentement(periode):
+        # Étape longue: le signe de vie avance sans attendre le checkpoint
+        for _ in range(3):
+            await asyncio.sleep(0.2)
+            with session.get_bind().connect() as connection:
+                heartbeats.append(connection.execute(select(ClotureJob.heartbeat)).scalar())
+        return await geler(periode)
+
+    monkeypatch.setattr(service, "_geler_ecritures", geler_lentement)
+    etat = await service.executer_cloture_mensuelle(PERIODE, uuid.uuid4())
+
+    assert etat["statut"] == "TERMINE"
+    assert heartbeats == sorted(heartbeats) and len(set(heartbeats)) == 3
+
+async def test_etapes_en_lecture_seule_en_parallele(session, ecritures, service):
+    """Analyse ML et optimisation s'attendent: elles ne passent que si elles tournent ensemble"""
+    arrivees = []
+    ensemble = asyncio.Event()
+
+    async def rendez_vous(**kwargs):
+        arrivees.append(kwargs)
+        if len(arrivees) == 2:
+            ensemble.set()
+        await asyncio.wait_for(ensemble.wait(), 1)
+        return {}
+
+    service.analyse.get_analyse_parcelle = AsyncMock(side_effect=rendez_vous)
+    service.analyse.optimize_costs = AsyncMock(side_effect=rendez_vous)
+
+    etat = await service.executer_cloture_mensuelle(PERIODE, uuid.uuid4())
+
+    assert etat["statut"] == "TERMINE"
+    assert {etape: etat["etapes"][etape]["statut"] for etape in ("analyse_ml", "optimisation", "totaux")} == {
+        "analyse_ml": "TERMINEE", "optimisation": "TERMINEE", "totaux": "TERMINEE"
+    }
+    # Chaque étape parallèle a sa propre session, distincte de celle du job
+    sessions = [appel.args[0] for appel in service.creer_analyse.call_args_list]
+    assert len(sessions) == 4 and len(set(map(id, sessions))) == 4 and session not in sessions
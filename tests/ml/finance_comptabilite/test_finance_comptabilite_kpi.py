@@ -0,0 +1,130 @@
+"""
+Tests des instantanés mensuels d'indicateurs financiers
+"""
+
+import uuid
+from datetime import date
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import CompteComptable, EcritureComptable, KpiSnapshot, StatutEcriture, TypeCompte
+from services.comptabilite_service import ComptabiliteService
+from services.finance_comptabilite.kpi import SnapshotsKpi, periode_decalee, periodes_entre
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'kpi.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def ecritures(session):
+    """Une vente en mars 2023, puis ventes, achats et encaissements en 2024"""
+    types = {"521": TypeCompte.ACTIF, "411": TypeCompte.ACTIF, "401": TypeCompte.PASSIF,
+             "701": TypeCompte.PRODUIT, "601": TypeCompte.CHARGE}
+    comptes = {numero: uuid.uuid4() for numero in types}
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": comptes[numero], "numero": numero, "libelle": numero, "type_compte": type_compte}
+        for numero, type_compte in types.items()
+    ])
+    journal_id = uuid.uuid4()
+    lignes = []
+    for periode, piece, debit, credit, montant, statut in [
+        ("2023-03", "VEN-0", "521", "701", 500, StatutEcriture.VALIDEE),
+        ("2024-02", "VEN-1", "411", "701", 1000, StatutEcriture.VALIDEE),
+        ("2024-02", "ACH-1", "601", "401", 400, StatutEcriture.VALIDEE),
+        ("2024-03", "ENC-1", "521", "411", 1000, StatutEcriture.VALIDEE),
+        ("2024-03", "VEN-2", "521", "701", 2000, StatutEcriture.VALIDEE),
+        ("2024-03", "ACH-2", "601", "521", 1500, StatutEcriture.VALIDEE),
+        ("2024-03", "ACH-3", "601", "521", 999, StatutEcriture.BROUILLON),
+    ]:
+        for numero, d, c in ((debit, montant, 0), (credit, 0, montant)):
+            lignes.append({
+                "id": uuid.uuid4(), "date_ecriture": date.fromisoformat(f"{periode}-10"), "numero_piece": piece,
+                "compte_id": comptes[numero], "libelle": piece, "debit": d, "credit": c, "statut": statut,
+                "journal_id": journal_id, "periode": periode
+            })
+    session.execute(EcritureComptable.__table__.insert(), lignes)
+    session.commit()
+    return comptes
+
+def test_periodes_entre():
+    assert periodes_entre("2023-11", "2024-02") == ["2023-11", "2023-12", "2024-01", "2024-02"]
+    assert periodes_entre("2024-03", "2024-02") == []
+
+async def test_enregistrement_des_instantanes(session, ecritures, assert_max_queries):
+    service = SnapshotsKpi(session)
+
+    with assert_max_queries(2):
+        snapshots = await service.enregistrer("2024-01", "2024-03")
+
+    assert [s["periode"] for s in snapshots] == ["2024-01", "2024-02", "2024-03"]
+    # Mois sans écriture: soldes de bilan reportés
+    assert snapshots[0]["total_actif"] == 500 and snapshots[0]["nombre_ecritures"] == 0
+    assert snapshots[1] == {
+        "periode": "2024-02", "chiffre_affaires": 1000, "charges": 400, "resultat_net": 600,
+        "total_actif": 1500, "total_passif": 400, "tresorerie": 500,
+        "ratio_liquidite": 3.75, "marge_nette": 0.6, "nombre_ecritures": 4
+    }
+    assert service.get_snapshots("2024-01", "2024-03") == snapshots
+
+    # Recalcul après une nouvelle vente: la ligne du mois est remplacée
+    session.execute(EcritureComptable.__table__.insert(), [
+        {"id": uuid.uuid4(), "date_ecriture": date(2024, 3, 20), "numero_piece": "VEN-3", "compte_id": ecritures[numero],
+         "libelle": "VEN-3", "debit": d, "credit": c, "statut": StatutEcriture.VALIDEE,
+         "journal_id": uuid.uuid4(), "periode": "2024-03"}
+        for numero, d, c in (("521", 500, 0), ("701", 0, 500))
+    ])
+    await service.enregistrer("2024-03")
+
+    mars = service.get_snapshot("2024-03")
+    assert (mars["chiffre_affaires"], mars["resultat_net"], mars["tresorerie"]) == (2500, 1000, 2500)
+    assert mars["marge_nette"] == 0.4
+    assert session.query(KpiSnapshot).count() == 3
+
+async def test_comparaison_annuelle(session, ecritures, assert_max_queries):
+    service = SnapshotsKpi(session)
+    await service.enregistrer("2023-01", "2024-12")
+
+    with assert_max_queries(1):
+        comparaison = service.comparer_annees(2024)
+
+    mars = comparaison["mois"][2]
+    assert (mars["n"]["chiffre_affaires"], mars["n_1"]["chiffre_affaires"]) == (2000, 500)
+    assert mars["variations"]["chiffre_affaires"] == 300.0
+    # Pas de chiffre d'affaires l'année précédente: variation non définie
+    assert comparaison["mois"][1]["variations"]["chiffre_affaires"] is None
+
+async def test_recommandations_lisent_les_instantanes(session, ecritures):
+    await SnapshotsKpi(session).enregistrer("2024-03")
+    service = ComptabiliteService(session)
+    service.cache = AsyncMock()
+    service.cache.get.return_value = None
+    service.analyse = AsyncMock()
+    service.analyse.get_analyse_parcelle.return_value = {"ml_analysis": {}}
+
+    # Les soldes des comptes ne sont pas tenus ici: le bilan reconstruit est vide,
+    # le ratio vient de l'instantané (actif 2000 / passif 400)
+    bilan = await service.get_bilan(date(2024, 3, 31))
+    assert bilan["total_passif"] == 0
+    assert not [r for r in bilan["recommendations"] if r["type"] == "RATIO"]
+
+    bilan = await service.get_bilan(date(2024, 4, 30))
+    assert [r["type"] for r in bilan["recommendations"]] == ["RATIO"]
+
+    # En cours de mois: chiffres du bilan affiché, sans lecture de l'instantané
+    service.kpi = Mock(wraps=service.kpi)
+    bilan = await service.get_bilan(date(2024, 3, 15))
+    assert [r["type"] for r in bilan["recommendations"]] == ["RATIO"]
+    service.kpi.get_snapshot.assert_not_called()
+
+def test_periode_decalee():
+    assert periode_decalee("2024-03", -11) == "2023-04"
+    assert periode_decalee("2024-12", 1) == "2025-01"
+    assert len(periodes_entre(periode_decalee("2024-03", -11), "2024-03")) == 12
@@ -0,0 +1,164 @@
+"""
+Tests du rapprochement bancaire transactions / écritures
+"""
+
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import (
+    CompteComptable,
+    EcritureComptable,
+    JournalComptable,
+    StatutEcriture,
+    TypeCompte,
+    TypeJournal
+)
+from models.finance import CategorieTransaction, StatutTransaction, Transaction, TypeTransaction
+from services.finance_comptabilite.rapprochement import (
+    LigneRapprochement,
+    RapprochementBancaire,
+    apparier
+)
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rapprochement.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def donnees(session):
+    """Transactions de mars 2024 et lignes des journaux de banque et de ventes"""
+    comptes = {numero: uuid.uuid4() for numero in ("521", "411")}
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": compte_id, "numero": numero, "libelle": numero, "type_compte": TypeCompte.ACTIF}
+        for numero, compte_id in comptes.items()
+    ])
+    journaux = {TypeJournal.BANQUE: uuid.uuid4(), TypeJournal.VENTE: uuid.uuid4()}
+    session.execute(JournalComptable.__table__.insert(), [
+        {"id": journal_id, "code": type_journal.value[:2], "libelle": type_journal.value, "type_journal": type_journal}
+        for type_journal, journal_id in journaux.items()
+    ])
+
+    t = {nom: uuid.uuid4() for nom in ("exacte", "approchee", "deja_liee", "orpheline", "virement")}
+    session.execute(Transaction.__table__.insert(), [
+        {"id": t[nom], "reference": reference, "date_transaction": datetime(2024, 3, jour),
+         "type_transaction": type_transaction, "categorie": CategorieTransaction.AUTRE,
+         "montant": montant, "statut": StatutTransaction.VALIDEE}
+        for nom, reference, jour, type_transaction, montant in [
+            ("exacte", "VIR-001", 5, TypeTransaction.RECETTE, Decimal("1000")),
+            ("approchee", "CHQ-7", 10, TypeTransaction.DEPENSE, Decimal("250")),
+            ("deja_liee", "VIR-002", 11, TypeTransaction.RECETTE, Decimal("400")),
+            ("orpheline", "CHQ-8", 12, TypeTransaction.DEPENSE, Decimal("999")),
+            ("virement", "VIR-INT", 20, TypeTransaction.VIREMENT, Decimal("300")),
+        ]
+    ])
+
+    e = {nom: uuid.uuid4() for nom in ("exacte", "contrepartie", "approchee", "deja_liee", "ventes", "orpheline", "virement")}
+    session.execute(EcritureComptable.__table__.insert(), [
+        {"id": e[nom], "date_ecriture": date(2024, 3, jour), "numero_piece": piece, "compte_id": comptes[numero],
+         "libelle": piece, "debit": debit, "credit": credit, "statut": StatutEcriture.VALIDEE,
+         "journal_id": journaux[journal], "periode": "2024-03", "transaction_id": transaction_id}
+        for nom, piece, jour, numero, debit, credit, journal, transaction_id in [
+            ("exacte", "VIR 001", 5, "521", 1000, 0, TypeJournal.BANQUE, None),
+            ("contrepartie", "VIR 001", 5, "411", 0, 1000, TypeJournal.BANQUE, None),
+            ("approchee", "BQ-99", 12, "521", 0, Decimal("250.50"), TypeJournal.BANQUE, None),
+            ("deja_liee", "VIR-002", 11, "521", 400, 0, TypeJournal.BANQUE, t["deja_liee"]),
+            ("ventes", "FAC-1", 12, "521", 999, 0, TypeJournal.VENTE, None),
+            ("orpheline", "BQ-100", 25, "521", 80, 0, TypeJournal.BANQUE, None),
+            ("virement", "VIR-INT", 20, "521", 0, 300, TypeJournal.BANQUE, None),
+        ]
+    ])
+    session.commit()
+    return t, e
+
+def test_apparier_exact_puis_approche():
+    transactions = [
+        LigneRapprochement("t1", 10000, 100, "A"),
+        LigneRapprochement("t2", 10000, 100, "B"),
+        LigneRapprochement("t3", -5000, 100, "C", sens_inconnu=True),
+    ]
+    ecritures = [
+        LigneRapprochement("e1", 10000, 101, "X"),
+        LigneRapprochement("e2", 10000, 100, "A"),
+        LigneRapprochement("e3", 5000, 100, "C"),
+        LigneRapprochement("e4", 10050, 104, "Y"),
+    ]
+
+    paires = apparier(transactions, ecritures, tolerance_centimes=100, fenetre_jours=3)
+
+    assert sorted(paires) == [(0, 1, "EXACT"), (1, 0, "APPROCHE"), (2, 2, "EXACT")]
+
+async def test_rapprochement_periode(session, donnees, assert_max_queries):
+    t, e = donnees
+    service = RapprochementBancaire(session)
+
+    simulation = await service.rapprocher(date(2024, 3, 1), date(2024, 3, 31), Decimal("1"), appliquer=False)
+    assert session.query(EcritureComptable).filter(EcritureComptable.transaction_id.isnot(None)).count() == 1
+
+    with assert_max_queries(3):
+        resultat = await service.rapprocher(date(2024, 3, 1), date(2024, 3, 31), Decimal("1"))
+
+    assert resultat.to_dict() == simulation.to_dict()
+    assert sorted((str(tr), str(ec), type_) for tr, ec, type_ in resultat.correspondances) == sorted([
+        (str(t["exacte"]), str(e["exacte"]), "EXACT"),
+        (str(t["approchee"]), str(e["approchee"]), "APPROCHE"),
+        (str(t["virement"]), str(e["virement"]), "EXACT"),
+    ])
+    assert resultat.transactions_non_rapprochees == [t["orpheline"]]
+    assert resultat.ecritures_non_rapprochees == [e["orpheline"]]
+
+    liens = dict(session.query(EcritureComptable.id, EcritureComptable.transaction_id).filter(
+        EcritureComptable.transaction_id.isnot(None)
+    ).all())
+    assert liens == {e["exacte"]: t["exacte"], e["approchee"]: t["approchee"],
+                     e["deja_liee"]: t["deja_liee"], e["virement"]: t["virement"]}
+
+    # Une seconde passe ne trouve plus rien à rapprocher
+    assert (await service.rapprocher(date(2024, 3, 1), date(2024, 3, 31), Decimal("1"))).correspondances == []
+
+@pytest.mark.performance
+def test_apparier_performance():
+    """50 000 lignes de banque appariées en quelques secondes"""
+    rng = np.random.default_rng(0)
+    n = 50_000
+    montants = rng.integers(1_000, 10_000_000, n) * 100 * rng.choice([-1, 1], n)
+    jours = 738_000 + rng.integers(0, 31, n)
+    transactions = [LigneRapprochement(i, int(montants[i]), int(jours[i]), f"R{i}") for i in range(n)]
+    ecritures = [
+        LigneRapprochement(i, int(montants[i]), int(jours[i]), f"R{i}") if i % 5 else
+        LigneRapprochement(i, int(montants[i]) + int(rng.integers(-50, 50)), int(jours[i]) + int(rng.integers(-2, 3)), "")
+        for i in range(n)
+    ]
+    rng.shuffle(ecritures)
+
+    start = time.perf_counter()
+    paires = apparier(transactions, ecritures, tolerance_centimes=100, fenetre_jours=3)
+
+    assert time.perf_counter() - start < 3
+    assert len(paires) == n
+    assert all(transactions[i].id == ecritures[j].id for i, j, _ in paires)
+
+@pytest.mark.performance
+def test_apparier_montants_repetes():
+    """Montants identiques sur toute l'année: seule la fenêtre de dates est consultée"""
+    n = 20_000
+    transactions = [LigneRapprochement(i, -250_000, 738_000 + i % 365, f"T{i}") for i in range(n)]
+    ecritures = [LigneRapprochement(i, -250_000, 738_000 + (i + 1) % 365, f"E{i}") for i in range(n)]
+
+    start = time.perf_counter()
+    paires = apparier(transactions, ecritures, tolerance_centimes=5_000, fenetre_jours=3)
+
+    assert time.perf_counter() - start < 1
+    assert len(paires) == n
+    assert all(abs(transactions[i].jour - ecritures[j].jour) <= 3 for i, j, _ in paires)
@@ -0,0 +1,98 @@
+"""
+Tests de la répartition analytique des coûts (matrice parcelle × centre)
+"""
+
+import uuid
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import CompteComptable, EcritureComptable, StatutEcriture, TypeCompte
+from models.production import CultureType, Parcelle, ParcelleStatus
+from models.tache import Tache
+from services.finance_comptabilite.couts import GestionCouts, calculer_parts, cle_du_compte
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'couts.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def domaine(session):
+    """Deux parcelles (3 ha et 1 ha), charges directes et indirectes de mars 2024"""
+    parcelles = {"PAR001": uuid.uuid4(), "PAR002": uuid.uuid4()}
+    session.execute(Parcelle.__table__.insert(), [
+        {"id": parcelles[code], "code": code, "culture_type": CultureType.PALMIER, "surface_hectares": surface,
+         "date_plantation": date(2015, 1, 1), "statut": ParcelleStatus.ACTIVE}
+        for code, surface in (("PAR001", 3), ("PAR002", 1))
+    ])
+    comptes = {numero: uuid.uuid4() for numero in ("601", "624", "611", "661", "701")}
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": compte_id, "numero": numero, "libelle": numero,
+         "type_compte": TypeCompte.PRODUIT if numero.startswith("7") else TypeCompte.CHARGE}
+        for numero, compte_id in comptes.items()
+    ])
+    journal_id = uuid.uuid4()
+    ecritures = [
+        ("601", "PAR001", 1000, 0, StatutEcriture.VALIDEE, date(2024, 3, 5)),
+        ("601", "PAR002", 500, 0, StatutEcriture.VALIDEE, date(2024, 3, 6)),
+        ("661", None, 800, 0, StatutEcriture.VALIDEE, date(2024, 3, 31)),
+        ("624", None, 400, 0, StatutEcriture.VALIDEE, date(2024, 3, 15)),
+        ("611", None, 100, 0, StatutEcriture.VALIDEE, date(2024, 3, 15)),
+        ("701", "PAR001", 0, 5000, StatutEcriture.VALIDEE, date(2024, 3, 20)),
+        # Ignorées: brouillon et hors période
+        ("601", "PAR001", 9999, 0, StatutEcriture.BROUILLON, date(2024, 3, 10)),
+        ("624", None, 9999, 0, StatutEcriture.VALIDEE, date(2024, 4, 1)),
+    ]
+    session.execute(EcritureComptable.__table__.insert(), [
+        {"id": uuid.uuid4(), "date_ecriture": jour, "numero_piece": f"P{i}", "compte_id": comptes[numero],
+         "libelle": numero, "debit": debit, "credit": credit, "statut": statut, "journal_id": journal_id,
+         "periode": jour.strftime("%Y-%m"), "parcelle_id": parcelles[code] if code else None}
+        for i, (numero, code, debit, credit, statut, jour) in enumerate(ecritures)
+    ])
+    session.execute(Tache.__table__.insert(), [
+        {"id": uuid.uuid4(), "titre": "Entretien", "projet_id": uuid.uuid4(), "parcelle_id": parcelles[code],
+         "heures_reelles": heures, "date_fin_reelle": datetime(2024, 3, 10)}
+        for code, heures in (("PAR001", 10), ("PAR002", 30))
+    ])
+    session.commit()
+    return parcelles
+
+def test_cles_et_parts():
+    assert cle_du_compte("6611") == "heures"
+    assert cle_du_compte("6132") == "recolte"
+    assert cle_du_compte("6321") == "heures"
+    assert cle_du_compte("624") == "surface"
+
+    parts = calculer_parts(np.array([[3.0, 0.0, 10.0], [1.0, 0.0, 30.0]]))
+    # Sans récolte sur la période, la clé récolte reprend la surface
+    assert parts.tolist() == [[0.75, 0.75, 0.25], [0.25, 0.25, 0.75]]
+
+async def test_rentabilite_de_toutes_les_parcelles(session, domaine, assert_max_queries):
+    service = GestionCouts(session)
+
+    with assert_max_queries(4):
+        resultat = await service.get_rentabilite_parcelles(date(2024, 3, 1), date(2024, 3, 31))
+
+    assert resultat["centres"] == {"601": "surface", "611": "recolte", "624": "surface", "661": "heures"}
+    assert resultat["non_reparti"] == 0
+    par001 = resultat["parcelles"][str(domaine["PAR001"])]
+    par002 = resultat["parcelles"][str(domaine["PAR002"])]
+    assert (par001["couts_directs"], par001["couts_indirects"], par001["marge"]) == (1000, 575, 3425)
+    assert par001["rentabilite"] == pytest.approx(217.46)
+    assert (par002["couts_directs"], par002["couts_indirects"], par002["cout_complet"]) == (500, 725, 1225)
+    assert par002["rentabilite"] == -100
+
+    # Les accès par parcelle réutilisent la répartition déjà calculée
+    parcelle = session.get(Parcelle, domaine["PAR002"])
+    with assert_max_queries(0):
+        assert await service._calculer_couts_directs(parcelle, date(2024, 3, 1), date(2024, 3, 31)) == 500
+        assert await service._calculer_couts_indirects(parcelle, datetime(2024, 3, 1), datetime(2024, 3, 31)) == 725
+    assert await service._calculer_cle_repartition(parcelle, datetime(2024, 3, 15)) == 0.25
@@ -0,0 +1,150 @@
+"""
+Tests du moteur de scénarios Monte-Carlo finance-comptabilité
+"""
+
+import time
+import uuid
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.production import CultureType, Parcelle, ParcelleStatus, QualiteRecolte, Recolte
+from schemas.finance import HypothesesCultureSchema
+from services.finance_comptabilite.scenarios import (
+    HypothesesCulture,
+    SimulationScenarios,
+    loi_rendement,
+    simuler_scenarios
+)
+
+def _historique(annees=4, seed=3):
+    """Palmier: récolte gamma chaque mois sauf en août"""
+    rng = np.random.default_rng(seed)
+    return [
+        (mois, 0.0 if mois == 8 else float(rng.gamma(6, 40)))
+        for _ in range(annees) for mois in range(1, 13)
+    ]
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scenarios.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+def test_loi_rendement_saisonniere():
+    p_zero, mu, sigma = loi_rendement(_historique())
+
+    assert p_zero[7] == 1.0
+    assert np.all(np.delete(p_zero, 7) == 0.0)
+    assert np.all(sigma > 0)
+    with pytest.raises(ValueError):
+        loi_rendement([])
+
+def test_scenarios_deterministes():
+    """Sans aléa, toutes les bandes valent la trajectoire attendue"""
+    hypotheses = [HypothesesCulture(
+        culture="PALMIER", surface_ha=2, prix_kg=100, volatilite_prix=0,
+        charges_fixes_mensuelles=5000, cout_variable_kg=10, probabilite_choc_meteo=0,
+        historique=[(m, 300.0) for m in range(1, 13)] * 2
+    )]
+
+    resultat = simuler_scenarios(hypotheses, mois=6, n_scenarios=500, tresorerie_initiale=-20000, seed=1)
+
+    bandes = resultat.bandes
+    assert bandes["produits"]["p10"] == pytest.approx([60000] * 6)
+    assert bandes["charges"]["p90"] == pytest.approx([11000] * 6)
+    assert bandes["tresorerie"]["p50"] == pytest.approx([29000 + 49000 * i for i in range(6)])
+    assert resultat.probabilite_tresorerie_negative == [0.0] * 6
+
+def test_scenarios_bandes_et_montee_en_production():
+    hypotheses = [
+        HypothesesCulture(culture="PALMIER", surface_ha=10, prix_kg=250, historique=_historique(),
+                          charges_fixes_mensuelles=150000, cout_variable_kg=40),
+        HypothesesCulture(culture="BITTERKOLA", surface_ha=5, prix_kg=1200, historique=_historique(seed=8),
+                          montee_en_production_mois=12, probabilite_choc_meteo=0.3)
+    ]
+
+    resultat = simuler_scenarios(hypotheses, mois=24, n_scenarios=20_000, mois_depart=1, seed=42)
+    again = simuler_scenarios(hypotheses, mois=24, n_scenarios=20_000, mois_depart=1, seed=42)
+
+    assert resultat.to_dict() == again.to_dict()
+    for serie in resultat.bandes.values():
+        assert len(serie["p10"]) == 24
+        assert np.all(np.array(serie["p10"]) <= np.array(serie["p50"]))
+        assert np.all(np.array(serie["p50"]) <= np.array(serie["p90"]))
+    # Pas de récolte en août: seules les charges fixes restent
+    assert resultat.bandes["produits"]["p90"][7] == 0
+    assert resultat.bandes["charges"]["p50"][7] == pytest.approx(150000, rel=0.01)
+    # La nouvelle culture monte en production sur la première année
+    assert resultat.bandes["produits"]["p50"][0] < resultat.bandes["produits"]["p50"][12]
+
+def test_scenarios_parametres_invalides():
+    with pytest.raises(ValueError):
+        simuler_scenarios([], mois=12)
+    with pytest.raises(ValueError):
+        simuler_scenarios([HypothesesCulture("PALMIER", 1, 1, historique=_historique())], mois=0)
+
+def test_historique_saisi_valide():
+    """Un mois hors 1-12 est refusé à la validation (422), pas à la simulation"""
+    with pytest.raises(ValidationError):
+        HypothesesCultureSchema(culture="PALMIER", surface_ha=1, prix_kg=100, historique=[(13, 300.0)])
+    with pytest.raises(ValidationError):
+        HypothesesCultureSchema(culture="PALMIER", surface_ha=1, prix_kg=100, historique=[(3, -1.0)])
+
+@pytest.mark.performance
+def test_scenarios_performance():
+    """100 000 scénarios sur 24 mois en moins d'une seconde"""
+    hypotheses = [HypothesesCulture(culture="PALMIER", surface_ha=10, prix_kg=250, historique=_historique(),
+                                    charges_fixes_mensuelles=150000, cout_variable_kg=40)]
+
+    durees = []
+    for _ in range(3):
+        start = time.perf_counter()
+        simuler_scenarios(hypotheses, mois=24, n_scenarios=100_000)
+        durees.append(time.perf_counter() - start)
+
+    assert min(durees) < 1.0
+
+async def test_historique_depuis_recoltes(session):
+    parcelle_id = uuid.uuid4()
+    session.execute(Parcelle.__table__.insert(), [
+        {"id": parcelle_id, "code": "PAR001", "culture_type": CultureType.PALMIER, "surface_hectares": 4,
+         "date_plantation": date(2015, 1, 1), "statut": ParcelleStatus.ACTIVE},
+        {"id": uuid.uuid4(), "code": "PAR002", "culture_type": CultureType.PALMIER, "surface_hectares": 6,
+         "date_plantation": date(2016, 1, 1), "statut": ParcelleStatus.ACTIVE},
+    ])
+    session.execute(Recolte.__table__.insert(), [
+        {"id": uuid.uuid4(), "parcelle_id": parcelle_id, "date_recolte": datetime(annee, mois, jour),
+         "quantite_kg": 500, "qualite": QualiteRecolte.A}
+        for annee in (2022, 2023, 2024) for mois in (3, 4) for jour in (5, 20)
+    ])
+    session.commit()
+    service = SimulationScenarios(session)
+
+    historique = service.historique_rendements(CultureType.PALMIER)
+    # Mars 2022 à avril 2024: les mois hors saison comptent comme mois sans récolte
+    assert len(historique) == 26
+    assert historique[:3] == [(3, 100.0), (4, 100.0), (5, 0.0)]
+    assert sum(kg for _, kg in historique) == 600.0
+    assert service.historique_rendements(CultureType.PAPAYE) == []
+
+    p_zero, _, _ = loi_rendement(historique)
+    assert p_zero[2] == 0.0 and p_zero[6] == 1.0
+
+    # Nouvelle culture évaluée sur l'historique du palmier
+    resultat = await service.simuler(
+        [HypothesesCulture(culture="BITTERKOLA", surface_ha=1, prix_kg=1000, culture_reference=CultureType.PALMIER)],
+        mois=4, n_scenarios=1000, mois_depart=3, seed=1
+    )
+    assert resultat.bandes["produits"]["p50"][:2] == pytest.approx([100000, 100000], rel=0.05)
+    assert resultat.bandes["produits"]["p90"][2:] == [0, 0]
+
+    with pytest.raises(ValueError, match="BITTERKOLA"):
+        await service.simuler([HypothesesCulture(culture="BITTERKOLA", surface_ha=1, prix_kg=1000)])
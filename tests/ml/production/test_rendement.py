@@ -16,7 +16,9 @@ from services.ml.production.rendement import PredicteurRendement
 @pytest.fixture
 def db_session():
     """Fixture pour la session de base de données."""
-    return Mock(spec=Session)
+    session = Mock(spec=Session)
+    session.get.return_value = None  # Parcelle sans GPS: météo de l'exploitation
+    return session
 
 @pytest.fixture
 def weather_service():
@@ -89,7 +91,7 @@ class TestPredicteurRendement:
         predictor._get_historique_rendements = AsyncMock(
             return_value=sample_historique
         )
-        predictor.weather_service.get_historical_data.return_value = sample_meteo
+        predictor.weather_service.get_daily_conditions.return_value = sample_meteo
         predictor.iot_service.get_sensor_data.return_value = sample_iot_data
         
         # Exécution
@@ -128,7 +130,7 @@ class TestPredicteurRendement:
         date_fin = date.today() + timedelta(days=30)
         
         predictor._get_historique_rendements = AsyncMock(return_value=[])
-        predictor.weather_service.get_historical_data.return_value = sample_meteo
+        predictor.weather_service.get_daily_conditions.return_value = sample_meteo
         predictor.iot_service.get_sensor_data.return_value = sample_iot_data
         
         # Exécution
@@ -214,3 +216,126 @@ class TestPredicteurRendement:
                 date.today() + timedelta(days=30),
                 date.today()
             )
+
+@pytest.fixture
+def sqlite_session():
+    """Session SQLite en mémoire avec les tables production et IoT."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models.base import Base
+    from models.production import CycleCulture
+    from models.iot_sensor import IoTSensor, SensorReading
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        Parcelle.__table__, CycleCulture.__table__, Recolte.__table__,
+        IoTSensor.__table__, SensorReading.__table__
+    ])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def parcelles_batch(sqlite_session):
+    """Trois parcelles dont deux dans la même cellule météo."""
+    from datetime import datetime
+    from models.production import CultureType, QualiteRecolte
+    from models.iot_sensor import IoTSensor, SensorReading, SensorType
+
+    coordonnees = [
+        {"latitude": 4.012, "longitude": 9.701},
+        {"latitude": 4.018, "longitude": 9.704},
+        {"latitude": 4.391, "longitude": 9.950}
+    ]
+    parcelles = []
+    for i, coords in enumerate(coordonnees):
+        parcelle = Parcelle(
+            code=f"P{i}",
+            culture_type=CultureType.PALMIER,
+            surface_hectares=10 + i,
+            date_plantation=date(2020, 1, 1),
+            coordonnees_gps=coords
+        )
+        sqlite_session.add(parcelle)
+        sqlite_session.flush()
+        for j in range(4):
+            sqlite_session.add(Recolte(
+                parcelle_id=parcelle.id,
+                date_recolte=datetime(2024, j + 1, 1),
+                quantite_kg=1000 + 100 * i + 50 * j,
+                qualite=QualiteRecolte.A
+            ))
+        capteur = IoTSensor(code=f"C{i}", type=SensorType.HUMIDITE_SOL, parcelle_id=parcelle.id)
+        sqlite_session.add(capteur)
+        sqlite_session.flush()
+        for k in range(3):
+            sqlite_session.add(SensorReading(
+                capteur_id=capteur.id,
+                timestamp=datetime.now() - timedelta(days=k),
+                valeur=20.0 + k + i,
+                unite="%"
+            ))
+        parcelles.append(parcelle)
+    sqlite_session.commit()
+    return parcelles
+
+class TestPredicteurRendementBatch:
+    """Tests pour la prédiction groupée des rendements."""
+
+    @pytest.fixture
+    def batch_predictor(self, sqlite_session, sample_meteo):
+        service = PredicteurRendement(sqlite_session)
+        service.weather_service = AsyncMock(spec=WeatherService)
+        service.weather_service.get_daily_conditions.return_value = sample_meteo
+        return service
+
+    async def test_predict_rendement_batch(self, batch_predictor, parcelles_batch):
+        """Une prédiction par parcelle et des totaux cohérents."""
+        result = await batch_predictor.predict_rendement_batch(horizon=30)
+
+        assert len(result["parcelles"]) == 3
+        totaux = result["totaux"]
+        assert totaux["nombre_parcelles"] == 3
+        assert totaux["surface_hectares"] == pytest.approx(33.0)
+        assert totaux["rendement_prevu"] == pytest.approx(
+            sum(p["rendement_prevu"] for p in result["parcelles"].values())
+        )
+        for prediction in result["parcelles"].values():
+            assert prediction["rendement_prevu"] > 0
+            assert prediction["intervalle_confiance"]["min"] < prediction["intervalle_confiance"]["max"]
+
+    async def test_weather_fetched_once_per_grid_cell(self, batch_predictor, parcelles_batch):
+        """Les parcelles voisines partagent une seule requête météo."""
+        await batch_predictor.predict_rendement_batch(horizon=30)
+
+        appels = batch_predictor.weather_service.get_daily_conditions.await_args_list
+        assert sorted(appel.args[2] for appel in appels) == [(4.0, 9.7), (4.4, 9.9)]
+
+    async def test_batch_matches_single_parcelle_features(
+        self,
+        batch_predictor,
+        parcelles_batch,
+        sample_meteo
+    ):
+        """La matrice de features reproduit le calcul parcelle par parcelle."""
+        parcelle = parcelles_batch[1]
+        historique = await batch_predictor._get_historique_rendements(parcelle.id)
+
+        result = await batch_predictor.predict_rendement_batch(
+            parcelle_ids=[parcelle.id],
+            horizon=30
+        )
+        stats_iot = await batch_predictor._get_stats_iot_batch(
+            [parcelle.id], date.today(), date.today() + timedelta(days=30)
+        )
+        iot = stats_iot[str(parcelle.id)]
+        features = batch_predictor._calculate_features(historique, sample_meteo, [])
+        features[6:9] = [iot["moyenne"], iot["ecart_type"], iot["nombre"]]
+        attendu = float(np.sum(features * PredicteurRendement.POIDS_FEATURES))
+
+        assert result["parcelles"][str(parcelle.id)]["rendement_prevu"] == pytest.approx(attendu)
+
+    async def test_predict_rendement_batch_invalid_horizon(self, batch_predictor):
+        """Un horizon nul est refusé."""
+        with pytest.raises(ValueError):
+            await batch_predictor.predict_rendement_batch(horizon=0)
@@ -0,0 +1,105 @@
+"""
+Tests de parité du backend d'inférence ONNX avec sklearn.
+"""
+
+import numpy as np
+import pytest
+
+from services.ml.core.inference import (
+    ModelRegistry,
+    SklearnBackend,
+    BACKEND_ONNX,
+    BACKEND_SKLEARN
+)
+
+sklearn_ensemble = pytest.importorskip("sklearn.ensemble")
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+@pytest.fixture
+def donnees():
+    """Jeu de données synthétique de type inventaire (10 features)"""
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(500, 10)) * [100, 5, 1, 30, 25, 70, 1, 50, 10, 3]
+    y = X[:, 0] * 0.5 + X[:, 3] * 2 + rng.normal(size=500)
+    labels = (X[:, 1] + X[:, 4] > 0).astype(int)
+    return X, y, labels
+
+@pytest.fixture
+def onnx_registry():
+    """Registre forçant le backend ONNX"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("skl2onnx")
+    return ModelRegistry(backend=BACKEND_ONNX)
+
+def test_onnx_parity_random_forest_regressor(donnees, onnx_registry):
+    """RandomForestRegressor + scaler: mêmes prédictions que sklearn"""
+    X, y, _ = donnees
+    scaler = StandardScaler().fit(X)
+    model = sklearn_ensemble.RandomForestRegressor(
+        n_estimators=50, max_depth=10, random_state=42
+    ).fit(scaler.transform(X), y)
+    pipeline = Pipeline([('scaler', scaler), ('model', model)])
+
+    inference = onnx_registry.register('rf', pipeline)
+
+    assert inference.name == BACKEND_ONNX
+    np.testing.assert_allclose(
+        inference.predict(X), pipeline.predict(X), rtol=1e-3, atol=1e-2
+    )
+
+def test_onnx_parity_gradient_boosting(donnees, onnx_registry):
+    """GradientBoostingRegressor: mêmes prédictions que sklearn"""
+    X, y, _ = donnees
+    model = sklearn_ensemble.GradientBoostingRegressor(
+        n_estimators=50, max_depth=5, random_state=42
+    ).fit(X, y)
+
+    inference = onnx_registry.register('gb', model)
+
+    np.testing.assert_allclose(
+        inference.predict(X), model.predict(X), rtol=1e-3, atol=1e-2
+    )
+
+def test_onnx_parity_random_forest_classifier(donnees, onnx_registry):
+    """RandomForestClassifier: mêmes classes et probabilités que sklearn"""
+    X, _, labels = donnees
+    model = sklearn_ensemble.RandomForestClassifier(
+        n_estimators=50, max_depth=5, random_state=42
+    ).fit(X, labels)
+
+    inference = onnx_registry.register('rfc', model)
+
+    np.testing.assert_array_equal(inference.predict(X), model.predict(X))
+    np.testing.assert_allclose(
+        inference.predict_proba(X), model.predict_proba(X), atol=1e-5
+    )
+
+def test_sklearn_backend_fallback(donnees):
+    """Le backend sklearn reste utilisable sans onnxruntime"""
+    X, y, _ = donnees
+    model = sklearn_ensemble.RandomForestRegressor(
+        n_estimators=10, random_state=42
+    ).fit(X, y)
+    registry = ModelRegistry(backend=BACKEND_SKLEARN)
+
+    inference = registry.register('rf', model)
+
+    assert isinstance(inference, SklearnBackend)
+    np.testing.assert_array_equal(registry.predict('rf', X), model.predict(X))
+
+def test_registry_versions_and_unknown_model(donnees):
+    """Chaque enregistrement incrémente la version du modèle"""
+    X, y, _ = donnees
+    model = sklearn_ensemble.RandomForestRegressor(
+        n_estimators=5, random_state=42
+    ).fit(X, y)
+    registry = ModelRegistry(backend=BACKEND_SKLEARN)
+
+    registry.register('rf', model)
+    registry.register('rf', model)
+
+    assert registry.version('rf') == 2
+    assert 'rf' in registry
+    with pytest.raises(KeyError):
+        registry.predict('inconnu', X)
@@ -0,0 +1,142 @@
+"""
+Tests de la mémoïsation des prédictions ML par empreinte des données.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.inventory import Stock, MouvementStock, TypeMouvement
+from services.cache_service import make_cache_key, fingerprint
+from services.ml.core.inference import get_model_registry
+from services.ml.core.memoization import (
+    PredictionMemo,
+    memoize_prediction,
+    latest,
+    get_prediction_memo
+)
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    """Vide le cache de prédictions entre les tests"""
+    get_prediction_memo().invalidate()
+    yield
+    get_prediction_memo().invalidate()
+
+def _stock(date_maj=datetime(2024, 1, 1)):
+    return Stock(id="stock-1", produit_id="p1", entrepot_id="e1",
+                 quantite=100, date_derniere_maj=date_maj)
+
+def _mouvements(n=3, debut=datetime(2024, 1, 1)):
+    return [
+        MouvementStock(id=f"m{i}", produit_id="p1", type_mouvement=TypeMouvement.ENTREE,
+                       quantite=10 + i, date_mouvement=debut + timedelta(days=i))
+        for i in range(n)
+    ]
+
+class FakePredictor:
+    """Prédicteur de test comptant les évaluations du modèle"""
+
+    def __init__(self):
+        self.calls = 0
+
+    @memoize_prediction(
+        'test_modele_memo',
+        entity=lambda stock, **_: stock.id,
+        watermark=lambda stock, mouvements, **_: (
+            stock.date_derniere_maj, latest(mouvements, 'date_mouvement')
+        )
+    )
+    def predict(self, stock, mouvements, horizon: int = 30):
+        self.calls += 1
+        return {"niveau": stock.quantite * horizon, "appel": self.calls}
+
+    @memoize_prediction(
+        'test_modele_memo',
+        entity=lambda stock, **_: stock.id,
+        watermark=lambda mouvements, **_: latest(mouvements, 'date_mouvement')
+    )
+    async def predict_async(self, stock, mouvements):
+        self.calls += 1
+        return {"appel": self.calls}
+
+def test_orm_objects_have_stable_cache_keys():
+    """Deux instances ORM de même id produisent la même clé"""
+    def f(stock, mouvements):
+        return None
+
+    key1 = make_cache_key(f, (_stock(), _mouvements()), {})
+    key2 = make_cache_key(f, (_stock(), _mouvements()), {})
+
+    assert key1 == key2
+    assert "0x" not in key1
+    assert fingerprint(_stock()) != fingerprint(Stock(id="stock-2"))
+
+def test_repeat_prediction_skips_model_evaluation():
+    """Une entité inchangée ne réévalue pas le modèle"""
+    predictor = FakePredictor()
+
+    first = predictor.predict(_stock(), _mouvements())
+    second = FakePredictor().predict(_stock(), _mouvements())
+
+    assert predictor.calls == 1
+    assert second == first
+
+def test_new_movement_invalidates_prediction():
+    """Un nouveau mouvement change le filigrane et force le recalcul"""
+    predictor = FakePredictor()
+
+    predictor.predict(_stock(), _mouvements(3))
+    predictor.predict(_stock(), _mouvements(4))
+    predictor.predict(_stock(date_maj=datetime(2024, 2, 1)), _mouvements(4))
+
+    assert predictor.calls == 3
+
+def test_scalar_parameters_are_part_of_key():
+    """Les paramètres scalaires distinguent les appels"""
+    predictor = FakePredictor()
+
+    predictor.predict(_stock(), _mouvements(), horizon=30)
+    predictor.predict(_stock(), _mouvements(), horizon=60)
+
+    assert predictor.calls == 2
+
+def test_model_retraining_invalidates_prediction():
+    """Un nouvel enregistrement du modèle change sa version"""
+    sklearn_cluster = pytest.importorskip("sklearn.cluster")
+    predictor = FakePredictor()
+    predictor.predict(_stock(), _mouvements())
+
+    get_model_registry().register(
+        'test_modele_memo', sklearn_cluster.KMeans(n_clusters=1), backend='sklearn'
+    )
+    predictor.predict(_stock(), _mouvements())
+
+    assert predictor.calls == 2
+
+async def test_async_prediction_memoized():
+    """Les méthodes asynchrones sont mémoïsées de la même façon"""
+    predictor = FakePredictor()
+
+    await predictor.predict_async(_stock(), _mouvements())
+    await predictor.predict_async(_stock(), _mouvements())
+
+    assert predictor.calls == 1
+
+def test_memo_stats_and_ttl():
+    """Statistiques de succès et expiration des entrées"""
+    memo = PredictionMemo(maxsize=10, default_ttl=60)
+    memo.set("k", {"v": 1})
+
+    assert memo.get("k") == {"v": 1}
+    assert memo.get("absent") is None
+    assert memo.stats()["hit_ratio"] == pytest.approx(0.5)
+
+    memo.set("court", {"v": 2}, ttl=-1)
+    assert memo.get("court") is None
+
+def test_latest_watermark():
+    """Le filigrane est la date la plus récente, dicts ou objets"""
+    assert latest(_mouvements(3), 'date_mouvement') == datetime(2024, 1, 3)
+    assert latest([{"timestamp": "2024-01-02"}, {"timestamp": "2024-01-05"}], 'timestamp') == "2024-01-05"
+    assert latest([], 'timestamp') is None
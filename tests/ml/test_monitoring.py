@@ -0,0 +1,177 @@
+"""
+Tests de l'instrumentation des prédictions ML (latence, cache, dérive).
+"""
+
+import logging
+import os
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY, generate_latest
+
+from core.telemetry import metrics_registry
+
+from services.ml.core.inference import ModelRegistry, BACKEND_SKLEARN
+from services.ml.core.monitoring import (
+    FeatureSketch,
+    MLMonitor,
+    monitor_prediction,
+    get_ml_monitor
+)
+from services.ml.production.service import ProductionMLService
+from services.ml.tableau_bord.predictions import get_ml_predictions
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+class ConstantModel:
+    """Modèle minimal renvoyant la somme des features"""
+
+    def predict(self, X):
+        return np.asarray(X).sum(axis=1)
+
+def test_registry_records_latency_and_batch_size():
+    """Chaque predict du registre alimente l'histogramme du modèle"""
+    registry = ModelRegistry(backend=BACKEND_SKLEARN)
+    registry.register('test_monitoring_registry', ConstantModel(), n_features=3)
+    before = _sample('ml_prediction_latency_seconds_count',
+                     model='test_monitoring_registry', operation='predict')
+
+    registry.predict('test_monitoring_registry', np.ones((64, 3)))
+
+    assert _sample('ml_prediction_latency_seconds_count',
+                   model='test_monitoring_registry', operation='predict') == before + 1
+    assert _sample('ml_prediction_batch_size_sum', model='test_monitoring_registry') >= 64
+
+async def test_decorator_records_errors_and_latency_alert(caplog, monkeypatch):
+    """Les erreurs sont comptées et le dépassement de seuil est signalé"""
+    monitor = get_ml_monitor()
+    monkeypatch.setattr(type(monitor), 'max_latency_ms', property(lambda self: 0))
+
+    @monitor_prediction('test_monitoring_async')
+    async def predire(valeur):
+        if valeur < 0:
+            raise ValueError("négatif")
+        return valeur
+
+    with caplog.at_level(logging.WARNING):
+        assert await predire(1) == 1
+    with pytest.raises(ValueError):
+        await predire(-1)
+
+    assert _sample('ml_predictions_total', model='test_monitoring_async', status='success') >= 1
+    assert _sample('ml_predictions_total', model='test_monitoring_async', status='error') >= 1
+    assert _sample('ml_latency_alerts_total', model='test_monitoring_async') >= 1
+    assert "Latence ML élevée" in caplog.text
+
+def test_cache_hit_ratio_gauge():
+    """Le taux de succès du cache est publié par modèle"""
+    monitor = MLMonitor()
+    monitor.record_cache('test_monitoring_cache', hit=False)
+    monitor.record_cache('test_monitoring_cache', hit=True)
+    monitor.record_cache('test_monitoring_cache', hit=True)
+    monitor.record_cache('test_monitoring_cache', hit=True)
+
+    assert _sample('ml_prediction_cache_hit_ratio', model='test_monitoring_cache') == pytest.approx(0.75)
+
+def test_feature_sketch_detects_shift():
+    """PSI et KS restent faibles sans dérive et augmentent avec un décalage"""
+    rng = np.random.default_rng(0)
+    sketch = FeatureSketch(bins=10, reference_size=2000, window_size=1000)
+    sketch.set_reference(rng.normal(size=(2000, 2)))
+
+    stable = sketch.update(rng.normal(size=(1000, 2)))
+    shifted = sketch.update(np.column_stack([
+        rng.normal(size=1000),
+        rng.normal(loc=1.5, size=1000)
+    ]))
+
+    assert stable['psi'].max() < 0.1
+    assert shifted['psi'][0] < 0.1
+    assert shifted['psi'][1] > 0.5
+    assert shifted['ks'][1] > 0.3
+
+def test_feature_sketch_builds_reference_from_first_rows():
+    """Sans données d'entraînement, les premières lignes servent de référence"""
+    sketch = FeatureSketch(bins=5, reference_size=100, window_size=50)
+
+    assert sketch.update(np.ones((60, 1))) is None
+    assert not sketch.has_reference
+    sketch.update(np.arange(60).reshape(-1, 1))
+
+    assert sketch.has_reference
+    assert sketch.reference.sum() == 120
+
+async def test_rendement_toutes_parcelles_mesure_une_fois():
+    """Le chemin "all" délègue au lot: un seul enregistrement de latence"""
+    service = ProductionMLService.__new__(ProductionMLService)
+    service.rendement_predictor = Mock()
+    service.rendement_predictor.predict_rendement_batch = AsyncMock(
+        return_value={"parcelles": {1: {}, 2: {}}}
+    )
+    labels = {"model": "production_rendement"}
+    avant = {
+        operation: _sample('ml_prediction_latency_seconds_count', operation=operation, **labels)
+        for operation in ('predict_rendement', 'predict_rendement_batch')
+    }
+
+    await service.predict_rendement("all", date(2024, 1, 1), date(2024, 1, 31))
+
+    assert _sample('ml_prediction_latency_seconds_count',
+                   operation='predict_rendement_batch', **labels) == avant['predict_rendement_batch'] + 1
+    assert _sample('ml_prediction_latency_seconds_count',
+                   operation='predict_rendement', **labels) == avant['predict_rendement']
+
+def test_metrics_endpoint_exposes_ml_metrics(client):
+    """L'endpoint /metrics expose les métriques ML au format Prometheus"""
+    get_ml_monitor().observe('test_monitoring_export', 'predict', 0.001, batch_size=1)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'model="test_monitoring_export"' in response.text
+    assert "ml_prediction_latency_seconds_bucket" in response.text
+
+async def test_metrics_endpoint_exposes_tableau_bord_predictions(client):
+    """Les prédictions agrégées du tableau de bord ont leur histogramme sur /metrics"""
+    cache_service = AsyncMock()
+    cache_service.get.return_value = None
+
+    await get_ml_predictions(projets_ml=AsyncMock(), cache_service=cache_service)
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    buckets = [line for line in response.text.splitlines()
+               if line.startswith("ml_prediction_latency_seconds_bucket")
+               and 'model="tableau_bord_predictions"' in line]
+    assert buckets and all('operation="get_ml_predictions"' in line for line in buckets)
+
+def test_metrics_aggregated_across_workers(tmp_path, monkeypatch):
+    """En mode multiprocessus, /metrics agrège les valeurs de chaque worker"""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for worker in ("a", "b"):
+        script = (
+            "from services.ml.core.monitoring import get_ml_monitor\n"
+            f"get_ml_monitor().observe('test_worker_{worker}', 'predict', 0.002, batch_size=4)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=Path(__file__).parents[2],
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        assert result.returncode == 0, result.stderr
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    export = generate_latest(metrics_registry()).decode()
+
+    assert 'ml_prediction_latency_seconds_count{model="test_worker_a",operation="predict"} 1.0' in export
+    assert 'ml_prediction_latency_seconds_count{model="test_worker_b",operation="predict"} 1.0' in export
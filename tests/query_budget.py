@@ -0,0 +1,81 @@
+"""
+Plugin pytest: budgets de requêtes SQL et temps passé en base par test
+
+Chargé par pytest.ini (-p tests.query_budget). Chaque test est profilé via
+les hooks SQLAlchemy de core.query_profiler:
+- fixture assert_max_queries: budget sur un bloc
+      with assert_max_queries(2):
+          await service.get_balance_generale()
+- marqueur max_queries(n): budget sur le test entier
+- option --db-stats: tests les plus coûteux en requêtes en fin de session
+
+Les temps des méthodes clés sont mesurés par pytest-benchmark (marqueur
+performance); chaque test vérifie son temps moyen contre un budget
+(benchmark.stats["mean"]). Pour suivre les régressions plus fines, on peut
+en plus les comparer à une référence enregistrée:
+    pytest -m performance --benchmark-autosave
+    pytest -m performance --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+import pytest
+
+from core.query_profiler import QueryProfile, profile_queries
+
+_STATS_KEY = pytest.StashKey[Dict[str, Tuple[int, float]]]()
+
+def _failure_message(profile: QueryProfile, limit: int, where: str) -> str:
+    statements = "\n".join(f"  {i}. {statement}" for i, statement in enumerate(profile.statements, 1))
+    return (
+        f"{where}: {profile.count} requêtes SQL pour un budget de {limit} "
+        f"({profile.total_ms:.1f} ms en base)\n{statements}"
+    )
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--db-stats",
+        action="store_true",
+        help="Affiche les tests exécutant le plus de requêtes SQL"
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "max_queries(n): budget de requêtes SQL du test")
+    config.stash[_STATS_KEY] = {}
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("max_queries")
+    with profile_queries(keep_statements=marker is not None) as profile:
+        outcome = yield
+    item.config.stash[_STATS_KEY][item.nodeid] = (profile.count, profile.total_ms)
+    item.user_properties.append(("db_queries", profile.count))
+    item.user_properties.append(("db_time_ms", round(profile.total_ms, 2)))
+
+    if marker is not None and outcome.excinfo is None:
+        limit = marker.args[0]
+        if profile.count > limit:
+            pytest.fail(_failure_message(profile, limit, item.name), pytrace=False)
+
+@pytest.fixture
+def assert_max_queries():
+    """Budget de requêtes SQL sur un bloc de code"""
+    @contextmanager
+    def _assert_max_queries(limit: int) -> Iterator[QueryProfile]:
+        with profile_queries(keep_statements=True) as profile:
+            yield profile
+        if profile.count > limit:
+            pytest.fail(_failure_message(profile, limit, "Budget dépassé"), pytrace=False)
+    return _assert_max_queries
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not config.getoption("--db-stats"):
+        return
+    stats = config.stash[_STATS_KEY]
+    if not stats:
+        return
+    terminalreporter.section("Requêtes SQL par test")
+    heaviest = sorted(stats.items(), key=lambda item: item[1][0], reverse=True)[:15]
+    for nodeid, (count, total_ms) in heaviest:
+        terminalreporter.write_line(f"{count:6d} requêtes {total_ms:9.1f} ms  {nodeid}")
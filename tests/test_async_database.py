@@ -0,0 +1,113 @@
+"""
+Tests de la session asynchrone et des services de lecture portés dessus.
+"""
+
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, Mock
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+pytest.importorskip("aiosqlite")
+
+from core.config import to_async_url
+from db.database import Base, get_async_db
+from models.hr import Employe, StatutEmploye
+from models.iot_sensor import IoTSensor, SensorReading, SensorType, SensorStatus
+from services.dashboard_service import DashboardService
+from services.iot_monitoring_service import IoTMonitoringService, READINGS_LIMIT
+
+@pytest.fixture
+async def async_session():
+    """Session aiosqlite en mémoire avec les tables IoT et RH"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[
+            IoTSensor.__table__, SensorReading.__table__, Employe.__table__
+        ])
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+@pytest.fixture
+async def capteurs(async_session):
+    """Deux capteurs d'une parcelle: l'un actif, l'autre sans lecture récente"""
+    parcelle_id = uuid4()
+    now = datetime.utcnow()
+    actif = IoTSensor(
+        id=uuid4(), code="TEMP-A", type=SensorType.TEMPERATURE_SOL,
+        parcelle_id=parcelle_id, intervalle_lecture=300,
+        seuils_alerte={"min": 10, "max": 30}
+    )
+    silencieux = IoTSensor(
+        id=uuid4(), code="HUM-B", type=SensorType.HUMIDITE_SOL,
+        parcelle_id=parcelle_id, intervalle_lecture=300, seuils_alerte={}
+    )
+    async_session.add_all([actif, silencieux])
+
+    for i in range(READINGS_LIMIT + 20):
+        async_session.add(SensorReading(
+            capteur_id=actif.id, timestamp=now - timedelta(minutes=i),
+            valeur=35 if i == 0 else 20, unite="°C",
+            niveau_batterie=90, qualite_signal=95
+        ))
+    async_session.add(SensorReading(
+        capteur_id=silencieux.id, timestamp=now - timedelta(hours=5),
+        valeur=40, unite="%", niveau_batterie=80, qualite_signal=90
+    ))
+    await async_session.commit()
+    return parcelle_id, actif, silencieux
+
+def test_to_async_url():
+    """Les URLs synchrones sont converties vers les pilotes asynchrones"""
+    assert to_async_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert to_async_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert to_async_url("sqlite:////tmp/erp.db") == "sqlite+aiosqlite:////tmp/erp.db"
+
+async def test_get_async_db_yields_async_session():
+    """La dépendance fournit une AsyncSession"""
+    dependency = get_async_db()
+    session = await dependency.__anext__()
+    try:
+        assert isinstance(session, AsyncSession)
+    finally:
+        await dependency.aclose()
+
+async def test_monitoring_batches_readings_per_sensor(async_session, capteurs):
+    """Lectures, stats et santé chargées par lot pour tous les capteurs"""
+    parcelle_id, actif, silencieux = capteurs
+    weather_service = Mock()
+    weather_service.get_forecast = AsyncMock(return_value={})
+    ml_service = Mock()
+    ml_service.analyze_meteo_impact = AsyncMock(return_value={"impact": 0})
+    service = IoTMonitoringService(async_session, Mock(), weather_service, ml_service)
+
+    data = await service.get_parcelle_monitoring(
+        parcelle_id,
+        start_date=datetime.utcnow() - timedelta(days=1)
+    )
+
+    mesures = data["mesures"][SensorType.TEMPERATURE_SOL][0]
+    assert len(mesures["lectures"]) == READINGS_LIMIT
+    assert mesures["statistiques"]["nombre_lectures"] == READINGS_LIMIT + 20
+    assert mesures["lectures"][0].valeur == 35
+
+    statuts = {c["code"]: c["status"] for c in data["capteurs"]}
+    assert statuts == {"TEMP-A": SensorStatus.ACTIF, "HUM-B": SensorStatus.ERREUR}
+    assert {a["type"] for a in data["alertes"]} == {"seuil_max", "sante_capteur"}
+    assert data["sante_systeme"]["capteurs_actifs"] == 1
+
+async def test_dashboard_hr_stats_on_async_session(async_session):
+    """Les stats RH sont calculées en une requête groupée"""
+    for i, statut in enumerate([StatutEmploye.ACTIF, StatutEmploye.ACTIF, StatutEmploye.CONGE]):
+        async_session.add(Employe(
+            matricule=f"E{i}", nom="Test", prenom=str(i),
+            date_embauche=date(2023, 1, 1), email=f"e{i}@fofal.cm", statut=statut
+        ))
+    await async_session.commit()
+
+    stats = await DashboardService(async_session)._get_hr_stats()
+
+    assert stats == {"effectif_total": 2, "en_conge": 1}
@@ -0,0 +1,86 @@
+"""
+Tests du générateur de données et du rapport des tests de charge.
+"""
+
+import csv
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from benchmarks.report import EndpointStats, compare, load_stats
+from benchmarks.seed import Volumes, create_schema, seed
+from models.comptabilite import EcritureComptable
+from models.iot_sensor import SensorReading
+
+TINY = Volumes(years=1, ecritures_per_day=3, parcelles=2, sensors_per_parcelle=1,
+               sensor_months=1, produits=10, stocks_per_produit=2)
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    create_schema(engine)
+    yield engine
+    engine.dispose()
+
+def test_seed_volumes_and_balanced_entries(engine):
+    state = seed(engine, TINY, end=date(2024, 6, 30))
+
+    # 2 capteurs, un relevé toutes les 5 minutes pendant 30 jours
+    assert state["counts"]["sensor_readings"] == 2 * 30 * 288
+    assert state["counts"]["stocks"] == 20
+    assert len(state["parcelles"]) == 2
+
+    with engine.connect() as connection:
+        debit, credit, count = connection.execute(select(
+            func.sum(EcritureComptable.debit),
+            func.sum(EcritureComptable.credit),
+            func.count()
+        )).one()
+        assert count == state["counts"]["ecritures_comptables"] > 500
+        assert float(debit) == pytest.approx(float(credit))
+        first = connection.execute(select(func.min(SensorReading.timestamp))).scalar()
+        assert str(first).startswith("2024-05-31")
+
+def test_create_schema_is_idempotent(engine):
+    assert create_schema(engine) == []
+
+def _stats_csv(path, rows):
+    fields = ["Type", "Name", "Request Count", "Failure Count", "50%", "95%", "Requests/s"]
+    with open(path, "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(dict(zip(fields, row)))
+
+def test_report_flags_regressions(tmp_path):
+    path = tmp_path / "run_stats.csv"
+    _stats_csv(path, [
+        ("GET", "dashboard/stats", 1000, 0, 40, 130, 50.0),
+        ("GET", "inventaire/produits", 800, 0, 20, 60, 30.0),
+        ("GET", "comptabilite/bilan", 200, 3, 90, 200, 10.0),
+        ("GET", "iot-monitoring/health", 100, 0, 5, 9, 5.0),
+        ("", "Aggregated", 2100, 3, 30, 120, 95.0),
+    ])
+    stats = load_stats(path)
+    assert set(stats) == {
+        "GET dashboard/stats", "GET inventaire/produits", "GET comptabilite/bilan", "GET iot-monitoring/health"
+    }
+
+    baseline = {
+        "GET dashboard/stats": {"p50_ms": 40, "p95_ms": 100, "rps": 50},
+        "GET inventaire/produits": {"p50_ms": 20, "p95_ms": 60, "rps": 40},
+        "GET comptabilite/bilan": {"p50_ms": 90, "p95_ms": 200, "rps": 10},
+    }
+    results = {c.name: c for c in compare(stats, baseline)}
+
+    assert results["GET dashboard/stats"].regressions == ["p95"]
+    assert results["GET inventaire/produits"].regressions == ["débit"]
+    assert results["GET comptabilite/bilan"].regressions == ["3 échecs"]
+    assert results["GET iot-monitoring/health"].regressions == []
+    assert results["GET iot-monitoring/health"].baseline is None
+
+def test_report_within_tolerance():
+    current = {"GET dashboard/stats": EndpointStats(1000, 0, 40, 115, 45)}
+    baseline = {"GET dashboard/stats": {"p50_ms": 40, "p95_ms": 100, "rps": 50}}
+    assert compare(current, baseline)[0].regressions == []
@@ -0,0 +1,141 @@
+"""
+Tests du service de change (taux persistés, cache en mémoire, conversion des rapports)
+"""
+
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import CompteComptable, EcritureComptable, StatutEcriture, TypeCompte
+from models.finance import TauxChange
+from services.change_service import (
+    ChangeService,
+    FournisseurTauxFixe,
+    TableTaux,
+    convertir_colonnes,
+    get_cache_taux
+)
+from services.comptabilite_service import ComptabiliteService
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'change.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture(autouse=True)
+def cache_vide():
+    get_cache_taux().clear()
+    yield
+    get_cache_taux().clear()
+
+class FournisseurCompte(FournisseurTauxFixe):
+    """Parités fixes, appels comptés"""
+
+    def __init__(self):
+        super().__init__("XAF")
+        self.appels = []
+
+    async def taux(self, devise, jours):
+        self.appels.append((devise, list(jours)))
+        return await super().taux(devise, jours)
+
+async def test_taux_completes_puis_servis_par_le_cache(session, assert_max_queries):
+    fournisseur = FournisseurCompte()
+    service = ChangeService(session, fournisseur)
+
+    table = await service.table("eur", date(2024, 3, 1), date(2024, 3, 31))
+
+    assert table.taux_aux(date(2024, 3, 15))[0] == pytest.approx(655.957)
+    assert len(fournisseur.appels[0][1]) == 31
+    assert session.query(TauxChange).filter(TauxChange.devise == "EUR").count() == 31
+
+    # Sous-plage déjà chargée: ni base ni fournisseur
+    with assert_max_queries(0):
+        await service.table("EUR", date(2024, 3, 10), date(2024, 3, 20))
+    assert await service.taux_au("XAF", date(2024, 3, 10)) == 1.0
+
+    # Cache vidé: les taux persistés suffisent
+    get_cache_taux().clear()
+    with assert_max_queries(1):
+        await service.table("EUR", date(2024, 3, 1), date(2024, 3, 31))
+    assert len(fournisseur.appels) == 1
+
+    with pytest.raises(ValueError, match="USD"):
+        await service.table("USD", date(2024, 3, 1), date(2024, 3, 31))
+
+async def test_date_future_au_dernier_taux_publie(session):
+    # Taux publiés jusqu'à avant-hier seulement; base vide
+    class FournisseurEnRetard(FournisseurCompte):
+        async def taux(self, devise, jours):
+            taux = await super().taux(devise, jours)
+            return {j: t for j, t in taux.items() if j <= date.today() - timedelta(days=2)}
+
+    fournisseur = FournisseurEnRetard()
+    service = ChangeService(session, fournisseur)
+    fin_mois = date.today() + timedelta(days=20)
+
+    assert await service.taux_au("EUR", fin_mois) == pytest.approx(655.957)
+    assert [max(jours) for _, jours in fournisseur.appels] == [date.today(), date.today() - timedelta(days=1)]
+    assert session.query(func.max(TauxChange.date_taux)).scalar() == date.today() - timedelta(days=2)
+
+def test_dernier_taux_connu_et_conversion_vectorisee():
+    jours = [date(2024, 3, 1), date(2024, 3, 4)]
+    table = TableTaux("EUR", np.array([j.toordinal() for j in jours]), np.array([650.0, 660.0]),
+                      jours[0], jours[-1])
+
+    taux = table.taux_aux([date(2024, 2, 28), date(2024, 3, 2), date(2024, 3, 4), date(2024, 4, 1)])
+    assert taux.tolist() == [650.0, 650.0, 660.0, 660.0]
+
+    lignes = [{"compte": "601", "debit": 1300.0, "credit": 0}, {"compte": "521", "debit": 0, "credit": 6600.0}]
+    converties = convertir_colonnes(lignes, ("debit", "credit"), np.array([650.0, 660.0]))
+    assert converties == [{"compte": "601", "debit": 2.0, "credit": 0.0}, {"compte": "521", "debit": 0.0, "credit": 10.0}]
+    assert lignes[0]["debit"] == 1300.0
+
+async def test_rapports_convertis_en_un_chargement(session, assert_max_queries):
+    comptes = {"601": uuid.uuid4(), "521": uuid.uuid4()}
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": compte_id, "numero": numero, "libelle": numero, "type_compte": TypeCompte.ACTIF}
+        for numero, compte_id in comptes.items()
+    ])
+    journal_id = uuid.uuid4()
+    session.execute(EcritureComptable.__table__.insert(), [
+        {"id": uuid.uuid4(), "date_ecriture": date(2024, 3, jour), "numero_piece": f"ACH-{jour}",
+         "compte_id": comptes[numero], "libelle": "Engrais", "debit": debit, "credit": credit,
+         "statut": StatutEcriture.VALIDEE, "journal_id": journal_id, "periode": "2024-03"}
+        for jour in (4, 18)
+        for numero, debit, credit in (("601", Decimal("655957"), 0), ("521", 0, Decimal("655957")))
+    ])
+    # Dévaluation fictive au 15 mars pour distinguer les taux
+    session.execute(TauxChange.__table__.insert(), [
+        {"date_taux": date(2024, 3, 1) + timedelta(days=i), "devise": "EUR",
+         "taux": Decimal("655.957") if i < 14 else Decimal("1311.914"), "source": "test"}
+        for i in range(31)
+    ])
+    session.commit()
+
+    service = ComptabiliteService(session)
+    service.cache = AsyncMock()
+    service.cache.get.return_value = None
+    service.change = ChangeService(session, FournisseurCompte())
+
+    with assert_max_queries(2):
+        grand_livre = await service.get_grand_livre(
+            compte_id=comptes["601"], date_debut=date(2024, 3, 1), date_fin=date(2024, 3, 31), devise="EUR"
+        )
+    assert [(l["debit"], l["solde"]) for l in grand_livre] == [(1000.0, 1000.0), (500.0, 1500.0)]
+    # Le cache garde les montants en devise de base
+    assert service.cache.set.await_args.args[1][0]["debit"] == 655957.0
+
+    balance = await service.get_balance_generale(date(2024, 3, 1), date(2024, 3, 31), devise="EUR")
+    assert {l["compte"]["numero"]: l["solde"] for l in balance} == {"521": -1000.0, "601": 1000.0}
+    assert service.change.fournisseur.appels == []
@@ -0,0 +1,100 @@
+"""
+Tests de la série de trésorerie journalière (une requête groupée par période)
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import CompteComptable, EcritureComptable, StatutEcriture, TypeCompte
+from services.comptabilite_stats_service import ComptabiliteStatsService
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cashflow.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def stats_service(session):
+    service = ComptabiliteStatsService(session)
+    service.weather_service = AsyncMock()
+    service.analyse = AsyncMock()
+    return service
+
+def _ecritures(session, today):
+    banque, ventes = uuid.uuid4(), uuid.uuid4()
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": banque, "numero": "521", "libelle": "Banque", "type_compte": TypeCompte.ACTIF,
+         "solde_debit": Decimal("1000"), "solde_credit": Decimal("0"), "actif": True},
+        {"id": ventes, "numero": "701", "libelle": "Ventes", "type_compte": TypeCompte.PRODUIT,
+         "solde_debit": Decimal("0"), "solde_credit": Decimal("300"), "actif": True},
+    ])
+    lignes = [
+        (today - timedelta(days=5), ventes, 0, 300, StatutEcriture.VALIDEE),
+        (today - timedelta(days=5), banque, 50, 0, StatutEcriture.VALIDEE),
+        (today - timedelta(days=2), banque, 120, 0, StatutEcriture.VALIDEE),
+        (today - timedelta(days=1), ventes, 0, 999, StatutEcriture.BROUILLON),
+        (today - timedelta(days=40), ventes, 0, 500, StatutEcriture.VALIDEE),
+    ]
+    session.execute(EcritureComptable.__table__.insert(), [
+        {"id": uuid.uuid4(), "date_ecriture": jour, "numero_piece": f"P{i}", "compte_id": compte,
+         "libelle": "Test", "debit": Decimal(debit), "credit": Decimal(credit), "statut": statut,
+         "journal_id": uuid.uuid4(), "periode": jour.strftime("%Y-%m")}
+        for i, (jour, compte, debit, credit, statut) in enumerate(lignes)
+    ])
+    session.commit()
+
+async def test_cashflow_gap_filled_in_one_query(session, stats_service, assert_max_queries):
+    today = datetime.now(timezone.utc).date()
+    _ecritures(session, today)
+    stats_service.weather_service.get_daily_impacts.return_value = {
+        (today - timedelta(days=2)).isoformat(): 30
+    }
+
+    with assert_max_queries(2):
+        cashflow = await stats_service._get_basic_cashflow(7)
+
+    assert [entry["date"] for entry in cashflow] == [
+        (today - timedelta(days=6 - i)).isoformat() for i in range(7)
+    ]
+    par_jour = {entry["date"]: entry for entry in cashflow}
+    cinq_jours = par_jour[(today - timedelta(days=5)).isoformat()]
+    assert (cinq_jours["entrees"], cinq_jours["sorties"], cinq_jours["solde"]) == (300, 50, 1250)
+    assert par_jour[(today - timedelta(days=2)).isoformat()]["solde"] == 1130
+    assert par_jour[(today - timedelta(days=2)).isoformat()]["impact_meteo"] == 30
+    # Écriture en brouillon ignorée, solde reporté sur les jours vides
+    assert cashflow[-1]["entrees"] == 0 and cashflow[-1]["solde"] == 1130
+    stats_service.weather_service.get_daily_impacts.assert_awaited_once_with(
+        today - timedelta(days=6), today
+    )
+
+async def test_cashflow_predictions_and_risks_by_date(session, stats_service):
+    today = datetime.now(timezone.utc).date()
+    hier = today - timedelta(days=1)
+    stats_service.weather_service.get_daily_impacts.return_value = {}
+    stats_service.analyse.get_analyse_parcelle.return_value = {
+        "ml_analysis": {
+            "predictions": [{"date": hier.isoformat(), "revenue": 400, "costs": 150}],
+            "risks": [
+                {"type": "MARCHE", "description": "Permanent"},
+                {"type": "WEATHER", "date_debut": hier.isoformat(), "date_fin": hier.isoformat()},
+            ]
+        }
+    }
+
+    cashflow = {entry["date"]: entry for entry in await stats_service.get_cashflow(days=3)}
+
+    assert len(cashflow) == 3
+    assert cashflow[hier.isoformat()]["ml_predictions"] == {"revenue": 400, "costs": 150}
+    assert cashflow[today.isoformat()]["ml_predictions"] == {"revenue": 0, "costs": 0}
+    assert [r["type"] for r in cashflow[hier.isoformat()]["ml_risks"]] == ["MARCHE", "WEATHER"]
+    assert [r["type"] for r in cashflow[today.isoformat()]["ml_risks"]] == ["MARCHE"]
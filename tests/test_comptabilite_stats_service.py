@@ -251,8 +251,8 @@ async def test_get_cashflow(stats_service, comptes, ecritures, mocker):
     """Test des données de trésorerie"""
     # Mock des services externes
     mocker.patch(
-        'services.weather_service.WeatherService.get_daily_impact',
-        return_value={"impact": 5}
+        'services.weather_service.WeatherService.get_daily_impacts',
+        return_value={}
     )
     
     mocker.patch(
@@ -0,0 +1,122 @@
+"""
+Tests de la validation en masse des écritures en brouillon
+"""
+
+import time
+import uuid
+from datetime import date
+from unittest.mock import AsyncMock
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import CompteComptable, EcritureComptable, StatutEcriture, TypeCompte
+from schemas.comptabilite import ValidationEcrituresRequest
+from services.comptabilite_service import ComptabiliteService
+
+JOURNAL_ACHATS = uuid.uuid4()
+JOURNAL_VENTES = uuid.uuid4()
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'validation.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def service(session):
+    service = ComptabiliteService(session)
+    service.cache = AsyncMock()
+    return service
+
+@pytest.fixture
+def comptes(session):
+    comptes = {"601": uuid.uuid4(), "521": uuid.uuid4()}
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": compte_id, "numero": numero, "libelle": numero,
+         "type_compte": TypeCompte.CHARGE if numero == "601" else TypeCompte.ACTIF}
+        for numero, compte_id in comptes.items()
+    ])
+    return comptes
+
+def _pieces(session, comptes, pieces):
+    """Insère des pièces (numero_piece, journal, periode, debit, credit, statut)"""
+    lignes = []
+    for piece, journal_id, periode, debit, credit, statut in pieces:
+        jour = date.fromisoformat(f"{periode}-05")
+        for numero, d, c in (("601", debit, 0), ("521", 0, credit)):
+            lignes.append({
+                "id": uuid.uuid4(), "date_ecriture": jour, "numero_piece": piece, "compte_id": comptes[numero],
+                "libelle": piece, "debit": d, "credit": c, "statut": statut, "journal_id": journal_id,
+                "periode": periode
+            })
+    session.execute(EcritureComptable.__table__.insert(), lignes)
+    session.commit()
+
+async def test_validation_par_periode_et_journal(session, service, comptes, assert_max_queries):
+    _pieces(session, comptes, [
+        ("ACH-1", JOURNAL_ACHATS, "2024-03", 1000, 1000, StatutEcriture.BROUILLON),
+        ("ACH-2", JOURNAL_ACHATS, "2024-03", 250, 250, StatutEcriture.BROUILLON),
+        ("VEN-1", JOURNAL_VENTES, "2024-03", 500, 500, StatutEcriture.BROUILLON),
+        ("ACH-3", JOURNAL_ACHATS, "2024-04", 300, 300, StatutEcriture.BROUILLON),
+        ("ACH-0", JOURNAL_ACHATS, "2024-03", 700, 700, StatutEcriture.VALIDEE),
+    ])
+    validateur = uuid.uuid4()
+
+    with assert_max_queries(2):
+        resultat = await service.valider_ecritures(validateur, periode="2024-03", journal_id=JOURNAL_ACHATS)
+
+    assert resultat["validees"] == 4
+    validees = session.query(EcritureComptable).filter(EcritureComptable.id.in_(resultat["ids"])).all()
+    assert {e.numero_piece for e in validees} == {"ACH-1", "ACH-2"}
+    assert all(e.statut == StatutEcriture.VALIDEE and e.validee_par_id == validateur for e in validees)
+    # Une seule invalidation par famille de clés
+    assert service.cache.delete_pattern.await_count == 5
+
+    # Rien à revalider
+    assert (await service.valider_ecritures(validateur, periode="2024-03", journal_id=JOURNAL_ACHATS))["validees"] == 0
+    assert service.cache.delete_pattern.await_count == 5
+
+async def test_validation_refuse_pieces_desequilibrees(session, service, comptes):
+    _pieces(session, comptes, [
+        ("ACH-1", JOURNAL_ACHATS, "2024-03", 1000, 1000, StatutEcriture.BROUILLON),
+        ("ACH-2", JOURNAL_ACHATS, "2024-03", 250, 200, StatutEcriture.BROUILLON),
+    ])
+
+    with pytest.raises(ValueError, match="ACH-2"):
+        await service.valider_ecritures(uuid.uuid4(), periode="2024-03")
+    assert session.query(EcritureComptable).filter(
+        EcritureComptable.statut == StatutEcriture.VALIDEE
+    ).count() == 0
+
+    # Une sélection par identifiants ne peut pas couper une pièce
+    ligne = session.query(EcritureComptable.id).filter(EcritureComptable.numero_piece == "ACH-1").first()
+    with pytest.raises(ValueError, match="ACH-1"):
+        await service.valider_ecritures(uuid.uuid4(), ids=[ligne.id])
+
+async def test_validation_exige_un_filtre(service):
+    with pytest.raises(ValueError):
+        await service.valider_ecritures(uuid.uuid4())
+    with pytest.raises(ValidationError):
+        ValidationEcrituresRequest(validee_par_id=uuid.uuid4())
+    with pytest.raises(ValidationError):
+        ValidationEcrituresRequest(validee_par_id=uuid.uuid4(), periode="2024-13")
+
+@pytest.mark.performance
+async def test_validation_d_un_mois(session, service, comptes):
+    """20 000 lignes en brouillon validées en quelques secondes"""
+    _pieces(session, comptes, [
+        (f"ACH-{i}", JOURNAL_ACHATS, "2024-03", 100 + i, 100 + i, StatutEcriture.BROUILLON)
+        for i in range(10_000)
+    ])
+
+    start = time.perf_counter()
+    resultat = await service.valider_ecritures(uuid.uuid4(), periode="2024-03")
+
+    assert resultat["validees"] == 20_000
+    assert time.perf_counter() - start < 5
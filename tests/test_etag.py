@@ -0,0 +1,132 @@
+"""
+Tests des ETags et des GET conditionnels des rapports.
+"""
+
+from datetime import date
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api.v1.endpoints import comptabilite
+from core.etag import content_etag, data_watermark, etag_matches, make_etag
+from db.database import get_db
+from models.base import Base
+from models.comptabilite import (
+    CompteComptable,
+    EcritureComptable,
+    JournalComptable,
+    TypeCompte,
+    TypeJournal
+)
+from models.finance import TauxChange
+from models.production import ProductionEvent, Recolte
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = [
+        CompteComptable.__table__, JournalComptable.__table__, EcritureComptable.__table__,
+        Recolte.__table__, ProductionEvent.__table__, TauxChange.__table__
+    ]
+    Base.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def client(session):
+    app = FastAPI()
+    app.include_router(comptabilite.router)
+    app.dependency_overrides[get_db] = lambda: session
+    return TestClient(app)
+
+def _ecriture(session, montant=100):
+    compte = session.query(CompteComptable).first()
+    if compte is None:
+        compte = CompteComptable(numero="571", libelle="Caisse", type_compte=TypeCompte.ACTIF)
+        journal = JournalComptable(code="CA", libelle="Caisse", type_journal=TypeJournal.CAISSE)
+        session.add_all([compte, journal])
+        session.flush()
+    journal = session.query(JournalComptable).first()
+    session.add(EcritureComptable(
+        date_ecriture=date(2024, 1, 15), numero_piece=uuid4().hex[:8], compte_id=compte.id,
+        libelle="Vente", debit=montant, journal_id=journal.id, periode="2024-01"
+    ))
+    session.commit()
+
+def test_etag_matches():
+    etag = make_etag("balance", date(2024, 1, 31))
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"autre", {etag.removeprefix("W/")}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"autre"', etag)
+    assert content_etag(b"{}") != content_etag(b"[]")
+
+def test_watermark_follows_writes(session):
+    """Le filigrane change à chaque écriture, en une seule requête"""
+    empty = data_watermark(session, "comptabilite", "production")
+    assert empty[0] == 0
+
+    _ecriture(session)
+    first = data_watermark(session, "comptabilite")
+    assert first[0] == 1
+
+    # Correction sans nouvelle ligne: détectée par updated_at
+    session.query(EcritureComptable).update({"libelle": "Vente corrigée"})
+    session.commit()
+    assert data_watermark(session, "comptabilite") != first
+
+def test_balance_not_modified_skips_report(client, session):
+    """Un client à jour reçoit 304 sans que la balance soit calculée"""
+    _ecriture(session)
+    with patch.object(
+        comptabilite.ComptabiliteService, "get_balance_generale", new_callable=AsyncMock
+    ) as balance:
+        balance.return_value = []
+
+        response = client.get("/comptabilite/balance")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        response = client.get("/comptabilite/balance", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert balance.await_count == 1
+
+        # Nouvelle écriture: l'ETag change et la balance est recalculée
+        _ecriture(session, montant=250)
+        response = client.get("/comptabilite/balance", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert balance.await_count == 2
+
+def test_balance_convertie_suit_les_taux(client, session):
+    """Balance en devise: un taux nouvellement publié change l'ETag"""
+    _ecriture(session)
+    with patch.object(
+        comptabilite.ComptabiliteService, "get_balance_generale", new_callable=AsyncMock
+    ) as balance:
+        balance.return_value = []
+
+        etag = client.get("/comptabilite/balance?devise=EUR").headers["etag"]
+        assert client.get("/comptabilite/balance").headers["etag"] != etag
+        response = client.get("/comptabilite/balance?devise=EUR", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        session.add(TauxChange(date_taux=date.today(), devise="EUR", taux=655.957, source="fixe"))
+        session.commit()
+        response = client.get("/comptabilite/balance?devise=EUR", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert balance.await_count == 3
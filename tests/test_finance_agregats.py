@@ -0,0 +1,103 @@
+"""
+Tests des agrégats mensuels de transactions (finance_agregats_mensuels)
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.finance import (
+    AgregatFinanceMensuel, CategorieTransaction, Compte,
+    StatutTransaction, Transaction, TypeCompte, TypeTransaction
+)
+from schemas.finance import TransactionCreate
+from services.finance_service import FinanceService
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'finance.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def finance_service(session):
+    service = FinanceService(session)
+    service.cache = AsyncMock()
+    service.cache.get.return_value = None
+    return service
+
+@pytest.fixture
+def compte(session):
+    compte = Compte(id=uuid.uuid4(), numero="BQ-01", libelle="Banque", type_compte=TypeCompte.BANQUE,
+                    solde=Decimal("1000000"))
+    session.add(compte)
+    session.commit()
+    return compte
+
+def _transaction(compte, reference, type_transaction, categorie, montant, jour):
+    return TransactionCreate(
+        reference=reference,
+        date_transaction=jour,
+        type_transaction=type_transaction,
+        categorie=categorie,
+        montant=montant,
+        description=None,
+        compte_source_id=compte.id if type_transaction == TypeTransaction.DEPENSE else None,
+        compte_destination_id=compte.id if type_transaction == TypeTransaction.RECETTE else None,
+        metadata=None,
+        piece_jointe=None
+    )
+
+async def test_create_transaction_updates_monthly_aggregate(session, finance_service, compte):
+    jour = datetime(2024, 3, 12)
+    await finance_service.create_transaction(
+        _transaction(compte, "DEP-1", TypeTransaction.DEPENSE, CategorieTransaction.TRANSPORT, 20000, jour)
+    )
+    await finance_service.create_transaction(
+        _transaction(compte, "DEP-2", TypeTransaction.DEPENSE, CategorieTransaction.TRANSPORT, 5000, jour)
+    )
+    await finance_service.create_transaction(
+        _transaction(compte, "VEN-1", TypeTransaction.RECETTE, CategorieTransaction.VENTE, 90000, jour)
+    )
+
+    agregats = {
+        (a.type_transaction, a.categorie): (a.montant_total, a.nombre_transactions)
+        for a in session.execute(select(AgregatFinanceMensuel)).scalars()
+    }
+    assert agregats == {
+        (TypeTransaction.DEPENSE, CategorieTransaction.TRANSPORT): (Decimal("25000"), 2),
+        (TypeTransaction.RECETTE, CategorieTransaction.VENTE): (Decimal("90000"), 1),
+    }
+
+async def test_stats_and_projection_read_aggregates(session, finance_service, assert_max_queries):
+    now = datetime.utcnow()
+    current_month = now.strftime("%Y-%m")
+    last_month = (now - timedelta(days=30)).strftime("%Y-%m")
+    for periode, type_transaction, statut, montant, nombre in [
+        (current_month, TypeTransaction.RECETTE, StatutTransaction.VALIDEE, 300000, 3),
+        (current_month, TypeTransaction.RECETTE, StatutTransaction.EN_ATTENTE, 999999, 1),
+        (current_month, TypeTransaction.DEPENSE, StatutTransaction.VALIDEE, 120000, 4),
+        (last_month, TypeTransaction.RECETTE, StatutTransaction.VALIDEE, 200000, 1),
+    ]:
+        finance_service._incrementer_agregat(
+            periode, type_transaction, CategorieTransaction.AUTRE, statut, montant, nombre
+        )
+    session.commit()
+
+    with assert_max_queries(2):
+        stats = await finance_service._get_basic_stats()
+
+    assert (stats["revenue"], stats["expenses"], stats["profit"]) == (300000, 120000, 180000)
+    assert stats["revenueVariation"] == {"value": 50.0, "type": "increase"}
+    # Moyenne par transaction validée sur la fenêtre de trois mois
+    assert await finance_service._calculate_base_projection("RECETTE", current_month) == 125000
+    # Aucune lecture de la table des transactions
+    assert session.query(Transaction).count() == 0
@@ -0,0 +1,149 @@
+"""
+Tests du suivi budgétaire (réalisé incrémental, écarts sans ML)
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import CompteComptable, ExerciceComptable, TypeCompte as TypeCompteComptable
+from models.finance import Budget, CategorieTransaction, Compte, TypeCompte, TypeTransaction
+from schemas.finance import BudgetCreate, TransactionCreate
+from services.comptabilite_service import ComptabiliteService
+from services.finance_comptabilite.budget import categorie_du_compte
+from services.cache_service import CacheService
+from services.finance_service import FinanceService
+from services.weather_service import WeatherService
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'budget.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def finance_service(session):
+    service = FinanceService(session)
+    service.cache = AsyncMock()
+    service.cache.get.return_value = None
+    return service
+
+@pytest.fixture
+def compte(session):
+    compte = Compte(id=uuid.uuid4(), numero="BQ-01", libelle="Banque", type_compte=TypeCompte.BANQUE,
+                    solde=Decimal("1000000"))
+    session.add(compte)
+    session.commit()
+    return compte
+
+def _transaction(compte, reference, type_transaction, categorie, montant):
+    return TransactionCreate(
+        reference=reference,
+        date_transaction=datetime(2024, 3, 12),
+        type_transaction=type_transaction,
+        categorie=categorie,
+        montant=montant,
+        description=None,
+        compte_source_id=compte.id if type_transaction == TypeTransaction.DEPENSE else None,
+        compte_destination_id=compte.id if type_transaction == TypeTransaction.RECETTE else None,
+        metadata=None,
+        piece_jointe=None
+    )
+
+def _budget(categorie, montant_prevu):
+    return BudgetCreate(periode="2024-03", categorie=categorie, montant_prevu=montant_prevu, notes=None, metadata=None)
+
+def test_categorie_du_compte():
+    assert categorie_du_compte("6011") == CategorieTransaction.ACHAT_INTRANT
+    assert categorie_du_compte("6241") == CategorieTransaction.MAINTENANCE
+    assert categorie_du_compte("6181") == CategorieTransaction.TRANSPORT
+    assert categorie_du_compte("658") == CategorieTransaction.AUTRE
+
+async def test_realise_incremental_et_ecarts_sans_ml(session, finance_service, compte, assert_max_queries):
+    intrants = CategorieTransaction.ACHAT_INTRANT
+    await finance_service.create_transaction(_transaction(compte, "DEP-1", TypeTransaction.DEPENSE, intrants, 20000))
+
+    # Budget créé en cours de mois: réalisé repris des opérations passées, montant prévu inchangé
+    with patch("services.finance_service.AnalyseFinanceComptaML") as analyse_ml:
+        budget = await finance_service.create_budget(_budget(intrants, 100000))
+        await finance_service.create_budget(_budget(CategorieTransaction.VENTE, 200000))
+    analyse_ml.assert_not_called()
+    assert (budget.montant_prevu, budget.montant_realise) == (Decimal("100000"), Decimal("20000"))
+
+    await finance_service.create_transaction(_transaction(compte, "DEP-2", TypeTransaction.DEPENSE, intrants, 30000))
+    await finance_service.create_transaction(
+        _transaction(compte, "VEN-1", TypeTransaction.RECETTE, CategorieTransaction.VENTE, 250000)
+    )
+    session.refresh(budget)
+    assert budget.montant_realise == Decimal("50000")
+
+    with patch("services.finance_service.AnalyseFinanceComptaML") as analyse_ml, assert_max_queries(1):
+        analysis = await finance_service.get_budget_analysis("2024-03")
+
+    analyse_ml.assert_not_called()
+    assert analysis["ml_statut"] == "EN_ATTENTE"
+    assert (analysis["total_prevu"], analysis["total_realise"]) == (300000, 300000)
+    assert analysis["categories"]["ACHAT_INTRANT"] == {
+        "prevu": 100000, "realise": 50000, "ecart": -50000, "ecart_percentage": -50.0
+    }
+    assert analysis["categories"]["VENTE"]["ecart_percentage"] == 25.0
+    assert {r["type"] for r in analysis["recommendations"]} == {"BUDGET_GAP"}
+
+async def test_ecritures_imputees_au_budget(session):
+    session.add(ExerciceComptable(id=uuid.uuid4(), annee="2024", date_debut=date(2024, 1, 1),
+                                  date_fin=date(2024, 12, 31), cloture=False))
+    entretien = CompteComptable(id=uuid.uuid4(), numero="6241", libelle="Entretien",
+                                type_compte=TypeCompteComptable.CHARGE, solde_debit=0, solde_credit=0)
+    session.add(entretien)
+    budget = Budget(id=uuid.uuid4(), periode="2024-03", categorie=CategorieTransaction.MAINTENANCE,
+                    montant_prevu=Decimal("40000"), montant_realise=0)
+    session.add(budget)
+    session.commit()
+
+    service = ComptabiliteService(session)
+    service.cache = AsyncMock()
+    ecriture = {"date_ecriture": date(2024, 3, 5), "numero_piece": "OD-1", "compte_id": entretien.id,
+                "libelle": "Réparation presse", "debit": Decimal("15000"), "credit": Decimal("0"),
+                "journal_id": uuid.uuid4()}
+    await service.create_ecriture(ecriture)
+    # Écriture issue d'une transaction: déjà comptée par la transaction
+    await service.create_ecriture({**ecriture, "numero_piece": "BQ-1", "transaction_id": uuid.uuid4()})
+
+    session.refresh(budget)
+    assert budget.montant_realise == Decimal("15000")
+
+async def test_enrichissement_ml_avec_la_meteo_du_mois(finance_service):
+    finance_service.weather_service = AsyncMock(spec=WeatherService)
+    finance_service.weather_service.get_daily_impacts.return_value = {
+        "2024-03-01": 0, "2024-03-02": 30, "2024-03-03": 45
+    }
+
+    with patch("services.finance_service.AnalyseFinanceComptaML") as analyse_ml:
+        analyse_ml.return_value.optimize_costs = AsyncMock(return_value={"savings": 0})
+        analyse_ml.return_value.predict_performance = AsyncMock(return_value={"trend": "STABLE"})
+        enrichissement = await finance_service.enrichir_budget_analysis("2024-03")
+
+    finance_service.weather_service.get_daily_impacts.assert_awaited_once_with(date(2024, 3, 1), date(2024, 3, 31))
+    meteo = enrichissement["weather_impact"]
+    assert (meteo["score"], meteo["factors"]) == (25.0, ["2 jour(s) de fortes précipitations ou de chaleur"])
+    finance_service.cache.set.assert_any_await("budget_ml_2024-03", enrichissement, expire_in=timedelta(hours=1))
+    finance_service.cache.invalidate.assert_awaited_with("budget_ml_en_cours_2024-03")
+
+async def test_un_seul_enrichissement_par_periode(session):
+    service = FinanceService(session)
+    service.cache = CacheService()
+    # SET NX: seule la première réservation aboutit
+    service.cache.redis = Mock()
+    service.cache.redis.set.side_effect = [True, None]
+
+    assert await service.reserver_enrichissement("2024-03")
+    assert not await service.reserver_enrichissement("2024-03")
+    service.cache.redis.set.assert_called_with("budget_ml_en_cours_2024-03", "1", nx=True, ex=600)
@@ -0,0 +1,77 @@
+"""
+Tests de la validation des écritures à la clôture mensuelle
+"""
+
+from datetime import date
+from unittest.mock import AsyncMock
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import create_schema
+from models.comptabilite import CompteComptable, EcritureComptable, ExerciceComptable, StatutEcriture, TypeCompte
+from services.finance_comptabilite.cloture import GestionCloture
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cloture.db'}")
+    create_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def exercice(session):
+    exercice = ExerciceComptable(id=uuid.uuid4(), annee="2024", date_debut=date(2024, 1, 1),
+                                 date_fin=date(2024, 12, 31), cloture=False)
+    session.add(exercice)
+    comptes = {numero: uuid.uuid4() for numero in ("521", "601")}
+    session.execute(CompteComptable.__table__.insert(), [
+        {"id": compte_id, "numero": numero, "libelle": numero,
+         "type_compte": TypeCompte.ACTIF if numero == "521" else TypeCompte.CHARGE}
+        for numero, compte_id in comptes.items()
+    ])
+    journal_id = uuid.uuid4()
+    session.execute(EcritureComptable.__table__.insert(), [
+        {"id": uuid.uuid4(), "date_ecriture": date(2024, 3, 4), "numero_piece": piece,
+         "compte_id": comptes[numero], "libelle": piece, "debit": debit, "credit": credit,
+         "statut": StatutEcriture.BROUILLON, "journal_id": journal_id, "periode": "2024-03"}
+        for piece, numero, debit, credit in [
+            ("ACH-1", "601", 1000, 0),
+            ("ACH-1", "521", 0, 1000),
+        ]
+    ])
+    session.commit()
+    return exercice
+
+@pytest.fixture
+def service(session):
+    service = GestionCloture(session)
+    service.comptabilite.cache = AsyncMock()
+    return service
+
+async def test_validation_des_brouillons(session, exercice, service):
+    validateur = uuid.uuid4()
+
+    validation = await service._valider_ecritures_attente(exercice, 3, validateur)
+
+    assert validation == {"success": True, "message": "2 écritures validées"}
+    ecritures = session.query(EcritureComptable).all()
+    assert {(e.statut, e.validee_par_id) for e in ecritures} == {(StatutEcriture.VALIDEE, validateur)}
+    service.comptabilite.cache.delete_pattern.assert_any_await("balance_*")
+
+async def test_piece_desequilibree_refusee(session, exercice, service):
+    session.query(EcritureComptable).filter(EcritureComptable.debit > 0).update(
+        {"debit": 900}, synchronize_session=False
+    )
+    session.commit()
+
+    validation = await service._valider_ecritures_attente(exercice, 3, uuid.uuid4())
+
+    assert not validation["success"]
+    assert "Pièces non équilibrées: ACH-1" in validation["message"]
+    assert session.query(EcritureComptable).filter(
+        EcritureComptable.statut == StatutEcriture.BROUILLON
+    ).count() == 2
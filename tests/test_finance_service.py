@@ -4,9 +4,9 @@ Tests du service finance avec ML et cache
 
 import pytest
 from datetime import datetime, timedelta
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from services.finance_service import FinanceService
-from models.finance import Budget, Transaction, Compte
+from models.finance import Budget, Transaction, Compte, TypeTransaction
 from schemas.finance import BudgetCreate, TransactionCreate, BudgetUpdate
 from decimal import Decimal
 from typing import Dict, Any
@@ -49,11 +49,12 @@ class TestFinanceService:
 
     async def test_get_stats_with_ml(self, finance_service, db_session):
         """Test des statistiques avec ML"""
-        # Setup
+        # Setup: totaux mensuels lus dans les agrégats, trésorerie des comptes
+        finance_service._totaux_mensuels = Mock(return_value={})
         db_session.query().filter().scalar.return_value = 1000000.0
         
         # Mock ML
-        with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.predict_performance') as mock_predict:
+        with patch('services.ml.finance_comptabilite.analyse.AnalyseFinanceCompta.predict_performance') as mock_predict:
             mock_predict.return_value = {
                 "predictions": [
                     {
@@ -72,7 +73,7 @@ class TestFinanceService:
                 ]
             }
             
-            with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
+            with patch('services.ml.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
                 mock_optimize.return_value = {
                     "potential_savings": 1000,
                     "implementation_plan": [
@@ -102,13 +103,13 @@ class TestFinanceService:
         db_session.query().filter().scalar.return_value = 1000000.0
         
         # Mock ML
-        with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.predict_performance') as mock_predict:
+        with patch('services.ml.finance_comptabilite.analyse.AnalyseFinanceCompta.predict_performance') as mock_predict:
             mock_predict.return_value = {
                 "predictions": [],
                 "risk_factors": []
             }
             
-            with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
+            with patch('services.ml.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
                 mock_optimize.return_value = {
                     "potential_savings": 0,
                     "implementation_plan": []
@@ -127,14 +128,14 @@ class TestFinanceService:
                 assert stats["cached"]
 
     async def test_create_budget_with_ml(self, finance_service, sample_budget_create, db_session):
-        """Test création d'un budget avec ML"""
+        """Test création d'un budget: le montant prévu n'est pas ajusté par le ML"""
         # Setup
         db_session.add = Mock()
         db_session.commit = Mock()
         db_session.refresh = Mock()
         
         # Mock ML
-        with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
+        with patch('services.ml.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
             mock_optimize.return_value = {
                 "potential_savings": 100000.0,
                 "implementation_plan": [
@@ -151,7 +152,8 @@ class TestFinanceService:
             # Vérifications
             assert db_session.add.called
             assert db_session.commit.called
-            assert budget.montant_prevu == sample_budget_create.montant_prevu - 100000.0
+            assert budget.montant_prevu == sample_budget_create.montant_prevu
+            mock_optimize.assert_not_called()
 
     async def test_get_budgets_with_ml(self, finance_service, db_session):
         """Test récupération des budgets avec ML"""
@@ -177,10 +179,9 @@ class TestFinanceService:
             # Exécution
             budgets = await finance_service.get_budgets("2024-01")
             
-            # Vérifications
+            # Vérifications: les budgets se chargent sans attendre le ML
             assert len(budgets) == 1
-            assert hasattr(budgets[0], "ml_predictions")
-            assert hasattr(budgets[0], "ml_recommendations")
+            mock_analyse.assert_not_called()
 
     async def test_budget_cache(self, finance_service, db_session):
         """Test du cache des budgets"""
@@ -211,59 +212,45 @@ class TestFinanceService:
         assert budgets[0]["cached"]
 
     async def test_get_budget_analysis_with_ml(self, finance_service, db_session):
-        """Test analyse budgétaire avec ML"""
+        """Test analyse budgétaire: écarts immédiats, ML joint depuis son cache"""
         # Setup
-        budgets = [
-            Budget(
-                periode="2024-01",
-                categorie="ACHAT_INTRANT",
-                montant_prevu=1000000.0,
-                montant_realise=1200000.0
-            )
-        ]
-        db_session.query().filter().all.return_value = budgets
-        
-        # Mock services
-        with patch.object(finance_service, '_analyze_weather_impact') as mock_weather:
-            mock_weather.return_value = {
-                "score": 50,
-                "factors": ["Fortes précipitations"],
-                "projections": {"TRANSPORT": "Augmentation probable"}
+        finance_service.suivi_budget.ecarts = Mock(return_value={
+            "total_prevu": 1000000.0,
+            "total_realise": 1200000.0,
+            "categories": {
+                "ACHAT_INTRANT": {"prevu": 1000000.0, "realise": 1200000.0, "ecart": 200000.0, "ecart_percentage": 20.0}
             }
-            
-            with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
-                mock_optimize.return_value = {
-                    "potential_savings": 100000.0,
-                    "implementation_plan": [
-                        {
-                            "category": "ACHAT_INTRANT",
-                            "actions": ["Optimiser achats"]
-                        }
-                    ]
-                }
-                
-                with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.predict_performance') as mock_predict:
-                    mock_predict.return_value = {
-                        "predictions": [
-                            {
-                                "month": "2024-02",
-                                "margin": -100000.0
-                            }
-                        ]
-                    }
-                    
-                    # Exécution
-                    analysis = await finance_service.get_budget_analysis("2024-01")
-                    
-                    # Vérifications
-                    assert "optimization" in analysis
-                    assert "performance" in analysis
-                    assert len(analysis["recommendations"]) > 0
+        })
+        finance_service.cache = AsyncMock()
+        finance_service.cache.get.return_value = None
+
+        # Sans enrichissement en cache: aucun modèle n'est appelé
+        with patch('services.finance_service.AnalyseFinanceComptaML') as mock_analyse_ml:
+            analysis = await finance_service.get_budget_analysis("2024-01")
+
+            assert analysis["ml_statut"] == "EN_ATTENTE"
+            assert "optimization" not in analysis
+            assert [r["type"] for r in analysis["recommendations"]] == ["BUDGET_GAP"]
+            mock_analyse_ml.assert_not_called()
+
+        # Enrichissement en cache sous sa propre clé
+        finance_service.cache.get.return_value = {
+            "weather_impact": {"score": 50},
+            "optimization": {"potential_savings": 100000.0, "implementation_plan": []},
+            "performance": {"predictions": [{"month": "2024-02", "margin": -100000.0}]}
+        }
+        analysis = await finance_service.get_budget_analysis("2024-01")
+
+        finance_service.cache.get.assert_awaited_with("budget_ml_2024-01")
+        assert analysis["ml_statut"] == "DISPONIBLE"
+        assert "optimization" in analysis
+        assert "performance" in analysis
+        assert len(analysis["recommendations"]) == 3
 
     async def test_get_financial_projections_with_ml(self, finance_service, db_session):
         """Test projections financières avec ML"""
-        # Setup
-        db_session.query().filter().scalar.return_value = 1000000.0
+        # Setup: totaux mensuels lus dans les agrégats
+        finance_service._totaux_mensuels = Mock(return_value={})
         
         # Mock services
         with patch.object(finance_service, '_analyze_weather_impact') as mock_weather:
@@ -273,7 +260,7 @@ class TestFinanceService:
                 "projections": {}
             }
             
-            with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.predict_performance') as mock_predict:
+            with patch('services.ml.finance_comptabilite.analyse.AnalyseFinanceCompta.predict_performance') as mock_predict:
                 mock_predict.return_value = {
                     "predictions": [
                         {
@@ -444,7 +431,7 @@ class TestFinanceService:
         ]
         
         # Mock cache
-        mock_cache = Mock()
+        mock_cache = AsyncMock()
         finance_service.cache = mock_cache
 
         # Exécution
@@ -452,8 +439,8 @@ class TestFinanceService:
 
         # Vérifications
         assert db_session.commit.called
-        assert existing_budget.montant_realise == sample_transaction_create.montant
-        assert mock_cache.delete.call_count == 2  # Stats et budget analysis
+        assert db_session.execute.called  # Réalisé du budget (UPDATE atomique)
+        assert mock_cache.invalidate.call_count == 1  # Stats
 
     async def test_create_transaction_insufficient_balance(self, finance_service, sample_transaction_create, db_session):
         """Test la création d'une transaction avec solde insuffisant"""
@@ -540,16 +527,21 @@ class TestFinanceService:
     async def test_get_basic_stats(self, finance_service, db_session):
         """Test des statistiques de base"""
         # Setup
-        db_session.query().filter().scalar.side_effect = [
-            1000000.0,  # revenue actuel
-            800000.0,   # revenue précédent
-            600000.0,   # dépenses actuelles
-            500000.0,   # dépenses précédentes
-            2000000.0   # trésorerie
-        ]
+        now = datetime.utcnow()
+        current_month = now.strftime("%Y-%m")
+        last_month = (now - timedelta(days=30)).strftime("%Y-%m")
+        totaux = {
+            (current_month, TypeTransaction.RECETTE): (Decimal("1000000"), 10),
+            (last_month, TypeTransaction.RECETTE): (Decimal("800000"), 8),
+            (current_month, TypeTransaction.DEPENSE): (Decimal("600000"), 6),
+            (last_month, TypeTransaction.DEPENSE): (Decimal("500000"), 5),
+        }
+        db_session.query().filter().scalar.return_value = Decimal("2000000")  # trésorerie
 
         # Exécution
-        stats = await finance_service._get_basic_stats()
+        with patch.object(finance_service, "_totaux_mensuels", return_value=totaux) as totaux_mensuels:
+            stats = await finance_service._get_basic_stats()
+        totaux_mensuels.assert_called_once_with(periodes=[current_month, last_month])
 
         # Vérifications
         assert stats["revenue"] == 1000000.0
@@ -561,13 +553,19 @@ class TestFinanceService:
 
     async def test_calculate_base_projection(self, finance_service, db_session):
         """Test du calcul de projection de base"""
-        # Setup
-        db_session.query().filter().scalar.return_value = 50000.0
+        # Setup: agrégats depuis novembre, le mois d'octobre est hors fenêtre
+        totaux = {
+            ("2023-10", TypeTransaction.RECETTE): (Decimal("900000"), 1),
+            ("2023-12", TypeTransaction.RECETTE): (Decimal("100000"), 2),
+            ("2024-01", TypeTransaction.RECETTE): (Decimal("50000"), 1),
+            ("2024-01", TypeTransaction.DEPENSE): (Decimal("70000"), 2),
+        }
 
         # Exécution
         projection = await finance_service._calculate_base_projection(
             "RECETTE",
-            "2024-02"
+            "2024-02",
+            totaux
         )
 
         # Vérifications
@@ -597,8 +595,8 @@ class TestFinanceService:
         # Exécution
         await finance_service._update_budget_realise(transaction)
 
-        # Vérifications
-        assert budget.montant_realise == 30000.0
+        # Vérifications: un UPDATE atomique
+        db_session.execute.assert_called_once()
 
     async def test_update_budget_realise_recette(self, finance_service, db_session):
         """Test de mise à jour du budget réalisé pour une recette"""
@@ -624,8 +622,8 @@ class TestFinanceService:
         # Exécution
         await finance_service._update_budget_realise(transaction)
 
-        # Vérifications
-        assert budget.montant_realise == 50000.0
+        # Vérifications: un UPDATE atomique
+        db_session.execute.assert_called_once()
 
     async def test_get_budgets_all(self, finance_service, db_session):
         """Test récupération de tous les budgets"""
@@ -668,7 +666,7 @@ class TestFinanceService:
         )
 
         # Mock ML
-        with patch('services.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
+        with patch('services.ml.finance_comptabilite.analyse.AnalyseFinanceCompta.optimize_costs') as mock_optimize:
             mock_optimize.return_value = {
                 "potential_savings": 10000.0,
                 "implementation_plan": []
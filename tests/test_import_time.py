@@ -0,0 +1,70 @@
+"""Benchmark du temps d'import de l'API et des services ML."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).parent.parent
+
+# Budget d'import en secondes (surchargeable pour les machines lentes de CI)
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "5.0"))
+
+HEAVY_MODULES = ["torch", "sklearn", "pandas", "pulp", "psutil", "scipy"]
+
+def _measure_import(module: str) -> dict:
+    """Importe un module dans un interpréteur neuf et mesure le coût"""
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+@pytest.mark.performance
+@pytest.mark.parametrize("module", [
+    "services.ml.core.config",
+    "services.ml.inventaire",
+    "services.hr_analytics_service",
+    "api.v1",
+])
+def test_import_does_not_load_heavy_dependencies(module):
+    """L'import ne doit charger ni torch, ni sklearn, ni pandas, ni pulp"""
+    mesure = _measure_import(module)
+    assert mesure["heavy"] == []
+
+@pytest.mark.performance
+def test_api_import_time_budget():
+    """Le chargement des routes API reste sous le budget de démarrage"""
+    mesure = _measure_import("api.v1")
+    assert mesure["elapsed"] < IMPORT_TIME_BUDGET
+
+def test_config_import_has_no_side_effects():
+    """L'import de la configuration ML ne sonde ni le CPU ni le GPU"""
+    script = (
+        "import services.ml.core.config as config\n"
+        "assert config._environment_optimized is False\n"
+        "assert config.get_resource_limits.cache_info().currsize == 0\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,166 @@
+"""
+Tests de la diffusion des notifications WebSocket entre workers.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from services.notification_hub import (
+    PING,
+    ClientConnection,
+    NotificationHub,
+    notification_message
+)
+from models.notification import ModuleNotification, Notification, TypeNotification
+
+class FakeWebSocket:
+    """Client WebSocket simulé: messages reçus et envoyés"""
+
+    def __init__(self, send_delay: float = 0):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent = []
+        self.closed_with = None
+        self.send_delay = send_delay
+
+    async def receive_text(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise WebSocketDisconnect()
+        return message
+
+    async def send_text(self, message):
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+@pytest.fixture
+def redis_client():
+    """Redis simulé, sans abonnement réel"""
+    client = Mock()
+    client.publish = AsyncMock()
+    with patch.object(NotificationHub, "_redis", return_value=client), \
+            patch.object(NotificationHub, "_listen", new=AsyncMock()):
+        yield client
+
+def _pmessage(user_id, data):
+    return {"type": "pmessage", "channel": f"notifications:{user_id}".encode(), "data": data.encode()}
+
+def test_full_queue_drops_oldest():
+    connection = ClientConnection(FakeWebSocket(), "u1", queue_size=2)
+    for i in range(3):
+        connection.enqueue(str(i))
+
+    assert connection.dropped == 1
+    assert [connection.queue.get_nowait() for _ in range(2)] == ["1", "2"]
+
+async def test_redis_message_reaches_local_connections_only(redis_client):
+    hub = NotificationHub()
+    alice = hub.register("alice", FakeWebSocket())
+    bob = hub.register("bob", FakeWebSocket())
+
+    hub.dispatch(_pmessage("alice", '{"titre":"Stock bas"}'))
+    hub.dispatch({"type": "psubscribe", "channel": b"notifications:*", "data": 1})
+
+    assert alice.queue.get_nowait() == '{"titre":"Stock bas"}'
+    assert bob.queue.empty()
+
+async def test_publish_goes_through_redis(redis_client):
+    hub = NotificationHub()
+    connection = hub.register("alice", FakeWebSocket())
+
+    await hub.publish("alice", {"id": uuid4(), "date": datetime(2024, 1, 15)})
+
+    channel, message = redis_client.publish.await_args[0]
+    assert channel == "notifications:alice"
+    assert json.loads(message)["date"] == "2024-01-15T00:00:00"
+    # Remise locale uniquement via l'abonnement, pas de doublon
+    assert connection.queue.empty()
+
+async def test_publish_falls_back_to_local_delivery(redis_client):
+    redis_client.publish.side_effect = ConnectionError("Redis indisponible")
+    hub = NotificationHub()
+    connection = hub.register("alice", FakeWebSocket())
+
+    await hub.publish("alice", {"titre": "Alerte"})
+
+    assert json.loads(connection.queue.get_nowait()) == {"titre": "Alerte"}
+
+async def test_slow_client_does_not_block_others(redis_client):
+    """Un client lent ne retarde pas la remise aux autres connexions"""
+    hub = NotificationHub(queue_size=5, heartbeat_interval=10, idle_timeout=10)
+    slow, fast = FakeWebSocket(send_delay=10), FakeWebSocket()
+    serving = [
+        asyncio.create_task(hub.serve(slow, "alice")),
+        asyncio.create_task(hub.serve(fast, "alice")),
+    ]
+    await asyncio.sleep(0)
+
+    for i in range(20):
+        hub.deliver_local("alice", str(i))
+        await asyncio.sleep(0.001)
+
+    assert fast.sent == [str(i) for i in range(20)]
+    assert slow.sent == []
+    assert sum(connection.dropped for connection in hub._connections["alice"]) == 14
+
+    for websocket in (slow, fast):
+        websocket.incoming.put_nowait(None)
+    await asyncio.gather(*serving)
+    assert len(hub) == 0
+
+async def test_heartbeat_and_idle_cleanup(redis_client):
+    """Client avec battement: ping en l'absence de message, fermeture s'il reste muet"""
+    hub = NotificationHub(heartbeat_interval=0.01, idle_timeout=0.05)
+    websocket = FakeWebSocket()
+
+    await asyncio.wait_for(hub.serve(websocket, "alice", heartbeat=True), 1)
+
+    assert PING in websocket.sent
+    assert websocket.closed_with == 1001
+    assert len(hub) == 0
+
+async def test_receive_only_client_kept_open(redis_client):
+    """Un client qui ne fait que recevoir ne reçoit pas de ping et n'est pas fermé"""
+    hub = NotificationHub(heartbeat_interval=0.01, idle_timeout=0.05)
+    websocket = FakeWebSocket()
+    serving = asyncio.create_task(hub.serve(websocket, "alice"))
+
+    await asyncio.sleep(0.1)
+    hub.deliver_local("alice", '{"titre":"Stock bas"}')
+    await asyncio.sleep(0.01)
+
+    assert websocket.sent == ['{"titre":"Stock bas"}']
+    assert websocket.closed_with is None and not serving.done()
+    websocket.incoming.put_nowait(None)
+    await serving
+    assert len(hub) == 0
+
+async def test_failed_send_releases_connection(redis_client):
+    """Un envoi en échec (pair disparu) libère la connexion"""
+    hub = NotificationHub()
+    websocket = FakeWebSocket()
+    websocket.send_text = AsyncMock(side_effect=RuntimeError("connexion fermée"))
+    serving = asyncio.create_task(hub.serve(websocket, "alice"))
+    await asyncio.sleep(0)
+
+    hub.deliver_local("alice", '{"titre":"Stock bas"}')
+
+    await asyncio.wait_for(serving, 1)
+    assert len(hub) == 0
+
+def test_notification_message():
+    notification = Notification(
+        id=uuid4(), titre="Stock bas", message="Engrais sous le seuil",
+        type=TypeNotification.WARNING, module=ModuleNotification.INVENTAIRE
+    )
+    message = notification_message(notification)
+    assert message["titre"] == "Stock bas"
+    assert message["type"] == TypeNotification.WARNING
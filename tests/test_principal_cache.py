@@ -0,0 +1,192 @@
+"""
+Tests du cache d'identités utilisé par get_current_user.
+"""
+
+import time
+from unittest.mock import Mock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from core.principal_cache import Principal, PrincipalCache, get_principal_cache
+from core.security import (
+    Permission,
+    authenticate_token,
+    create_access_token,
+    require_permissions,
+    revoke_token,
+    verify_token
+)
+from models.auth import (
+    Permission as PermissionModel,
+    Role,
+    TypeRole,
+    Utilisateur,
+    role_permission
+)
+
+class FakeRedis:
+    """Clés partagées entre workers (révocations, versions)"""
+
+    def __init__(self):
+        self.store = {}
+
+    def exists(self, key):
+        return int(key in self.store)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = str(value)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def redis_client():
+    """Redis partagé simulé"""
+    client = Mock(wraps=FakeRedis())
+    with patch.object(PrincipalCache, "_redis", return_value=client):
+        get_principal_cache().clear()
+        yield client
+
+@pytest.fixture
+def user(db):
+    suffix = uuid4().hex[:8]
+    finance = (
+        db.query(PermissionModel).filter_by(code="FINANCE").first()
+        or PermissionModel(code="FINANCE", module="finance", actions={"read": True})
+    )
+    role = Role(nom=f"Comptables {suffix}", type=TypeRole.OPERATEUR, permissions=[finance])
+    db.add(role)
+    db.flush()
+    user = Utilisateur(
+        email=f"{suffix}@fofal.cm", username=f"compta-{suffix}", hashed_password="x",
+        role_id=role.id, is_active=True
+    )
+    db.add(user)
+    db.commit()
+    yield user
+
+    # La base de test est partagée: les tests d'intégration attendent des tables vides
+    db.rollback()
+    for table in (Utilisateur.__table__, role_permission, Role.__table__, PermissionModel.__table__):
+        db.execute(table.delete())
+    db.commit()
+
+def _principal(**kwargs):
+    values = dict(
+        id="u1", username="u1", role_id=None, is_active=True,
+        is_superuser=False, is_staff=False, permissions=frozenset({"user"})
+    )
+    values.update(kwargs)
+    return Principal(**values)
+
+def test_cached_token_skips_database(db, user):
+    """Le second appel est servi par le cache, sans requête"""
+    token = create_access_token(subject=user.username)
+
+    principal = authenticate_token(token, db)
+    assert principal.id == user.id
+    assert principal.permissions == frozenset({"user", "finance"})
+
+    assert authenticate_token(token, Mock(side_effect=AssertionError)) is principal
+
+def test_user_update_invalidates_cache(db, user):
+    token = create_access_token(subject=user.username)
+    authenticate_token(token, db)
+
+    user.is_active = False
+    db.commit()
+
+    assert get_principal_cache().get(token) is None
+    with pytest.raises(HTTPException) as exc:
+        authenticate_token(token, db)
+    assert exc.value.status_code == 401
+
+def test_logout_revokes_token(db, user, redis_client):
+    """Le token révoqué est refusé et inscrit dans la liste partagée"""
+    token = create_access_token(subject=user.username)
+    authenticate_token(token, db)
+
+    revoke_token(token)
+
+    assert redis_client.setex.call_args[0][0].startswith("auth:revoked:")
+    with pytest.raises(HTTPException):
+        authenticate_token(token, db)
+
+def test_token_revoked_by_another_worker(db, user, redis_client):
+    redis_client.exists.return_value = 1
+    with pytest.raises(HTTPException):
+        authenticate_token(create_access_token(subject=user.username), db)
+
+def test_cached_token_revoked_by_another_worker(db, user):
+    """Un succès du cache relit la liste de révocation partagée"""
+    token = create_access_token(subject=user.username)
+    authenticate_token(token, db)
+
+    autre_worker = PrincipalCache(ttl_seconds=60)
+    autre_worker.revoke(verify_token(token)["jti"], time.time() + 60)
+
+    with pytest.raises(HTTPException) as exc:
+        authenticate_token(token, db)
+    assert exc.value.status_code == 401
+
+def test_user_update_published_to_other_workers(db, user, redis_client):
+    """Le commit publie la modification: le cache des autres workers est périmé"""
+    token = create_access_token(subject=user.username)
+    autre_worker = PrincipalCache(ttl_seconds=60)
+    autre_worker.put(token, authenticate_token(token, db))
+    assert autre_worker.get(token) is not None
+
+    user.is_active = False
+    db.commit()
+
+    assert redis_client.mget([f"auth:version:user:{user.id}"]) == ["1"]
+    assert autre_worker.get(token) is None
+    assert len(autre_worker) == 0
+
+def test_entry_expires_with_token():
+    cache = PrincipalCache(ttl_seconds=60)
+    cache.put("token", _principal(), token_expires_at=time.time() - 1)
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+def test_eviction_bounds_size():
+    cache = PrincipalCache(ttl_seconds=60, max_entries=2)
+    for i in range(3):
+        cache.put(f"token{i}", _principal(id=f"u{i}"))
+    assert len(cache) == 2
+    assert cache.get("token0") is None
+
+async def test_require_permissions_uses_principal_permissions():
+    @require_permissions([Permission.FINANCE])
+    async def endpoint(current_user=None):
+        return "ok"
+
+    assert await endpoint(current_user=_principal(permissions=frozenset({"finance"}))) == "ok"
+    assert await endpoint(current_user=_principal(permissions=frozenset({"admin"}))) == "ok"
+    with pytest.raises(HTTPException) as exc:
+        await endpoint(current_user=_principal())
+    assert exc.value.status_code == 403
+
+@pytest.mark.performance
+def test_cache_hit_latency(db, user):
+    """Un succès du cache coûte quelques microsecondes"""
+    token = create_access_token(subject=user.username)
+    authenticate_token(token, db)
+
+    start_time = time.perf_counter()
+    for _ in range(1000):
+        authenticate_token(token, db)
+    elapsed = (time.perf_counter() - start_time) / 1000
+
+    assert elapsed < 50e-6
@@ -0,0 +1,82 @@
+"""
+Budgets de requêtes SQL et temps des méthodes de service les plus sollicitées.
+
+Les budgets (requêtes et temps moyen) sont vérifiés à chaque exécution de la
+suite; les temps peuvent en plus être comparés à une référence
+pytest-benchmark enregistrée (voir tests/query_budget.py).
+"""
+
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import Volumes, create_schema, seed
+from models.iot_sensor import IoTSensor
+from services.comptabilite_service import ComptabiliteService
+from services.iot_monitoring_service import IoTMonitoringService
+
+VOLUMES = Volumes(years=1, ecritures_per_day=3, parcelles=4, sensors_per_parcelle=5,
+                  sensor_months=1, produits=10, stocks_per_produit=1)
+
+# Temps moyen maximal (secondes) sur la base de test, environ 10 fois la mesure de référence
+BUDGET_BALANCE_GENERALE = 0.05
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('budgets') / 'erp.db'}")
+    create_schema(engine)
+    seed(engine, VOLUMES, end=date(2024, 6, 30))
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+@pytest.fixture
+def comptabilite(session):
+    service = ComptabiliteService(session)
+    service.cache = AsyncMock()
+    service.cache.get.return_value = None
+    return service
+
+def _monitoring(session):
+    return IoTMonitoringService(session, Mock(), Mock(), Mock())
+
+def test_balance_generale_single_query(comptabilite, assert_max_queries):
+    with assert_max_queries(1):
+        balance = asyncio.run(comptabilite.get_balance_generale(date(2024, 1, 1), date(2024, 6, 30)))
+
+    assert len(balance) > 5
+    assert sum(ligne["debit"] for ligne in balance) == pytest.approx(
+        sum(ligne["credit"] for ligne in balance)
+    )
+    assert all(ligne["compte"]["numero"] for ligne in balance)
+
+def test_sensor_health_batched(session, assert_max_queries):
+    sensors = session.execute(select(IoTSensor)).scalars().all()
+    assert len(sensors) == 20
+
+    with assert_max_queries(1):
+        health = asyncio.run(_monitoring(session)._load_health(sensors))
+
+    assert set(health) == {sensor.id for sensor in sensors}
+
+@pytest.mark.max_queries(2)
+def test_max_queries_marker(session):
+    sensors = session.execute(select(IoTSensor)).scalars().all()
+    asyncio.run(_monitoring(session)._load_health(sensors))
+
+@pytest.mark.performance
+def test_balance_generale_benchmark(benchmark, comptabilite):
+    balance = benchmark(
+        lambda: asyncio.run(comptabilite.get_balance_generale(date(2024, 1, 1), date(2024, 6, 30)))
+    )
+    assert balance
+    if benchmark.stats:  # Absent avec --benchmark-disable
+        assert benchmark.stats["mean"] < BUDGET_BALANCE_GENERALE
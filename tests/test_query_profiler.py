@@ -0,0 +1,72 @@
+"""
+Tests du profilage SQL par requête et des attributs de trace.
+"""
+
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from core.query_profiler import QueryProfile, QueryProfilerMiddleware, profile_queries
+from core.telemetry import record_cache_lookup, set_span_attributes
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE parcelles (id INTEGER PRIMARY KEY, code TEXT)"))
+        connection.execute(text("INSERT INTO parcelles VALUES (1, 'P1'), (2, 'P2'), (3, 'P3')"))
+    yield engine
+    engine.dispose()
+
+def test_profile_counts_queries(engine):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with profile_queries() as profile:
+            for i in range(3):
+                connection.execute(text("SELECT code FROM parcelles WHERE id = :id"), {"id": i})
+        connection.execute(text("SELECT 1"))
+
+    assert profile.count == 3
+    assert profile.total_ms > 0
+
+def test_slowest_statements_are_kept():
+    profile = QueryProfile(slowest_count=2)
+    for duration, statement in [(1.0, "a"), (5.0, "b"), (3.0, "c"), (0.5, "d")]:
+        profile.record(statement, duration)
+
+    assert profile.count == 4
+    assert profile.slowest == [(5.0, "b"), (3.0, "c")]
+
+def test_middleware_reports_per_request_stats(engine, caplog):
+    """Un N+1 apparaît dans les en-têtes et le journal de la requête"""
+    app = FastAPI()
+    app.add_middleware(QueryProfilerMiddleware, warn_count=2)
+
+    @app.get("/parcelles")
+    def parcelles():
+        with engine.connect() as connection:
+            ids = connection.execute(text("SELECT id FROM parcelles")).scalars().all()
+            return [
+                connection.execute(text("SELECT code FROM parcelles WHERE id = :id"), {"id": i}).scalar()
+                for i in ids
+            ]
+
+    with caplog.at_level(logging.INFO, logger="core.query_profiler"):
+        response = TestClient(app).get("/parcelles")
+
+    assert response.json() == ["P1", "P2", "P3"]
+    assert response.headers["x-db-query-count"] == "4"
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert "N+1 probable" in caplog.text
+    assert "SELECT code FROM parcelles" in caplog.text
+
+def test_span_helpers_without_sdk():
+    """Sans fournisseur de traces configuré, les attributs sont ignorés"""
+    set_span_attributes({"db.query_count": 3, "ignored": None})
+    record_cache_lookup("cle", True)
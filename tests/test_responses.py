@@ -0,0 +1,59 @@
+"""
+Tests de la sérialisation orjson, du cache d'octets JSON et de la compression.
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from core.responses import APIJSONResponse, cached_json, dumps
+from main import app
+
+def test_dumps_matches_default_encoder():
+    """Même contenu que jsonable_encoder + json pour les types courants"""
+    content = {
+        "date": datetime(2024, 1, 15, 8, 30),
+        "id": uuid4(),
+        "montant": Decimal("1250.50"),
+        "tags": {"finance"},
+        "valeurs": [1.5, 2, None],
+        1: "clé entière"
+    }
+
+    assert json.loads(dumps(content)) == json.loads(json.dumps(jsonable_encoder(content)))
+
+def test_dumps_numpy():
+    assert json.loads(dumps({"serie": np.arange(3, dtype=np.float64)})) == {"serie": [0.0, 1.0, 2.0]}
+
+async def test_cached_json_hit_skips_compute():
+    """Un succès du cache renvoie les octets stockés sans recalcul"""
+    cache = AsyncMock()
+    cache.get_json.return_value = b'{"cached":true}'
+    compute = AsyncMock()
+
+    assert await cached_json(cache, "cle", compute) == b'{"cached":true}'
+    compute.assert_not_called()
+
+async def test_cached_json_miss_stores_encoded_payload():
+    cache = AsyncMock()
+    cache.get_json.return_value = None
+
+    payload = await cached_json(cache, "cle", AsyncMock(return_value={"total": Decimal("2.5")}))
+
+    assert payload == b'{"total":2.5}'
+    cache.set_json.assert_awaited_once_with("cle", payload, None)
+
+def test_default_response_class_and_compression(client):
+    """Réponses orjson par défaut, compressées au-delà du seuil"""
+    assert app.router.default_response_class is APIJSONResponse
+
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,86 @@
+"""
+Tests du conteneur de services par requête.
+"""
+
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import redis
+
+from core.config import STORAGE_CONFIG
+from services.analytics_cross_module_service import CrossModuleAnalytics
+from services.cache_service import CacheService, get_redis_client
+from services.comptabilite_service import ComptabiliteService
+from services.comptabilite_stats_service import ComptabiliteStatsService
+from services.container import PROCESS_SINGLETONS, ServiceContainer
+from services.iot_service import IoTService
+from services.weather_service import WeatherService
+
+def test_services_shared_within_request():
+    """Un service demandé plusieurs fois n'est construit qu'une fois par requête"""
+    db, async_db = Mock(), Mock()
+    container = ServiceContainer(db, async_db)
+
+    comptabilite = container.get(ComptabiliteService)
+
+    assert comptabilite.stats_service is container.get(ComptabiliteStatsService)
+    assert comptabilite.analyse is comptabilite.stats_service.analyse
+    assert comptabilite.stats_service.read_db is async_db
+    assert container.get(IoTService).db is db
+
+def test_stateless_clients_shared_across_requests():
+    """Cache et météo sont des singletons du processus, les services métier non"""
+    first, second = ServiceContainer(Mock()), ServiceContainer(Mock())
+
+    assert first.get(CacheService) is second.get(CacheService)
+    assert first.get(WeatherService) is second.get(WeatherService)
+    assert first.get(IoTService) is not second.get(IoTService)
+    assert first.get(IoTService).weather_service is first.get(WeatherService)
+    assert first.get(CacheService).redis is get_redis_client()
+
+def test_request_graph_creates_no_redis_client():
+    """Construire le graphe comptable ne crée aucun nouveau client Redis"""
+    get_redis_client()
+    with patch.object(redis.Redis, "__init__", side_effect=AssertionError("nouveau client Redis")):
+        ComptabiliteService(Mock())
+
+def test_unresolvable_parameter_raises():
+    """Un paramètre obligatoire sans annotation exploitable est signalé"""
+    class Service:
+        def __init__(self, seuil):
+            self.seuil = seuil
+
+    with pytest.raises(TypeError, match="seuil"):
+        ServiceContainer(Mock()).get(Service)
+
+def _temps_moyen(construire, repetitions=50):
+    construire()
+    start_time = time.perf_counter()
+    for _ in range(repetitions):
+        construire()
+    return (time.perf_counter() - start_time) / repetitions
+
+@pytest.mark.performance
+def test_request_graph_construction_time(tmp_path):
+    """Coût de construction par requête: avant (clients Redis neufs) et avec le conteneur"""
+    db = Mock()
+    stockage = {"storage_path": str(tmp_path), "max_file_size_mb": 10, "allowed_extensions": []}
+
+    with patch.dict(STORAGE_CONFIG, stockage):
+        # Avant: chaque service construit ses dépendances et ouvre son propre client Redis
+        nouveau_client = get_redis_client.__wrapped__
+        with patch.dict(PROCESS_SINGLETONS, {CacheService: CacheService, WeatherService: WeatherService}), \
+                patch("services.cache_service.get_redis_client", nouveau_client), \
+                patch("services.weather_service.get_redis_client", nouveau_client), \
+                patch("services.production_report_service.get_redis_client", nouveau_client):
+            avant = _temps_moyen(lambda: (ComptabiliteService(db), CrossModuleAnalytics(db)))
+
+        def par_conteneur():
+            container = ServiceContainer(db)
+            return container.get(ComptabiliteService), container.get(CrossModuleAnalytics)
+        apres = _temps_moyen(par_conteneur)
+
+    # Moins de 2 ms par requête, et au moins 5 fois moins qu'avant
+    assert apres < 0.002
+    assert apres * 5 < avant
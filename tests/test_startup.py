@@ -0,0 +1,87 @@
+"""
+Tests du démarrage: vérification du schéma et phases du lifespan.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+from db.schema import (
+    SchemaVersionError,
+    check_schema_version,
+    migration_graph,
+    MIGRATIONS_DIR
+)
+from main import app
+
+MIGRATION = '''
+revision: str = "{revision}"
+down_revision = {down!r}
+
+def upgrade():
+    pass
+'''
+
+@pytest.fixture
+def migrations(tmp_path):
+    """Trois révisions linéaires: 001 -> 002 -> 003"""
+    for revision, down in [("001", None), ("002", "001"), ("003", "002")]:
+        (tmp_path / f"{revision}.py").write_text(MIGRATION.format(revision=revision, down=down))
+    return tmp_path
+
+def _engine_at(tmp_path, revision=None):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    if revision:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32))"))
+            connection.execute(text(f"INSERT INTO alembic_version VALUES ('{revision}')"))
+    return engine
+
+def test_repository_has_single_head():
+    """Les migrations du dépôt ont une seule tête"""
+    known, heads = migration_graph(MIGRATIONS_DIR)
+    assert len(heads) == 1
+    assert heads <= known
+
+def test_schema_at_head(tmp_path, migrations):
+    assert check_schema_version(_engine_at(tmp_path, "003"), directory=migrations) == {"003"}
+
+def test_schema_behind_head(tmp_path, migrations, caplog):
+    """Un schéma en retard bloque le démarrage, ou est signalé en mode warn"""
+    engine = _engine_at(tmp_path, "002")
+
+    with pytest.raises(SchemaVersionError, match="003"):
+        check_schema_version(engine, directory=migrations)
+    check_schema_version(engine, mode="warn", directory=migrations)
+    assert "retard" in caplog.text
+
+def test_schema_without_alembic_table(tmp_path, migrations):
+    with pytest.raises(SchemaVersionError, match="vide"):
+        check_schema_version(_engine_at(tmp_path), directory=migrations)
+
+def test_schema_ahead_of_code(tmp_path, migrations):
+    """Révision inconnue: migration d'une version plus récente déjà appliquée"""
+    assert check_schema_version(_engine_at(tmp_path, "004"), directory=migrations) == {"004"}
+
+def test_schema_create_mode(tmp_path, migrations):
+    """Le mode create crée les tables des modèles, sans exiger de migration"""
+    engine = _engine_at(tmp_path)
+
+    assert check_schema_version(engine, mode="create", directory=migrations) == frozenset()
+
+    tables = set(inspect(engine).get_table_names())
+    assert {"ecritures_comptables", "budgets", "stocks", "kpi_snapshots"} <= tables
+    # Idempotent: un second démarrage ne recrée rien
+    check_schema_version(engine, mode="create", directory=migrations)
+
+def test_lifespan_records_phase_timings():
+    """Le lifespan exécute les phases de démarrage et mesure leur durée"""
+    with patch("core.startup.check_schema_version") as check, \
+            patch("core.startup.warm_cache"):
+        with TestClient(app) as client:
+            assert client.get("/").status_code == 200
+
+    check.assert_called_once()
+    assert set(app.state.startup_timings) == {"schema", "pool", "models", "cache", "total"}
@@ -1,5 +1,5 @@
 import pytest
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from services.weather_service import WeatherService
 import httpx
 from unittest.mock import patch, MagicMock, AsyncMock
@@ -202,6 +202,34 @@ async def test_get_forecast_with_cache(weather_service):
         weather_service.redis_client.setex.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_get_daily_conditions_par_coordonnees(weather_service):
+    """Conditions journalières d'une cellule de grille en une requête"""
+    weather_service.redis_client.get.return_value = None
+    mock_response = {
+        "days": [
+            {"datetime": "2024-01-20", "temp": 27.5, "humidity": 80, "precip": 12.0},
+            {"datetime": "2024-01-21", "temp": 28.0, "humidity": 75, "precip": None}
+        ]
+    }
+
+    with patch("httpx.AsyncClient.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200, json=lambda: mock_response)
+
+        result = await weather_service.get_daily_conditions(
+            date(2024, 1, 20), date(2024, 1, 21), (4.0, 9.7)
+        )
+
+    assert result == [
+        {"date": "2024-01-20", "temperature": 27.5, "humidite": 80, "precipitation": 12.0},
+        {"date": "2024-01-21", "temperature": 28.0, "humidite": 75, "precipitation": 0}
+    ]
+    assert mock_get.call_args.args[0].endswith("/4.0,9.7/2024-01-20/2024-01-21")
+    assert weather_service.redis_client.setex.call_args.args[0] == (
+        "weather:conditions:4.0,9.7:2024-01-20:2024-01-21"
+    )
+
+
 @pytest.mark.asyncio
 async def test_error_handling_and_notification(weather_service):
     """Test de la gestion des erreurs et notifications"""